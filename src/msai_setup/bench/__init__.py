@@ -0,0 +1,18 @@
+"""Inference benchmarks with stored, comparable results.
+
+``msai bench llama`` runs a llama-bench matrix, ``msai bench serve`` loads a
+running OpenAI-compatible server with concurrent streaming requests, and
+``msai bench compare`` diffs two stored runs and flags regressions, for
+example after a kernel, Mesa or ROCm upgrade. Each run is stored with the build ids of the stack it ran on,
+so a slowdown can be traced to whatever changed underneath.
+"""
+
+from __future__ import annotations
+
+# A change smaller than this share of the baseline is noise, whatever the stddev says.
+# Defined here rather than in ``bench.store`` so the CLI can show it without loading SQLite.
+REGRESSION_THRESHOLD = 0.05
+
+
+class BenchError(RuntimeError):
+    """Raised when a benchmark cannot run or its output cannot be read."""
@@ -0,0 +1,297 @@
+"""Bench CLI - `msai bench <command>`.
+
+Commands import the suites and the results store when they run, so building
+the ``msai`` command tree loads neither SQLite nor Rich.
+"""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import typer
+
+from msai_setup.bench import REGRESSION_THRESHOLD
+
+bench_app = typer.Typer(
+    name="bench",
+    help="Reproducible inference benchmarks, stored with build ids and compared across runs.",
+    no_args_is_help=True,
+)
+
+
+def _when(timestamp: float) -> str:
+    from datetime import datetime
+
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sizes(values: list[str] | None) -> list[int] | None:
+    """Repeatable size options, each also accepting ``512,2048``."""
+    if not values:
+        return None
+    try:
+        return [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError as e:
+        raise typer.BadParameter(f"expected integers, got {', '.join(values)}") from e
+
+
+@bench_app.command("llama")
+def bench_llama(
+    model: Annotated[
+        list[str] | None,
+        typer.Option("--model", "-m", help="GGUF model to benchmark (repeatable; default: bench.llama.models)"),
+    ] = None,
+    prompt: Annotated[
+        list[str] | None, typer.Option("--prompt", "-p", metavar="N[,N...]", help="Prompt sizes in tokens (repeatable)")
+    ] = None,
+    gen: Annotated[
+        list[str] | None, typer.Option("--gen", "-n", metavar="N[,N...]", help="Generated tokens (repeatable)")
+    ] = None,
+    batch: Annotated[
+        list[str] | None, typer.Option("--batch", "-b", metavar="N[,N...]", help="Logical batch sizes (repeatable)")
+    ] = None,
+    ubatch: Annotated[
+        list[str] | None, typer.Option("--ubatch", "-u", metavar="N[,N...]", help="Physical batch sizes (repeatable)")
+    ] = None,
+    ngl: Annotated[int | None, typer.Option("--ngl", help="Layers to offload to the GPU")] = None,
+    repetitions: Annotated[int | None, typer.Option("--repetitions", "-r", min=1, help="Runs per case")] = None,
+    binary: Annotated[str, typer.Option("--binary", help="llama-bench executable")] = "llama-bench",
+) -> None:
+    """Run llama-bench over a model x prompt x batch matrix and store the results."""
+    from rich.table import Table
+
+    from msai_setup.bench import BenchError
+    from msai_setup.bench.env import build_ids
+    from msai_setup.bench.llama import SUITE, LlamaMatrix, run_matrix
+    from msai_setup.bench.store import BenchStore
+    from msai_setup.utils.config import get_config_value
+    from msai_setup.utils.formatting import console
+
+    try:
+        matrix = LlamaMatrix.from_config(get_config_value("bench.llama", {}) or {})
+    except (TypeError, ValueError) as e:
+        typer.echo(f"invalid bench.llama config: {e}", err=True)
+        raise typer.Exit(code=1) from e
+    if model:
+        matrix.models = model
+    for key, values in (("prompt", prompt), ("gen", gen), ("batch", batch), ("ubatch", ubatch)):
+        if (sizes := _sizes(values)) is not None:
+            setattr(matrix, key, sizes)
+    if ngl is not None:
+        matrix.ngl = ngl
+    if repetitions is not None:
+        matrix.repetitions = repetitions
+    if not matrix.models:
+        typer.echo("no models to benchmark: pass --model or set bench.llama.models", err=True)
+        raise typer.Exit(code=1)
+
+    try:
+        measurements, build = run_matrix(
+            matrix, binary=binary, on_model=lambda path: console.print(f"[dim]benchmarking {path}...[/dim]")
+        )
+    except (BenchError, OSError) as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1) from e
+    env = build_ids()
+    if build:
+        env["llama.cpp"] = build
+    run_id = BenchStore().record(SUITE, env, measurements)
+
+    table = Table(title=f"llama-bench, run {run_id}", title_justify="left")
+    table.add_column("Case")
+    table.add_column("t/s", justify="right")
+    table.add_column("±", justify="right", style="dim")
+    for measurement in measurements:
+        table.add_row(measurement.case, f"{measurement.value:.2f}", f"{measurement.stddev:.2f}")
+    console.print(table)
+    console.print("[dim]" + ", ".join(f"{key} {value}" for key, value in sorted(env.items())) + "[/dim]")
+
+
+@bench_app.command("serve")
+def bench_serve(
+    url: Annotated[
+        str, typer.Option("--url", help="OpenAI-compatible base URL (llama-server, Ollama: .../v1)")
+    ] = "http://127.0.0.1:8080/v1",
+    model: Annotated[
+        str | None, typer.Option("--model", "-m", help="Model to request (default: the first the server lists)")
+    ] = None,
+    requests: Annotated[int, typer.Option("--requests", "-N", min=1, help="Requests to send")] = 32,
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c", min=1, help="Requests in flight at most")] = 4,
+    rate: Annotated[
+        float | None,
+        typer.Option("--rate", min=0.0, help="Poisson arrival rate in requests/s (default: all at once)"),
+    ] = None,
+    prompt_tokens: Annotated[
+        str, typer.Option("--prompt-tokens", "-p", metavar="N|MIN-MAX", help="Prompt length per request")
+    ] = "256",
+    max_tokens: Annotated[
+        str, typer.Option("--max-tokens", "-n", metavar="N|MIN-MAX", help="Tokens to generate per request")
+    ] = "128",
+    seed: Annotated[int, typer.Option("--seed", help="Seed for lengths, prompts and arrivals")] = 0,
+    timeout: Annotated[float, typer.Option("--timeout", min=1.0, help="Seconds a single request may take")] = 300.0,
+) -> None:
+    """Load a running server with concurrent streaming requests and store TTFT, ITL and throughput."""
+    from rich.table import Table
+
+    from msai_setup.bench import BenchError
+    from msai_setup.bench.env import build_ids
+    from msai_setup.bench.serve import PERCENTILES, SUITE, Lengths, ServeLoad, run_load, served_model
+    from msai_setup.bench.store import BenchStore
+    from msai_setup.utils.formatting import console
+    from msai_setup.utils.stats import percentile
+
+    try:
+        prompt_lengths = Lengths.parse(prompt_tokens)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="'--prompt-tokens'") from e
+    try:
+        output_lengths = Lengths.parse(max_tokens)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="'--max-tokens'") from e
+    try:
+        model = model or served_model(url)
+    except BenchError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1) from e
+    load = ServeLoad(
+        url=url.rstrip("/"),
+        model=model,
+        requests=requests,
+        concurrency=concurrency,
+        rate=rate or None,
+        prompt_tokens=prompt_lengths,
+        max_tokens=output_lengths,
+        seed=seed,
+        timeout=timeout,
+    )
+
+    with console.status(f"sending {requests} requests to {load.url}...") as status:
+        done = 0
+
+        def progress(_result: object) -> None:
+            nonlocal done
+            done += 1
+            status.update(f"{done}/{requests} requests done")
+
+        report = run_load(load, on_done=progress)
+    for failure in report.failed[:3]:
+        console.print(f"[yellow]request failed: {failure.error}[/yellow]")
+    if not report.completed:
+        typer.echo(f"all {requests} requests failed; nothing recorded", err=True)
+        raise typer.Exit(code=1)
+    env = {**build_ids(), "endpoint": load.url}
+    run_id = BenchStore().record(SUITE, env, report.measurements())
+
+    table = Table(title=f"{load.case}, run {run_id}", title_justify="left")
+    table.add_column("ms")
+    for q in PERCENTILES:
+        table.add_column(f"p{q}", justify="right")
+    labels = {
+        "ttft": "Time to first token",
+        "itl": "Inter-token latency",
+        "latency": "Request latency",
+        "queue": "Queue wait",
+    }
+    for metric, values in report.samples().items():
+        if values:
+            table.add_row(labels[metric], *(f"{percentile(values, q) * 1000:.1f}" for q in PERCENTILES))
+    console.print(table)
+    console.print(
+        f"{len(report.completed)}/{len(report.results)} requests in {report.duration:.1f}s: "
+        f"{report.throughput:.1f} output tok/s, {report.request_rate:.2f} requests/s"
+    )
+
+
+@bench_app.command("runs")
+def bench_runs(
+    suite: Annotated[str | None, typer.Option("--suite", "-s", help="Only runs of this suite")] = None,
+    limit: Annotated[int, typer.Option("--limit", "-n", min=1, help="Runs to list")] = 20,
+) -> None:
+    """List stored benchmark runs, newest first."""
+    from rich.table import Table
+
+    from msai_setup.bench.store import BenchStore
+    from msai_setup.utils.formatting import console
+
+    runs = BenchStore().runs(suite, limit=limit)
+    if not runs:
+        typer.echo("no benchmark runs recorded yet")
+        return
+    table = Table(title="Benchmark runs", title_justify="left")
+    for column in ("Run", "When", "Suite", "Stack"):
+        table.add_column(column, justify="right" if column == "Run" else "left")
+    for run in runs:
+        stack = ", ".join(f"{key} {value}" for key, value in sorted(run.env.items()))
+        table.add_row(str(run.id), _when(run.at), run.suite, stack)
+    console.print(table)
+
+
+@bench_app.command("compare")
+def bench_compare(
+    baseline: Annotated[
+        int | None,
+        typer.Option("--baseline", "-b", metavar="RUN", help="Run to compare against (default: the one before latest)"),
+    ] = None,
+    latest: Annotated[
+        int | None,
+        typer.Option("--latest", "-l", metavar="RUN", help="Run to judge (default: the suite's latest)"),
+    ] = None,
+    suite: Annotated[str, typer.Option("--suite", "-s", help="Suite whose runs to pick by default")] = "llama",
+    threshold: Annotated[
+        float,
+        typer.Option("--threshold", "-t", min=0.0, help="Smallest relative change that counts, e.g. 0.05 for 5%"),
+    ] = REGRESSION_THRESHOLD,
+) -> None:
+    """Compare two runs case by case; exits 1 if anything regressed.
+
+    A case regressed when it got worse by more than the threshold and by more
+    than the two runs' standard deviations combined.
+    """
+    from rich.table import Table
+
+    from msai_setup.bench.store import BenchStore, env_changes
+    from msai_setup.utils.formatting import console
+
+    store = BenchStore()
+    if latest is None:
+        recent = store.runs(suite, limit=1)
+        latest = recent[0].id if recent else None
+    after = store.run(latest) if latest is not None else None
+    if after is None:
+        typer.echo(f"no run {latest}" if latest is not None else f"no {suite} runs recorded yet", err=True)
+        raise typer.Exit(code=1)
+    if baseline is not None:
+        before = store.run(baseline)
+    else:
+        before = store.previous(after)
+    if before is None or before.id == after.id:
+        typer.echo("no baseline run to compare with", err=True)
+        raise typer.Exit(code=1)
+
+    console.print(f"[bold]run {after.id} at {_when(after.at)} vs run {before.id} at {_when(before.at)}[/bold]")
+    for key, (old, new) in env_changes(before.env, after.env).items():
+        console.print(f"  {key}: {old or '-'} → {new or '-'}")
+    comparisons = store.compare(before, after, threshold=threshold)
+    if not comparisons:
+        typer.echo("the runs have no case in common", err=True)
+        raise typer.Exit(code=1)
+    table = Table(title_justify="left")
+    table.add_column("Case")
+    table.add_column("Metric")
+    for column in ("Before", "After", "Change"):
+        table.add_column(column, justify="right")
+    for comparison in comparisons:
+        change = f"{comparison.change:+.1%}"
+        if comparison.regressed:
+            change = f"[red]{change} regressed[/red]"
+        elif comparison.improved:
+            change = f"[green]{change}[/green]"
+        table.add_row(
+            comparison.case,
+            comparison.metric,
+            f"{comparison.before.value:.2f} ±{comparison.before.stddev:.2f}",
+            f"{comparison.after.value:.2f} ±{comparison.after.stddev:.2f}",
+            change,
+        )
+    console.print(table)
+    raise typer.Exit(code=1 if any(comparison.regressed for comparison in comparisons) else 0)
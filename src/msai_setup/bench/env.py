@@ -0,0 +1,30 @@
+"""Build ids of the stack a benchmark ran on."""
+
+from __future__ import annotations
+
+from msai_setup.utils.probe import Probe, get_probe
+from msai_setup.utils.shell import run_command
+
+# Debian packages whose version is recorded with every run, by the key they are stored under.
+PACKAGES = {"mesa": "mesa-vulkan-drivers", "firmware": "linux-firmware"}
+
+
+def build_ids(probe: Probe | None = None) -> dict[str, str]:
+    """Kernel, Mesa, ROCm and firmware versions; whatever is not installed is left out.
+
+    One ``dpkg-query`` covers the packages; the kernel and ROCm versions are
+    file reads.
+    """
+    probe = probe or get_probe()
+    ids: dict[str, str] = {}
+    if kernel := probe.kernel_release():
+        ids["kernel"] = kernel
+    if rocm := (probe.read("/opt/rocm/.info/version") or "").strip():
+        ids["rocm"] = rocm
+    # dpkg-query exits 1 when any package is missing but still prints the others.
+    result = run_command(["dpkg-query", "-W", "-f", "${Package}\\t${Version}\\n", *PACKAGES.values()])
+    versions = dict(line.split("\t", 1) for line in result.stdout.splitlines() if "\t" in line)
+    for key, package in PACKAGES.items():
+        if versions.get(package):
+            ids[key] = versions[package]
+    return ids
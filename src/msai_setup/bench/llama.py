@@ -0,0 +1,144 @@
+"""The llama-bench suite: a model x prompt x batch matrix, measured in tokens/s.
+
+``llama-bench`` takes comma-separated lists for each dimension and runs the
+cross product itself, so the suite runs it once per model with ``-o json``
+and turns each row into a measurement. A row is either prompt processing
+(``pp512``: ``n_prompt`` tokens, no generation) or text generation
+(``tg128``). The rows carry llama.cpp's build number and commit, which are
+stored with the run next to the kernel, Mesa and ROCm versions.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from msai_setup.bench import BenchError
+from msai_setup.bench.store import Measurement
+from msai_setup.utils.shell import run_command
+
+SUITE = "llama"
+
+
+def _ints(value: Any) -> list[int]:
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str):
+        return [int(part) for part in value.split(",") if part.strip()]
+    return [int(part) for part in value]
+
+
+@dataclass
+class LlamaMatrix:
+    """What to benchmark: models and the prompt, generation and batch sizes to cross them with."""
+
+    models: list[str]
+    prompt: list[int] = field(default_factory=lambda: [512])
+    gen: list[int] = field(default_factory=lambda: [128])
+    batch: list[int] = field(default_factory=lambda: [2048])
+    ubatch: list[int] = field(default_factory=lambda: [512])
+    ngl: int = 99
+    repetitions: int = 3
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> LlamaMatrix:
+        """Build the matrix from the ``bench.llama`` section of the msai config.
+
+        Raises:
+            ValueError: If a size is not an integer or a list of them.
+        """
+        matrix = cls(models=[str(model) for model in config.get("models", [])])
+        for key in ("prompt", "gen", "batch", "ubatch"):
+            if key in config:
+                setattr(matrix, key, _ints(config[key]))
+        for key in ("ngl", "repetitions"):
+            if key in config:
+                setattr(matrix, key, int(config[key]))
+        return matrix
+
+    def args(self, model: str) -> list[str]:
+        """llama-bench arguments for one model."""
+
+        def joined(values: list[int]) -> str:
+            return ",".join(str(value) for value in values)
+
+        return [
+            "-m", model,
+            "-p", joined(self.prompt),
+            "-n", joined(self.gen),
+            "-b", joined(self.batch),
+            "-ub", joined(self.ubatch),
+            "-ngl", str(self.ngl),
+            "-r", str(self.repetitions),
+            "-o", "json",
+        ]  # fmt: skip
+
+
+def _test(row: dict[str, Any]) -> str:
+    prompt, gen = int(row.get("n_prompt", 0)), int(row.get("n_gen", 0))
+    if prompt and gen:
+        return f"pp{prompt}+tg{gen}"
+    return f"pp{prompt}" if prompt else f"tg{gen}"
+
+
+def parse_llama_bench(output: str) -> tuple[list[Measurement], str | None]:
+    """Measurements and the llama.cpp build id from ``llama-bench -o json`` output.
+
+    Raises:
+        BenchError: If the output is not llama-bench's JSON.
+    """
+    try:
+        rows = json.loads(output)
+        if not isinstance(rows, list):
+            raise TypeError("not a list of rows")
+        measurements: list[Measurement] = []
+        build: str | None = None
+        for row in rows:
+            case = (
+                f"{Path(row['model_filename']).name} {_test(row)} b{row['n_batch']} ub{row['n_ubatch']}"
+                f" ngl{row['n_gpu_layers']} {row.get('backends', '?')}"
+            )
+            measurements.append(Measurement(case, "t/s", float(row["avg_ts"]), float(row.get("stddev_ts", 0.0))))
+            if "build_number" in row:
+                build = f"b{row['build_number']} ({row.get('build_commit', '?')})"
+    except (ValueError, TypeError, KeyError) as e:
+        raise BenchError(f"unreadable llama-bench output: {e}") from e
+    return measurements, build
+
+
+def run_matrix(
+    matrix: LlamaMatrix,
+    *,
+    binary: str = "llama-bench",
+    on_model: Callable[[str], None] | None = None,
+) -> tuple[list[Measurement], str | None]:
+    """Run llama-bench for every model of the matrix, one after the other.
+
+    Args:
+        matrix: Models and sizes to run.
+        binary: The llama-bench executable.
+        on_model: Called with each model before it starts, for progress.
+
+    Returns:
+        All measurements and the llama.cpp build id.
+
+    Raises:
+        BenchError: If a run fails; measurements of earlier models are lost
+            with it, as a partial matrix does not compare.
+    """
+    measurements: list[Measurement] = []
+    build: str | None = None
+    for model in matrix.models:
+        if on_model is not None:
+            on_model(model)
+        result = run_command([binary, *matrix.args(model)], timeout=None)
+        if not result.success:
+            tail = "\n".join(result.stderr.strip().splitlines()[-5:])
+            raise BenchError(f"{binary} failed on {model} (exit {result.returncode}):\n{tail}")
+        rows, row_build = parse_llama_bench(result.stdout)
+        measurements += rows
+        build = row_build or build
+    return measurements, build
@@ -0,0 +1,315 @@
+"""The serve suite: concurrent streaming requests against an OpenAI-compatible server.
+
+``llama-server`` and Ollama both expose ``/v1/chat/completions``. The load
+generator sends ``requests`` chat completions with ``stream: true``, at most
+``concurrency`` in flight, either all at once or arriving at ``rate``
+requests per second (Poisson arrivals, as independent users would). Prompt
+and output lengths are drawn per request from a fixed value or a uniform
+range, with a seeded generator so two runs send the same load.
+
+Each request records when its first content chunk arrived (time to first
+token), the gaps between later chunks (inter-token latency; servers send one
+token per chunk, or a few under load) and when it finished. Under ``rate``
+those times count from the request's scheduled arrival, not from when it got
+a concurrency slot: a saturated server makes arrivals queue, and leaving that
+wait out would hide exactly the latency users see (coordinated omission). The
+wait is also reported on its own as queue time. Output token
+counts come from the final ``usage`` chunk when the server sends one, and
+from the number of content chunks otherwise.
+
+Prompts are random words from a small vocabulary: most tokenizers spend one
+token per common word, so a prompt of N words is close to N tokens, and
+random words keep the server's prompt cache from answering for free.
+``ignore_eos`` asks llama-server to generate the full ``max_tokens`` rather
+than stop early; servers that do not know it ignore it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from itertools import pairwise
+
+import httpx
+
+from msai_setup.bench import BenchError
+from msai_setup.bench.store import Measurement
+from msai_setup.utils.stats import percentile
+
+SUITE = "serve"
+
+PERCENTILES = (50, 95, 99)
+
+_WORDS = (
+    "time year people way day man thing woman life child world school state family student group country problem "
+    "hand part place case week company system program question work government number night point home water room "
+    "mother area money story fact month lot right study book eye job word business issue side kind head house "
+    "service friend father power hour game line end member law car city community name president team minute idea"
+).split()
+
+
+@dataclass(frozen=True)
+class Lengths:
+    """A token count per request: fixed (``256``) or drawn uniformly from a range (``128-512``)."""
+
+    low: int
+    high: int
+
+    @classmethod
+    def parse(cls, text: str) -> Lengths:
+        """Parse ``N`` or ``MIN-MAX``.
+
+        Raises:
+            ValueError: If the text is neither, or the range is empty or not positive.
+        """
+        low, sep, high = text.strip().partition("-")
+        lengths = cls(int(low), int(high) if sep else int(low))
+        if not 0 < lengths.low <= lengths.high:
+            raise ValueError(f"expected N or MIN-MAX with 0 < MIN <= MAX, got {text!r}")
+        return lengths
+
+    def draw(self, rng: random.Random) -> int:
+        """One request's length."""
+        return rng.randint(self.low, self.high)
+
+    def __str__(self) -> str:
+        """The form ``parse`` accepts."""
+        return str(self.low) if self.low == self.high else f"{self.low}-{self.high}"
+
+
+@dataclass
+class ServeLoad:
+    """The load to send: where, which model, how many requests and how fast."""
+
+    url: str
+    model: str
+    requests: int = 32
+    concurrency: int = 4
+    rate: float | None = None
+    prompt_tokens: Lengths = field(default_factory=lambda: Lengths(256, 256))
+    max_tokens: Lengths = field(default_factory=lambda: Lengths(128, 128))
+    seed: int = 0
+    timeout: float = 300.0
+
+    @property
+    def case(self) -> str:
+        """The case name results are stored under; runs with the same load compare."""
+        rate = f"{self.rate:g}/s" if self.rate else "max"
+        return f"{self.model} c{self.concurrency} rate {rate} p{self.prompt_tokens} n{self.max_tokens}"
+
+
+@dataclass
+class RequestResult:
+    """Timings of one streamed completion, in seconds.
+
+    TTFT and latency count from the scheduled arrival under a rate, and from
+    when the request was sent otherwise; ``queue`` is the time in between.
+    """
+
+    prompt_tokens: int
+    output_tokens: int = 0
+    ttft: float | None = None
+    itl: list[float] = field(default_factory=list)
+    latency: float = 0.0
+    queue: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class ServeReport:
+    """All requests of a load run and how long the run took."""
+
+    load: ServeLoad
+    results: list[RequestResult]
+    duration: float
+
+    @property
+    def completed(self) -> list[RequestResult]:
+        """Requests that streamed to the end."""
+        return [result for result in self.results if result.error is None]
+
+    @property
+    def failed(self) -> list[RequestResult]:
+        """Requests that errored or timed out."""
+        return [result for result in self.results if result.error is not None]
+
+    @property
+    def output_tokens(self) -> int:
+        """Tokens generated across completed requests."""
+        return sum(result.output_tokens for result in self.completed)
+
+    @property
+    def throughput(self) -> float:
+        """Generated tokens per second of wall time, across all requests."""
+        return self.output_tokens / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def request_rate(self) -> float:
+        """Completed requests per second of wall time."""
+        return len(self.completed) / self.duration if self.duration > 0 else 0.0
+
+    def samples(self) -> dict[str, list[float]]:
+        """TTFT, inter-token and end-to-end latencies of completed requests, by metric.
+
+        Under a rate, the time each request waited for a concurrency slot is
+        included as ``queue``; without one every request is due at once, so
+        the wait only reflects the concurrency limit.
+        """
+        completed = self.completed
+        samples = {
+            "ttft": [result.ttft for result in completed if result.ttft is not None],
+            "itl": [gap for result in completed for gap in result.itl],
+            "latency": [result.latency for result in completed],
+        }
+        if self.load.rate:
+            samples["queue"] = [result.queue for result in completed]
+        return samples
+
+    def measurements(self) -> list[Measurement]:
+        """Throughput and latency percentiles (in ms), as stored measurements."""
+        case = self.load.case
+        measured = [
+            Measurement(case, "output tok/s", self.throughput),
+            Measurement(case, "requests/s", self.request_rate),
+        ]
+        for metric, values in self.samples().items():
+            if values:
+                measured += [
+                    Measurement(case, f"{metric} p{q} ms", percentile(values, q) * 1000, higher_is_better=False)
+                    for q in PERCENTILES
+                ]
+        return measured
+
+
+def _prompt(rng: random.Random, tokens: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(tokens))
+
+
+def arrivals(requests: int, rate: float | None, rng: random.Random) -> list[float]:
+    """Send times in seconds from the start: all at once, or Poisson arrivals at ``rate`` per second."""
+    if not rate:
+        return [0.0] * requests
+    at, times = 0.0, list[float]()
+    for _ in range(requests):
+        times.append(at)
+        at += rng.expovariate(rate)
+    return times
+
+
+async def _stream(
+    client: httpx.AsyncClient,
+    load: ServeLoad,
+    prompt_tokens: int,
+    max_tokens: int,
+    prompt: str,
+    *,
+    due: float | None = None,
+) -> RequestResult:
+    """Send one request; timings count from ``due`` (a ``perf_counter`` time) or from now."""
+    result = RequestResult(prompt_tokens=prompt_tokens)
+    body = {
+        "model": load.model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "ignore_eos": True,
+    }
+    chunks: list[float] = []
+    usage: int | None = None
+    sent = time.perf_counter()
+    started = due if due is not None else sent
+    result.queue = max(0.0, sent - started)
+    try:
+        async with client.stream("POST", "/chat/completions", json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"HTTP {response.status_code}: {response.text[:200]}"
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line.removeprefix("data:").strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                for choice in event.get("choices") or []:
+                    delta = choice.get("delta") or {}
+                    # Reasoning models stream their thinking separately; it is generated all the same.
+                    if delta.get("content") or delta.get("reasoning_content"):
+                        chunks.append(time.perf_counter() - started)
+                        break
+                if event.get("usage"):
+                    usage = event["usage"].get("completion_tokens")
+    except (httpx.HTTPError, ValueError) as e:
+        result.error = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        result.latency = time.perf_counter() - started
+    if not chunks:
+        result.error = "no tokens streamed"
+        return result
+    result.ttft = chunks[0]
+    result.itl = [later - earlier for earlier, later in pairwise(chunks)]
+    result.output_tokens = usage if usage is not None else len(chunks)
+    return result
+
+
+async def _run(load: ServeLoad, on_done: Callable[[RequestResult], None] | None) -> ServeReport:
+    rng = random.Random(load.seed)
+    plan = []
+    for _ in range(load.requests):
+        prompt_tokens, max_tokens = load.prompt_tokens.draw(rng), load.max_tokens.draw(rng)
+        plan.append((prompt_tokens, max_tokens, _prompt(rng, prompt_tokens)))
+    send_at = arrivals(load.requests, load.rate, rng)
+    slots = asyncio.Semaphore(load.concurrency)
+    limits = httpx.Limits(max_connections=load.concurrency, max_keepalive_connections=load.concurrency)
+    timeout = httpx.Timeout(load.timeout, connect=10.0)
+
+    async with httpx.AsyncClient(base_url=load.url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+
+        async def send(index: int) -> RequestResult:
+            due = started + send_at[index]
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            async with slots:
+                result = await _stream(client, load, *plan[index], due=due if load.rate else None)
+            if on_done is not None:
+                on_done(result)
+            return result
+
+        results = await asyncio.gather(*(send(index) for index in range(load.requests)))
+        return ServeReport(load, list(results), time.perf_counter() - started)
+
+
+def run_load(load: ServeLoad, *, on_done: Callable[[RequestResult], None] | None = None) -> ServeReport:
+    """Send the load and wait for every request to finish or fail.
+
+    Args:
+        load: What to send.
+        on_done: Called with each request's result as it finishes, for progress.
+
+    Returns:
+        Every request's timings and the run's wall time. Failed requests are
+        in the report, not raised.
+    """
+    return asyncio.run(_run(load, on_done))
+
+
+def served_model(url: str, *, timeout: float = 10.0) -> str:
+    """The first model the server lists at ``/models``.
+
+    Raises:
+        BenchError: If the server cannot be reached or lists no model.
+    """
+    try:
+        response = httpx.get(f"{url.rstrip('/')}/models", timeout=timeout)
+        response.raise_for_status()
+        models = response.json().get("data") or []
+        return str(models[0]["id"])
+    except (httpx.HTTPError, ValueError, AttributeError, IndexError, KeyError, TypeError) as e:
+        raise BenchError(f"cannot list the models served at {url}: {e}") from e
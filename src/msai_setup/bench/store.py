@@ -0,0 +1,192 @@
+"""Benchmark results in a local SQLite database.
+
+A run is one invocation of a suite (``llama``, ...): when it ran, the build
+ids of the stack underneath (kernel, Mesa, ROCm, firmware, llama.cpp), and
+its measurements. A measurement is a value for one metric of one case, e.g.
+``t/s`` of ``model.gguf pp512 b2048``. Comparing two runs matches cases and
+metrics by name, so any suite's results can be compared the same way.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from msai_setup.bench import REGRESSION_THRESHOLD
+from msai_setup.utils.db import STATE_DIR, connect
+
+STORE_PATH = STATE_DIR / "bench.db"
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    at REAL NOT NULL,
+    suite TEXT NOT NULL,
+    env TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_suite_at ON runs (suite, at);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    "case" TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    stddev REAL NOT NULL,
+    higher_is_better INTEGER NOT NULL,
+    PRIMARY KEY (run_id, "case", metric)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class Measurement:
+    """One metric of one benchmark case."""
+
+    case: str
+    metric: str
+    value: float
+    stddev: float = 0.0
+    higher_is_better: bool = True
+
+
+@dataclass
+class BenchRun:
+    """A stored run: its suite, when it ran and on which stack."""
+
+    id: int
+    at: float
+    suite: str
+    env: dict[str, str]
+    measurements: list[Measurement] = field(default_factory=list)
+
+
+@dataclass
+class Comparison:
+    """A case/metric measured in both runs."""
+
+    case: str
+    metric: str
+    before: Measurement
+    after: Measurement
+    threshold: float = REGRESSION_THRESHOLD
+
+    @property
+    def change(self) -> float:
+        """Relative change from the baseline (+0.1 is 10% more)."""
+        return (self.after.value - self.before.value) / self.before.value if self.before.value else 0.0
+
+    def _significant(self) -> bool:
+        delta = abs(self.after.value - self.before.value)
+        return abs(self.change) >= self.threshold and delta > self.before.stddev + self.after.stddev
+
+    @property
+    def regressed(self) -> bool:
+        """Worse by more than the threshold and the runs' combined noise."""
+        worse = self.change < 0 if self.after.higher_is_better else self.change > 0
+        return worse and self._significant()
+
+    @property
+    def improved(self) -> bool:
+        """Better by more than the threshold and the runs' combined noise."""
+        better = self.change > 0 if self.after.higher_is_better else self.change < 0
+        return better and self._significant()
+
+
+def env_changes(before: dict[str, str], after: dict[str, str]) -> dict[str, tuple[str | None, str | None]]:
+    """Build ids that differ between two runs, as (before, after)."""
+    return {
+        key: (before.get(key), after.get(key))
+        for key in sorted(before.keys() | after.keys())
+        if before.get(key) != after.get(key)
+    }
+
+
+class BenchStore:
+    """The results database; every method opens and closes its own connection."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        """Use the database at ``path`` (default ``STORE_PATH``), created by the first ``record``."""
+        self.path = path or STORE_PATH
+
+    def _connect(self, *, write: bool = False) -> AbstractContextManager[sqlite3.Connection]:
+        return connect(self.path, _SCHEMA, _SCHEMA_VERSION, create=write)
+
+    def record(
+        self, suite: str, env: dict[str, str], measurements: list[Measurement], *, now: float | None = None
+    ) -> int:
+        """Store a run and its measurements; returns the run id."""
+        with self._connect(write=True) as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (at, suite, env) VALUES (?, ?, ?)",
+                (now if now is not None else time.time(), suite, json.dumps(env, sort_keys=True)),
+            )
+            run_id = cursor.lastrowid
+            assert run_id is not None
+            conn.executemany(
+                "INSERT OR REPLACE INTO measurements"
+                ' (run_id, position, "case", metric, value, stddev, higher_is_better) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (run_id, position, m.case, m.metric, m.value, m.stddev, int(m.higher_is_better))
+                    for position, m in enumerate(measurements)
+                ],
+            )
+        return run_id
+
+    def runs(self, suite: str | None = None, *, limit: int = 20) -> list[BenchRun]:
+        """The most recent runs, newest first, without their measurements."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM runs WHERE ? IS NULL OR suite = ? ORDER BY at DESC, id DESC LIMIT ?",
+                (suite, suite, limit),
+            ).fetchall()
+        return [BenchRun(row["id"], row["at"], row["suite"], json.loads(row["env"])) for row in rows]
+
+    def run(self, run_id: int) -> BenchRun | None:
+        """A run with its measurements, in the order they were recorded."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            measured = conn.execute(
+                'SELECT "case", metric, value, stddev, higher_is_better FROM measurements'
+                " WHERE run_id = ? ORDER BY position",
+                (run_id,),
+            ).fetchall()
+        return BenchRun(
+            row["id"],
+            row["at"],
+            row["suite"],
+            json.loads(row["env"]),
+            [
+                Measurement(m["case"], m["metric"], m["value"], m["stddev"], bool(m["higher_is_better"]))
+                for m in measured
+            ],
+        )
+
+    def previous(self, run: BenchRun) -> BenchRun | None:
+        """The run of the same suite recorded just before ``run``, with its measurements."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM runs WHERE suite = ? AND (at < ? OR (at = ? AND id < ?))"
+                " ORDER BY at DESC, id DESC LIMIT 1",
+                (run.suite, run.at, run.at, run.id),
+            ).fetchone()
+        return self.run(row["id"]) if row else None
+
+    def compare(
+        self, baseline: BenchRun, latest: BenchRun, *, threshold: float = REGRESSION_THRESHOLD
+    ) -> list[Comparison]:
+        """Cases and metrics measured in both runs, in the latest run's order."""
+        before = {(m.case, m.metric): m for m in baseline.measurements}
+        return [
+            Comparison(m.case, m.metric, before[(m.case, m.metric)], m, threshold)
+            for m in latest.measurements
+            if (m.case, m.metric) in before
+        ]
@@ -1,4 +1,10 @@
-"""MS-S1 MAX CLI."""
+"""MS-S1 MAX CLI.
+
+``msai`` runs from shell prompts and scripts, so this module imports only what
+typer needs to build the command tree (option types, defaults, help text).
+Each command imports the modules that do the work when it runs; the import
+budget is enforced by ``tests/test_cli_startup.py``.
+"""
 
 from __future__ import annotations
 
@@ -7,19 +13,15 @@ from pathlib import Path
 from typing import Annotated
 
 import typer
-from rich.table import Table
 
-from msai_setup.doctor.checks import Category
-from msai_setup.doctor.profile import Profile, resolve_profile, set_profile
-from msai_setup.doctor.runner import run_category, run_doctor
-from msai_setup.lab import instance as lab_instance
+from msai_setup.bench.cli import bench_app
+from msai_setup.doctor.checks import Category, Check
+from msai_setup.doctor.formats import OutputFormat
 from msai_setup.lab import profiles as lab_profiles
-from msai_setup.lab import state as lab_state
-from msai_setup.lab import vbox as lab_vbox
 from msai_setup.lab.cli import lab_app
-from msai_setup.lab.config import load_config
-from msai_setup.lab.provision import main as lab_provision
-from msai_setup.utils.formatting import console
+from msai_setup.models.cli import models_app
+from msai_setup.perf.cli import perf_app
+from msai_setup.utils.duration import parse_duration
 
 app = typer.Typer(
     name="msai",
@@ -39,14 +41,26 @@ profile_app = typer.Typer(
     no_args_is_help=False,
 )
 
+history_app = typer.Typer(
+    name="history",
+    help="Query past doctor runs: state changes, fact trends and regressions.",
+    invoke_without_command=True,
+)
+
+doctor_app.add_typer(history_app, name="history")
 app.add_typer(doctor_app, name="doctor")
 app.add_typer(profile_app, name="profile")
 app.add_typer(lab_app, name="lab")
+app.add_typer(bench_app, name="bench")
+app.add_typer(models_app, name="models")
+app.add_typer(perf_app, name="perf")
 
 
 @profile_app.callback(invoke_without_command=True)
 def profile_main(ctx: typer.Context) -> None:
     """Show the active profile when no subcommand is given."""
+    from msai_setup.doctor.profile import resolve_profile
+
     if ctx.invoked_subcommand is None:
         profile, source = resolve_profile()
         typer.echo(f"profile: {profile.value} (resolved from {source})")
@@ -57,6 +71,8 @@ def profile_set(
     name: Annotated[str, typer.Argument(help="Profile to persist: server or desktop.")],
 ) -> None:
     """Persist the host profile for future doctor runs."""
+    from msai_setup.doctor.profile import Profile, set_profile
+
     try:
         profile = Profile(name.strip().lower())
     except ValueError:
@@ -101,6 +117,10 @@ def bootstrap(
         bool,
         typer.Option("--force", help="Install even if already detected as present."),
     ] = False,
+    verify: Annotated[
+        bool,
+        typer.Option("--verify/--no-verify", help="Re-check the doctor categories of installed components."),
+    ] = True,
 ) -> None:
     """Install the MS-S1 MAX stack (Docker, ZFS tools, ROCm, KVM, Tailscale, Ollama).
 
@@ -109,7 +129,7 @@ def bootstrap(
     """
     from msai_setup.install.runner import bootstrap as run_bootstrap
 
-    run_bootstrap(components, dry_run=dry_run, assume_yes=yes, force=force)
+    run_bootstrap(components, dry_run=dry_run, assume_yes=yes, force=force, verify=verify)
 
 
 # ---------------------------------------------------------------------------
@@ -159,6 +179,9 @@ def create(
     need a local ISO via --iso. After this, `msai lab <cmd>` targets this
     instance.
     """
+    from msai_setup.lab import instance as lab_instance
+    from msai_setup.lab.provision import main as lab_provision
+
     lab_instance.validate_name(name)
     if os_profile not in lab_profiles.PROFILES:
         valid = ", ".join(sorted(lab_profiles.PROFILES))
@@ -206,6 +229,12 @@ def create(
 @lab_app.command(name="ls", hidden=True)
 def list_instances() -> None:
     """List lab instances visible in target/."""
+    from rich.table import Table
+
+    from msai_setup.lab import instance as lab_instance
+    from msai_setup.lab import vbox as lab_vbox
+    from msai_setup.utils.formatting import console
+
     items = lab_instance.list_instances()
     if not items:
         typer.echo("no instances yet. Create one: msai lab create <name>")
@@ -243,6 +272,8 @@ def use(
     name: Annotated[str, typer.Argument(help="Instance name to switch to.")],
 ) -> None:
     """Switch the current instance pointer to an existing instance."""
+    from msai_setup.lab import instance as lab_instance
+
     existing = {i.name for i in lab_instance.list_instances()}
     if name not in existing:
         typer.echo(
@@ -274,6 +305,11 @@ def start(
     Boots with a visible console by default (or matching how the VM was
     provisioned); pass --headless for a windowless boot.
     """
+    from msai_setup.lab import instance as lab_instance
+    from msai_setup.lab import state as lab_state
+    from msai_setup.lab import vbox as lab_vbox
+    from msai_setup.lab.config import load_config
+
     target = name or lab_instance.require_current()
     if not lab_vbox.vm_exists(target):
         typer.echo(f"VM '{target}' not present. Create it: msai lab create {target}", err=True)
@@ -308,6 +344,9 @@ def stop(
     ] = False,
 ) -> None:
     """Power off a lab instance."""
+    from msai_setup.lab import instance as lab_instance
+    from msai_setup.lab import vbox as lab_vbox
+
     target = name or lab_instance.require_current()
     if not lab_vbox.vm_running(target):
         typer.echo(f"VM '{target}' is not running.")
@@ -348,7 +387,8 @@ def ssh_login(
     explicitly when passing a command (it can't be inferred from "current"
     in that case, since the parser can't tell a command apart from a name).
     """
-    import os
+    from msai_setup.lab import instance as lab_instance
+    from msai_setup.lab.config import load_config
 
     target = name or lab_instance.require_current()
     cfg = load_config(vm_name=target)
@@ -385,6 +425,80 @@ YesOption = Annotated[
     bool,
     typer.Option("--yes", "-y", help="With --apply, auto-apply safe fixes without prompting"),
 ]
+JobsOption = Annotated[
+    int | None,
+    typer.Option("--jobs", "-j", min=1, help="Checks to run concurrently (default: CPU count)"),
+]
+DeadlineOption = Annotated[
+    float | None,
+    typer.Option(
+        "--deadline",
+        parser=parse_duration,
+        metavar="DURATION",
+        help="Time budget for the whole run, e.g. 10s; overrunning checks show as TIMEOUT",
+    ),
+]
+TimingsOption = Annotated[
+    bool,
+    typer.Option("--timings", help="Print per-check wall time and child CPU/RSS, most expensive first"),
+]
+FormatOption = Annotated[
+    OutputFormat,
+    typer.Option(
+        "--format",
+        case_sensitive=False,
+        help="Output format: rich report, one JSON document, or NDJSON streamed per result",
+    ),
+]
+
+FreshOption = Annotated[
+    bool,
+    typer.Option("--fresh", help="Re-run every check, ignoring cached results"),
+]
+CachedOnlyOption = Annotated[
+    bool,
+    typer.Option("--cached-only", help="Run nothing; report the last cached results (for prompts and status bars)"),
+]
+
+
+def _doctor(
+    categories: list[Category] | None,
+    *,
+    fix: bool,
+    apply: bool,
+    yes: bool,
+    jobs: int | None,
+    deadline: float | None,
+    timings: bool,
+    output_format: OutputFormat,
+    fresh: bool,
+    cached_only: bool,
+    checks: list[tuple[Category, Check]] | None = None,
+) -> None:
+    """Run the doctor for the given categories (or explicit checks) and exit with its status."""
+    from msai_setup.doctor.runner import run_doctor
+
+    if fresh and cached_only:
+        raise typer.BadParameter("--fresh and --cached-only are mutually exclusive", param_hint="'--cached-only'")
+    if apply and output_format is not OutputFormat.RICH:
+        raise typer.BadParameter(
+            f"--apply prompts interactively and cannot be used with --format {output_format.value}",
+            param_hint="'--apply'",
+        )
+    _passed, _warnings, failed = run_doctor(
+        categories,
+        fix=fix,
+        apply=apply,
+        assume_yes=yes,
+        jobs=jobs,
+        deadline=deadline,
+        timings=timings,
+        output_format=output_format,
+        fresh=fresh,
+        cached_only=cached_only,
+        checks=checks,
+    )
+    raise typer.Exit(code=1 if failed > 0 else 0)
 
 
 @doctor_app.callback(invoke_without_command=True)
@@ -393,73 +507,342 @@ def doctor_main(
     fix: FixOption = False,
     apply: ApplyOption = False,
     yes: YesOption = False,
+    jobs: JobsOption = None,
+    deadline: DeadlineOption = None,
+    timings: TimingsOption = False,
+    output_format: FormatOption = OutputFormat.RICH,
+    fresh: FreshOption = False,
+    cached_only: CachedOnlyOption = False,
 ) -> None:
     """Run all health checks."""
     if ctx.invoked_subcommand is None:
-        _passed, _warnings, failed = run_doctor(fix=fix, apply=apply, assume_yes=yes)
-        raise typer.Exit(code=1 if failed > 0 else 0)
+        _doctor(
+            None,
+            fix=fix,
+            apply=apply,
+            yes=yes,
+            jobs=jobs,
+            deadline=deadline,
+            timings=timings,
+            output_format=output_format,
+            fresh=fresh,
+            cached_only=cached_only,
+        )
+
+
+def _category_command(category: Category, help_text: str) -> None:
+    """Register ``msai doctor <category>`` with the shared doctor options."""
+
+    def command(
+        fix: FixOption = False,
+        apply: ApplyOption = False,
+        yes: YesOption = False,
+        jobs: JobsOption = None,
+        deadline: DeadlineOption = None,
+        timings: TimingsOption = False,
+        output_format: FormatOption = OutputFormat.RICH,
+        fresh: FreshOption = False,
+        cached_only: CachedOnlyOption = False,
+    ) -> None:
+        _doctor(
+            [category],
+            fix=fix,
+            apply=apply,
+            yes=yes,
+            jobs=jobs,
+            deadline=deadline,
+            timings=timings,
+            output_format=output_format,
+            fresh=fresh,
+            cached_only=cached_only,
+        )
+
+    command.__doc__ = help_text
+    doctor_app.command(category.value)(command)
+
+
+_category_command(Category.SYSTEM, "Run system checks (Ubuntu, kernel, memory, CPU, SSH).")
+_category_command(Category.ZFS, "Run ZFS checks (pool, health, scrub, snapshots).")
+_category_command(Category.DOCKER, "Run Docker checks (daemon, group, compose).")
+_category_command(Category.INCUS, "Run Incus checks (installed, daemon, initialized, incus-admin group).")
+_category_command(Category.KVM, "Run KVM checks (KVM enabled, QEMU, IOMMU, vfio-pci).")
 
 
 @doctor_app.command()
-def system(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run system checks (Ubuntu, kernel, memory, CPU, SSH)."""
-    _passed, _warnings, failed = run_category(
-        Category.SYSTEM, fix=fix, apply=apply, assume_yes=yes
+def gpu(
+    fix: FixOption = False,
+    apply: ApplyOption = False,
+    yes: YesOption = False,
+    jobs: JobsOption = None,
+    deadline: DeadlineOption = None,
+    timings: TimingsOption = False,
+    output_format: FormatOption = OutputFormat.RICH,
+    fresh: FreshOption = False,
+    cached_only: CachedOnlyOption = False,
+    sample: Annotated[
+        float | None,
+        typer.Option(
+            "--sample",
+            parser=parse_duration,
+            metavar="DURATION",
+            help="Also sample GPU load, clocks, memory and power for this long, e.g. 10s",
+        ),
+    ] = None,
+) -> None:
+    """Run GPU checks (AMD driver, ROCm, Vulkan), optionally sampling live load."""
+    checks = None
+    if sample is not None:
+        if cached_only:
+            raise typer.BadParameter("--sample and --cached-only are mutually exclusive", param_hint="'--sample'")
+        from msai_setup.doctor.checks import registry
+        from msai_setup.doctor.checks.gpu import gpu_load_check
+
+        checks = [*registry.get_checks([Category.GPU]), (Category.GPU, gpu_load_check(sample))]
+    _doctor(
+        [Category.GPU],
+        fix=fix,
+        apply=apply,
+        yes=yes,
+        jobs=jobs,
+        deadline=deadline,
+        timings=timings,
+        output_format=output_format,
+        fresh=fresh,
+        cached_only=cached_only,
+        checks=checks,
     )
-    raise typer.Exit(code=1 if failed > 0 else 0)
 
 
-@doctor_app.command()
-def zfs(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run ZFS checks (pool, health, scrub, snapshots)."""
-    _passed, _warnings, failed = run_category(Category.ZFS, fix=fix, apply=apply, assume_yes=yes)
-    raise typer.Exit(code=1 if failed > 0 else 0)
+_category_command(Category.INFERENCE, "Run inference checks (llama.cpp installed, HIP/ROCm backend).")
+_category_command(
+    Category.PERFORMANCE, "Run performance checks (CPU governor and EPP, GPU power state, persisted profile)."
+)
+_category_command(Category.TAILSCALE, "Run Tailscale checks (daemon, connection, MagicDNS).")
 
 
-@doctor_app.command()
-def docker(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run Docker checks (daemon, group, compose)."""
-    _passed, _warnings, failed = run_category(Category.DOCKER, fix=fix, apply=apply, assume_yes=yes)
-    raise typer.Exit(code=1 if failed > 0 else 0)
+@doctor_app.command("watch")
+def doctor_watch(
+    categories: Annotated[
+        list[Category] | None,
+        typer.Argument(help="Categories to watch (default: all)", case_sensitive=False),
+    ] = None,
+    interval: Annotated[
+        float | None,
+        typer.Option(
+            "--interval",
+            parser=parse_duration,
+            metavar="DURATION",
+            show_default="5m",
+            help="Re-run period for checks without their own interval",
+        ),
+    ] = None,
+    poll: Annotated[
+        float | None,
+        typer.Option(
+            "--poll",
+            parser=parse_duration,
+            metavar="DURATION",
+            show_default="2s",
+            help="How often to re-check input files between inotify events",
+        ),
+    ] = None,
+    jobs: JobsOption = None,
+) -> None:
+    """Keep a live report, re-running checks only when their inputs change."""
+    from msai_setup.doctor.checks import registry
+    from msai_setup.doctor.profile import resolve_profile
+    from msai_setup.doctor.watch import DEFAULT_INTERVAL, DEFAULT_POLL, watch
+    from msai_setup.utils.formatting import console
+
+    profile, _source = resolve_profile()
+    watch(
+        registry.get_checks(categories or None),
+        profile=profile,
+        console=console,
+        interval=DEFAULT_INTERVAL if interval is None else interval,
+        poll=DEFAULT_POLL if poll is None else poll,
+        jobs=jobs,
+    )
 
 
-@doctor_app.command()
-def incus(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run Incus checks (installed, daemon, initialized, incus-admin group)."""
-    _passed, _warnings, failed = run_category(Category.INCUS, fix=fix, apply=apply, assume_yes=yes)
-    raise typer.Exit(code=1 if failed > 0 else 0)
+@doctor_app.command("export")
+def doctor_export(
+    textfile_dir: Annotated[
+        Path,
+        typer.Option(
+            "--textfile-dir",
+            file_okay=False,
+            help="node_exporter textfile collector directory to write msai_doctor.prom into",
+        ),
+    ],
+    categories: Annotated[
+        list[Category] | None,
+        typer.Argument(help="Categories to export (default: all)", case_sensitive=False),
+    ] = None,
+    jobs: JobsOption = None,
+    deadline: DeadlineOption = None,
+    fresh: FreshOption = False,
+) -> None:
+    """Write doctor results as Prometheus gauges (for a systemd timer)."""
+    from msai_setup.doctor.engine import DoctorRun
+    from msai_setup.doctor.export import TEXTFILE_NAME, render_textfile, write_textfile
+    from msai_setup.doctor.history import record_run
+
+    run = DoctorRun(categories or None, jobs=jobs, deadline=deadline, fresh=fresh)
+    for _result in run:
+        pass
+    record_run(run)
+    target = textfile_dir / TEXTFILE_NAME
+    if write_textfile(textfile_dir, render_textfile(run.results())):
+        typer.echo(f"wrote {target}")
+    else:
+        typer.echo(f"{target} unchanged")
 
 
-@doctor_app.command()
-def kvm(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run KVM checks (KVM enabled, QEMU, IOMMU, vfio-pci)."""
-    _passed, _warnings, failed = run_category(Category.KVM, fix=fix, apply=apply, assume_yes=yes)
-    raise typer.Exit(code=1 if failed > 0 else 0)
+def _when(timestamp: float) -> str:
+    from datetime import datetime
 
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
 
-@doctor_app.command()
-def gpu(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run GPU checks (AMD driver, ROCm, Vulkan)."""
-    _passed, _warnings, failed = run_category(Category.GPU, fix=fix, apply=apply, assume_yes=yes)
-    raise typer.Exit(code=1 if failed > 0 else 0)
 
+@history_app.callback(invoke_without_command=True)
+def history_main(
+    ctx: typer.Context,
+    limit: Annotated[int, typer.Option("--limit", "-n", min=1, help="Runs to list")] = 20,
+) -> None:
+    """List recent doctor runs when no query is given."""
+    if ctx.invoked_subcommand is not None:
+        return
+    from rich.table import Table
 
-@doctor_app.command()
-def inference(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run inference checks (llama.cpp installed, HIP/ROCm backend)."""
-    _passed, _warnings, failed = run_category(
-        Category.INFERENCE, fix=fix, apply=apply, assume_yes=yes
-    )
-    raise typer.Exit(code=1 if failed > 0 else 0)
+    from msai_setup.doctor.history import History
+    from msai_setup.utils.formatting import console
+
+    runs = History().runs(limit)
+    if not runs:
+        typer.echo("no doctor runs recorded yet")
+        return
+    table = Table(title="Doctor runs", title_justify="left")
+    for column in ("Run", "When", "Profile", "OK", "Warn", "Fail", "Timeout", "Skip", "Cached", "Took"):
+        table.add_column(column, justify="left" if column in ("When", "Profile") else "right")
+    for run in runs:
+        summary = run.summary
+        table.add_row(
+            str(run.id),
+            _when(run.at),
+            run.profile,
+            str(summary.passed),
+            str(summary.warnings),
+            str(summary.failed),
+            str(summary.timed_out),
+            str(summary.skipped),
+            str(summary.cached),
+            f"{run.elapsed_s:.1f}s",
+        )
+    console.print(table)
 
 
-@doctor_app.command()
-def tailscale(fix: FixOption = False, apply: ApplyOption = False, yes: YesOption = False) -> None:
-    """Run Tailscale checks (daemon, connection, MagicDNS)."""
-    _passed, _warnings, failed = run_category(
-        Category.TAILSCALE, fix=fix, apply=apply, assume_yes=yes
-    )
-    raise typer.Exit(code=1 if failed > 0 else 0)
+@history_app.command("changes")
+def history_changes(
+    category: Annotated[Category, typer.Argument(help="Category of the check", case_sensitive=False)],
+    check: Annotated[str, typer.Argument(help='Check name as reported, e.g. "Scrub recent"')],
+    limit: Annotated[int, typer.Option("--limit", "-n", min=1, help="State changes to list")] = 10,
+) -> None:
+    """Show when a check last changed state, newest first."""
+    from msai_setup.doctor.history import History
+    from msai_setup.utils.formatting import STATUS_SYMBOLS, console
+
+    transitions = History().transitions(category, check, limit=limit)
+    if not transitions:
+        typer.echo(f"no history for {category.value}/{check}", err=True)
+        raise typer.Exit(code=1)
+    for transition in transitions:
+        symbol, style = STATUS_SYMBOLS[transition.status]
+        was = f"was {transition.previous.value}" if transition.previous else "first seen"
+        console.print(f"  {_when(transition.at)}  [{style}]{symbol}[/{style}] {transition.message} [dim]({was})[/dim]")
+
+
+@history_app.command("fact")
+def history_fact(
+    name: Annotated[str, typer.Argument(help="Fact name, e.g. zfs_scrub_age_days")],
+    days: Annotated[int, typer.Option("--days", "-d", min=1, help="How far back to look")] = 90,
+    label: Annotated[
+        list[str] | None,
+        typer.Option("--label", "-l", metavar="KEY=VALUE", help="Only series with this label (repeatable)"),
+    ] = None,
+) -> None:
+    """Show a fact's daily min/max/last over the last N days."""
+    import time
+
+    from rich.table import Table
+
+    from msai_setup.doctor.history import History
+    from msai_setup.utils.formatting import console
+
+    wanted: dict[str, str] = {}
+    for item in label or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise typer.BadParameter(f"expected KEY=VALUE, got {item!r}", param_hint="'--label'")
+        wanted[key] = value
+    rows = History().fact_days(name, since=time.time() - days * 86400.0, labels=wanted)
+    if not rows:
+        typer.echo(f"no values of {name} in the last {days} days", err=True)
+        raise typer.Exit(code=1)
+    table = Table(title=f"{name}, last {days} days", title_justify="left")
+    table.add_column("Day")
+    table.add_column("Labels", style="dim")
+    for column in ("Min", "Max", "Last", "Samples"):
+        table.add_column(column, justify="right")
+    for row in rows:
+        labels = ",".join(f"{key}={value}" for key, value in sorted(row.labels.items()))
+        table.add_row(row.day, labels, f"{row.minimum:g}", f"{row.maximum:g}", f"{row.last:g}", str(row.samples))
+    console.print(table)
+
+
+@history_app.command("regressions")
+def history_regressions(
+    baseline: Annotated[
+        int | None,
+        typer.Option("--baseline", "-b", metavar="RUN", help="Run id to compare against (default: the previous run)"),
+    ] = None,
+    since: Annotated[
+        float | None,
+        typer.Option(
+            "--since",
+            parser=parse_duration,
+            metavar="DURATION",
+            help="Compare against the last run at least this long ago, e.g. 7d",
+        ),
+    ] = None,
+) -> None:
+    """Compare the latest run with a baseline run; exits 1 if anything regressed."""
+    import time
+
+    from msai_setup.doctor.history import History
+    from msai_setup.doctor.render import print_changes
+
+    if baseline is not None and since is not None:
+        raise typer.BadParameter("--baseline and --since are mutually exclusive", param_hint="'--since'")
+    history = History()
+    runs = history.runs(2)
+    if not runs:
+        typer.echo("no doctor runs recorded yet", err=True)
+        raise typer.Exit(code=1)
+    latest = runs[0]
+    if baseline is not None:
+        base = history.run(baseline)
+    elif since is not None:
+        base = history.run_before(time.time() - since)
+    else:
+        base = runs[1] if len(runs) > 1 else None
+    if base is None or base.id == latest.id:
+        typer.echo("no baseline run to compare with", err=True)
+        raise typer.Exit(code=1)
+    changes = history.compare(base.id, latest.id)
+    scope = f"run {latest.id} at {_when(latest.at)} vs run {base.id} at {_when(base.at)}"
+    print_changes(changes, scope, verb="Compared", status_only=True)
+    raise typer.Exit(code=1 if any(change.regressed for change in changes) else 0)
 
 
 if __name__ == "__main__":
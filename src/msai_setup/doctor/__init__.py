@@ -1,10 +1,39 @@
-"""Doctor module for system health checks."""
+"""Doctor module for system health checks.
 
-from msai_setup.doctor.checks import Category, CheckResult
-from msai_setup.doctor.runner import run_doctor
+The names below are imported on first access, so importing a submodule (the
+CLI needs ``doctor.checks.Category``) does not load the whole engine.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from msai_setup.doctor.checks import Category, CheckResult
+    from msai_setup.doctor.engine import DoctorRun
+    from msai_setup.doctor.formats import OutputFormat
+    from msai_setup.doctor.runner import run_doctor
+
+_EXPORTS = {
+    "run_doctor": "msai_setup.doctor.runner",
+    "DoctorRun": "msai_setup.doctor.engine",
+    "OutputFormat": "msai_setup.doctor.formats",
+    "CheckResult": "msai_setup.doctor.checks",
+    "Category": "msai_setup.doctor.checks",
+}
 
 __all__ = [
     "run_doctor",
+    "DoctorRun",
+    "OutputFormat",
     "CheckResult",
     "Category",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import an exported name on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name]), name)
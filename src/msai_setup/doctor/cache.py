@@ -0,0 +1,173 @@
+"""On-disk cache of doctor results.
+
+Some checks are expensive and their answer almost never changes: the CPU
+model, installed memory, whether ROCm and Vulkan see the GPU. A check that
+declares a ``ttl`` has its result stored in ``~/.cache/msai/doctor.json`` and
+reused by later runs until the TTL runs out or one of its invalidation keys
+changes:
+
+- ``kernel``: the running kernel release
+- ``boot``: the boot id (anything read from hardware, modules or /sys)
+- ``dpkg``: the mtime of ``/var/lib/dpkg/status`` (any package change)
+- an absolute path: that path's mtime (``/etc/ssh``...), or its absence
+
+Every run stores the latest result of *every* check, TTL or not, so
+``msai doctor --cached-only`` can answer from the file alone (no checks run,
+only the invalidation keys are read) for shell prompts and status bars.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, cast
+
+from msai_setup.doctor.checks import Category, Check, CheckResult
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import Probe, get_probe
+
+CACHE_PATH = Path(os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))) / "msai" / "doctor.json"
+
+_VERSION = 1
+
+
+def _mtime(probe: Probe, path: str) -> str:
+    try:
+        return str(probe.resolve(path).stat().st_mtime_ns)
+    except OSError:
+        return "absent"
+
+
+def _boot_id(probe: Probe) -> str:
+    return (probe.read("/proc/sys/kernel/random/boot_id") or "").strip()
+
+
+_NAMED_KEYS: dict[str, Callable[[Probe], str]] = {
+    "kernel": lambda probe: probe.kernel_release() or "",
+    "boot": _boot_id,
+    "dpkg": lambda probe: _mtime(probe, "/var/lib/dpkg/status"),
+}
+
+
+def key_value(key: str, probe: Probe | None = None) -> str:
+    """Current value of an invalidation key.
+
+    Raises:
+        ValueError: If ``key`` is neither a known name nor an absolute path.
+    """
+    probe = probe or get_probe()
+    if key.startswith("/"):
+        return _mtime(probe, key)
+    try:
+        return _NAMED_KEYS[key](probe)
+    except KeyError:
+        raise ValueError(f"unknown cache key {key!r}; use {', '.join(_NAMED_KEYS)} or an absolute path") from None
+
+
+def _entry_id(category: Category, check: Check) -> str:
+    return f"{category.value}/{check.name}"
+
+
+class ResultCache:
+    """The result cache file, loaded once per run and saved once at the end."""
+
+    def __init__(self, path: Path | None = None, *, probe: Probe | None = None) -> None:
+        """Load the cache from ``path`` (default ``CACHE_PATH``).
+
+        A missing, unreadable or foreign-version file is an empty cache. The
+        cache belongs to one sysroot; entries stored against another are
+        ignored.
+        """
+        self.path = path or CACHE_PATH
+        self.probe = probe or get_probe()
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._keys: dict[str, str] = {}
+        self._dirty = False
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if (
+            isinstance(data, dict)
+            and data.get("version") == _VERSION
+            and data.get("sysroot") == str(self.probe.sysroot)
+            and isinstance(data.get("entries"), dict)
+        ):
+            self.entries = cast("dict[str, dict[str, Any]]", data["entries"])
+
+    def _key(self, key: str) -> str:
+        # Each key is read at most once per run.
+        if key not in self._keys:
+            self._keys[key] = key_value(key, self.probe)
+        return self._keys[key]
+
+    def _current_keys(self, check: Check) -> dict[str, str]:
+        return {key: self._key(key) for key in check.keys}
+
+    def lookup(self, category: Category, check: Check, *, now: float, ignore_ttl: bool = False) -> CheckResult | None:
+        """A stored result still valid for ``check``, marked as cached.
+
+        Args:
+            category: The check's category.
+            check: The check, whose current ``ttl`` and ``keys`` apply.
+            now: Current wall-clock time (``time.time()``).
+            ignore_ttl: Accept any stored result whose keys still match,
+                expired or not, and for checks without a TTL too.
+        """
+        entry = self.entries.get(_entry_id(category, check))
+        if entry is None:
+            return None
+        if entry.get("keys") != self._current_keys(check):
+            return None
+        if not ignore_ttl:
+            age = now - float(entry.get("stored_at", 0.0))
+            if check.ttl is None or not 0 <= age < check.ttl:
+                return None
+        return self.last(category, check)
+
+    def last(self, category: Category, check: Check) -> CheckResult | None:
+        """The stored result for ``check`` regardless of TTL and keys, marked as cached."""
+        entry = self.entries.get(_entry_id(category, check))
+        if entry is None:
+            return None
+        try:
+            result = CheckResult.from_dict(entry["result"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        result.cached = True
+        return result
+
+    def put(self, category: Category, check: Check, result: CheckResult, *, now: float) -> None:
+        """Store a fresh result (timeouts are not worth remembering)."""
+        if result.status is CheckStatus.TIMEOUT or result.cached:
+            return
+        self.entries[_entry_id(category, check)] = {
+            "stored_at": now,
+            "keys": self._current_keys(check),
+            # Keep the wall time (exported as the check's duration), not child detail.
+            "result": {**result.to_dict(), "timing": {"wall_s": result.timing.wall_s} if result.timing else None},
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache atomically, if anything was stored.
+
+        Entries another run stored since this one loaded are kept, so
+        single-category runs do not forget the rest.
+        """
+        if not self._dirty:
+            return
+        merged = ResultCache(self.path, probe=self.probe).entries
+        merged.update(self.entries)
+        data = {"version": _VERSION, "sysroot": str(self.probe.sysroot), "entries": merged}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + f".{os.getpid()}.partial")
+            tmp.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+            tmp.rename(self.path)
+        except OSError:
+            # A read-only home must not fail the doctor run.
+            return
+        self._dirty = False
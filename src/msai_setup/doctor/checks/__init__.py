@@ -0,0 +1,362 @@
+"""Health check definitions and the registry that loads them.
+
+The checks themselves live in one module per category (``checks.system``,
+``checks.zfs``...), which register them with ``register_check`` when
+imported. ``CHECK_MODULES`` is the index of those modules: the registry
+imports a category's module the first time that category is asked for, so
+``msai doctor gpu`` (or a ``--cached-only`` query) never imports, let alone
+registers, the ZFS or Tailscale checks.
+
+Other packages can add checks through the ``msai_setup.doctor.checks`` entry
+point group. The entry point's name is the category it contributes to and
+its value the module to import, e.g. in the plugin's ``pyproject.toml``::
+
+    [project.entry-points."msai_setup.doctor.checks"]
+    gpu = "my_package.msai_checks"
+
+The module registers its checks with ``register_check`` like the built-in
+ones. A plugin that fails to import is reported as a failed check rather
+than aborting the run.
+"""
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+from msai_setup.utils.status import CheckStatus
+
+if TYPE_CHECKING:
+    from importlib.metadata import EntryPoint
+
+    from msai_setup.utils.shell import ChildUsage
+
+
+class Category(Enum):
+    """Check categories."""
+
+    SYSTEM = "system"
+    ZFS = "zfs"
+    DOCKER = "docker"
+    INCUS = "incus"
+    KVM = "kvm"
+    GPU = "gpu"
+    INFERENCE = "inference"
+    PERFORMANCE = "performance"
+    TAILSCALE = "tailscale"
+
+
+def _no_children() -> list[ChildUsage]:
+    return []
+
+
+@dataclass
+class CheckTiming:
+    """What a check cost: its wall time and the children it spawned."""
+
+    wall_s: float
+    children: list[ChildUsage] = field(default_factory=_no_children)
+
+    @property
+    def spawns(self) -> int:
+        """Number of child processes reaped."""
+        return len(self.children)
+
+    @property
+    def cpu_s(self) -> float:
+        """Total child CPU seconds (user + system)."""
+        return sum(child.cpu_s for child in self.children)
+
+    @property
+    def maxrss_kb(self) -> int:
+        """Largest max RSS of any single child, in kB."""
+        return max((child.maxrss_kb for child in self.children), default=0)
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready form, with per-child detail."""
+        return {
+            "wall_s": round(self.wall_s, 6),
+            "spawns": self.spawns,
+            "cpu_s": round(self.cpu_s, 6),
+            "maxrss_kb": self.maxrss_kb,
+            "children": [
+                {
+                    "argv": list(child.argv),
+                    "wall_s": round(child.wall_s, 6),
+                    "user_s": round(child.user_s, 6),
+                    "system_s": round(child.system_s, 6),
+                    "maxrss_kb": child.maxrss_kb,
+                }
+                for child in self.children
+            ],
+        }
+
+
+def _no_labels() -> dict[str, str]:
+    return {}
+
+
+@dataclass(frozen=True)
+class Fact:
+    """A number a check measured on the way to its verdict (e.g. memory in GB).
+
+    Facts are exported as metrics (``msai doctor export``); ``name`` is a
+    Prometheus-style metric suffix and ``labels`` tell apart several facts of
+    the same name (one per pool, say).
+    """
+
+    name: str
+    value: float
+    labels: dict[str, str] = field(default_factory=_no_labels)
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready form."""
+        return {"name": self.name, "value": self.value, "labels": dict(self.labels)}
+
+
+def _no_facts() -> list[Fact]:
+    return []
+
+
+@dataclass
+class CheckResult:
+    """Result of a health check."""
+
+    name: str
+    status: CheckStatus
+    message: str
+    category: Category
+    detail: str | None = None
+    fix: str | None = None
+    timing: CheckTiming | None = None
+    cached: bool = False
+    facts: list[Fact] = field(default_factory=_no_facts)
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready form of the result (enums as their values)."""
+        return {
+            "category": self.category.value,
+            "name": self.name,
+            "status": self.status.value,
+            "message": self.message,
+            "detail": self.detail,
+            "fix": self.fix,
+            "cached": self.cached,
+            "facts": [fact.to_dict() for fact in self.facts],
+            "timing": self.timing.to_dict() if self.timing else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CheckResult:
+        """Rebuild a result from ``to_dict`` output (child usage is not restored)."""
+        timing = data.get("timing")
+        return cls(
+            name=data["name"],
+            status=CheckStatus(data["status"]),
+            message=data["message"],
+            category=Category(data["category"]),
+            detail=data.get("detail"),
+            fix=data.get("fix"),
+            cached=bool(data.get("cached", False)),
+            facts=[Fact(f["name"], float(f["value"]), dict(f.get("labels", {}))) for f in data.get("facts", [])],
+            timing=CheckTiming(wall_s=float(timing["wall_s"])) if timing else None,
+        )
+
+
+# Type alias for check functions
+CheckFunction = Callable[[], CheckResult]
+
+
+def _no_requires() -> tuple[CheckFunction, ...]:
+    return ()
+
+
+@dataclass
+class Check:
+    """A health check definition.
+
+    ``requires`` lists prerequisite check functions. The runner only starts a
+    check once every prerequisite has passed; if one did not (FAIL, WARN or
+    SKIP), the check is reported as SKIP without being run at all.
+
+    ``timeout`` is the check's own time budget in seconds. A check that
+    overruns it has its child process groups killed and is reported as
+    TIMEOUT.
+
+    ``inputs`` and ``interval`` drive ``msai doctor watch``: ``inputs`` are
+    the host paths (globs allowed, directories walked) the result is derived
+    from, and the check is re-run as soon as one of them changes. ``interval``
+    is how often to re-run it regardless, in seconds; None uses the watch
+    default.
+
+    ``ttl`` lets a result be reused from the on-disk result cache for that
+    many seconds, as long as every invalidation key in ``keys`` still has
+    the value it had when the result was stored (see ``doctor.cache``).
+    """
+
+    name: str
+    run: CheckFunction
+    requires: tuple[CheckFunction, ...] = field(default_factory=_no_requires)
+    timeout: float | None = None
+    inputs: tuple[str, ...] = ()
+    interval: float | None = None
+    ttl: float | None = None
+    keys: tuple[str, ...] = ()
+
+
+def _default_checks() -> list[tuple[Category, Check]]:
+    return []
+
+
+def _no_modules() -> dict[Category, tuple[str, ...]]:
+    return {}
+
+
+def _no_categories() -> set[Category]:
+    return set()
+
+
+ENTRY_POINT_GROUP = "msai_setup.doctor.checks"
+
+# Category -> modules registering its built-in checks, imported on first use.
+CHECK_MODULES: dict[Category, tuple[str, ...]] = {
+    category: (f"{__name__}.{category.value}",) for category in Category
+}
+
+
+def _plugins(group: str) -> dict[Category, list[EntryPoint]]:
+    """Installed entry points of ``group``, by the category they are named after."""
+    from importlib.metadata import entry_points
+
+    values = {category.value: category for category in Category}
+    found: dict[Category, list[EntryPoint]] = {}
+    for entry_point in entry_points(group=group):
+        category = values.get(entry_point.name)
+        if category is not None:
+            found.setdefault(category, []).append(entry_point)
+    return found
+
+
+def _broken_plugin(category: Category, entry_point: EntryPoint, error: Exception) -> Check:
+    """A stand-in check reporting a plugin that failed to import."""
+    name = f"Plugin {entry_point.value}"
+
+    def run() -> CheckResult:
+        return CheckResult(
+            name=name,
+            status=CheckStatus.FAIL,
+            message=f"{name}: failed to load ({error})",
+            category=category,
+        )
+
+    return Check(name=name, run=run)
+
+
+@dataclass
+class CheckRegistry:
+    """Registry of health checks, loading each category's modules on demand.
+
+    ``modules`` maps a category to the modules that register its checks and
+    ``plugins`` names an entry point group to load alongside them; a bare
+    ``CheckRegistry()`` holds only what is registered on it directly.
+    """
+
+    checks: list[tuple[Category, Check]] = field(default_factory=_default_checks)
+    modules: dict[Category, tuple[str, ...]] = field(default_factory=_no_modules)
+    plugins: str | None = None
+    loaded: set[Category] = field(default_factory=_no_categories)
+
+    def load(self, categories: list[Category] | None = None) -> None:
+        """Import the check modules of ``categories`` (None for all) not loaded yet."""
+        pending = [category for category in (categories or list(Category)) if category not in self.loaded]
+        if not pending:
+            return
+        # Scanning installed distributions costs more than importing a module.
+        plugins = _plugins(self.plugins) if self.plugins else {}
+        for category in pending:
+            self.loaded.add(category)
+            for module in self.modules.get(category, ()):
+                importlib.import_module(module)
+            for entry_point in plugins.get(category, []):
+                try:
+                    entry_point.load()
+                except Exception as e:  # noqa: BLE001 - a broken plugin must not break the doctor
+                    self.checks.append((category, _broken_plugin(category, entry_point, e)))
+
+    def register(self, category: Category, check: Check) -> None:
+        """Register a check under a category.
+
+        Raises:
+            ValueError: If a prerequisite is not itself a registered check.
+        """
+        for prerequisite in check.requires:
+            if self.find(prerequisite) is None:
+                raise ValueError(f"{check.name}: prerequisite {prerequisite.__name__} is not a registered check")
+        self.checks.append((category, check))
+
+    def find(self, func: CheckFunction) -> Check | None:
+        """Return the registered check wrapping ``func``, if any."""
+        return next((check for _cat, check in self.checks if check.run is func), None)
+
+    def get_checks(self, categories: list[Category] | None = None) -> list[tuple[Category, Check]]:
+        """Get checks, optionally filtered by category, loading them first.
+
+        Checks come in category order, then registration order, however the
+        categories happened to be loaded.
+        """
+        self.load(categories)
+        order = {category: position for position, category in enumerate(Category)}
+        selected = [(cat, check) for cat, check in self.checks if categories is None or cat in categories]
+        return sorted(selected, key=lambda pair: order[pair[0]])
+
+
+# Global registry
+registry = CheckRegistry(modules=CHECK_MODULES, plugins=ENTRY_POINT_GROUP)
+
+
+def register_check(
+    category: Category,
+    name: str,
+    *,
+    requires: tuple[CheckFunction, ...] = (),
+    timeout: float | None = None,
+    inputs: tuple[str, ...] = (),
+    interval: float | None = None,
+    ttl: float | None = None,
+    keys: tuple[str, ...] = (),
+) -> Callable[[CheckFunction], CheckFunction]:
+    """Decorator to register a check function.
+
+    Args:
+        category: Category the check reports under.
+        name: Display name of the check.
+        requires: Check functions that must pass before this one is worth
+            running. They have to be registered first (defined above it).
+        timeout: Time budget in seconds, or None for only the run deadline.
+        inputs: Host paths the result depends on; watch mode re-runs the
+            check when any of them changes.
+        interval: Seconds between watch-mode re-runs, or None for the
+            watch default.
+        ttl: Seconds a cached result may be reused, or None to always run.
+        keys: Invalidation keys for the cached result: ``kernel``, ``boot``,
+            ``dpkg``, or an absolute path whose mtime is compared.
+    """
+
+    def decorator(func: CheckFunction) -> CheckFunction:
+        check = Check(
+            name=name,
+            run=func,
+            requires=requires,
+            timeout=timeout,
+            inputs=inputs,
+            interval=interval,
+            ttl=ttl,
+            keys=keys,
+        )
+        registry.register(category, check)
+        return func
+
+    return decorator
@@ -0,0 +1,91 @@
+"""Helpers shared by several check categories."""
+
+from __future__ import annotations
+
+import grp
+import os
+import pwd
+import re
+
+from msai_setup.doctor.checks import Category, CheckResult
+from msai_setup.utils.formatting import GIB, CheckStatus
+from msai_setup.utils.probe import get_probe
+
+# Result-cache TTL for facts that change only with hardware, packages or reboots.
+DAY = 24 * 3600.0
+
+# Memory kept out of both the ARC and the GPU: kernel, services, page cache.
+SYSTEM_RESERVE = 8 * GIB
+
+# Smallest ARC worth recommending: below this metadata alone starts to thrash.
+ARC_FLOOR = 4 * GIB
+
+
+def user_groups() -> tuple[set[str], set[str]]:
+    """Return (session_groups, account_groups) for the current user.
+
+    The process's own group list reflects the *running session*; the group DB
+    lookup for the username gives the account's configured groups (what
+    ``id -nG`` and ``id -nG $USER`` print). The two differ right after
+    ``usermod -aG`` and before the next login, which is exactly the case we
+    want to report distinctly rather than as "not in group".
+    """
+    session = {_group_name(gid) for gid in {os.getegid(), *os.getgroups()}}
+    try:
+        account_entry = pwd.getpwuid(os.getuid())
+        account = {
+            _group_name(gid) for gid in os.getgrouplist(account_entry.pw_name, account_entry.pw_gid)
+        }
+    except KeyError:
+        account = set[str]()
+    return session, account
+
+
+def _group_name(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+
+def group_membership(
+    group: str, *, name: str, category: Category, fix: str
+) -> CheckResult:
+    """OK if the group is active now, OK-with-note if pending re-login, else WARN."""
+    session, account = user_groups()
+    if group in session:
+        return CheckResult(
+            name=name,
+            status=CheckStatus.OK,
+            message=f"User in {group} group",
+            category=category,
+        )
+    if group in account:
+        return CheckResult(
+            name=name,
+            status=CheckStatus.OK,
+            message=f"User in {group} group (log out/in to activate in this session)",
+            category=category,
+        )
+    return CheckResult(
+        name=name,
+        status=CheckStatus.WARN,
+        message=f"User not in {group} group",
+        category=category,
+        fix=fix,
+    )
+
+
+def modprobe_drop_in_matching(pattern: re.Pattern[str]) -> str | None:
+    """Host path of the first /etc/modprobe.d file with a line matching ``pattern``."""
+    root = get_probe().resolve("/etc/modprobe.d")
+    if not root.is_dir():
+        return None
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        try:
+            text = path.read_text(errors="replace")
+        except OSError:
+            continue
+        if any(pattern.search(line) for line in text.splitlines()):
+            return "/etc/modprobe.d/" + path.relative_to(root).as_posix()
+    return None
@@ -0,0 +1,65 @@
+"""Docker checks: daemon, group membership and Compose."""
+
+from __future__ import annotations
+
+import re
+
+from msai_setup.doctor.checks import Category, CheckResult, register_check
+from msai_setup.doctor.checks._common import DAY, group_membership
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.shell import is_service_running, run_command
+
+
+@register_check(Category.DOCKER, "Daemon running", interval=30.0)
+def check_docker_daemon() -> CheckResult:
+    """Check Docker daemon is running."""
+    if is_service_running("docker"):
+        return CheckResult(
+            name="Daemon running",
+            status=CheckStatus.OK,
+            message="Docker daemon running",
+            category=Category.DOCKER,
+        )
+
+    return CheckResult(
+        name="Daemon running",
+        status=CheckStatus.FAIL,
+        message="Docker daemon not running",
+        category=Category.DOCKER,
+        fix="sudo systemctl start docker",
+    )
+
+
+@register_check(Category.DOCKER, "User in group", inputs=("/etc/group",))
+def check_docker_group() -> CheckResult:
+    """Check current user is in docker group."""
+    return group_membership(
+        "docker",
+        name="User in group",
+        category=Category.DOCKER,
+        fix="sudo usermod -aG docker $USER && newgrp docker",
+    )
+
+
+@register_check(Category.DOCKER, "Compose v2", ttl=DAY, keys=("dpkg",))
+def check_docker_compose() -> CheckResult:
+    """Check Docker Compose v2 is available."""
+    result = run_command("docker compose version")
+    if result.success:
+        # Extract version
+        match = re.search(r"v?(\d+\.\d+\.\d+)", result.output)
+        version = match.group(1) if match else "installed"
+        return CheckResult(
+            name="Compose v2",
+            status=CheckStatus.OK,
+            message=f"Compose v{version}",
+            category=Category.DOCKER,
+        )
+
+    return CheckResult(
+        name="Compose v2",
+        status=CheckStatus.FAIL,
+        message="Docker Compose not available",
+        category=Category.DOCKER,
+        fix="sudo apt install docker-compose-plugin",
+    )
@@ -0,0 +1,489 @@
+"""GPU checks: amdgpu, device groups, ROCm, Vulkan, GPU memory limits, and on request a load sample."""
+
+from __future__ import annotations
+
+from msai_setup.doctor.checks import Category, Check, CheckResult, Fact, register_check
+from msai_setup.doctor.checks._common import ARC_FLOOR, DAY, SYSTEM_RESERVE, user_groups
+from msai_setup.utils.amdgpu import GpuSample, GpuSampler
+from msai_setup.utils.formatting import GIB, CheckStatus, format_gib
+from msai_setup.utils.probe import get_probe
+from msai_setup.utils.shell import command_exists, run_command
+from msai_setup.utils.stats import percentile
+
+_AMD_VENDOR = "0x1002"
+
+
+@register_check(Category.GPU, "AMD driver")
+def check_amd_driver() -> CheckResult:
+    """Check amdgpu module is loaded."""
+    probe = get_probe()
+    if probe.module_loaded("amdgpu"):
+        return CheckResult(
+            name="AMD driver",
+            status=CheckStatus.OK,
+            message="amdgpu module loaded",
+            category=Category.GPU,
+        )
+
+    # Check if GPU is passed through to VM
+    amd_display = [d for d in probe.pci_devices() if d.is_display and d.vendor == _AMD_VENDOR]
+    if any(d.driver == "vfio-pci" for d in amd_display):
+        return CheckResult(
+            name="AMD driver",
+            status=CheckStatus.OK,
+            message="GPU passed through (vfio-pci)",
+            category=Category.GPU,
+        )
+
+    return CheckResult(
+        name="AMD driver",
+        status=CheckStatus.WARN,
+        message="amdgpu module not loaded",
+        category=Category.GPU,
+    )
+
+
+@register_check(Category.GPU, "Render/video groups", inputs=("/etc/group",))
+def check_gpu_groups() -> CheckResult:
+    """Check the user is in render+video groups (needed for /dev/kfd + /dev/dri)."""
+    needed = ("render", "video")
+    session, account = user_groups()
+
+    if all(g in session for g in needed):
+        return CheckResult(
+            name="Render/video groups",
+            status=CheckStatus.OK,
+            message="User in render and video groups",
+            category=Category.GPU,
+        )
+    if all(g in account for g in needed):
+        return CheckResult(
+            name="Render/video groups",
+            status=CheckStatus.OK,
+            message="User in render and video groups (log out/in to activate in this session)",
+            category=Category.GPU,
+        )
+
+    missing = [g for g in needed if g not in account]
+    return CheckResult(
+        name="Render/video groups",
+        status=CheckStatus.WARN,
+        message=f"User not in {', '.join(missing)} group(s); ROCm compute needs /dev/kfd access",
+        category=Category.GPU,
+        detail="Group change takes effect on next login",
+        fix="sudo usermod -aG render,video $USER",
+    )
+
+
+@register_check(
+    Category.GPU,
+    "ROCm installed",
+    requires=(check_amd_driver,),
+    timeout=15.0,
+    ttl=DAY,
+    keys=("kernel", "boot", "dpkg"),
+)
+def check_rocm() -> CheckResult:
+    """Check ROCm is installed and working."""
+    if not command_exists("rocminfo"):
+        return CheckResult(
+            name="ROCm installed",
+            status=CheckStatus.FAIL,
+            message="ROCm not installed",
+            category=Category.GPU,
+            detail="26.04 ships ROCm 7.x with native gfx1151 support; see docs ai/gpu/rocm-installation",
+            fix="sudo apt install rocm",
+        )
+
+    result = run_command("rocminfo")
+    if result.success:
+        targets = sorted({node.gfx_target for node in get_probe().kfd_nodes() if node.is_gpu})
+        return CheckResult(
+            name="ROCm installed",
+            status=CheckStatus.OK,
+            message=f"ROCm working ({', '.join(targets)})" if targets else "ROCm working",
+            category=Category.GPU,
+        )
+
+    return CheckResult(
+        name="ROCm installed",
+        status=CheckStatus.WARN,
+        message="ROCm installed but not working",
+        category=Category.GPU,
+        detail=result.stderr[:100] if result.stderr else None,
+    )
+
+
+@register_check(
+    Category.GPU,
+    "Vulkan",
+    requires=(check_amd_driver,),
+    timeout=15.0,
+    ttl=DAY,
+    keys=("kernel", "boot", "dpkg"),
+)
+def check_vulkan() -> CheckResult:
+    """Check Vulkan is working."""
+    if not command_exists("vulkaninfo"):
+        return CheckResult(
+            name="Vulkan",
+            status=CheckStatus.WARN,
+            message="vulkaninfo not installed",
+            category=Category.GPU,
+            fix="sudo apt install vulkan-tools",
+        )
+
+    result = run_command("vulkaninfo --summary")
+    if result.success and "deviceName" in result.output:
+        return CheckResult(
+            name="Vulkan",
+            status=CheckStatus.OK,
+            message="Vulkan working",
+            category=Category.GPU,
+        )
+
+    return CheckResult(
+        name="Vulkan",
+        status=CheckStatus.WARN,
+        message="Vulkan not working",
+        category=Category.GPU,
+    )
+
+
+PAGE_SIZE = 4096
+
+# GPU-addressable memory below this share of the recommended GTT caps the models that load.
+GTT_SHORTFALL = 0.9
+
+# Allocation order of a 2 MiB block with 4 KiB pages: one transparent hugepage.
+HUGEPAGE_ORDER = 9
+
+# Below this share of free memory in 2 MiB or larger blocks, big allocations compact or fall back to 4 KiB pages.
+FRAGMENTED_RATIO = 0.5
+
+_GPU_MEMORY_DROP_IN = "/etc/default/grub.d/90-msai-gpu-memory.cfg"
+
+_THP = "/sys/kernel/mm/transparent_hugepage"
+
+_THP_FIX = (
+    "printf 'w /sys/kernel/mm/transparent_hugepage/enabled - - - - madvise\\n"
+    "w /sys/kernel/mm/transparent_hugepage/defrag - - - - defer+madvise\\n' "
+    "| sudo tee /etc/tmpfiles.d/msai-thp.conf && sudo systemd-tmpfiles --create /etc/tmpfiles.d/msai-thp.conf"
+)
+
+_COMPACT_FIX = "echo 1 | sudo tee /proc/sys/vm/compact_memory"
+
+
+def _cmdline_param(name: str) -> str | None:
+    """The value of ``name=`` on the kernel command line; the last one wins, as in the kernel."""
+    value = None
+    for param in get_probe().kernel_cmdline():
+        key, sep, rest = param.partition("=")
+        if sep and key.replace("-", "_") == name:
+            value = rest
+    return value
+
+
+def _module_param(module: str, name: str) -> int | None:
+    """A numeric module parameter as loaded (sysfs), else as given on the kernel command line."""
+    text = get_probe().read(f"/sys/module/{module}/parameters/{name}") or _cmdline_param(f"{module}.{name}")
+    try:
+        return int(text.strip()) if text else None
+    except ValueError:
+        return None
+
+
+def recommend_gtt(mem_total: int, *, zfs: bool) -> int:
+    """GPU-addressable memory (bytes, whole GiB) to allow on a unified-memory APU.
+
+    Everything but the system reserve, and with ZFS loaded the smallest ARC
+    worth keeping: the counterpart of the ZFS check's ``recommend_arc_max``,
+    so following both leaves each its share.
+    """
+    room = mem_total - SYSTEM_RESERVE - (ARC_FLOOR if zfs else 0)
+    return max(0, room // GIB * GIB)
+
+
+def _gpu_memory_fix(limit: int, gttsize_set: bool) -> str:
+    pages = limit // PAGE_SIZE
+    params = f"ttm.pages_limit={pages} ttm.page_pool_size={pages}"
+    if gttsize_set:
+        # An explicit gttsize caps the GTT on its own; raise it with the TTM limit rather than drop it.
+        params = f"amdgpu.gttsize={limit // 1024**2} {params}"
+    return (
+        f"echo 'GRUB_CMDLINE_LINUX_DEFAULT=\"$GRUB_CMDLINE_LINUX_DEFAULT {params}\"' "
+        f"| sudo tee {_GPU_MEMORY_DROP_IN} && sudo update-grub"
+    )
+
+
+@register_check(
+    Category.GPU,
+    "GPU memory limits",
+    requires=(check_amd_driver,),
+    inputs=("/proc/cmdline", "/sys/module/ttm/parameters", "/sys/module/amdgpu/parameters/gttsize"),
+)
+def check_gpu_memory_limits() -> CheckResult:
+    """Check how much RAM the iGPU can address and that the limits on it agree.
+
+    On the APU, VRAM is only the BIOS carve-out; model weights live in the
+    GTT, system RAM mapped for the GPU. amdgpu advertises a GTT size
+    (``amdgpu.gttsize``, by default TTM's limit), but TTM backs GPU buffers
+    with at most ``ttm.pages_limit`` pages, half the RAM unless raised, so
+    the smaller of the two caps the largest model. ``ttm.page_pool_size`` is
+    how many freed pages TTM keeps ready for reuse; below the limit, loading
+    a model again re-allocates and re-maps pages the pool dropped.
+    """
+    probe = get_probe()
+    cards = probe.amdgpu_cards()
+    mem_total = probe.meminfo().get("MemTotal", 0) * 1024
+    if not cards or not mem_total:
+        return CheckResult(
+            name="GPU memory limits",
+            status=CheckStatus.SKIP,
+            message="GPU memory limits: skipped (no amdgpu device in sysfs)",
+            category=Category.GPU,
+        )
+
+    vram_total = sum(int(probe.read(f"{card}/mem_info_vram_total") or 0) for card in cards)
+    gtt_total = sum(int(probe.read(f"{card}/mem_info_gtt_total") or 0) for card in cards)
+    default_pages = mem_total // 2 // PAGE_SIZE
+    pages_limit = _module_param("ttm", "pages_limit") or default_pages
+    pool_pages = _module_param("ttm", "page_pool_size") or default_pages
+    gttsize = _module_param("amdgpu", "gttsize")
+    gttsize_set = gttsize is not None and gttsize > 0
+
+    ttm_limit = pages_limit * PAGE_SIZE
+    addressable = vram_total + min(gtt_total, ttm_limit)
+    recommended = recommend_gtt(mem_total, zfs=probe.module_loaded("zfs"))
+    facts = [
+        Fact("gpu_addressable_bytes", addressable),
+        Fact("gpu_gtt_total_bytes", gtt_total),
+        Fact("ttm_pages_limit_bytes", ttm_limit),
+        Fact("ttm_page_pool_bytes", pool_pages * PAGE_SIZE),
+        Fact("gpu_recommended_gtt_bytes", recommended),
+    ]
+    detail = (
+        f"RAM {format_gib(mem_total)}, VRAM {format_gib(vram_total)}, GTT {format_gib(gtt_total)}, "
+        f"TTM limit {format_gib(ttm_limit)}, TTM pool {format_gib(pool_pages * PAGE_SIZE)}"
+        + (f", amdgpu.gttsize {gttsize} MiB" if gttsize_set else "")
+    )
+
+    problems: list[str] = []
+    limit = ttm_limit
+    if min(gtt_total, ttm_limit) < GTT_SHORTFALL * recommended:
+        problems.append(
+            f"GPU can address {format_gib(addressable)} of {format_gib(mem_total)} RAM, "
+            f"recommend GTT {format_gib(recommended)}"
+        )
+        limit = recommended
+    if gttsize_set and gttsize is not None and gttsize * 1024**2 > ttm_limit:
+        problems.append(
+            f"amdgpu.gttsize {gttsize} MiB exceeds the TTM limit of {format_gib(ttm_limit)}; "
+            "loads past it fail part way"
+        )
+    if pool_pages < pages_limit:
+        pool = format_gib(pool_pages * PAGE_SIZE)
+        problems.append(f"TTM pool {pool} below its limit; model reloads re-allocate pages")
+
+    if problems:
+        return CheckResult(
+            name="GPU memory limits",
+            status=CheckStatus.WARN,
+            message="; ".join(problems),
+            category=Category.GPU,
+            detail=f"{detail}\nThe fix writes {_GPU_MEMORY_DROP_IN}; it takes effect after a reboot",
+            fix=_gpu_memory_fix(limit, gttsize_set),
+            facts=facts,
+        )
+    return CheckResult(
+        name="GPU memory limits",
+        status=CheckStatus.OK,
+        message=f"GPU can address {format_gib(addressable)} of {format_gib(mem_total)} RAM",
+        category=Category.GPU,
+        detail=detail,
+        facts=facts,
+    )
+
+
+def _selected(text: str | None) -> str | None:
+    """The bracketed choice of a sysfs mode file (``always [madvise] never``)."""
+    start, end = (text or "").find("["), (text or "").find("]")
+    return text[start + 1 : end] if text and 0 <= start < end else None
+
+
+@register_check(Category.GPU, "Transparent hugepages", inputs=(f"{_THP}/enabled", f"{_THP}/defrag"))
+def check_transparent_hugepages() -> CheckResult:
+    """Check transparent hugepages are available without stalling allocations.
+
+    ``enabled=never`` puts host-side model buffers (CPU-offloaded layers,
+    mmap'd weights being copied in) on 4 KiB pages. ``defrag=always`` makes
+    every faulting allocation compact memory synchronously, which is what
+    turns a cold model load into minutes of system time. ``madvise`` with
+    ``defer+madvise`` keeps hugepages for code that asks for them and pushes
+    compaction to kcompactd for everything else.
+    """
+    probe = get_probe()
+    enabled = _selected(probe.read(f"{_THP}/enabled"))
+    defrag = _selected(probe.read(f"{_THP}/defrag"))
+    if enabled is None:
+        return CheckResult(
+            name="Transparent hugepages",
+            status=CheckStatus.SKIP,
+            message="Transparent hugepages: skipped (kernel built without THP)",
+            category=Category.GPU,
+        )
+
+    settings = f"enabled={enabled}, defrag={defrag}"
+    problems: list[str] = []
+    if enabled == "never":
+        problems.append("hugepages disabled")
+    if defrag == "always":
+        problems.append("synchronous compaction on every fault slows model loads")
+    if problems:
+        return CheckResult(
+            name="Transparent hugepages",
+            status=CheckStatus.WARN,
+            message=f"{settings}: {'; '.join(problems)}",
+            category=Category.GPU,
+            detail="The fix persists enabled=madvise, defrag=defer+madvise with a tmpfiles.d drop-in",
+            fix=_THP_FIX,
+        )
+    return CheckResult(
+        name="Transparent hugepages",
+        status=CheckStatus.OK,
+        message=settings,
+        category=Category.GPU,
+    )
+
+
+@register_check(Category.GPU, "Memory fragmentation", interval=60.0)
+def check_memory_fragmentation() -> CheckResult:
+    """Check free memory is still in large blocks, from ``/proc/buddyinfo``.
+
+    TTM fills GTT buffers with the largest blocks the buddy allocator has
+    and transparent hugepages need 2 MiB ones. When free memory is mostly
+    small blocks, a model load either waits on compaction or ends up on
+    4 KiB pages, which the GPU walks with more TLB misses.
+    """
+    orders = get_probe().buddyinfo()
+    if not orders:
+        return CheckResult(
+            name="Memory fragmentation",
+            status=CheckStatus.SKIP,
+            message="Memory fragmentation: skipped (no /proc/buddyinfo)",
+            category=Category.GPU,
+        )
+
+    sizes = [count * (PAGE_SIZE << order) for order, count in enumerate(orders)]
+    free, large = sum(sizes), sum(sizes[HUGEPAGE_ORDER:])
+    ratio = large / free if free else 0.0
+    message = f"{format_gib(free)} free, {ratio:.0%} in 2 MiB or larger blocks"
+    facts = [Fact("memory_free_bytes", free), Fact("memory_free_hugepage_ratio", round(ratio, 4))]
+    # With under a GiB free the problem is free memory, not its layout.
+    if free >= GIB and ratio < FRAGMENTED_RATIO:
+        return CheckResult(
+            name="Memory fragmentation",
+            status=CheckStatus.WARN,
+            message=f"{message}; large GPU allocations will compact or fall back to 4 KiB pages",
+            category=Category.GPU,
+            detail="Compacting stalls allocations for a few seconds; run it before loading a model, not during",
+            fix=_COMPACT_FIX,
+            facts=facts,
+        )
+    return CheckResult(
+        name="Memory fragmentation",
+        status=CheckStatus.OK,
+        message=message,
+        category=Category.GPU,
+        facts=facts,
+    )
+
+
+# Busy percentage from which the GPU counts as loaded when judging its clocks.
+BUSY_LOADED = 80
+
+# Under load, a median shader clock below this share of the top DPM level is throttling.
+LOW_CLOCK_RATIO = 0.7
+
+# GTT or VRAM use (peak over the window) from which allocations are close to failing.
+MEMORY_NEAR_LIMIT = 0.9
+
+
+def _spread(values: list[float], unit: str, scale: float = 1.0) -> str:
+    p50, p95 = percentile(values, 50) / scale, percentile(values, 95) / scale
+    return f"p50 {p50:.0f}{unit} / p95 {p95:.0f}{unit} / max {max(values) / scale:.0f}{unit}"
+
+
+def summarize_gpu_load(samples: list[GpuSample], sampler: GpuSampler, duration: float) -> CheckResult:
+    """Judge a window of GPU samples: percentiles, clocks under load, memory headroom."""
+    busy = [float(s.busy_percent) for s in samples if s.busy_percent is not None]
+    sclk = [float(s.sclk_mhz) for s in samples if s.sclk_mhz is not None]
+    mclk = [float(s.mclk_mhz) for s in samples if s.mclk_mhz is not None]
+    power = [s.power_w for s in samples if s.power_w is not None]
+    vram = [float(s.vram_used) for s in samples if s.vram_used is not None]
+    gtt = [float(s.gtt_used) for s in samples if s.gtt_used is not None]
+    loaded_sclk = [
+        float(s.sclk_mhz)
+        for s in samples
+        if s.busy_percent is not None and s.busy_percent >= BUSY_LOADED and s.sclk_mhz is not None
+    ]
+
+    lines = [f"{len(samples)} samples over {duration:g}s from {sampler.card}"]
+    facts: list[Fact] = []
+    for label, values, unit, scale, fact in (
+        ("busy", busy, "%", 1.0, "gpu_busy_percent"),
+        ("sclk", sclk, " MHz", 1.0, "gpu_sclk_mhz"),
+        ("mclk", mclk, " MHz", 1.0, "gpu_mclk_mhz"),
+        ("power", power, " W", 1.0, "gpu_power_watts"),
+        ("VRAM", vram, " MiB", 1024**2, "gpu_vram_used_bytes"),
+        ("GTT", gtt, " MiB", 1024**2, "gpu_gtt_used_bytes"),
+    ):
+        if values:
+            lines.append(f"{label}: {_spread(values, unit, scale)}")
+            facts += [Fact(fact, round(percentile(values, q), 2), {"quantile": f"p{q}"}) for q in (50, 95)]
+
+    problems: list[str] = []
+    if loaded_sclk and sampler.sclk_max and percentile(loaded_sclk, 50) < LOW_CLOCK_RATIO * sampler.sclk_max:
+        problems.append(
+            f"sclk p50 {percentile(loaded_sclk, 50):.0f} of {sampler.sclk_max} MHz while "
+            f"≥{BUSY_LOADED}% busy (power profile or thermal limit?)"
+        )
+    if gtt and sampler.gtt_total and max(gtt) >= MEMORY_NEAR_LIMIT * sampler.gtt_total:
+        problems.append(f"GTT peaked at {max(gtt) / sampler.gtt_total:.0%} of {format_gib(sampler.gtt_total)}")
+    if vram and sampler.vram_total and max(vram) >= MEMORY_NEAR_LIMIT * sampler.vram_total:
+        problems.append(f"VRAM peaked at {max(vram) / sampler.vram_total:.0%} of {format_gib(sampler.vram_total)}")
+
+    headline = [f"busy p50 {percentile(busy, 50):.0f}% / p95 {percentile(busy, 95):.0f}%"] if busy else []
+    if sclk:
+        headline.append(f"sclk p50 {percentile(sclk, 50):.0f} MHz")
+    if gtt and sampler.gtt_total:
+        headline.append(f"GTT {max(gtt) / GIB:.1f} of {format_gib(sampler.gtt_total)}")
+    if power:
+        headline.append(f"{percentile(power, 95):.0f} W p95")
+    return CheckResult(
+        name="GPU load",
+        status=CheckStatus.WARN if problems else CheckStatus.OK,
+        message="; ".join(problems) if problems else ", ".join(headline) or "GPU reports no counters",
+        category=Category.GPU,
+        detail="\n".join(lines),
+        facts=facts,
+    )
+
+
+def gpu_load_check(duration: float, interval: float = 0.1) -> Check:
+    """A check sampling the first amdgpu card for ``duration`` seconds (``msai doctor gpu --sample``)."""
+
+    def run() -> CheckResult:
+        cards = get_probe().amdgpu_cards()
+        if not cards:
+            return CheckResult(
+                name="GPU load",
+                status=CheckStatus.SKIP,
+                message="GPU load: skipped (no amdgpu device in sysfs)",
+                category=Category.GPU,
+            )
+        with GpuSampler(cards[0]) as sampler:
+            samples = sampler.collect(duration, interval)
+        return summarize_gpu_load(samples, sampler, duration)
+
+    return Check(name="GPU load", run=run, requires=(check_amd_driver,), timeout=duration + 10.0)
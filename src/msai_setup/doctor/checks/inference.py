@@ -0,0 +1,172 @@
+"""Inference checks (llama.cpp, and whether the default model fits in memory)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from msai_setup.doctor.checks import Category, CheckResult, Fact, register_check
+from msai_setup.models.index import load_model
+from msai_setup.models.plan import plan_model, read_budget
+from msai_setup.utils.config import get_config_value
+from msai_setup.utils.formatting import CheckStatus, format_gib
+from msai_setup.utils.gguf import CACHE_TYPES, GGUFError
+from msai_setup.utils.probe import Probe, get_probe
+from msai_setup.utils.shell import command_exists, run_command
+
+
+@register_check(Category.INFERENCE, "llama.cpp installed")
+def check_llamacpp_installed() -> CheckResult:
+    """Check llama.cpp's server binary is installed."""
+    if command_exists("llama-server"):
+        return CheckResult(
+            name="llama.cpp installed",
+            status=CheckStatus.OK,
+            message="llama-server present",
+            category=Category.INFERENCE,
+        )
+
+    return CheckResult(
+        name="llama.cpp installed",
+        status=CheckStatus.FAIL,
+        message="llama.cpp not installed",
+        category=Category.INFERENCE,
+        fix="msai bootstrap llamacpp",
+    )
+
+
+@register_check(
+    Category.INFERENCE,
+    "GPU backend",
+    requires=(check_llamacpp_installed,),
+    timeout=20.0,
+    ttl=3600.0,
+    keys=("kernel", "boot"),
+)
+def check_llamacpp_gpu() -> CheckResult:
+    """Check llama.cpp enumerates a GPU device (Vulkan or ROCm).
+
+    The GPU backend lives in a separate ``libggml-*.so`` that ggml loads at
+    runtime, so inspecting the binary's direct links misses it. Asking
+    llama.cpp itself to list devices is the reliable signal. The default build
+    is Vulkan (fastest here); a ROCm/HIP build is equally valid.
+    """
+    if not command_exists("llama-cli"):
+        return CheckResult(
+            name="GPU backend",
+            status=CheckStatus.SKIP,
+            message="llama.cpp not installed",
+            category=Category.INFERENCE,
+        )
+
+    result = run_command("llama-cli --list-devices")
+    device = next(
+        (line.strip() for line in result.output.splitlines() if "Vulkan" in line or "ROCm" in line),
+        None,
+    )
+    if result.success and device:
+        return CheckResult(
+            name="GPU backend",
+            status=CheckStatus.OK,
+            message=f"GPU offload available ({device})",
+            category=Category.INFERENCE,
+        )
+
+    return CheckResult(
+        name="GPU backend",
+        status=CheckStatus.WARN,
+        message="no GPU device listed by llama.cpp (CPU-only build?)",
+        category=Category.INFERENCE,
+        detail="Rebuild with a GPU backend (Vulkan or HIP) for offload",
+        fix="msai bootstrap llamacpp-vulkan --force",
+    )
+
+
+def _serving(probe: Probe) -> bool:
+    """Whether a llama-server process is running (its model is already in memory)."""
+    proc = probe.resolve("/proc")
+    if not proc.is_dir():
+        return False
+    return any(
+        entry.name.isdigit() and (probe.read(f"/proc/{entry.name}/comm") or "").strip() == "llama-server"
+        for entry in proc.iterdir()
+    )
+
+
+@register_check(Category.INFERENCE, "Model fits memory")
+def check_model_fits() -> CheckResult:
+    """Check the default model fits in free memory at its configured context.
+
+    The model comes from the ``models.default`` config section (``path``,
+    ``context``, ``parallel``, ``cache_type``). Its weights and KV cache per
+    token come from the model index, which re-reads the GGUF header only
+    when the file changed; ``msai models plan`` shows the full breakdown.
+    Free memory already holds a running llama-server's model, so the check
+    skips while one runs.
+    """
+    config = get_config_value("models.default", {}) or {}
+    if not isinstance(config, dict) or not config.get("path"):
+        return CheckResult(
+            name="Model fits memory",
+            status=CheckStatus.SKIP,
+            message="no default model configured (models.default.path)",
+            category=Category.INFERENCE,
+        )
+    probe = get_probe()
+    if _serving(probe):
+        return CheckResult(
+            name="Model fits memory",
+            status=CheckStatus.SKIP,
+            message="llama-server is running; its model already holds the memory being planned",
+            category=Category.INFERENCE,
+        )
+    path = Path(str(config["path"])).expanduser()
+    cache_type = str(config.get("cache_type", "f16"))
+    try:
+        model = load_model(path)
+        plan = plan_model(
+            model,
+            read_budget(probe),
+            context=int(config.get("context", 0)) or None,
+            parallel=int(config.get("parallel", 1)),
+            cache_type=cache_type,
+        )
+    except (GGUFError, KeyError, TypeError, ValueError) as e:
+        detail = f"cache_type must be one of {', '.join(CACHE_TYPES)}" if isinstance(e, KeyError) else str(e)
+        return CheckResult(
+            name="Model fits memory",
+            status=CheckStatus.FAIL,
+            message=f"cannot plan {path.name}",
+            category=Category.INFERENCE,
+            detail=detail,
+        )
+
+    labels = {"model": path.name}
+    facts = [
+        Fact("model_weights_bytes", plan.weights, labels),
+        Fact("model_kv_cache_bytes", plan.kv_cache, labels),
+        Fact("model_usable_memory_bytes", plan.usable, labels),
+        Fact("model_max_context", plan.max_context, labels),
+    ]
+    summary = f"{path.name} needs {format_gib(plan.need)} of {format_gib(plan.usable)} usable at context {plan.context}"
+    if plan.parallel > 1:
+        summary += f" x {plan.parallel}"
+    detail = (
+        f"Weights {format_gib(plan.weights)}, KV cache {format_gib(plan.kv_cache)} ({cache_type}), "
+        f"compute {format_gib(plan.compute)}; largest safe context {plan.max_context}"
+    )
+    if plan.fits:
+        status = CheckStatus.OK
+    elif plan.max_context:
+        status = CheckStatus.WARN
+        summary += f"; largest safe context {plan.max_context}"
+    else:
+        status = CheckStatus.FAIL
+        summary = f"{path.name}: {plan.failure_cause()}"
+    return CheckResult(
+        name="Model fits memory",
+        status=status,
+        message=summary,
+        category=Category.INFERENCE,
+        detail=detail,
+        facts=facts,
+    )
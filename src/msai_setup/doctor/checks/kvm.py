@@ -0,0 +1,90 @@
+"""KVM checks: hardware acceleration, QEMU, IOMMU and vfio."""
+
+from __future__ import annotations
+
+from msai_setup.doctor.checks import Category, CheckResult, Fact, register_check
+from msai_setup.doctor.checks._common import DAY
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import get_probe
+from msai_setup.utils.shell import command_exists
+
+
+@register_check(Category.KVM, "KVM enabled", inputs=("/dev/kvm",))
+def check_kvm_enabled() -> CheckResult:
+    """Check hardware KVM acceleration is available (/dev/kvm present)."""
+    if get_probe().exists("/dev/kvm"):
+        return CheckResult(
+            name="KVM enabled",
+            status=CheckStatus.OK,
+            message="KVM acceleration available (/dev/kvm)",
+            category=Category.KVM,
+        )
+
+    return CheckResult(
+        name="KVM enabled",
+        status=CheckStatus.FAIL,
+        message="/dev/kvm missing (enable SVM/virtualization in BIOS)",
+        category=Category.KVM,
+    )
+
+
+@register_check(Category.KVM, "QEMU installed", ttl=DAY, keys=("dpkg",))
+def check_qemu() -> CheckResult:
+    """Check the QEMU x86 system emulator Incus uses for VMs is installed."""
+    if command_exists("qemu-system-x86_64"):
+        return CheckResult(
+            name="QEMU installed",
+            status=CheckStatus.OK,
+            message="qemu-system-x86 present",
+            category=Category.KVM,
+        )
+
+    return CheckResult(
+        name="QEMU installed",
+        status=CheckStatus.WARN,
+        message="qemu-system-x86 not installed (needed for Incus VMs)",
+        category=Category.KVM,
+        fix="msai bootstrap kvm",
+    )
+
+
+@register_check(Category.KVM, "IOMMU enabled")
+def check_iommu() -> CheckResult:
+    """Check IOMMU is enabled for GPU passthrough."""
+    groups = get_probe().iommu_group_count()
+    if groups:
+        return CheckResult(
+            name="IOMMU enabled",
+            status=CheckStatus.OK,
+            message=f"IOMMU enabled ({groups} groups)",
+            category=Category.KVM,
+            facts=[Fact("iommu_groups", groups)],
+        )
+
+    return CheckResult(
+        name="IOMMU enabled",
+        status=CheckStatus.FAIL,
+        message="IOMMU not enabled",
+        category=Category.KVM,
+        detail="Add 'amd_iommu=on iommu=pt' to kernel parameters",
+    )
+
+
+@register_check(Category.KVM, "vfio-pci loaded")
+def check_vfio() -> CheckResult:
+    """Check vfio-pci module is loaded."""
+    if get_probe().module_loaded("vfio_pci"):
+        return CheckResult(
+            name="vfio-pci loaded",
+            status=CheckStatus.OK,
+            message="vfio-pci module loaded",
+            category=Category.KVM,
+        )
+
+    return CheckResult(
+        name="vfio-pci loaded",
+        status=CheckStatus.WARN,
+        message="vfio-pci module not loaded",
+        category=Category.KVM,
+        detail="Module may load on-demand when GPU is passed through",
+    )
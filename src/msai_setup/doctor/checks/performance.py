@@ -0,0 +1,206 @@
+"""Performance checks: CPU frequency scaling, GPU power state and the persisted profile."""
+
+from __future__ import annotations
+
+from msai_setup.doctor.checks import Category, CheckResult, Fact, register_check
+from msai_setup.perf.profiles import (
+    CPU,
+    PINNED_LEVELS,
+    PROFILES,
+    SCRIPT_PATH,
+    UNIT_NAME,
+    UNIT_WANTED,
+    differences,
+    matching_profile,
+    persisted_profile,
+    read_settings,
+    summary,
+)
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import get_probe
+
+
+@register_check(
+    Category.PERFORMANCE,
+    "CPU frequency scaling",
+    inputs=(f"{CPU}/cpu*/cpufreq/scaling_governor", f"{CPU}/cpu*/cpufreq/energy_performance_preference"),
+)
+def check_cpu_scaling() -> CheckResult:
+    """Report the cpufreq driver, governor and EPP, with the current clock as a load indicator.
+
+    amd_pstate in active mode (``amd-pstate-epp``) lets the firmware pick
+    clocks from the EPP hint within microseconds; under ``acpi-cpufreq`` the
+    kernel steps through three P-states and the EPP does not exist.
+    """
+    settings = read_settings()
+    if not settings.governors:
+        return CheckResult(
+            name="CPU frequency scaling",
+            status=CheckStatus.SKIP,
+            message="CPU frequency scaling: skipped (no cpufreq in sysfs)",
+            category=Category.PERFORMANCE,
+        )
+
+    parts = [settings.driver or "unknown driver", f"governor {summary(settings.governors)}"]
+    if settings.epp:
+        parts.append(f"EPP {summary(settings.epp)}")
+    facts: list[Fact] = []
+    if settings.cpu_freq_mhz:
+        mean, peak = sum(settings.cpu_freq_mhz) / len(settings.cpu_freq_mhz), max(settings.cpu_freq_mhz)
+        parts.append(f"{mean:.0f} MHz mean / {peak:.0f} MHz max now")
+        facts += [
+            Fact("cpu_freq_mhz", round(mean, 1), {"stat": "mean"}),
+            Fact("cpu_freq_mhz", round(peak, 1), {"stat": "max"}),
+        ]
+    message = ", ".join(parts)
+
+    if not (settings.driver or "").startswith("amd-pstate"):
+        return CheckResult(
+            name="CPU frequency scaling",
+            status=CheckStatus.WARN,
+            message=f"{message}; amd_pstate not in use, clocks ramp slowly and EPP is unavailable",
+            category=Category.PERFORMANCE,
+            detail="Boot with amd_pstate=active (see docs operations/power-management)",
+            facts=facts,
+        )
+    if len(set(settings.governors)) > 1 or len(set(settings.epp)) > 1:
+        return CheckResult(
+            name="CPU frequency scaling",
+            status=CheckStatus.WARN,
+            message=f"{message}; CPUs disagree, so throughput depends on where threads land",
+            category=Category.PERFORMANCE,
+            fix="msai perf profile set balanced",
+            facts=facts,
+        )
+    return CheckResult(
+        name="CPU frequency scaling",
+        status=CheckStatus.OK,
+        message=message,
+        category=Category.PERFORMANCE,
+        detail=f"amd_pstate mode: {settings.amd_pstate}" if settings.amd_pstate else None,
+        facts=facts,
+    )
+
+
+@register_check(
+    Category.PERFORMANCE,
+    "GPU power state",
+    inputs=("/sys/class/drm/card*/device/power_dpm_force_performance_level",),
+)
+def check_gpu_power_state() -> CheckResult:
+    """Report amdgpu's DPM level and power profile, with the current shader clock.
+
+    A level a tuning tool left at ``manual``, ``low`` or a ``profile_*``
+    value pins the clocks whatever the load, and under ``manual`` the power
+    profile is ignored.
+    """
+    settings = read_settings()
+    if not settings.gpus:
+        return CheckResult(
+            name="GPU power state",
+            status=CheckStatus.SKIP,
+            message="GPU power state: skipped (no amdgpu device in sysfs)",
+            category=Category.PERFORMANCE,
+        )
+
+    parts: list[str] = []
+    pinned: list[str] = []
+    facts: list[Fact] = []
+    for gpu in settings.gpus:
+        card = gpu.card.split("/")[4]
+        text = f"{card}: DPM {gpu.dpm_level}, profile {gpu.power_profiles.active or 'unknown'}"
+        if gpu.sclk_mhz is not None:
+            text += f", sclk {gpu.sclk_mhz} MHz now"
+            facts.append(Fact("gpu_sclk_current_mhz", gpu.sclk_mhz, {"card": card}))
+        parts.append(text)
+        if gpu.dpm_level in PINNED_LEVELS:
+            pinned.append(f"{card} clocks pinned by DPM level {gpu.dpm_level}")
+
+    if pinned:
+        return CheckResult(
+            name="GPU power state",
+            status=CheckStatus.WARN,
+            message="; ".join(pinned),
+            category=Category.PERFORMANCE,
+            detail="\n".join(parts),
+            fix="msai perf profile set balanced",
+            facts=facts,
+        )
+    return CheckResult(
+        name="GPU power state",
+        status=CheckStatus.OK,
+        message="; ".join(parts),
+        category=Category.PERFORMANCE,
+        facts=facts,
+    )
+
+
+@register_check(
+    Category.PERFORMANCE,
+    "Performance profile",
+    inputs=(
+        SCRIPT_PATH,
+        UNIT_WANTED,
+        f"{CPU}/cpu*/cpufreq/scaling_governor",
+        f"{CPU}/cpu*/cpufreq/energy_performance_preference",
+        "/sys/class/drm/card*/device/power_dpm_force_performance_level",
+        "/sys/class/drm/card*/device/pp_power_profile_mode",
+    ),
+)
+def check_perf_profile() -> CheckResult:
+    """Check the host still runs the persisted ``msai perf profile``.
+
+    power-profiles-daemon, tuned or a manual ``rocm-smi`` can change the
+    settings after the unit has run; the fix re-runs it.
+    """
+    probe = get_probe()
+    settings = read_settings()
+    live = matching_profile(settings)
+    persisted = persisted_profile()
+    facts = [Fact("perf_profile", 1, {"profile": live.name if live else "custom"})]
+
+    if persisted is None and not settings.governors and not settings.gpus:
+        return CheckResult(
+            name="Performance profile",
+            status=CheckStatus.SKIP,
+            message="Performance profile: skipped (no cpufreq or amdgpu power settings in sysfs)",
+            category=Category.PERFORMANCE,
+        )
+    if persisted is None:
+        return CheckResult(
+            name="Performance profile",
+            status=CheckStatus.OK,
+            message=f"Settings match {live.name} (none persisted)" if live else "Custom settings (none persisted)",
+            category=Category.PERFORMANCE,
+            detail="msai perf profile set inference|balanced|quiet applies and persists one",
+            facts=facts,
+        )
+    if not probe.exists(UNIT_WANTED):
+        return CheckResult(
+            name="Performance profile",
+            status=CheckStatus.WARN,
+            message=f"Profile {persisted} installed but {UNIT_NAME} not enabled; it is lost on reboot",
+            category=Category.PERFORMANCE,
+            fix=f"sudo systemctl enable {UNIT_NAME}",
+            facts=facts,
+        )
+
+    profile = PROFILES.get(persisted)
+    drift = differences(profile, settings) if profile else []
+    if drift:
+        return CheckResult(
+            name="Performance profile",
+            status=CheckStatus.WARN,
+            message=f"Settings drifted from persisted profile {persisted}",
+            category=Category.PERFORMANCE,
+            detail="\n".join(drift) + "\npower-profiles-daemon, tuned or rocm-smi may have changed them",
+            fix=f"sudo systemctl restart {UNIT_NAME}",
+            facts=facts,
+        )
+    return CheckResult(
+        name="Performance profile",
+        status=CheckStatus.OK,
+        message=f"Profile {persisted} (persisted, applied)",
+        category=Category.PERFORMANCE,
+        facts=facts,
+    )
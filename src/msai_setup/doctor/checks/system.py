@@ -0,0 +1,263 @@
+"""System checks: OS release, kernel, memory, CPU, SSH and audio."""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+from msai_setup.doctor.checks import Category, CheckResult, Fact, register_check
+from msai_setup.doctor.checks._common import DAY, modprobe_drop_in_matching
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import get_probe
+
+
+@register_check(Category.SYSTEM, "Ubuntu version", inputs=("/etc/os-release",), ttl=DAY, keys=("/etc/os-release",))
+def check_ubuntu_version() -> CheckResult:
+    """Check Ubuntu version is 26.04 LTS."""
+    release = get_probe().os_release()
+    version = release.get("VERSION_ID")
+    if not version:
+        return CheckResult(
+            name="Ubuntu version",
+            status=CheckStatus.FAIL,
+            message="Could not determine Ubuntu version",
+            category=Category.SYSTEM,
+            detail="No VERSION_ID in /etc/os-release",
+        )
+
+    if version.startswith("26.04"):
+        desc = release.get("PRETTY_NAME") or f"Ubuntu {version}"
+        return CheckResult(
+            name="Ubuntu version",
+            status=CheckStatus.OK,
+            message=desc,
+            category=Category.SYSTEM,
+        )
+
+    return CheckResult(
+        name="Ubuntu version",
+        status=CheckStatus.WARN,
+        message=f"Ubuntu {version} (expected 26.04 LTS)",
+        category=Category.SYSTEM,
+    )
+
+
+@register_check(Category.SYSTEM, "Kernel version")
+def check_kernel_version() -> CheckResult:
+    """Check kernel version is 7.0+ (26.04 default); 6.18+ is the gfx1151 floor."""
+    kernel = get_probe().kernel_release()
+    if not kernel:
+        return CheckResult(
+            name="Kernel version",
+            status=CheckStatus.FAIL,
+            message="Could not determine kernel version",
+            category=Category.SYSTEM,
+        )
+
+    # Extract major.minor version
+    match = re.match(r"(\d+)\.(\d+)", kernel)
+    if match:
+        major, minor = int(match.group(1)), int(match.group(2))
+        if major >= 7 or (major == 6 and minor >= 18):
+            return CheckResult(
+                name="Kernel version",
+                status=CheckStatus.OK,
+                message=f"Kernel {kernel}",
+                category=Category.SYSTEM,
+            )
+
+    return CheckResult(
+        name="Kernel version",
+        status=CheckStatus.WARN,
+        message=f"Kernel {kernel} (recommend 7.0+ (26.04 default); 6.18+ is the documented gfx1151 floor)",
+        category=Category.SYSTEM,
+    )
+
+
+@register_check(Category.SYSTEM, "Memory", ttl=DAY, keys=("boot",))
+def check_memory() -> CheckResult:
+    """Check system memory is 128GB."""
+    meminfo = get_probe().meminfo()
+    if not meminfo:
+        return CheckResult(
+            name="Memory",
+            status=CheckStatus.FAIL,
+            message="Could not read memory info",
+            category=Category.SYSTEM,
+        )
+
+    kb = meminfo.get("MemTotal")
+    if kb is not None:
+        gb = kb / (1024 * 1024)
+        gb_rounded = round(gb)
+
+        facts = [Fact("memory_total_gb", round(gb, 2))]
+        if gb_rounded >= 120:  # Allow some tolerance
+            return CheckResult(
+                name="Memory",
+                status=CheckStatus.OK,
+                message=f"Memory: {gb_rounded}GB",
+                category=Category.SYSTEM,
+                facts=facts,
+            )
+
+        return CheckResult(
+            name="Memory",
+            status=CheckStatus.WARN,
+            message=f"Memory: {gb_rounded}GB (expected 128GB)",
+            category=Category.SYSTEM,
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Memory",
+        status=CheckStatus.FAIL,
+        message="Could not parse memory info",
+        category=Category.SYSTEM,
+    )
+
+
+@register_check(Category.SYSTEM, "CPU", ttl=DAY, keys=("boot",))
+def check_cpu() -> CheckResult:
+    """Check CPU is AMD Ryzen AI Max (Strix Halo)."""
+    probe = get_probe()
+    if not probe.exists("/proc/cpuinfo"):
+        return CheckResult(
+            name="CPU",
+            status=CheckStatus.FAIL,
+            message="Could not read CPU info",
+            category=Category.SYSTEM,
+        )
+
+    cpu_name = probe.cpu_model()
+    if cpu_name:
+        if "ryzen ai max" in cpu_name.lower():
+            return CheckResult(
+                name="CPU",
+                status=CheckStatus.OK,
+                message=f"CPU: {cpu_name} (Strix Halo)",
+                category=Category.SYSTEM,
+            )
+
+        return CheckResult(
+            name="CPU",
+            status=CheckStatus.WARN,
+            message=f"CPU: {cpu_name}",
+            category=Category.SYSTEM,
+        )
+
+    return CheckResult(
+        name="CPU",
+        status=CheckStatus.FAIL,
+        message="Could not parse CPU info",
+        category=Category.SYSTEM,
+    )
+
+
+@register_check(
+    Category.SYSTEM,
+    "SSH hardened",
+    inputs=("/etc/ssh/sshd_config*",),
+    ttl=3600.0,
+    keys=("/etc/ssh", "/etc/ssh/sshd_config", "/etc/ssh/sshd_config.d"),
+)
+def check_ssh_hardened() -> CheckResult:
+    """Check SSH is hardened (password auth disabled)."""
+    probe = get_probe()
+    sshd_config = probe.resolve("/etc/ssh/sshd_config")
+    if not sshd_config.exists():
+        return CheckResult(
+            name="SSH hardened",
+            status=CheckStatus.SKIP,
+            message="sshd_config not found",
+            category=Category.SYSTEM,
+        )
+
+    drop_in_dir = probe.resolve("/etc/ssh/sshd_config.d")
+    drop_ins = sorted(p for p in drop_in_dir.rglob("*") if p.is_file()) if drop_in_dir.is_dir() else []
+    if any(_password_auth_disabled(path) for path in (sshd_config, *drop_ins)):
+        return CheckResult(
+            name="SSH hardened",
+            status=CheckStatus.OK,
+            message="PasswordAuthentication disabled",
+            category=Category.SYSTEM,
+        )
+
+    return CheckResult(
+        name="SSH hardened",
+        status=CheckStatus.WARN,
+        message="Password authentication may be enabled",
+        category=Category.SYSTEM,
+        fix="Add 'PasswordAuthentication no' to /etc/ssh/sshd_config",
+    )
+
+
+_PASSWORD_AUTH = re.compile(r"^PasswordAuthentication\s+(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+def _password_auth_disabled(path: Path) -> bool:
+    """Whether a sshd config file sets ``PasswordAuthentication no``."""
+    try:
+        text = path.read_text(errors="replace")
+    except OSError:
+        return False
+    return any(value.lower() == "no" for value in _PASSWORD_AUTH.findall(text))
+
+
+_AUDIO_POWERSAVE = re.compile(r"snd_hda_intel.*power_save\s*=\s*0")
+
+_AUDIO_POWERSAVE_FIX = (
+    "echo 'options snd_hda_intel power_save=0 power_save_controller=N' "
+    "| sudo tee /etc/modprobe.d/audio-disable-powersave.conf"
+)
+
+
+@register_check(
+    Category.SYSTEM,
+    "Audio power save",
+    inputs=("/etc/modprobe.d", "/sys/module/snd_hda_intel/parameters/power_save"),
+)
+def check_audio_powersave() -> CheckResult:
+    """Check the snd_hda_intel codec power save is disabled persistently.
+
+    The MS-S1 MAX emits idle static/pop when the HD-audio codec suspends. The
+    fix is a modprobe drop-in setting power_save=0; a runtime-only value does
+    not survive reboot. See docs/ubuntu/troubleshooting/audio-noise.md.
+    """
+    probe = get_probe()
+    param = probe.resolve("/sys/module/snd_hda_intel/parameters/power_save")
+    if not param.exists():
+        return CheckResult(
+            name="Audio power save",
+            status=CheckStatus.SKIP,
+            message="snd_hda_intel not loaded (no HD-audio codec)",
+            category=Category.SYSTEM,
+        )
+
+    # A persistent drop-in is the only thing that survives reboot.
+    persistent = modprobe_drop_in_matching(_AUDIO_POWERSAVE)
+    if persistent:
+        return CheckResult(
+            name="Audio power save",
+            status=CheckStatus.OK,
+            message=f"Disabled persistently ({persistent})",
+            category=Category.SYSTEM,
+        )
+
+    runtime = param.read_text().strip()
+    if runtime == "0":
+        return CheckResult(
+            name="Audio power save",
+            status=CheckStatus.WARN,
+            message="Disabled at runtime only, not persistent (static noise returns on reboot)",
+            category=Category.SYSTEM,
+            fix=_AUDIO_POWERSAVE_FIX,
+        )
+
+    return CheckResult(
+        name="Audio power save",
+        status=CheckStatus.WARN,
+        message=f"Enabled (power_save={runtime}); codec suspend causes idle static noise",
+        category=Category.SYSTEM,
+        fix=_AUDIO_POWERSAVE_FIX,
+    )
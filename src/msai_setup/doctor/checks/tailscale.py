@@ -0,0 +1,113 @@
+"""Tailscale checks: daemon, tailnet connection and MagicDNS."""
+
+from __future__ import annotations
+
+from msai_setup.doctor.checks import Category, CheckResult, register_check
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.shell import is_service_running, run_command
+
+
+@register_check(Category.TAILSCALE, "Daemon running", interval=30.0)
+def check_tailscale_daemon() -> CheckResult:
+    """Check tailscaled is running."""
+    if is_service_running("tailscaled"):
+        return CheckResult(
+            name="Daemon running",
+            status=CheckStatus.OK,
+            message="tailscaled running",
+            category=Category.TAILSCALE,
+        )
+
+    return CheckResult(
+        name="Daemon running",
+        status=CheckStatus.FAIL,
+        message="tailscaled not running",
+        category=Category.TAILSCALE,
+        fix="sudo systemctl start tailscaled",
+    )
+
+
+@register_check(
+    Category.TAILSCALE, "Connected", requires=(check_tailscale_daemon,), timeout=10.0, interval=30.0
+)
+def check_tailscale_connected() -> CheckResult:
+    """Check Tailscale is connected to tailnet."""
+    result = run_command("tailscale status --json", cached=True)
+    if not result.success:
+        return CheckResult(
+            name="Connected",
+            status=CheckStatus.FAIL,
+            message="Could not get Tailscale status",
+            category=Category.TAILSCALE,
+        )
+
+    import json
+
+    try:
+        status = json.loads(result.output)
+        if status.get("BackendState") == "Running":
+            # Get tailnet name
+            self_status = status.get("Self", {})
+            dns_name = self_status.get("DNSName", "")
+            if dns_name:
+                # Extract tailnet from DNS name (format: hostname.tailnet.ts.net.)
+                parts = dns_name.rstrip(".").split(".")
+                if len(parts) >= 3:
+                    tailnet = ".".join(parts[1:])
+                    return CheckResult(
+                        name="Connected",
+                        status=CheckStatus.OK,
+                        message=f"Connected to {tailnet}",
+                        category=Category.TAILSCALE,
+                    )
+            return CheckResult(
+                name="Connected",
+                status=CheckStatus.OK,
+                message="Connected to tailnet",
+                category=Category.TAILSCALE,
+            )
+    except json.JSONDecodeError:
+        pass
+
+    return CheckResult(
+        name="Connected",
+        status=CheckStatus.WARN,
+        message="Tailscale not connected",
+        category=Category.TAILSCALE,
+        fix="sudo tailscale up",
+    )
+
+
+@register_check(Category.TAILSCALE, "MagicDNS", requires=(check_tailscale_connected,))
+def check_tailscale_magicdns() -> CheckResult:
+    """Check MagicDNS is enabled."""
+    result = run_command("tailscale status --json", cached=True)
+    if not result.success:
+        return CheckResult(
+            name="MagicDNS",
+            status=CheckStatus.SKIP,
+            message="Could not get Tailscale status",
+            category=Category.TAILSCALE,
+        )
+
+    import json
+
+    try:
+        status = json.loads(result.output)
+        self_status = status.get("Self", {})
+        if self_status.get("DNSName"):
+            return CheckResult(
+                name="MagicDNS",
+                status=CheckStatus.OK,
+                message="MagicDNS enabled",
+                category=Category.TAILSCALE,
+            )
+    except json.JSONDecodeError:
+        pass
+
+    return CheckResult(
+        name="MagicDNS",
+        status=CheckStatus.WARN,
+        message="MagicDNS may not be enabled",
+        category=Category.TAILSCALE,
+    )
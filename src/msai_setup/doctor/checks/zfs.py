@@ -0,0 +1,495 @@
+"""ZFS checks: the imported pools, their health, scrubs, device errors, the ARC and snapshots."""
+
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+from msai_setup.doctor.checks import Category, CheckResult, Fact, register_check
+from msai_setup.doctor.checks._common import ARC_FLOOR, DAY, SYSTEM_RESERVE, modprobe_drop_in_matching
+from msai_setup.utils.formatting import GIB, CheckStatus, format_gib
+from msai_setup.utils.probe import get_probe
+from msai_setup.utils.shell import CommandResult, command_exists, run_command
+from msai_setup.utils.zfs import (
+    PoolStatus,
+    SnapshotScanner,
+    SnapshotSet,
+    arc_activity,
+    parse_arcstats,
+    parse_zpool_status,
+)
+
+# The data pool every profile expects; other pools (rpool on a ZFS-root install) are checked when present.
+DATA_POOL = "tank"
+
+SCRUB_MAX_AGE_DAYS = 30
+
+
+def zpool_status() -> dict[str, PoolStatus] | None:
+    """Every imported pool, from a single ``zpool status -p -P`` per doctor run.
+
+    Returns:
+        Pools by name, or None if ``zpool`` is missing or failed.
+    """
+    result = run_command("zpool status -p -P", cached=True)
+    if not result.success:
+        return None
+    return parse_zpool_status(result.stdout)
+
+
+def _pool_list(names: list[str]) -> str:
+    return ", ".join(f"'{name}'" for name in names)
+
+
+@register_check(Category.ZFS, "Pool exists")
+def check_zfs_pool_exists() -> CheckResult:
+    """Check ZFS is available and at least one pool is imported.
+
+    The per-pool checks (health, scrub age, device errors) depend on this
+    one, not on any particular pool, so a host with only ``rpool`` still gets
+    them; a missing data pool is ``check_zfs_data_pool``'s finding.
+    """
+    result = run_command("zpool status -p -P", cached=True)
+    if not result.success:
+        return CheckResult(
+            name="Pool exists",
+            status=CheckStatus.FAIL,
+            message="ZFS not available",
+            category=Category.ZFS,
+            detail=result.stderr,
+        )
+
+    pools = parse_zpool_status(result.stdout)
+    facts = [Fact("zfs_pools", len(pools))]
+    if not pools:
+        return CheckResult(
+            name="Pool exists",
+            status=CheckStatus.FAIL,
+            message="No pools imported",
+            category=Category.ZFS,
+            fix=f"sudo zpool import {DATA_POOL}",
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Pool exists",
+        status=CheckStatus.OK,
+        message=f"Imported: {_pool_list(list(pools))}",
+        category=Category.ZFS,
+        facts=facts,
+    )
+
+
+@register_check(Category.ZFS, "Data pool", requires=(check_zfs_pool_exists,))
+def check_zfs_data_pool() -> CheckResult:
+    """Check the data pool (``tank``) is among the imported pools."""
+    pools = zpool_status() or {}
+    if DATA_POOL not in pools:
+        return CheckResult(
+            name="Data pool",
+            status=CheckStatus.FAIL,
+            message=f"Pool '{DATA_POOL}' not imported",
+            category=Category.ZFS,
+            detail=f"Imported: {_pool_list(list(pools))}" if pools else None,
+            fix=f"sudo zpool import {DATA_POOL}",
+        )
+
+    return CheckResult(
+        name="Data pool",
+        status=CheckStatus.OK,
+        message=f"Pool '{DATA_POOL}' imported",
+        category=Category.ZFS,
+    )
+
+
+@register_check(Category.ZFS, "Pool health", requires=(check_zfs_pool_exists,), interval=60.0)
+def check_zfs_pool_health() -> CheckResult:
+    """Check every pool is ONLINE with no known data errors."""
+    pools = zpool_status()
+    if not pools:
+        return CheckResult(
+            name="Pool health",
+            status=CheckStatus.SKIP,
+            message="Pool health: skipped (no pools imported)",
+            category=Category.ZFS,
+        )
+
+    facts = [Fact("zfs_pool_online", int(pool.state == "ONLINE"), {"pool": name}) for name, pool in pools.items()]
+    degraded = [pool for pool in pools.values() if pool.state != "ONLINE"]
+    damaged = [pool for pool in pools.values() if pool.state == "ONLINE" and pool.data_errors]
+    if not degraded and not damaged:
+        return CheckResult(
+            name="Pool health",
+            status=CheckStatus.OK,
+            message=f"{_pool_list(list(pools))} ONLINE, no known data errors",
+            category=Category.ZFS,
+            facts=facts,
+        )
+
+    problems = [f"'{pool.name}' is {pool.state}" for pool in degraded]
+    problems += [f"'{pool.name}' has {pool.data_errors} data errors" for pool in damaged]
+    details = [f"{pool.name}: {pool.status}" for pool in degraded + damaged if pool.status]
+    if degraded:
+        return CheckResult(
+            name="Pool health",
+            status=CheckStatus.FAIL,
+            message=f"Pool health: {'; '.join(problems)}",
+            category=Category.ZFS,
+            detail="\n".join(details) or "Check zpool status for details",
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Pool health",
+        status=CheckStatus.WARN,
+        message=f"Pool health: {'; '.join(problems)}",
+        category=Category.ZFS,
+        detail="\n".join(details) or None,
+        fix=f"sudo zpool scrub {' '.join(pool.name for pool in damaged)}",
+        facts=facts,
+    )
+
+
+def _scrub_age(pool: PoolStatus, now: datetime) -> tuple[str, int | None]:
+    """How the pool's last scan reads in the report, and the scrub age to judge it by."""
+    scan = pool.scan
+    if scan.state == "scanning":
+        done = f", {scan.percent_done:g}% done" if scan.percent_done is not None else ""
+        return f"{pool.name} {scan.function} in progress{done}", 0
+    if scan.state == "none" or scan.ended is None:
+        return f"{pool.name} never", None
+    days = (now - scan.ended).days
+    if scan.state != "finished":
+        return f"{pool.name} {scan.function} {scan.state} {days} days ago", None
+    if scan.function == "resilver":
+        # zpool status only shows the latest scan; a resilver re-read the whole pool.
+        return f"{pool.name} resilvered {days} days ago", days
+    return f"{pool.name} {days} days ago", days
+
+
+@register_check(Category.ZFS, "Scrub recent", requires=(check_zfs_pool_exists,))
+def check_zfs_scrub() -> CheckResult:
+    """Check every pool was scrubbed within the last 30 days."""
+    pools = zpool_status()
+    if not pools:
+        return CheckResult(
+            name="Scrub recent",
+            status=CheckStatus.SKIP,
+            message="Scrub age: skipped (no pools imported)",
+            category=Category.ZFS,
+        )
+
+    now = datetime.now()
+    phrases: list[str] = []
+    stale: list[str] = []
+    facts: list[Fact] = []
+    for name, pool in pools.items():
+        phrase, days = _scrub_age(pool, now)
+        phrases.append(phrase)
+        if pool.scan.completed is not None and days is not None:
+            facts.append(Fact("zfs_scrub_age_days", days, {"pool": name}))
+        if days is None or days > SCRUB_MAX_AGE_DAYS:
+            stale.append(name)
+
+    message = f"Last scrub: {'; '.join(phrases)}"
+    if not stale:
+        return CheckResult(
+            name="Scrub recent",
+            status=CheckStatus.OK,
+            message=message,
+            category=Category.ZFS,
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Scrub recent",
+        status=CheckStatus.WARN,
+        message=message,
+        category=Category.ZFS,
+        fix=f"sudo zpool scrub {' '.join(stale)}",
+        facts=facts,
+    )
+
+
+@register_check(Category.ZFS, "Device errors", requires=(check_zfs_pool_exists,), interval=60.0)
+def check_zfs_device_errors() -> CheckResult:
+    """Check no vdev has read, write or checksum errors."""
+    pools = zpool_status()
+    if not pools:
+        return CheckResult(
+            name="Device errors",
+            status=CheckStatus.SKIP,
+            message="Device errors: skipped (no pools imported)",
+            category=Category.ZFS,
+        )
+
+    facts: list[Fact] = []
+    failing: list[str] = []
+    for name, pool in pools.items():
+        devices = pool.devices()
+        for kind in ("read", "write", "cksum"):
+            facts.append(
+                Fact("zfs_device_errors", sum(getattr(vdev, kind) for vdev in devices), {"pool": name, "kind": kind})
+            )
+        failing += [
+            f"{vdev.name} (read {vdev.read}, write {vdev.write}, cksum {vdev.cksum})"
+            for vdev in pool.vdevs()
+            if vdev.errors
+        ]
+    if not failing:
+        count = sum(len(pool.devices()) for pool in pools.values())
+        return CheckResult(
+            name="Device errors",
+            status=CheckStatus.OK,
+            message=f"No read/write/checksum errors on {count} devices",
+            category=Category.ZFS,
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Device errors",
+        status=CheckStatus.WARN,
+        message=f"Device errors: {len(failing)} vdev{'s' if len(failing) != 1 else ''} reporting errors",
+        category=Category.ZFS,
+        detail="\n".join(failing) + "\nCheck cabling/SMART, replace failing disks, then 'zpool clear' the pool",
+        facts=facts,
+    )
+
+
+# Seconds between the two arcstats samples the ARC check compares.
+ARC_SAMPLE_S = 1.0
+
+_ARC_MAX_DROP_IN = re.compile(r"^\s*options\s+zfs\b.*\bzfs_arc_max\s*=\s*(\d+)")
+
+
+def recommend_arc_max(mem_total: int, gtt_total: int) -> int:
+    """An ``arc_max`` (bytes, whole GiB) that leaves the GPU its GTT plus a system reserve.
+
+    On a unified-memory APU the iGPU maps system RAM through the GTT, so
+    every byte the ARC holds is a byte a model cannot. The ARC gets what is
+    left, never more than the ZFS default of half the RAM nor less than
+    ``ARC_FLOOR``.
+    """
+    room = min(mem_total - gtt_total - SYSTEM_RESERVE, mem_total // 2)
+    return max(ARC_FLOOR, room // GIB * GIB)
+
+
+def _arc_max_fix(arc_max: int) -> str:
+    fix = (
+        f"echo 'options zfs zfs_arc_max={arc_max}' | sudo tee /etc/modprobe.d/zfs-arc-max.conf"
+        f" && echo {arc_max} | sudo tee /sys/module/zfs/parameters/zfs_arc_max"
+    )
+    # With root on ZFS the module loads from the initramfs, which carries its own copy of modprobe.d.
+    mounts = get_probe().read("/proc/mounts") or ""
+    if any(fields[1:3] == ["/", "zfs"] for fields in (line.split() for line in mounts.splitlines())):
+        fix += " && sudo update-initramfs -u"
+    return fix
+
+
+@register_check(
+    Category.ZFS,
+    "ARC sizing",
+    inputs=("/etc/modprobe.d", "/sys/module/zfs/parameters/zfs_arc_max"),
+)
+def check_zfs_arc() -> CheckResult:
+    """Check the ARC's hit ratio and that its ceiling leaves room for the GPU.
+
+    Samples ``/proc/spl/kstat/zfs/arcstats`` twice, ``ARC_SAMPLE_S`` apart,
+    for the current hit ratio (falling back to the ratio since module load
+    on an idle box), and compares the ARC ceiling (``c_max``) with what is
+    left of RAM once the amdgpu GTT and a system reserve are set aside.
+    """
+    probe = get_probe()
+    before = parse_arcstats(probe.read("/proc/spl/kstat/zfs/arcstats") or "")
+    if "c_max" not in before:
+        return CheckResult(
+            name="ARC sizing",
+            status=CheckStatus.SKIP,
+            message="ARC sizing: skipped (zfs module not loaded)",
+            category=Category.ZFS,
+        )
+    time.sleep(ARC_SAMPLE_S)
+    after = parse_arcstats(probe.read("/proc/spl/kstat/zfs/arcstats") or "") or before
+    window = f"over {ARC_SAMPLE_S:g}s"
+    activity = arc_activity(after, before)
+    if not activity.accesses:
+        window, activity = "since load", arc_activity(after)
+
+    size, c_max = after.get("size", 0), after["c_max"]
+    mem_total = probe.meminfo().get("MemTotal", 0) * 1024
+    gtt_total = sum(int(probe.read(f"{card}/mem_info_gtt_total") or 0) for card in probe.amdgpu_cards())
+    recommended = recommend_arc_max(mem_total, gtt_total) if mem_total and gtt_total else None
+
+    ratio = activity.hit_ratio
+    demand = activity.demand_hit_ratio
+    summary = f"ARC {format_gib(size)} of {format_gib(c_max)}"
+    if ratio is not None:
+        summary += f", hit ratio {ratio:.1%} {window}"
+    detail = (
+        f"Demand: {activity.demand_hits} hits, {activity.demand_misses} misses; "
+        f"prefetch: {activity.prefetch_hits} hits, {activity.prefetch_misses} misses ({window})"
+    )
+    facts = [Fact("zfs_arc_size_bytes", size), Fact("zfs_arc_max_bytes", c_max)]
+    if ratio is not None:
+        facts.append(Fact("zfs_arc_hit_ratio", round(ratio, 4)))
+    if recommended is not None:
+        facts.append(Fact("zfs_arc_recommended_max_bytes", recommended))
+        detail += f"\nRAM {format_gib(mem_total)}, GTT {format_gib(gtt_total)}, reserve {format_gib(SYSTEM_RESERVE)}"
+
+    if recommended is not None and c_max > recommended * 1.05:
+        return CheckResult(
+            name="ARC sizing",
+            status=CheckStatus.WARN,
+            message=f"{summary}; ARC may grow into GPU memory, recommend arc_max {format_gib(recommended)}",
+            category=Category.ZFS,
+            detail=detail,
+            fix=_arc_max_fix(recommended),
+            facts=facts,
+        )
+
+    if (
+        recommended is not None
+        and demand is not None
+        and demand < 0.9
+        and size >= c_max * 0.95
+        and c_max < recommended * 0.9
+    ):
+        return CheckResult(
+            name="ARC sizing",
+            status=CheckStatus.WARN,
+            message=f"{summary}; ARC is full and missing {1 - demand:.0%} of demand reads, "
+            f"room to grow to {format_gib(recommended)}",
+            category=Category.ZFS,
+            detail=detail,
+            fix=_arc_max_fix(recommended),
+            facts=facts,
+        )
+
+    runtime = int((probe.read("/sys/module/zfs/parameters/zfs_arc_max") or "0").strip() or 0)
+    if runtime and not modprobe_drop_in_matching(_ARC_MAX_DROP_IN):
+        return CheckResult(
+            name="ARC sizing",
+            status=CheckStatus.WARN,
+            message=f"{summary}; zfs_arc_max set at runtime only (reverts on reboot)",
+            category=Category.ZFS,
+            detail=detail,
+            fix=_arc_max_fix(runtime),
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="ARC sizing",
+        status=CheckStatus.OK,
+        message=summary,
+        category=Category.ZFS,
+        detail=detail,
+        facts=facts,
+    )
+
+
+# A dataset whose newest auto-snapshot is older than this has stopped being snapshotted.
+SNAPSHOT_STALE_DAYS = 2
+
+# More snapshots than this on one dataset means pruning is not keeping up.
+SNAPSHOT_MAX_PER_DATASET = 500
+
+
+def scan_snapshots() -> tuple[SnapshotScanner, CommandResult]:
+    """Stream every snapshot through a SnapshotScanner (the listing is never held in memory)."""
+    scanner = SnapshotScanner()
+    result = run_command(
+        "zfs list -H -p -t snapshot -o name,creation,used",
+        timeout=120.0,
+        on_line=scanner.add,
+    )
+    return scanner, result
+
+
+def _age(seconds: float) -> str:
+    days = seconds / DAY
+    return f"{days:.0f} days" if days >= 2 else f"{seconds / 3600:.0f} hours"
+
+
+def _names(sets: list[SnapshotSet], describe: Callable[[SnapshotSet], str]) -> str:
+    shown = ", ".join(f"{entry.dataset} ({describe(entry)})" for entry in sets[:3])
+    return shown + (f" and {len(sets) - 3} more" if len(sets) > 3 else "")
+
+
+@register_check(Category.ZFS, "Auto-snapshots", requires=(check_zfs_pool_exists,))
+def check_zfs_snapshots() -> CheckResult:
+    """Check snapshots are taken and pruned: no stale or runaway snapshot sets."""
+    tool = next((name for name in ("zfs-auto-snapshot", "sanoid") if command_exists(name)), None)
+    scanner, result = scan_snapshots()
+    if not result.success:
+        return CheckResult(
+            name="Auto-snapshots",
+            status=CheckStatus.SKIP,
+            message="Snapshots: skipped (zfs list failed)",
+            category=Category.ZFS,
+            detail=result.stderr.strip() or None,
+        )
+
+    sets = sorted(scanner.datasets.values(), key=lambda entry: entry.dataset)
+    if not sets and tool is None:
+        return CheckResult(
+            name="Auto-snapshots",
+            status=CheckStatus.WARN,
+            message="No auto-snapshot tool detected",
+            category=Category.ZFS,
+            fix="sudo apt install zfs-auto-snapshot",
+        )
+    if not sets:
+        return CheckResult(
+            name="Auto-snapshots",
+            status=CheckStatus.WARN,
+            message=f"{tool} installed but no snapshots taken",
+            category=Category.ZFS,
+            detail=f"Check the {tool} timers and which datasets it is configured for",
+            facts=[Fact("zfs_snapshots", 0)],
+        )
+
+    now = time.time()
+    facts = [Fact("zfs_snapshots", scanner.total)]
+    for pool in sorted({entry.pool for entry in sets}):
+        in_pool = [entry for entry in sets if entry.pool == pool]
+        facts.append(Fact("zfs_pool_snapshots", sum(entry.count for entry in in_pool), {"pool": pool}))
+        facts.append(Fact("zfs_snapshot_used_bytes", sum(entry.used for entry in in_pool), {"pool": pool}))
+        oldest = min(entry.oldest for entry in in_pool if entry.oldest is not None)
+        facts.append(Fact("zfs_snapshot_oldest_age_days", round((now - oldest) / DAY, 1), {"pool": pool}))
+
+    stale = [
+        entry
+        for entry in sets
+        if entry.newest_auto is not None and now - entry.newest_auto > SNAPSHOT_STALE_DAYS * DAY
+    ]
+    runaway = [entry for entry in sets if entry.count > SNAPSHOT_MAX_PER_DATASET]
+    newest = max((entry.newest for entry in sets if entry.newest is not None), default=None)
+    summary = f"{scanner.total} snapshots in {len(sets)} datasets" + (
+        f", newest {_age(now - newest)} old" if newest is not None else ""
+    )
+    if stale or runaway:
+        problems = []
+        if stale:
+            problems.append(
+                f"auto-snapshots stopped on {_names(stale, lambda e: f'last {_age(now - (e.newest_auto or 0))} ago')}"
+            )
+        if runaway:
+            problems.append(f"not pruned on {_names(runaway, lambda e: f'{e.count} snapshots')}")
+        return CheckResult(
+            name="Auto-snapshots",
+            status=CheckStatus.WARN,
+            message=f"Snapshots: {'; '.join(problems)}",
+            category=Category.ZFS,
+            detail=f"{summary}. Check the {tool or 'snapshot'} timers and retention settings",
+            facts=facts,
+        )
+
+    return CheckResult(
+        name="Auto-snapshots",
+        status=CheckStatus.OK,
+        message=f"{tool}: {summary}" if tool else f"Snapshots present ({summary})",
+        category=Category.ZFS,
+        facts=facts,
+    )
@@ -0,0 +1,307 @@
+"""The result-producing side of the doctor, independent of presentation.
+
+``DoctorRun`` resolves the profile, runs the selected checks through the
+scheduler and yields each ``CheckResult`` as soon as it is ready (already
+softened for the active profile). Renderers in ``doctor.render`` decide what
+to do with them: the Rich report buffers and prints grouped output, while the
+NDJSON renderer writes each result the moment it arrives.
+
+Results still valid in the on-disk result cache (``doctor.cache``) are yielded
+first, without running their checks; everything else runs and is stored.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from typing import Any
+
+from msai_setup.doctor.cache import ResultCache
+from msai_setup.doctor.checks import Category, Check, CheckResult, registry
+from msai_setup.doctor.profile import Profile, category_expected, resolve_profile
+from msai_setup.doctor.scheduler import iter_results
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.shell import CommandCache, command_cache
+
+FIXABLE = (CheckStatus.WARN, CheckStatus.FAIL)
+
+
+def apply_profile(result: CheckResult, profile: Profile) -> CheckResult:
+    """Soften findings for categories not expected on the active profile.
+
+    On a desktop box, a missing ZFS pool or KVM is not a failure; downgrade
+    such WARN/FAIL results to SKIP with a note so the report stays honest.
+    """
+    if result.status not in FIXABLE or category_expected(profile, result.category):
+        return result
+    # A copy, not in-place: the scheduler still holds the raw result to decide
+    # whether dependents may run.
+    return replace(
+        result,
+        status=CheckStatus.SKIP,
+        message=f"{result.message} (not expected on {profile.value})",
+        fix=None,
+    )
+
+
+@dataclass
+class Summary:
+    """Counts of results by outcome, plus how many came from the result cache."""
+
+    passed: int = 0
+    warnings: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    skipped: int = 0
+    cached: int = 0
+
+    @classmethod
+    def of(cls, results: list[CheckResult]) -> Summary:
+        """Tally a list of results."""
+        summary = cls()
+        for result in results:
+            if result.status == CheckStatus.OK:
+                summary.passed += 1
+            elif result.status == CheckStatus.WARN:
+                summary.warnings += 1
+            elif result.status == CheckStatus.FAIL:
+                summary.failed += 1
+            elif result.status == CheckStatus.TIMEOUT:
+                summary.timed_out += 1
+            else:
+                summary.skipped += 1
+            if result.cached:
+                summary.cached += 1
+        return summary
+
+    def to_dict(self) -> dict[str, int]:
+        """JSON-ready form."""
+        return {
+            "passed": self.passed,
+            "warnings": self.warnings,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "skipped": self.skipped,
+            "cached": self.cached,
+        }
+
+
+class DoctorRun:
+    """One doctor invocation: which checks, under which profile, and results."""
+
+    def __init__(
+        self,
+        categories: list[Category] | None = None,
+        *,
+        profile: Profile | None = None,
+        jobs: int | None = None,
+        deadline: float | None = None,
+        fresh: bool = False,
+        cached_only: bool = False,
+        checks: list[tuple[Category, Check]] | None = None,
+    ) -> None:
+        """Select checks and resolve the profile; nothing runs until iterated.
+
+        Args:
+            categories: Categories to check, or None for all.
+            profile: Host profile; None resolves it automatically.
+            jobs: Maximum checks to run at once; None means one per CPU.
+            deadline: Time budget in seconds for the whole run, or None.
+            fresh: Run every check, ignoring cached results (the fresh
+                results are still stored).
+            cached_only: Run nothing; report the last stored result of each
+                check whose invalidation keys still match, expired or not.
+            checks: Explicit (category, check) pairs to run instead of
+                selecting by category.
+        """
+        if fresh and cached_only:
+            raise ValueError("fresh and cached_only are mutually exclusive")
+        if profile is None:
+            self.profile, self.profile_source = resolve_profile()
+        else:
+            self.profile, self.profile_source = profile, "specified"
+        self.checks = checks if checks is not None else registry.get_checks(categories)
+        self.jobs = jobs
+        self.deadline = deadline
+        self.fresh = fresh
+        self.cached_only = cached_only
+        self.started_at: datetime | None = None
+        self.elapsed = 0.0
+        self.cache: CommandCache | None = None
+        self._results: list[CheckResult | None] = [None] * len(self.checks)
+
+    def __iter__(self) -> Iterator[CheckResult]:
+        """Run the checks, yielding each result as it completes."""
+        self.started_at = datetime.now(UTC)
+        started = time.monotonic()
+        now = time.time()
+        store = ResultCache()
+
+        reused: dict[int, CheckResult] = {}
+        if not self.fresh:
+            for index, (category, check) in enumerate(self.checks):
+                hit = store.lookup(category, check, now=now, ignore_ttl=self.cached_only)
+                if hit is not None:
+                    reused[index] = hit
+        for index, raw in reused.items():
+            yield self._record(index, raw)
+
+        pending = [index for index in range(len(self.checks)) if index not in reused]
+        if self.cached_only:
+            for index in pending:
+                category, check = self.checks[index]
+                missing = CheckResult(
+                    name=check.name,
+                    status=CheckStatus.SKIP,
+                    message=f"{check.name}: no cached result (run msai doctor to refresh)",
+                    category=category,
+                )
+                yield self._record(index, missing)
+            self.elapsed = time.monotonic() - started
+            return
+
+        # Checks share one command cache so a probe several of them need
+        # (zpool status, tailscale status --json) forks once per run.
+        subset = [self.checks[index] for index in pending]
+        known = {self.checks[index][1].run: raw for index, raw in reused.items()}
+        with command_cache() as cache:
+            self.cache = cache
+            for position, raw in iter_results(subset, jobs=self.jobs, deadline=self.deadline, known=known):
+                index = pending[position]
+                category, check = self.checks[index]
+                store.put(category, check, raw, now=now)
+                yield self._record(index, raw)
+        store.save()
+        self.elapsed = time.monotonic() - started
+
+    def _record(self, index: int, raw: CheckResult) -> CheckResult:
+        result = apply_profile(raw, self.profile)
+        self._results[index] = result
+        return result
+
+    def results(self) -> list[CheckResult]:
+        """Results gathered so far, in report (registration) order."""
+        return [result for result in self._results if result is not None]
+
+    def summary(self) -> Summary:
+        """Tally of the results gathered so far."""
+        return Summary.of(self.results())
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready description of the run and its results."""
+        return {
+            "profile": self.profile.value,
+            "profile_source": self.profile_source,
+            "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "elapsed_s": round(self.elapsed, 6),
+            "summary": self.summary().to_dict(),
+            "command_cache": {"hits": self.cache.hits, "misses": self.cache.misses} if self.cache else None,
+            "results": [result.to_dict() for result in self.results()],
+        }
+
+
+def with_dependents(
+    selected: list[tuple[Category, Check]],
+    universe: list[tuple[Category, Check]],
+) -> list[tuple[Category, Check]]:
+    """``selected`` plus every check in ``universe`` that (transitively) requires one of them.
+
+    The result keeps ``universe`` order, so prerequisites still come first.
+    """
+    chosen = {check.run for _cat, check in selected}
+    grew = True
+    while grew:
+        grew = False
+        for _cat, check in universe:
+            if check.run not in chosen and any(func in chosen for func in check.requires):
+                chosen.add(check.run)
+                grew = True
+    in_universe = {check.run for _cat, check in universe}
+    extra = [(cat, check) for cat, check in selected if check.run not in in_universe]
+    return [(cat, check) for cat, check in universe if check.run in chosen] + extra
+
+
+_SEVERITY = {
+    CheckStatus.OK: 0,
+    CheckStatus.SKIP: 1,
+    CheckStatus.WARN: 2,
+    CheckStatus.FAIL: 3,
+    CheckStatus.TIMEOUT: 3,
+}
+
+
+@dataclass
+class Change:
+    """A check's result before and after a fix or install."""
+
+    after: CheckResult
+    before: CheckResult | None = None
+
+    @property
+    def changed(self) -> bool:
+        """Whether the status or message moved."""
+        before = self.before
+        return before is None or (before.status, before.message) != (self.after.status, self.after.message)
+
+    @property
+    def improved(self) -> bool:
+        """Whether the status got better."""
+        return self.before is not None and _SEVERITY[self.after.status] < _SEVERITY[self.before.status]
+
+    @property
+    def regressed(self) -> bool:
+        """Whether the status got worse."""
+        return self.before is not None and _SEVERITY[self.after.status] > _SEVERITY[self.before.status]
+
+
+def verify(
+    checks: list[tuple[Category, Check]],
+    before: Mapping[tuple[Category, str], CheckResult],
+    *,
+    profile: Profile | None = None,
+    jobs: int | None = None,
+) -> list[Change]:
+    """Re-run just ``checks`` (bypassing the result cache) and diff against ``before``.
+
+    Args:
+        checks: The checks tied to what changed, in report order.
+        before: Earlier results keyed by (category, check name).
+        profile: Host profile; None resolves it automatically.
+        jobs: Maximum checks to run at once; None means one per CPU.
+
+    Returns:
+        One Change per check, in report order.
+    """
+    run = DoctorRun(profile=profile, jobs=jobs, fresh=True, checks=checks)
+    for _result in run:
+        pass
+    results = run.results()
+    if len(results) != len(run.checks):
+        raise RuntimeError(f"verification produced {len(results)} results for {len(run.checks)} checks")
+    return [
+        Change(after=result, before=before.get((category, check.name)))
+        for (category, check), result in zip(run.checks, results, strict=True)
+    ]
+
+
+def last_known(
+    checks: list[tuple[Category, Check]],
+    *,
+    profile: Profile | None = None,
+) -> dict[tuple[Category, str], CheckResult]:
+    """Last stored result of each check, however old or invalidated.
+
+    This is the cheap "before" for a change made outside a doctor run (e.g.
+    ``msai bootstrap``), without paying for a pass before the change.
+    """
+    if profile is None:
+        profile, _source = resolve_profile()
+    store = ResultCache()
+    found: dict[tuple[Category, str], CheckResult] = {}
+    for category, check in checks:
+        result = store.last(category, check)
+        if result is not None:
+            found[(category, check.name)] = apply_profile(result, profile)
+    return found
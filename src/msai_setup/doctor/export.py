@@ -0,0 +1,132 @@
+"""Prometheus textfile export of doctor results.
+
+``msai doctor export --textfile-dir DIR`` writes ``DIR/msai_doctor.prom`` for
+node_exporter's textfile collector: one status gauge per check and outcome,
+each check's duration, whether it was answered from the result cache, counts
+by outcome, and the numeric facts checks report (memory size, scrub age,
+snapshot counts...).
+
+The file is replaced atomically (temp file in the same directory, then
+rename) and only when a value other than a check duration changed, so a
+one-minute timer does not churn the disk. No timestamp is written: node_exporter already exposes the
+file's mtime as ``node_textfile_mtime_seconds``.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from msai_setup.doctor.checks import CheckResult, Fact
+from msai_setup.utils.formatting import CheckStatus
+
+TEXTFILE_NAME = "msai_doctor.prom"
+
+_PREFIX = "msai_doctor"
+_DURATION = f"{_PREFIX}_check_duration_seconds"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str]) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _check_labels(result: CheckResult) -> dict[str, str]:
+    return {"category": result.category.value, "check": result.name}
+
+
+def _family(lines: list[str], name: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+
+
+def render_textfile(results: list[CheckResult]) -> str:
+    """Render results in the Prometheus text exposition format.
+
+    Output is deterministic for equal results (report order, sorted facts),
+    which is what lets ``write_textfile`` skip unchanged rewrites.
+    """
+    lines: list[str] = []
+
+    name = f"{_PREFIX}_check_status"
+    _family(lines, name, "1 for the check's current status, 0 for the others.")
+    for result in results:
+        for status in CheckStatus:
+            labels = {**_check_labels(result), "status": status.value}
+            lines.append(f"{name}{_labels(labels)} {int(result.status is status)}")
+
+    _family(lines, _DURATION, "Wall time of the check's last actual run.")
+    for result in results:
+        if result.timing is not None:
+            lines.append(f"{_DURATION}{_labels(_check_labels(result))} {_number(round(result.timing.wall_s, 3))}")
+
+    name = f"{_PREFIX}_check_cached"
+    _family(lines, name, "1 if the result was reused from the result cache.")
+    for result in results:
+        lines.append(f"{name}{_labels(_check_labels(result))} {int(result.cached)}")
+
+    name = f"{_PREFIX}_checks"
+    _family(lines, name, "Number of checks by status.")
+    counts = Counter(result.status for result in results)
+    for status in CheckStatus:
+        lines.append(f"{name}{_labels({'status': status.value})} {counts[status]}")
+
+    facts: dict[str, list[tuple[CheckResult, Fact]]] = {}
+    for result in results:
+        for fact in result.facts:
+            facts.setdefault(fact.name, []).append((result, fact))
+    for fact_name in sorted(facts):
+        name = f"{_PREFIX}_{fact_name}"
+        _family(lines, name, f"{fact_name.replace('_', ' ')} as measured by msai doctor.")
+        for result, fact in facts[fact_name]:
+            labels = {**_check_labels(result), **dict(sorted(fact.labels.items()))}
+            lines.append(f"{name}{_labels(labels)} {_number(fact.value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _without_durations(text: str) -> list[str]:
+    """The samples that matter for "did anything change": durations differ on almost every run."""
+    return [line for line in text.splitlines() if not line.startswith(f"{_DURATION}{{")]
+
+
+def write_textfile(directory: Path, text: str, name: str = TEXTFILE_NAME) -> bool:
+    """Atomically replace ``directory/name`` with ``text`` unless only durations differ.
+
+    Check durations move on every run, so comparing them would rewrite the
+    file every time; the durations on disk are refreshed with the next real
+    change. The temp file starts with a dot and does not end in ``.prom``, so
+    the collector never reads a half-written file.
+
+    Returns:
+        True if the file was written, False if it was already up to date.
+    """
+    target = directory / name
+    try:
+        if _without_durations(target.read_text()) == _without_durations(text):
+            return False
+    except OSError:
+        pass
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        # mkstemp creates 0600; node_exporter usually runs as another user.
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return True
@@ -1,6 +1,17 @@
 """Auto-fix suggestions and commands."""
 
+import os
+import queue
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 
 from msai_setup.utils.shell import run_interactive
 
@@ -12,6 +23,7 @@ class FixResult:
     success: bool
     message: str
     output: str | None = None
+    duration_s: float | None = None
 
 
 def apply_fix(command: str, *, dry_run: bool = False) -> FixResult:
@@ -33,22 +45,204 @@ def apply_fix(command: str, *, dry_run: bool = False) -> FixResult:
             message=f"Would run: {command}",
         )
 
+    started = time.monotonic()
     code = run_interactive(command)
+    duration = time.monotonic() - started
     if code == 0:
         return FixResult(
             success=True,
             message=f"Applied: {command}",
+            duration_s=duration,
         )
 
     return FixResult(
         success=False,
         message=f"Failed (exit {code}): {command}",
+        duration_s=duration,
     )
 
 
+_SYSTEMCTL = re.compile(r"\bsystemctl\s+(?:--\S+\s+)*(?:start|stop|restart|reload|enable|disable)\s+(?:--\S+\s+)*(\S+)")
+_WRITES_FILE = re.compile(r"(?:\btee(?:\s+-a)?|>>?)\s+(/\S+)")
+_PACKAGES = re.compile(r"\b(?:apt|apt-get|dpkg|snap)\b")
+_ACCOUNTS = re.compile(r"\b(?:usermod|groupadd|useradd|gpasswd)\b")
+_SUDO = re.compile(r"(?:^|[\s;&|(])sudo\s")
+
+# Steps known to finish without reading the terminal: unit control, a config
+# drop-in written through tee, and tmpfiles applying such a drop-in. Anything
+# else (apt without -y, tailscale up, incus admin init, newgrp, msai bootstrap)
+# may prompt, so it keeps the terminal.
+_NON_INTERACTIVE_STEPS = (
+    re.compile(
+        r"(?:sudo\s+)?systemctl\s+(?:--[\w-]+\s+)*"
+        r"(?:start|stop|restart|reload|enable|disable|daemon-reload)(?:\s+[\w@.:-]+)*"
+    ),
+    re.compile(r"(?:echo|printf)\s+(?:'[^']*'|[\w.=-]+)\s*\|\s*(?:sudo\s+)?tee(?:\s+-a)?\s+/[\w@./+-]+(?:\s*>\s*/dev/null)?"),
+    re.compile(r"(?:sudo\s+)?systemd-tmpfiles\s+--create(?:\s+/[\w@./+-]+)*"),
+)
+
+
+def fix_target(command: str) -> str:
+    """What a fix changes, for deciding which fixes may run side by side.
+
+    Fixes with the same target run one after another, in order; fixes with
+    different targets run concurrently. Commands we cannot classify share
+    one ``shell`` target, so they never race each other.
+    """
+    if match := _SYSTEMCTL.search(command):
+        unit = match.group(1)
+        return f"unit:{unit if '.' in unit else unit + '.service'}"
+    if _PACKAGES.search(command):
+        return "packages"  # one dpkg lock for all of them
+    if _ACCOUNTS.search(command):
+        return "accounts"  # /etc/group and friends
+    if match := _WRITES_FILE.search(command):
+        return f"file:{match.group(1)}"
+    return "shell"
+
+
+def needs_sudo(command: str) -> bool:
+    """Whether a fix command escalates with sudo."""
+    return _SUDO.search(command) is not None
+
+
+def is_batchable(command: str) -> bool:
+    """Whether a fix can run with captured output and no terminal.
+
+    True for the safe fixes and for commands made only of ``&&``-chained
+    steps known not to prompt (``systemctl``, ``tee`` drop-ins,
+    ``systemd-tmpfiles``). Everything else runs on the terminal, one at a time.
+    """
+    if is_safe_fix(command):
+        return True
+    steps = re.split(r"\s*&&\s*", command.strip())
+    return all(any(step.fullmatch(part) for step in _NON_INTERACTIVE_STEPS) for part in steps)
+
+
+def _sudo_shim(directory: Path) -> dict[str, str] | None:
+    """Environment whose ``sudo`` never prompts, reusing the cached credentials.
+
+    Fixes run concurrently with captured output, so a password prompt would
+    have nowhere to go. A ``sudo`` earlier in PATH execs the real one with
+    ``-n``: it either rides the session authenticated up front or fails.
+    """
+    real = shutil.which("sudo")
+    if real is None:
+        return None
+    shim = directory / "sudo"
+    shim.write_text(f'#!/bin/sh\nexec {shlex.quote(real)} -n "$@"\n')
+    shim.chmod(0o755)
+    return {**os.environ, "PATH": f"{directory}{os.pathsep}{os.environ.get('PATH', os.defpath)}"}
+
+
+def _run_captured(command: str, env: dict[str, str] | None) -> FixResult:
+    started = time.monotonic()
+    try:
+        proc = subprocess.run(
+            ["bash", "-c", command],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env,
+            check=False,
+        )
+        code, output = proc.returncode, proc.stdout
+    except OSError as e:
+        code, output = 127, str(e)
+    duration = time.monotonic() - started
+    if code == 0:
+        return FixResult(success=True, message=f"Applied: {command}", output=output or None, duration_s=duration)
+    return FixResult(
+        success=False,
+        message=f"Failed (exit {code}): {command}",
+        output=output or None,
+        duration_s=duration,
+    )
+
+
+def run_fixes(
+    commands: list[str],
+    *,
+    jobs: int | None = None,
+    dry_run: bool = False,
+    announce: Callable[[str], None] | None = None,
+) -> Iterator[tuple[int, FixResult]]:
+    """Apply a batch of fixes: one sudo authentication, independent ones in parallel.
+
+    If any fix uses sudo, ``sudo -v`` runs once on the terminal first.
+    Fixes that cannot prompt (``is_batchable``) then run with captured output
+    through a ``sudo`` that cannot prompt either (see ``_sudo_shim``), grouped
+    by ``fix_target``: each group runs in order, and the groups run
+    concurrently. The remaining fixes run afterwards, one at a time on the
+    terminal, in the order they were chosen.
+
+    Args:
+        commands: Fix commands, in the order they were chosen.
+        jobs: Maximum groups to run at once; None means all of them.
+        dry_run: If True, report what would run without running anything.
+        announce: Called with each terminal fix just before it starts, so
+            its live output has a heading.
+
+    Yields:
+        (index, result) as each fix finishes, index into ``commands``.
+    """
+    if dry_run:
+        for index, command in enumerate(commands):
+            yield index, FixResult(success=True, message=f"Would run: {command}")
+        return
+
+    selected = list(range(len(commands)))
+    with tempfile.TemporaryDirectory(prefix="msai-fix-") as shim_dir:
+        env: dict[str, str] | None = None
+        if any(needs_sudo(command) for command in commands) and os.geteuid() != 0:
+            if run_interactive("sudo -v") != 0:
+                for index, command in enumerate(commands):
+                    if needs_sudo(command):
+                        message = f"Skipped (sudo authentication failed): {command}"
+                        yield index, FixResult(success=False, message=message)
+                selected = [index for index in selected if not needs_sudo(commands[index])]
+            else:
+                env = _sudo_shim(Path(shim_dir))
+
+        groups: dict[str, list[int]] = {}
+        for index in selected:
+            if is_batchable(commands[index]):
+                groups.setdefault(fix_target(commands[index]), []).append(index)
+        if groups:
+            yield from _run_groups(commands, groups, env, jobs)
+
+    for index in selected:
+        if not is_batchable(commands[index]):
+            if announce is not None:
+                announce(commands[index])
+            yield index, apply_fix(commands[index])
+
+
+def _run_groups(
+    commands: list[str],
+    groups: dict[str, list[int]],
+    env: dict[str, str] | None,
+    jobs: int | None,
+) -> Iterator[tuple[int, FixResult]]:
+    done: queue.Queue[tuple[int, FixResult]] = queue.Queue()
+
+    def run_group(members: list[int]) -> None:
+        for index in members:
+            done.put((index, _run_captured(commands[index], env)))
+
+    pending = sum(len(members) for members in groups.values())
+    with ThreadPoolExecutor(max_workers=jobs or len(groups), thread_name_prefix="fix") as pool:
+        for members in groups.values():
+            pool.submit(run_group, members)
+        for _ in range(pending):
+            yield done.get()
+
+
 # Fixes that are safe to auto-apply with --yes: idempotent, non-destructive,
 # no package installation and no data changes. Install-type or state-changing
-# fixes are deliberately excluded so they always require an explicit prompt.
+# fixes, and anything touching the boot configuration (grub, initramfs), are
+# deliberately excluded so they always require an explicit prompt.
 SAFE_FIXES: dict[str, str] = {
     "docker_start": "sudo systemctl start docker",
     "libvirtd_start": "sudo systemctl start libvirtd",
@@ -58,6 +252,11 @@ SAFE_FIXES: dict[str, str] = {
         "echo 'options snd_hda_intel power_save=0 power_save_controller=N' "
         "| sudo tee /etc/modprobe.d/audio-disable-powersave.conf"
     ),
+    "thp_madvise": (
+        "printf 'w /sys/kernel/mm/transparent_hugepage/enabled - - - - madvise\\n"
+        "w /sys/kernel/mm/transparent_hugepage/defrag - - - - defer+madvise\\n' "
+        "| sudo tee /etc/tmpfiles.d/msai-thp.conf && sudo systemd-tmpfiles --create /etc/tmpfiles.d/msai-thp.conf"
+    ),
 }
 
 
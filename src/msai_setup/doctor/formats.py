@@ -0,0 +1,17 @@
+"""Output formats of the doctor report.
+
+Kept apart from ``doctor.render`` so the CLI can declare ``--format`` without
+importing the renderers (and everything they run) at startup.
+"""
+
+from __future__ import annotations
+
+from enum import Enum
+
+
+class OutputFormat(str, Enum):
+    """Output formats accepted by ``--format``."""
+
+    RICH = "rich"
+    JSON = "json"
+    NDJSON = "ndjson"
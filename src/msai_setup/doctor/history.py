@@ -0,0 +1,332 @@
+"""Doctor run history in a local SQLite database.
+
+Every ``msai doctor`` (and ``msai doctor export``) run appends one row to
+``runs``, one row per check to ``results`` and one row per freshly measured
+fact to ``facts`` in ``~/.local/state/msai/history.db``. That is enough to
+answer "when did this check last change state?", "how has scrub age moved
+over the last 90 days?" and "what got worse since last week?" (see
+``msai doctor history``).
+
+Writes have to stay cheap because a timer may run the doctor every minute:
+the database is in WAL mode with ``synchronous=NORMAL`` (a commit is an
+append to the log, fsynced at checkpoints rather than per transaction), a run
+is a single transaction of batched inserts, and rows older than the retention
+window are pruned in that same transaction. Timestamps are indexed, so the
+queries stay fast as the history grows.
+
+Facts of results answered from the result cache are not stored again: they
+are an old measurement, not a new one.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from pathlib import Path
+
+from msai_setup.doctor.checks import Category, CheckResult
+from msai_setup.doctor.engine import Change, DoctorRun, Summary
+from msai_setup.utils.db import STATE_DIR, connect
+from msai_setup.utils.status import CheckStatus
+
+HISTORY_PATH = STATE_DIR / "history.db"
+
+# Rows older than this are pruned when a run is recorded.
+RETENTION_DAYS = 400
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    at REAL NOT NULL,
+    elapsed_s REAL NOT NULL,
+    profile TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    warnings INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    timed_out INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    cached INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_at ON runs (at);
+
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    at REAL NOT NULL,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL,
+    wall_s REAL,
+    cached INTEGER NOT NULL,
+    PRIMARY KEY (run_id, category, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_check_at ON results (category, name, at);
+
+CREATE TABLE IF NOT EXISTS facts (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    at REAL NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    category TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS facts_name_at ON facts (name, at);
+CREATE INDEX IF NOT EXISTS facts_run ON facts (run_id);
+"""
+
+
+@dataclass
+class RunRow:
+    """One recorded doctor run."""
+
+    id: int
+    at: float
+    elapsed_s: float
+    profile: str
+    summary: Summary
+
+
+@dataclass
+class Transition:
+    """A check's status at the moment it changed (or was first recorded)."""
+
+    at: float
+    run_id: int
+    status: CheckStatus
+    message: str
+    previous: CheckStatus | None
+
+
+@dataclass
+class FactDay:
+    """One day of a fact series (per label set)."""
+
+    day: str
+    labels: dict[str, str]
+    minimum: float
+    maximum: float
+    last: float
+    samples: int
+
+
+def _labels_key(labels: dict[str, str]) -> str:
+    return json.dumps(labels, sort_keys=True, separators=(",", ":"))
+
+
+def _run_row(row: sqlite3.Row) -> RunRow:
+    return RunRow(
+        id=row["id"],
+        at=row["at"],
+        elapsed_s=row["elapsed_s"],
+        profile=row["profile"],
+        summary=Summary(
+            passed=row["passed"],
+            warnings=row["warnings"],
+            failed=row["failed"],
+            timed_out=row["timed_out"],
+            skipped=row["skipped"],
+            cached=row["cached"],
+        ),
+    )
+
+
+class History:
+    """The history database; every method opens and closes its own connection."""
+
+    def __init__(self, path: Path | None = None, *, retention_days: float = RETENTION_DAYS) -> None:
+        """Use the database at ``path`` (default ``HISTORY_PATH``), created by the first ``record``."""
+        self.path = path or HISTORY_PATH
+        self.retention_days = retention_days
+
+    def _connect(self, *, write: bool = False) -> AbstractContextManager[sqlite3.Connection]:
+        return connect(self.path, _SCHEMA, _SCHEMA_VERSION, create=write)
+
+    def record(self, run: DoctorRun, *, now: float | None = None) -> int:
+        """Append a finished run; returns its id.
+
+        Args:
+            run: A run that has been iterated to completion.
+            now: Timestamp to record; defaults to when the run started.
+        """
+        at = now if now is not None else (run.started_at.timestamp() if run.started_at else time.time())
+        results = run.results()
+        summary = run.summary()
+        with self._connect(write=True) as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (at, elapsed_s, profile, passed, warnings, failed, timed_out, skipped, cached)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    at,
+                    run.elapsed,
+                    run.profile.value,
+                    summary.passed,
+                    summary.warnings,
+                    summary.failed,
+                    summary.timed_out,
+                    summary.skipped,
+                    summary.cached,
+                ),
+            )
+            run_id = cursor.lastrowid
+            if run_id is None:
+                raise sqlite3.DatabaseError("INSERT INTO runs returned no row id")
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (run_id, at, category, name, status, message, wall_s, cached)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        at,
+                        result.category.value,
+                        result.name,
+                        result.status.value,
+                        result.message,
+                        result.timing.wall_s if result.timing else None,
+                        int(result.cached),
+                    )
+                    for result in results
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO facts (run_id, at, name, labels, category, check_name, value)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, at, fact.name, _labels_key(fact.labels), result.category.value, result.name, fact.value)
+                    for result in results
+                    if not result.cached
+                    for fact in result.facts
+                ],
+            )
+            conn.execute("DELETE FROM runs WHERE at < ?", (at - self.retention_days * 86400.0,))
+        return run_id
+
+    def runs(self, limit: int = 20) -> list[RunRow]:
+        """The most recent runs, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM runs ORDER BY at DESC, id DESC LIMIT ?", (limit,)).fetchall()
+        return [_run_row(row) for row in rows]
+
+    def run_before(self, at: float) -> RunRow | None:
+        """The last run recorded at or before ``at``."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM runs WHERE at <= ? ORDER BY at DESC, id DESC LIMIT 1", (at,)
+            ).fetchone()
+        return _run_row(row) if row else None
+
+    def run(self, run_id: int) -> RunRow | None:
+        """A run by id."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return _run_row(row) if row else None
+
+    def results(self, run_id: int) -> list[CheckResult]:
+        """The results recorded for a run, in category then check order."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM results WHERE run_id = ?", (run_id,)).fetchall()
+        order = {category.value: position for position, category in enumerate(Category)}
+        results = [
+            CheckResult(
+                name=row["name"],
+                status=CheckStatus(row["status"]),
+                message=row["message"],
+                category=Category(row["category"]),
+                cached=bool(row["cached"]),
+            )
+            for row in rows
+            if row["category"] in order
+        ]
+        return sorted(results, key=lambda result: order[result.category.value])
+
+    def transitions(self, category: Category, name: str, *, limit: int = 10) -> list[Transition]:
+        """The check's state changes, newest first (the first record counts as one)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT at, run_id, status, message, previous FROM (
+                    SELECT at, run_id, status, message,
+                           LAG(status) OVER (ORDER BY at, run_id) AS previous
+                    FROM results WHERE category = ? AND name = ?
+                )
+                WHERE previous IS NULL OR previous != status
+                ORDER BY at DESC, run_id DESC
+                LIMIT ?
+                """,
+                (category.value, name, limit),
+            ).fetchall()
+        return [
+            Transition(
+                at=row["at"],
+                run_id=row["run_id"],
+                status=CheckStatus(row["status"]),
+                message=row["message"],
+                previous=CheckStatus(row["previous"]) if row["previous"] else None,
+            )
+            for row in rows
+        ]
+
+    def fact_days(self, name: str, *, since: float, labels: dict[str, str] | None = None) -> list[FactDay]:
+        """Daily min/max/last of a fact since ``since``, oldest first.
+
+        Args:
+            name: Fact name, e.g. ``zfs_scrub_age_days``.
+            since: Earliest timestamp to include.
+            labels: Only series whose labels include all of these.
+        """
+        with self._connect() as conn:
+            # The window gives every row of a day and label set that series' latest
+            # value (ties broken by insertion order), so max(last) just picks it up.
+            rows = conn.execute(
+                """
+                SELECT day, labels, min(value) AS minimum, max(value) AS maximum, max(last) AS last,
+                       count(*) AS samples
+                FROM (
+                    SELECT date(at, 'unixepoch', 'localtime') AS day, labels, value,
+                           last_value(value) OVER (
+                               PARTITION BY date(at, 'unixepoch', 'localtime'), labels
+                               ORDER BY at, rowid
+                               ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                           ) AS last
+                    FROM facts WHERE name = ? AND at >= ?
+                )
+                GROUP BY day, labels
+                ORDER BY day, labels
+                """,
+                (name, since),
+            ).fetchall()
+        days: list[FactDay] = []
+        for row in rows:
+            series = json.loads(row["labels"])
+            if labels and any(series.get(key) != value for key, value in labels.items()):
+                continue
+            days.append(FactDay(row["day"], series, row["minimum"], row["maximum"], row["last"], row["samples"]))
+        return days
+
+    def compare(self, baseline_id: int, latest_id: int) -> list[Change]:
+        """Checks present in both runs, as changes from the baseline to the latest."""
+        before = {(result.category, result.name): result for result in self.results(baseline_id)}
+        return [
+            Change(after=result, before=before[(result.category, result.name)])
+            for result in self.results(latest_id)
+            if (result.category, result.name) in before
+        ]
+
+
+def record_run(run: DoctorRun) -> None:
+    """Record a finished run, unless it only replayed cached results.
+
+    A history that cannot be written (read-only home, locked database) must
+    not fail the doctor run.
+    """
+    if run.cached_only or not run.results():
+        return
+    try:
+        History().record(run)
+    except (OSError, sqlite3.Error):
+        return
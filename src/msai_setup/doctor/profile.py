@@ -36,6 +36,7 @@ _EXPECTED: dict[Profile, set[Category]] = {
         Category.INCUS,
         Category.GPU,
         Category.INFERENCE,
+        Category.PERFORMANCE,
         Category.TAILSCALE,
     },
 }
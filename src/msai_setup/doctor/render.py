@@ -0,0 +1,305 @@
+"""Renderers for doctor results.
+
+A renderer is fed by ``DoctorRun``: ``start`` once before any check runs,
+``result`` for every result as it completes, and ``finish`` once at the end.
+The Rich renderer buffers results so it can print them grouped and in
+registration order; the machine formats never touch the Rich console, so
+they are safe in headless pipelines and cron jobs.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import IO, Any
+
+import typer
+from rich.markup import escape
+from rich.table import Table
+
+from msai_setup.doctor.checks import Category, Check, CheckResult
+from msai_setup.doctor.engine import FIXABLE, Change, DoctorRun, verify, with_dependents
+from msai_setup.doctor.fixes import is_safe_fix, run_fixes
+from msai_setup.doctor.formats import OutputFormat
+from msai_setup.utils.formatting import STATUS_SYMBOLS, console, print_header, print_status, print_summary
+
+
+class Renderer:
+    """Receives a run's results as they complete; every hook defaults to a no-op."""
+
+    def start(self, run: DoctorRun) -> None:
+        """Called once, before any check runs."""
+
+    def result(self, result: CheckResult) -> None:
+        """Called for each result, in completion order."""
+
+    def finish(self, run: DoctorRun) -> None:
+        """Called once, after every result has been delivered."""
+
+
+def _print_timings(results: list[CheckResult], elapsed: float) -> None:
+    """Print per-check cost, most expensive first."""
+    table = Table(title="Check timings", title_justify="left", show_lines=False)
+    table.add_column("Check")
+    table.add_column("Category", style="dim")
+    table.add_column("Status")
+    table.add_column("Wall", justify="right")
+    table.add_column("Spawns", justify="right")
+    table.add_column("Child CPU", justify="right")
+    table.add_column("Max RSS", justify="right")
+
+    def wall(result: CheckResult) -> float:
+        return result.timing.wall_s if result.timing else 0.0
+
+    for result in sorted(results, key=wall, reverse=True):
+        timing = result.timing
+        table.add_row(
+            result.name,
+            result.category.value,
+            result.status.value,
+            f"{wall(result) * 1000:.1f} ms",
+            str(timing.spawns) if timing else "-",
+            f"{timing.cpu_s * 1000:.0f} ms" if timing and timing.spawns else "-",
+            f"{timing.maxrss_kb / 1024:.1f} MiB" if timing and timing.spawns else "-",
+        )
+    console.print()
+    console.print(table)
+    total = sum(wall(r) for r in results)
+    console.print(f"[dim]wall time {elapsed:.2f}s for {total:.2f}s of check time[/dim]")
+
+
+def _choose_fix(result: CheckResult, *, assume_yes: bool) -> str | None:
+    """Decide whether to queue a check's fix, honoring safe-vs-prompt policy."""
+    if not result.fix or result.status not in FIXABLE:
+        return None
+
+    safe = is_safe_fix(result.fix)
+    if assume_yes and safe:
+        console.print(f"         [info]queued:[/info] {result.fix}")
+        return result.fix
+
+    label = "Apply this fix?" if safe else "Apply this fix? (installs/changes state)"
+    if typer.confirm(f"         {label}", default=safe):
+        return result.fix
+    return None
+
+
+def _apply_fixes(commands: list[str]) -> None:
+    """Run the queued fixes as one batch, printing each outcome as it lands."""
+    console.print(f"\n[header]Applying {len(commands)} fix{'es' if len(commands) != 1 else ''}[/header]")
+
+    def announce(command: str) -> None:
+        console.print(f"  [info]running:[/info] {escape(command)}", highlight=False)
+
+    for _index, outcome in run_fixes(commands, announce=announce):
+        style = "ok" if outcome.success else "fail"
+        took = f" [dim]({outcome.duration_s:.1f}s)[/dim]" if outcome.duration_s is not None else ""
+        console.print(f"  [{style}]{outcome.message}[/{style}]{took}")
+        if not outcome.success and outcome.output:
+            for line in outcome.output.strip().splitlines()[-5:]:
+                console.print(f"         [dim]{escape(line)}[/dim]", highlight=False)
+
+
+def _badge(result: CheckResult) -> str:
+    symbol, style = STATUS_SYMBOLS[result.status]
+    return f"[{style}]{symbol}[/{style}]"
+
+
+def print_changes(
+    changes: list[Change],
+    scope: str | None = None,
+    *,
+    verb: str = "Re-verified",
+    status_only: bool = False,
+) -> None:
+    """Print a before/after diff of re-run checks.
+
+    Checks whose status or message moved show both sides; the rest are listed
+    dimmed so it is clear they were re-run too.
+
+    Args:
+        changes: The re-run checks, in report order.
+        scope: What was re-verified (e.g. the categories), for the header.
+        verb: Header verb ("Re-verified 3 checks").
+        status_only: List only checks whose status moved; message-only
+            changes (an age ticking up) count as unchanged.
+    """
+    count = len(changes)
+    suffix = f" ({scope})" if scope else ""
+    console.print(f"\n[header]{verb} {count} check{'s' if count != 1 else ''}{suffix}[/header]")
+    for change in changes:
+        after = change.after
+        if status_only and not (change.improved or change.regressed):
+            continue
+        if not change.changed:
+            console.print(f"  [dim]{STATUS_SYMBOLS[after.status][0]} {after.message} (unchanged)[/dim]")
+        elif change.before is None:
+            console.print(f"  {_badge(after)} {after.message} [dim](new)[/dim]")
+        else:
+            console.print(f"  {_badge(change.before)} → {_badge(after)} {after.message}")
+            if change.before.message != after.message:
+                console.print(f"         [dim]was: {change.before.message}[/dim]")
+    improved = sum(change.improved for change in changes)
+    regressed = sum(change.regressed for change in changes)
+    parts = []
+    if improved:
+        parts.append(f"[ok]{improved} improved[/ok]")
+    if regressed:
+        parts.append(f"[fail]{regressed} regressed[/fail]")
+    new = sum(change.before is None for change in changes)
+    if new:
+        parts.append(f"{new} new")
+    parts.append(f"{count - improved - regressed - new} unchanged")
+    console.print(f"  {', '.join(parts)}")
+
+
+def _fixed_checks(run: DoctorRun, commands: list[str]) -> list[tuple[Category, Check]]:
+    """The checks whose fix is among ``commands``, plus their dependents in the run."""
+    wanted = set(commands)
+    fixed = [pair for pair, result in zip(run.checks, run.results(), strict=True) if result.fix in wanted]
+    return with_dependents(fixed, run.checks)
+
+
+class RichRenderer(Renderer):
+    """The interactive report: grouped by category, with fixes and prompts.
+
+    Grouped output needs every result, so the report is printed in ``finish``.
+    """
+
+    def __init__(
+        self,
+        *,
+        fix: bool = False,
+        apply: bool = False,
+        assume_yes: bool = False,
+        timings: bool = False,
+    ) -> None:
+        """Configure which extras the report shows."""
+        # Applying implies showing the fix line.
+        self.fix = fix or apply
+        self.apply = apply
+        self.assume_yes = assume_yes
+        self.timings = timings
+
+    def start(self, run: DoctorRun) -> None:
+        """Print the banner and the active profile."""
+        console.print("\n[header]MS-S1 MAX Health Check[/header]")
+        console.print("[dim]" + "=" * 22 + "[/dim]")
+        console.print(f"[dim]profile: {run.profile.value} ({run.profile_source})[/dim]")
+
+    def finish(self, run: DoctorRun) -> None:
+        """Print results by category, the summary and any requested extras.
+
+        With ``apply``, fixes are chosen (prompting where policy says so)
+        while the report prints, then applied together as one batch; the
+        checks that proposed them (and their dependents) are then re-run and
+        shown as a before/after diff.
+        """
+        results = run.results()
+        queued: list[str] = []
+        by_category: dict[Category, list[CheckResult]] = {}
+        for result in results:
+            by_category.setdefault(result.category, []).append(result)
+
+        for category in Category:
+            if category not in by_category:
+                continue
+            print_header(category.value.title())
+            for result in by_category[category]:
+                show_fix = self.fix and result.fix and result.status in FIXABLE
+                print_status(
+                    result.status,
+                    result.message,
+                    detail=result.detail,
+                    fix=result.fix if show_fix else None,
+                )
+                if self.apply:
+                    command = _choose_fix(result, assume_yes=self.assume_yes)
+                    if command is not None and command not in queued:
+                        queued.append(command)
+
+        if queued:
+            _apply_fixes(queued)
+            targets = _fixed_checks(run, queued)
+            before = {
+                (category, check.name): result for (category, check), result in zip(run.checks, results, strict=True)
+            }
+            print_changes(verify(targets, before, profile=run.profile, jobs=run.jobs))
+
+        summary = run.summary()
+        print_summary(summary.passed, summary.warnings, summary.failed, summary.timed_out)
+        if summary.cached:
+            hint = "" if run.cached_only else " (--fresh to re-run them)"
+            console.print(f"[dim]{summary.cached} results from the result cache{hint}[/dim]")
+        if run.cache is not None and run.cache.hits:
+            console.print(
+                f"[dim]command cache: {run.cache.hits} hits, {run.cache.misses} misses "
+                f"({run.cache.hits} spawns saved)[/dim]"
+            )
+        if self.timings:
+            _print_timings(results, run.elapsed)
+
+
+class JsonRenderer(Renderer):
+    """One JSON document describing the whole run, written at the end."""
+
+    def __init__(self, stream: IO[str] | None = None) -> None:
+        """Write to ``stream``, or to stdout as it is at write time."""
+        self.stream = stream
+
+    def finish(self, run: DoctorRun) -> None:
+        """Write the run, results in report order."""
+        stream = self.stream or sys.stdout
+        json.dump(run.to_dict(), stream, indent=2)
+        stream.write("\n")
+        stream.flush()
+
+
+class NdjsonRenderer(Renderer):
+    """One JSON object per line, each result flushed as soon as it is ready.
+
+    Lines carry a ``type``: ``result`` for each check (in completion order),
+    then a single ``summary`` line with the run metadata and counts.
+    """
+
+    def __init__(self, stream: IO[str] | None = None) -> None:
+        """Write to ``stream``, or to stdout as it is at write time."""
+        self.stream = stream
+
+    def _emit(self, record: dict[str, Any]) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(record) + "\n")
+        stream.flush()
+
+    def result(self, result: CheckResult) -> None:
+        """Write and flush one result line."""
+        self._emit({"type": "result", **result.to_dict()})
+
+    def finish(self, run: DoctorRun) -> None:
+        """Write the closing summary line."""
+        record = run.to_dict()
+        del record["results"]
+        self._emit({"type": "summary", **record})
+
+
+def make_renderer(
+    output_format: OutputFormat,
+    *,
+    fix: bool = False,
+    apply: bool = False,
+    assume_yes: bool = False,
+    timings: bool = False,
+) -> Renderer:
+    """Build the renderer for an output format.
+
+    The machine formats always include fix commands and timings in each
+    result, so ``fix`` and ``timings`` only affect the Rich report. Applying
+    fixes is interactive and only valid with the Rich report.
+    """
+    if output_format is OutputFormat.RICH:
+        return RichRenderer(fix=fix, apply=apply, assume_yes=assume_yes, timings=timings)
+    if apply:
+        raise ValueError(f"--apply cannot be combined with --format {output_format.value}")
+    if output_format is OutputFormat.JSON:
+        return JsonRenderer()
+    return NdjsonRenderer()
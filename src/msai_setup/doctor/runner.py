@@ -1,53 +1,10 @@
 """Check orchestration and reporting."""
 
-import typer
-
-from msai_setup.doctor.checks import Category, CheckResult, registry
-from msai_setup.doctor.fixes import apply_fix, is_safe_fix
-from msai_setup.doctor.profile import Profile, category_expected, resolve_profile
-from msai_setup.utils.formatting import (
-    CheckStatus,
-    console,
-    print_header,
-    print_status,
-    print_summary,
-)
-
-_FIXABLE = (CheckStatus.WARN, CheckStatus.FAIL)
-
-
-def _apply_profile(result: CheckResult, profile: Profile) -> CheckResult:
-    """Soften findings for categories not expected on the active profile.
-
-    On a desktop box, a missing ZFS pool or KVM is not a failure; downgrade
-    such WARN/FAIL results to SKIP with a note so the report stays honest.
-    """
-    if result.status not in _FIXABLE or category_expected(profile, result.category):
-        return result
-    result.status = CheckStatus.SKIP
-    result.message = f"{result.message} (not expected on {profile.value})"
-    result.fix = None
-    return result
-
-
-def _maybe_apply(result: CheckResult, *, assume_yes: bool) -> None:
-    """Offer to apply a check's fix, honoring safe-vs-prompt policy."""
-    if not result.fix or result.status not in _FIXABLE:
-        return
-
-    safe = is_safe_fix(result.fix)
-    if assume_yes and safe:
-        console.print(f"         [info]applying:[/info] {result.fix}")
-        outcome = apply_fix(result.fix)
-        style = "ok" if outcome.success else "fail"
-        console.print(f"         [{style}]{outcome.message}[/{style}]")
-        return
-
-    label = "Apply this fix?" if safe else "Apply this fix? (installs/changes state)"
-    if typer.confirm(f"         {label}", default=safe):
-        outcome = apply_fix(result.fix)
-        style = "ok" if outcome.success else "fail"
-        console.print(f"         [{style}]{outcome.message}[/{style}]")
+from msai_setup.doctor.checks import Category, Check
+from msai_setup.doctor.engine import DoctorRun
+from msai_setup.doctor.history import record_run
+from msai_setup.doctor.profile import Profile
+from msai_setup.doctor.render import OutputFormat, make_renderer
 
 
 def run_doctor(
@@ -57,98 +14,63 @@ def run_doctor(
     apply: bool = False,
     assume_yes: bool = False,
     profile: Profile | None = None,
+    jobs: int | None = None,
+    deadline: float | None = None,
+    timings: bool = False,
+    output_format: OutputFormat = OutputFormat.RICH,
+    fresh: bool = False,
+    cached_only: bool = False,
+    checks: list[tuple[Category, Check]] | None = None,
 ) -> tuple[int, int, int]:
     """Run health checks and display results.
 
+    Checks run concurrently in a bounded worker pool and each result is handed
+    to the renderer as it completes. The Rich report is printed once they are
+    all done, grouped and ordered exactly as registered; ``ndjson`` writes a
+    line per result straight away. Checks that overrun their own budget or the
+    run deadline show as TIMEOUT. Results still valid in the on-disk result
+    cache are reported without re-running their checks. The run is appended
+    to the history database (``doctor.history``).
+
     Args:
         categories: Categories to check, or None for all.
         fix: If True, display fix commands for issues.
         apply: If True, offer to run each fix (safe fixes auto-apply with
-            assume_yes; install/state-changing fixes always prompt).
+            assume_yes; install/state-changing fixes always prompt). Only
+            valid with the Rich report.
         assume_yes: If True, auto-apply safe fixes without prompting.
         profile: Host profile; None resolves it automatically.
+        jobs: Maximum checks to run at once; None means one per CPU.
+        deadline: Time budget in seconds for the whole run, or None.
+        timings: If True, print each check's wall time and child-process
+            CPU/RSS after the summary, most expensive first.
+        output_format: Rich report, a single JSON document, or NDJSON.
+        fresh: If True, re-run checks even if a cached result is valid.
+        cached_only: If True, run nothing and report cached results only.
+        checks: Explicit (category, check) pairs to run instead of the
+            categories' registered checks (e.g. with an on-demand sampler).
 
     Returns:
-        Tuple of (passed, warnings, failed) counts.
+        Tuple of (passed, warnings, failed) counts; timeouts count as failed.
     """
-    if profile is None:
-        profile, source = resolve_profile()
-    else:
-        source = "specified"
-
-    console.print("\n[header]MS-S1 MAX Health Check[/header]")
-    console.print("[dim]" + "=" * 22 + "[/dim]")
-    console.print(f"[dim]profile: {profile.value} ({source})[/dim]")
-
-    # Applying implies showing the fix line.
-    if apply:
-        fix = True
-
-    checks = registry.get_checks(categories)
-
-    # Group checks by category
-    checks_by_category: dict[Category, list[CheckResult]] = {}
-    for cat, check in checks:
-        if cat not in checks_by_category:
-            checks_by_category[cat] = []
-
-        try:
-            result = _apply_profile(check.run(), profile)
-            checks_by_category[cat].append(result)
-        except Exception as e:
-            # Handle unexpected errors in checks
-            checks_by_category[cat].append(
-                CheckResult(
-                    name=check.name,
-                    status=CheckStatus.FAIL,
-                    message=f"Check failed: {e}",
-                    category=cat,
-                )
-            )
-
-    # Display results by category
-    passed = 0
-    warnings = 0
-    failed = 0
-
-    for category in Category:
-        if category not in checks_by_category:
-            continue
-
-        results = checks_by_category[category]
-        print_header(category.value.title())
-
-        for result in results:
-            show_fix = (
-                fix
-                and result.fix
-                and result.status
-                in (
-                    CheckStatus.WARN,
-                    CheckStatus.FAIL,
-                )
-            )
-            print_status(
-                result.status,
-                result.message,
-                detail=result.detail,
-                fix=result.fix if show_fix else None,
-            )
-
-            if apply:
-                _maybe_apply(result, assume_yes=assume_yes)
-
-            if result.status == CheckStatus.OK:
-                passed += 1
-            elif result.status == CheckStatus.WARN:
-                warnings += 1
-            elif result.status == CheckStatus.FAIL:
-                failed += 1
-            # SKIP doesn't count toward totals
-
-    print_summary(passed, warnings, failed)
+    renderer = make_renderer(output_format, fix=fix, apply=apply, assume_yes=assume_yes, timings=timings)
+    run = DoctorRun(
+        categories,
+        profile=profile,
+        jobs=jobs,
+        deadline=deadline,
+        fresh=fresh,
+        cached_only=cached_only,
+        checks=checks,
+    )
+    renderer.start(run)
+    for result in run:
+        renderer.result(result)
+    renderer.finish(run)
+    record_run(run)
 
-    return passed, warnings, failed
+    summary = run.summary()
+    return summary.passed, summary.warnings, summary.failed + summary.timed_out
 
 
 def run_category(
@@ -158,6 +80,12 @@ def run_category(
     apply: bool = False,
     assume_yes: bool = False,
     profile: Profile | None = None,
+    jobs: int | None = None,
+    deadline: float | None = None,
+    timings: bool = False,
+    output_format: OutputFormat = OutputFormat.RICH,
+    fresh: bool = False,
+    cached_only: bool = False,
 ) -> tuple[int, int, int]:
     """Run checks for a single category.
 
@@ -167,10 +95,26 @@ def run_category(
         apply: If True, offer to run each fix.
         assume_yes: If True, auto-apply safe fixes without prompting.
         profile: Host profile; None resolves it automatically.
+        jobs: Maximum checks to run at once; None means one per CPU.
+        deadline: Time budget in seconds for the whole run, or None.
+        timings: If True, print per-check cost after the summary.
+        output_format: Rich report, a single JSON document, or NDJSON.
+        fresh: If True, re-run checks even if a cached result is valid.
+        cached_only: If True, run nothing and report cached results only.
 
     Returns:
         Tuple of (passed, warnings, failed) counts.
     """
     return run_doctor(
-        [category], fix=fix, apply=apply, assume_yes=assume_yes, profile=profile
+        [category],
+        fix=fix,
+        apply=apply,
+        assume_yes=assume_yes,
+        profile=profile,
+        jobs=jobs,
+        deadline=deadline,
+        timings=timings,
+        output_format=output_format,
+        fresh=fresh,
+        cached_only=cached_only,
     )
@@ -0,0 +1,254 @@
+"""Concurrent check execution.
+
+Checks are probes that spend nearly all of their time waiting on child
+processes (``rocminfo``, ``vulkaninfo``, ``zpool status``...), so a thread
+per running check, at most ``jobs`` of them, is enough to overlap them. Declared prerequisites
+(``register_check(..., requires=...)``) turn the check list into a DAG: a
+check starts once all of its prerequisites have passed, independent branches
+run side by side, and a check whose prerequisite did not pass is reported as
+SKIP without being run. Results are yielded as they complete, tagged with
+their position in the input list so the caller can restore the report order.
+
+Time is bounded two ways: a per-check budget declared at registration and an
+optional deadline for the whole run. When either expires, the check's child
+process groups are killed (see ``ProcessScope``) and it is reported as
+TIMEOUT straight away, without waiting for its thread to notice. The thread
+is abandoned and no longer counts against ``jobs``, so a check hung in Python
+code delays nothing queued behind it. Everything that finished in time is
+still reported.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+
+from msai_setup.doctor.checks import Category, Check, CheckFunction, CheckResult, CheckTiming
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.shell import ProcessScope, process_scope
+
+
+def default_jobs() -> int:
+    """Worker count used when --jobs is not given: one per CPU."""
+    return os.cpu_count() or 1
+
+
+def run_check(category: Category, check: Check, scope: ProcessScope | None = None) -> CheckResult:
+    """Run one check, turning an unexpected exception into a FAIL result.
+
+    Commands the check runs are attributed to ``scope`` so they can be killed
+    if it overruns; the result carries the check's wall time and the usage of
+    every child it spawned.
+    """
+    scope = scope or ProcessScope()
+    started = time.monotonic()
+    try:
+        with process_scope(scope):
+            result = check.run()
+    except Exception as e:
+        result = CheckResult(
+            name=check.name,
+            status=CheckStatus.FAIL,
+            message=f"Check failed: {e}",
+            category=category,
+        )
+    result.timing = CheckTiming(wall_s=time.monotonic() - started, children=scope.usage())
+    return result
+
+
+def _start(category: Category, check: Check, scope: ProcessScope) -> Future[CheckResult]:
+    """Run a check on a thread of its own; the future completes when it returns.
+
+    Not a pool worker: a check abandoned after its budget keeps its thread
+    until it returns, and in a pool the next check would queue behind it
+    with its budget already running.
+    """
+    future: Future[CheckResult] = Future()
+    future.set_running_or_notify_cancel()
+
+    def target() -> None:
+        try:
+            future.set_result(run_check(category, check, scope))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name=f"doctor-{check.name}", daemon=True).start()
+    return future
+
+
+class _Plan:
+    """Prerequisite bookkeeping for one run.
+
+    Prerequisites that are not part of this run (e.g. filtered out by
+    category) are ignored rather than treated as failed, unless ``known``
+    holds an earlier result for them, in which case that result decides.
+    """
+
+    def __init__(
+        self,
+        checks: list[tuple[Category, Check]],
+        known: Mapping[CheckFunction, CheckResult] | None = None,
+    ) -> None:
+        self.checks = checks
+        known = known or {}
+        position: dict[CheckFunction, int] = {check.run: i for i, (_cat, check) in enumerate(checks)}
+        self.prereqs = [
+            [position[func] for func in check.requires if func in position] for _cat, check in checks
+        ]
+        self.settled = [
+            [known[func] for func in check.requires if func not in position and func in known]
+            for _cat, check in checks
+        ]
+        self.dependents: list[list[int]] = [[] for _ in checks]
+        for index, prereqs in enumerate(self.prereqs):
+            for prereq in prereqs:
+                self.dependents[prereq].append(index)
+        self.waiting = [len(prereqs) for prereqs in self.prereqs]
+        self.results: dict[int, CheckResult] = {}
+
+    def roots(self) -> list[int]:
+        """Checks with no prerequisites in this run."""
+        return [i for i, count in enumerate(self.waiting) if count == 0]
+
+    def blocked(self, index: int) -> CheckResult | None:
+        """A SKIP result if some prerequisite did not pass, else None."""
+        category, check = self.checks[index]
+        for result in (*self.settled[index], *(self.results[prereq] for prereq in self.prereqs[index])):
+            if result.status is not CheckStatus.OK:
+                return CheckResult(
+                    name=check.name,
+                    status=CheckStatus.SKIP,
+                    message=f"{check.name}: skipped (requires '{result.name}', which is {result.status.value})",
+                    category=category,
+                )
+        return None
+
+    def complete(self, index: int, result: CheckResult) -> list[int]:
+        """Record a result and return the dependents that are now unblocked."""
+        self.results[index] = result
+        ready: list[int] = []
+        for dependent in self.dependents[index]:
+            self.waiting[dependent] -= 1
+            if self.waiting[dependent] == 0:
+                ready.append(dependent)
+        return ready
+
+
+@dataclass
+class _Running:
+    """A submitted check and the moment it must be done by."""
+
+    index: int
+    scope: ProcessScope
+    started: float
+    due: float | None
+    budget: float | None
+
+
+def _timed_out(category: Category, check: Check, message: str, entry: _Running | None = None) -> CheckResult:
+    timing = None
+    if entry is not None:
+        timing = CheckTiming(wall_s=time.monotonic() - entry.started, children=entry.scope.usage())
+    return CheckResult(
+        name=check.name,
+        status=CheckStatus.TIMEOUT,
+        message=f"{check.name}: {message}",
+        category=category,
+        timing=timing,
+    )
+
+
+def _earliest(*moments: float | None) -> float | None:
+    present = [m for m in moments if m is not None]
+    return min(present) if present else None
+
+
+def iter_results(
+    checks: list[tuple[Category, Check]],
+    *,
+    jobs: int | None = None,
+    deadline: float | None = None,
+    known: Mapping[CheckFunction, CheckResult] | None = None,
+) -> Iterator[tuple[int, CheckResult]]:
+    """Run checks at most ``jobs`` at a time, yielding results as they finish.
+
+    Args:
+        checks: (category, check) pairs, in report order. Prerequisites are
+            registered before their dependents, so this is a valid
+            topological order.
+        jobs: Maximum concurrent checks; None means one per CPU.
+        deadline: Seconds the whole run may take, or None for no limit.
+            Checks still running when it expires, and checks not started
+            yet, are reported as TIMEOUT.
+        known: Earlier results of checks outside ``checks``, consulted when
+            one of them is a prerequisite (watch mode re-runs subsets).
+
+    Yields:
+        (index, result) where index is the check's position in ``checks``.
+    """
+    plan = _Plan(checks, known)
+    workers = jobs or default_jobs()
+    run_due = time.monotonic() + deadline if deadline is not None else None
+    ready = deque(plan.roots())
+    running: dict[Future[CheckResult], _Running] = {}
+
+    while ready or running:
+        if run_due is not None and time.monotonic() >= run_due:
+            break
+        # Start no more than ``workers`` at once; each check gets its own
+        # thread, so its budget starts when it actually starts.
+        while ready and len(running) < workers:
+            index = ready.popleft()
+            skipped = plan.blocked(index)
+            if skipped is not None:
+                ready.extend(plan.complete(index, skipped))
+                yield index, skipped
+                continue
+            category, check = checks[index]
+            scope = ProcessScope()
+            started = time.monotonic()
+            budget_due = started + check.timeout if check.timeout is not None else None
+            future = _start(category, check, scope)
+            running[future] = _Running(index, scope, started, _earliest(budget_due, run_due), check.timeout)
+        if not running:
+            continue
+
+        due = _earliest(*(r.due for r in running.values()))
+        timeout = None if due is None else max(0.0, due - time.monotonic())
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            entry = running.pop(future)
+            result = future.result()
+            ready.extend(plan.complete(entry.index, result))
+            yield entry.index, result
+
+        now = time.monotonic()
+        for future, entry in list(running.items()):
+            if entry.due is None or now < entry.due:
+                continue
+            del running[future]
+            entry.scope.cancel()
+            category, check = checks[entry.index]
+            if run_due is not None and entry.due >= run_due:
+                message = "timed out (run deadline reached)"
+            else:
+                message = f"timed out after {entry.budget:g}s"
+            result = _timed_out(category, check, message, entry)
+            ready.extend(plan.complete(entry.index, result))
+            yield entry.index, result
+
+    # Run deadline reached: report what is still running or never started.
+    for entry in running.values():
+        entry.scope.cancel()
+        category, check = checks[entry.index]
+        result = _timed_out(category, check, "timed out (run deadline reached)", entry)
+        plan.complete(entry.index, result)
+        yield entry.index, result
+    for index, (category, check) in enumerate(checks):
+        if index not in plan.results:
+            yield index, _timed_out(category, check, "not started (run deadline reached)")
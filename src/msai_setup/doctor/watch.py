@@ -0,0 +1,486 @@
+"""``msai doctor watch``: a live report that only re-runs what changed.
+
+Each check may declare the host paths its result is derived from
+(``register_check(..., inputs=...)``) and how often it is worth re-running
+regardless (``interval=``). The watcher fingerprints those inputs (mtime,
+size and inode; content too for /proc and /sys attributes, whose mtime never
+moves) and re-runs a check only when its fingerprint changed or its interval
+expired, together with the checks that depend on it. Results that come back
+the same are not redrawn.
+
+Changes are noticed through inotify where the kernel offers it, so an edit to
+``sshd_config`` shows up within moments; the fingerprints are also polled on
+a short period to catch what inotify cannot see (sysfs attributes, files in
+directories created after the watch started).
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from rich.console import Console
+from rich.control import Control, ControlType
+from rich.text import Text
+
+from msai_setup.doctor.checks import Category, Check, CheckResult
+from msai_setup.doctor.engine import Summary, apply_profile
+from msai_setup.doctor.profile import Profile
+from msai_setup.doctor.scheduler import iter_results
+from msai_setup.utils.formatting import STATUS_SYMBOLS
+from msai_setup.utils.probe import Probe, get_probe
+from msai_setup.utils.shell import command_cache
+
+DEFAULT_INTERVAL = 300.0
+DEFAULT_POLL = 2.0
+
+# Pseudo-filesystems whose attribute files keep a constant mtime and size.
+_PSEUDO = ("/proc/", "/sys/")
+
+Stamp = tuple[str, int, int, int, bytes | None]
+
+
+def _has_magic(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def _expand(pattern: str, probe: Probe) -> list[str]:
+    """Host paths a pattern stands for; a plain path stands for itself, present or not."""
+    if not _has_magic(pattern):
+        return [pattern]
+    root = probe.sysroot
+    return sorted("/" + path.relative_to(root).as_posix() for path in root.glob(pattern.lstrip("/")))
+
+
+def _stamp_path(host: str, path: Path, st: os.stat_result, out: list[Stamp]) -> None:
+    content = None
+    if host.startswith(_PSEUDO) and stat.S_ISREG(st.st_mode):
+        try:
+            content = path.read_bytes()[:4096]
+        except OSError:
+            content = None
+    out.append((host, st.st_mtime_ns, st.st_size, st.st_ino, content))
+
+
+def _stamp_tree(host: str, probe: Probe, out: list[Stamp]) -> None:
+    """Stamp ``host`` and, for a directory, everything below it.
+
+    Only ``host`` itself is resolved through symlinks. Below it, symlinks are
+    stamped but never followed: sysfs links back up its own tree (a CPU's
+    ``node0/cpu0``, every device's ``subsystem``), so following them never ends.
+    """
+    path = probe.resolve(host)
+    try:
+        st = path.stat()
+    except OSError:
+        out.append((host, -1, -1, -1, None))
+        return
+    if not stat.S_ISDIR(st.st_mode):
+        _stamp_path(host, path, st, out)
+        return
+    out.append((host, st.st_mtime_ns, 0, st.st_ino, None))
+    _stamp_children(host.rstrip("/"), path, out)
+
+
+def _stamp_children(host: str, path: Path, out: list[Stamp]) -> None:
+    try:
+        with os.scandir(path) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+    except OSError:
+        return
+    for entry in entries:
+        child = f"{host}/{entry.name}"
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            out.append((child, -1, -1, -1, None))
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            out.append((child, st.st_mtime_ns, 0, st.st_ino, None))
+            _stamp_children(child, Path(entry.path), out)
+        elif entry.is_symlink():
+            out.append((child, st.st_mtime_ns, st.st_size, st.st_ino, None))
+        else:
+            _stamp_path(child, Path(entry.path), st, out)
+
+
+def fingerprint(patterns: tuple[str, ...], probe: Probe | None = None) -> tuple[Stamp, ...]:
+    """Stat (and for pseudo files, read) everything a check's inputs cover.
+
+    Directories are walked, globs expanded, and missing paths recorded as
+    missing, so creating, editing, replacing or removing any of them changes
+    the fingerprint.
+    """
+    probe = probe or get_probe()
+    stamps: list[Stamp] = []
+    for pattern in patterns:
+        for host in _expand(pattern, probe):
+            _stamp_tree(host, probe, stamps)
+    return tuple(stamps)
+
+
+def watch_dirs(patterns: tuple[str, ...], probe: Probe | None = None) -> set[Path]:
+    """Existing directories to watch so any change to ``patterns`` raises an event.
+
+    That is the parent of each path, so files that are created or atomically
+    replaced are noticed too, and every directory below a plain directory
+    input. A glob adds the directory its static prefix names, where new
+    matches would appear, and the directories it matches, but nothing below
+    them: under /sys that can reach a good part of the device tree.
+    """
+    probe = probe or get_probe()
+    dirs: set[Path] = set()
+    for pattern in patterns:
+        hosts = _expand(pattern, probe)
+        dirs.update(probe.resolve(os.path.dirname(host.rstrip("/")) or "/") for host in hosts)
+        if _has_magic(pattern):
+            static = pattern.split("*")[0].split("?")[0].split("[")[0]
+            dirs.add(probe.resolve(static if static.endswith("/") else os.path.dirname(static) or "/"))
+            dirs.update(probe.resolve(host) for host in hosts)
+            continue
+        stamps: list[Stamp] = []
+        _stamp_tree(pattern, probe, stamps)
+        dirs.add(probe.resolve(pattern))
+        for host, *_ in stamps[1:]:
+            path = probe.resolve(host)
+            if not path.is_symlink():  # the walk did not follow it either
+                dirs.add(path)
+    return {path for path in dirs if path.is_dir()}
+
+
+# inotify(7) event bits: content, metadata and directory membership changes.
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+
+
+class Inotify:
+    """A minimal inotify binding through libc.
+
+    Events only serve as a wake-up (the watcher re-fingerprints to find out
+    what changed), so they are drained unparsed. Where inotify is unavailable
+    ``active`` is False and ``wait`` simply sleeps, leaving change detection
+    to polling.
+    """
+
+    def __init__(self) -> None:
+        """Open an inotify instance if the platform has one."""
+        self.fd: int | None = None
+        self._watched: set[Path] = set()
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd >= 0:
+            self.fd = fd
+
+    @property
+    def active(self) -> bool:
+        """Whether events are being delivered."""
+        return self.fd is not None
+
+    def add(self, path: Path) -> None:
+        """Watch a directory (or file); repeated and failing adds are ignored."""
+        if self.fd is None or path in self._watched:
+            return
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_MASK) >= 0:
+            self._watched.add(path)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until an event arrives or ``timeout`` passes; True on an event."""
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def close(self) -> None:
+        """Release the inotify instance."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+@dataclass
+class _Slot:
+    """One check's place in the watch: its latest results and when it is next due."""
+
+    category: Category
+    check: Check
+    raw: CheckResult | None = None
+    shown: CheckResult | None = None
+    stamp: tuple[Stamp, ...] = ()
+    due: float = 0.0
+
+
+def _row_key(result: CheckResult | None) -> tuple[object, ...] | None:
+    if result is None:
+        return None
+    return result.status, result.message, result.detail
+
+
+class Watcher:
+    """Decides which checks to re-run and re-runs them.
+
+    ``tick`` is one evaluation step: it re-runs every check whose inputs
+    changed or whose interval expired (plus their dependents) and returns the
+    indices whose displayed row changed. The first tick runs everything.
+    """
+
+    def __init__(
+        self,
+        checks: list[tuple[Category, Check]],
+        *,
+        profile: Profile,
+        interval: float = DEFAULT_INTERVAL,
+        jobs: int | None = None,
+        probe: Probe | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Set up the watch.
+
+        Args:
+            checks: (category, check) pairs in report order.
+            profile: Host profile results are softened for.
+            interval: Re-run period for checks without their own interval.
+            jobs: Maximum checks to run at once; None means one per CPU.
+            probe: Probe resolving input paths; None uses the global one.
+            clock: Monotonic time source (injectable for tests).
+        """
+        self.slots = [_Slot(category, check) for category, check in checks]
+        self.profile = profile
+        self.interval = interval
+        self.jobs = jobs
+        self.probe = probe
+        self.clock = clock
+        position = {check.run: i for i, (_cat, check) in enumerate(checks)}
+        self._dependents: list[list[int]] = [[] for _ in checks]
+        for index, (_cat, check) in enumerate(checks):
+            for func in check.requires:
+                if func in position:
+                    self._dependents[position[func]].append(index)
+
+    def results(self) -> list[CheckResult]:
+        """Latest shown result of every check that has run."""
+        return [slot.shown for slot in self.slots if slot.shown is not None]
+
+    def next_due(self) -> float:
+        """The earliest moment an interval expires."""
+        return min((slot.due for slot in self.slots), default=self.clock() + self.interval)
+
+    def watch_dirs(self) -> set[Path]:
+        """Directories to hand to inotify for every check's inputs."""
+        dirs: set[Path] = set()
+        for slot in self.slots:
+            dirs |= watch_dirs(slot.check.inputs, self.probe)
+        return dirs
+
+    def stale(self) -> list[int]:
+        """Indices of checks to re-run now, dependents included, in report order."""
+        now = self.clock()
+        stale: set[int] = set()
+        for index, slot in enumerate(self.slots):
+            if slot.raw is None or now >= slot.due:
+                stale.add(index)
+            elif slot.check.inputs and fingerprint(slot.check.inputs, self.probe) != slot.stamp:
+                stale.add(index)
+        pending = list(stale)
+        while pending:
+            for dependent in self._dependents[pending.pop()]:
+                if dependent not in stale:
+                    stale.add(dependent)
+                    pending.append(dependent)
+        return sorted(stale)
+
+    def refresh(self, indices: list[int]) -> list[int]:
+        """Re-run the given checks; return those whose row changed."""
+        if not indices:
+            return []
+        selected = set(indices)
+        for index in indices:
+            slot = self.slots[index]
+            # Stamp before running, so an edit made mid-run triggers another.
+            slot.stamp = fingerprint(slot.check.inputs, self.probe) if slot.check.inputs else ()
+        subset = [(self.slots[i].category, self.slots[i].check) for i in indices]
+        known = {
+            slot.check.run: slot.raw
+            for i, slot in enumerate(self.slots)
+            if i not in selected and slot.raw is not None
+        }
+        changed: list[int] = []
+        with command_cache():
+            for position, raw in iter_results(subset, jobs=self.jobs, known=known):
+                slot = self.slots[indices[position]]
+                shown = apply_profile(raw, self.profile)
+                if _row_key(shown) != _row_key(slot.shown):
+                    changed.append(indices[position])
+                slot.raw, slot.shown = raw, shown
+                slot.due = self.clock() + (slot.check.interval or self.interval)
+        return sorted(changed)
+
+    def tick(self) -> list[int]:
+        """Re-run whatever is stale; return the indices whose row changed."""
+        return self.refresh(self.stale())
+
+
+def _row(slot: _Slot, width: int) -> Text:
+    result = slot.shown
+    if result is None:
+        text = Text(f"  {'…':<9} {slot.check.name}", style="dim")
+    else:
+        symbol, style = STATUS_SYMBOLS[result.status]
+        text = Text("  ")
+        text.append(f"{symbol:<9}", style=style)
+        text.append(f" {slot.category.value:<9} ", style="dim")
+        text.append(result.message)
+    text.truncate(width, overflow="ellipsis")
+    return text
+
+
+class RowDisplay:
+    """Draws the watch once, then rewrites only the rows that changed.
+
+    Every row is truncated to the terminal width so it occupies exactly one
+    line, which lets an update move the cursor straight to it.
+    """
+
+    def __init__(self, console: Console, watcher: Watcher) -> None:
+        """Bind the display to a terminal console and a watcher."""
+        self.console = console
+        self.watcher = watcher
+        self._header_lines = 1
+
+    def draw(self, status: str) -> None:
+        """Draw every row and the status line."""
+        width = self.console.width
+        self.console.print(Text("MS-S1 MAX Health Watch", style="header"))
+        for slot in self.watcher.slots:
+            self.console.print(_row(slot, width), no_wrap=True)
+        self.console.print(Text(status, style="dim"), no_wrap=True, overflow="ellipsis")
+
+    def _rewrite(self, line: int, text: Text) -> None:
+        # The cursor rests on the line below the status line.
+        total = self._header_lines + len(self.watcher.slots) + 1
+        up = total - line
+        self.console.control(Control.move(0, -up), Control.move_to_column(0), Control((ControlType.ERASE_IN_LINE, 2)))
+        self.console.print(text, end="", no_wrap=True)
+        self.console.control(Control.move(0, up), Control.move_to_column(0))
+
+    def update(self, changed: list[int], status: str) -> None:
+        """Rewrite the changed rows and the status line."""
+        width = self.console.width
+        for index in changed:
+            self._rewrite(self._header_lines + index, _row(self.watcher.slots[index], width))
+        status_text = Text(status, style="dim")
+        status_text.truncate(width, overflow="ellipsis")
+        self._rewrite(self._header_lines + len(self.watcher.slots), status_text)
+
+
+class LogDisplay:
+    """For non-terminals: one line per changed row, as it changes."""
+
+    def __init__(self, console: Console, watcher: Watcher) -> None:
+        """Bind the display to a console and a watcher."""
+        self.console = console
+        self.watcher = watcher
+
+    def draw(self, status: str) -> None:
+        """Log every row."""
+        self.update(list(range(len(self.watcher.slots))), status)
+
+    def update(self, changed: list[int], status: str) -> None:
+        """Log the changed rows, timestamped."""
+        stamp = datetime.now().strftime("%H:%M:%S")
+        for index in changed:
+            slot = self.watcher.slots[index]
+            if slot.shown is None:
+                continue
+            symbol, style = STATUS_SYMBOLS[slot.shown.status]
+            self.console.print(
+                f"{stamp} [{style}]{symbol}[/{style}] {slot.category.value}/{slot.check.name}: {slot.shown.message}",
+                highlight=False,
+                soft_wrap=True,
+            )
+
+
+def _status_line(watcher: Watcher, notifier: Inotify, poll: float) -> str:
+    summary = Summary.of(watcher.results())
+    counts = f"{summary.passed} ok, {summary.warnings} warn, {summary.failed + summary.timed_out} fail"
+    mode = "inotify + " if notifier.active else ""
+    when = datetime.now().strftime("%H:%M:%S")
+    return f"{counts} · updated {when} · {mode}poll every {poll:g}s · Ctrl-C to stop"
+
+
+def watch(
+    checks: list[tuple[Category, Check]],
+    *,
+    profile: Profile,
+    console: Console,
+    interval: float = DEFAULT_INTERVAL,
+    poll: float = DEFAULT_POLL,
+    jobs: int | None = None,
+) -> None:
+    """Run the watch loop until interrupted.
+
+    Args:
+        checks: (category, check) pairs to watch, in report order.
+        profile: Host profile results are softened for.
+        console: Where to draw; a terminal gets in-place row updates,
+            anything else a line per change.
+        interval: Re-run period for checks without their own interval.
+        poll: How often to re-fingerprint inputs between inotify events.
+        jobs: Maximum checks to run at once; None means one per CPU.
+    """
+    watcher = Watcher(checks, profile=profile, interval=interval, jobs=jobs)
+    display = RowDisplay(console, watcher) if console.is_terminal else LogDisplay(console, watcher)
+    notifier = Inotify()
+    try:
+        watcher.tick()
+        display.draw(_status_line(watcher, notifier, poll))
+        while True:
+            for path in watcher.watch_dirs():
+                notifier.add(path)
+            notifier.wait(max(0.0, min(poll, watcher.next_due() - time.monotonic())))
+            stale = watcher.stale()
+            if not stale:
+                continue
+            changed = watcher.refresh(stale)
+            display.update(changed, _status_line(watcher, notifier, poll))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notifier.close()
@@ -3,6 +3,10 @@
 Every component is idempotent (skipped when its ``detect`` probe passes) and
 isolated (a failing component warns and the run continues, rather than aborting
 everything after it). ``sudo apt-get update`` runs at most once per invocation.
+
+Afterwards, the doctor categories of the components that were installed (the
+manifest's ``category`` field) are re-checked and shown as a before/after
+diff, the "before" being each check's last stored result.
 """
 
 from __future__ import annotations
@@ -22,6 +26,7 @@ class ComponentOutcome:
 
     name: str
     status: str  # "skipped" | "planned" | "installed" | "failed"
+    category: str | None = None  # doctor category that verifies the component
 
 
 def install_commands(component: Component) -> list[str]:
@@ -63,6 +68,7 @@ def bootstrap(
     dry_run: bool = False,
     assume_yes: bool = False,
     force: bool = False,
+    verify: bool = True,
 ) -> list[ComponentOutcome]:
     """Install the selected stack components (all of them when names is empty).
 
@@ -71,6 +77,8 @@ def bootstrap(
         dry_run: Print the plan without running anything.
         assume_yes: Skip the per-component confirmation prompt.
         force: Install even if the detect probe says it is already present.
+        verify: Re-run the doctor categories of installed components and
+            print what changed.
 
     Returns:
         One ComponentOutcome per selected component.
@@ -89,7 +97,7 @@ def bootstrap(
     for name, component in selected:
         if not force and component.detect and shell_succeeds(component.detect):
             console.print(f"[ok][OK][/ok] {name}: already installed")
-            outcomes.append(ComponentOutcome(name, "skipped"))
+            outcomes.append(ComponentOutcome(name, "skipped", component.category))
             continue
 
         steps = install_commands(component)
@@ -101,45 +109,71 @@ def bootstrap(
             console.print(f"  [info]$[/info] {cmd}")
 
         if dry_run:
-            outcomes.append(ComponentOutcome(name, "planned"))
+            outcomes.append(ComponentOutcome(name, "planned", component.category))
             continue
 
         if not assume_yes and not typer.confirm(f"Install {name}?", default=True):
-            outcomes.append(ComponentOutcome(name, "skipped"))
+            outcomes.append(ComponentOutcome(name, "skipped", component.category))
             continue
 
-        outcomes.append(_run_component(name, plan, needs_update=needs_update))
+        outcomes.append(_run_component(name, plan, needs_update=needs_update, category=component.category))
         if needs_update:
             apt_updated = True
 
-    _print_summary(outcomes, dry_run=dry_run)
+    _print_summary(outcomes, dry_run=dry_run, verify=verify)
+    if verify and not dry_run:
+        _verify(outcomes)
     return outcomes
 
 
-def _run_component(name: str, plan: list[str], *, needs_update: bool) -> ComponentOutcome:
+def _run_component(name: str, plan: list[str], *, needs_update: bool, category: str | None) -> ComponentOutcome:
     """Run a component's commands in order, stopping at the first failure."""
     for cmd in plan:
         try:
             code = run_interactive(cmd)
         except Exception as exc:  # noqa: BLE001 - isolate one component's failure
             console.print(f"[fail]{name}: {cmd!r} raised {exc}; skipping rest[/fail]")
-            return ComponentOutcome(name, "failed")
+            return ComponentOutcome(name, "failed", category)
         if code != 0:
             console.print(f"[fail]{name}: '{cmd}' exited {code}; skipping rest[/fail]")
-            return ComponentOutcome(name, "failed")
+            return ComponentOutcome(name, "failed", category)
     console.print(f"[ok][OK][/ok] {name}: installed")
-    return ComponentOutcome(name, "installed")
+    return ComponentOutcome(name, "installed", category)
 
 
-def _print_summary(outcomes: list[ComponentOutcome], *, dry_run: bool) -> None:
-    """Print a one-line tally and a nudge to re-run doctor."""
+def _print_summary(outcomes: list[ComponentOutcome], *, dry_run: bool, verify: bool = False) -> None:
+    """Print a one-line tally and, unless verifying, a nudge to re-run doctor."""
     tally: dict[str, int] = {}
     for outcome in outcomes:
         tally[outcome.status] = tally.get(outcome.status, 0) + 1
     parts = [f"{count} {status}" for status, count in sorted(tally.items())]
     console.print(f"\nSummary: {', '.join(parts) or 'nothing to do'}")
     if not dry_run and tally.get("installed"):
-        console.print(
-            "[dim]Group changes (docker/render/libvirt) take effect on next login. "
-            "Verify with [cyan]msai doctor[/cyan].[/dim]"
-        )
+        nudge = "" if verify else " Verify with [cyan]msai doctor[/cyan]."
+        console.print(f"[dim]Group changes (docker/render/libvirt) take effect on next login.{nudge}[/dim]")
+
+
+def verify_categories(outcomes: list[ComponentOutcome]) -> list[str]:
+    """Doctor categories of the installed components, in first-seen order."""
+    categories: list[str] = []
+    for outcome in outcomes:
+        if outcome.status == "installed" and outcome.category and outcome.category not in categories:
+            categories.append(outcome.category)
+    return categories
+
+
+def _verify(outcomes: list[ComponentOutcome]) -> None:
+    """Re-run the doctor checks tied to what was installed and print the diff."""
+    names = verify_categories(outcomes)
+    if not names:
+        return
+    # Deferred: plain installs should not pay for importing every check.
+    from msai_setup.doctor.checks import Category, registry
+    from msai_setup.doctor.engine import last_known, verify
+    from msai_setup.doctor.profile import resolve_profile
+    from msai_setup.doctor.render import print_changes
+
+    profile, _source = resolve_profile()
+    targets = registry.get_checks([Category(name) for name in names])
+    before = last_known(targets, profile=profile)
+    print_changes(verify(targets, before, profile=profile), scope=", ".join(names))
@@ -24,15 +24,13 @@ from pathlib import Path
 
 from msai_setup.lab import state
 from msai_setup.lab.config import LabConfig, load_config
+from msai_setup.lab.playbooks import KNOWN_PLAYBOOKS
 
 log = logging.getLogger(__name__)
 
 ANSIBLE_DIR = Path(__file__).resolve().parent / "ansible"
 INVENTORY_PATH = ANSIBLE_DIR / "inventory.generated.yml"
 
-DEFAULT_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw")
-KNOWN_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw", "zfs", "docker", "services", "incus", "rdp")
-
 
 def require_ansible() -> None:
     """Raise SystemExit with install hints if `ansible-playbook` is not on PATH."""
@@ -1,4 +1,8 @@
-"""Lab CLI - `msai lab <command>`."""
+"""Lab CLI - `msai lab <command>`.
+
+Commands import the lab modules they drive when they run, so building the
+``msai`` command tree does not load provisioning, Ansible or VirtualBox code.
+"""
 
 from __future__ import annotations
 
@@ -7,13 +11,7 @@ from typing import Annotated
 
 import typer
 
-from msai_setup.lab import apply as apply_mod
-from msai_setup.lab import pipeline as pipeline_mod
-from msai_setup.lab import state as state_mod
-from msai_setup.lab import vbox as vbox_mod
-from msai_setup.lab import zfsroot as zfsroot_mod
-from msai_setup.lab.apply import KNOWN_PLAYBOOKS
-from msai_setup.lab.config import load_config
+from msai_setup.lab.playbooks import DEFAULT_PLAYBOOKS, KNOWN_PLAYBOOKS, PIPELINE_PLAYBOOKS
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -62,8 +60,10 @@ def apply(
     verbose: _VerboseOption = False,
 ) -> None:
     """Run one or more Ansible playbooks against the lab VM."""
+    from msai_setup.lab import apply as apply_mod
+
     _configure_logging(verbose)
-    chosen: list[str] = list(playbooks) if playbooks else list(apply_mod.DEFAULT_PLAYBOOKS)
+    chosen: list[str] = list(playbooks) if playbooks else list(DEFAULT_PLAYBOOKS)
     extras: list[str] = []
     if check:
         extras.append("--check")
@@ -93,7 +93,7 @@ def all(
             "--playbooks",
             help="Comma-separated playbooks for the apply phase.",
         ),
-    ] = ",".join(pipeline_mod.DEFAULT_PLAYBOOKS),
+    ] = ",".join(PIPELINE_PLAYBOOKS),
     verbose: _VerboseOption = False,
 ) -> None:
     """Run the whole pipeline end-to-end: provision then apply.
@@ -103,6 +103,8 @@ def all(
     playbook set including zfs, docker, and services — "all" means all. Narrow
     it with --playbooks, or run individual playbooks via `msai lab apply <name>`.
     """
+    from msai_setup.lab import pipeline as pipeline_mod
+
     _configure_logging(verbose)
     pb_list = [p.strip() for p in playbooks.split(",") if p.strip()]
     if stop_after not in (None, "provision", "apply"):
@@ -150,6 +152,8 @@ def install_zfs_root(
     `msai use <name>` or let it use the default. Use a fresh instance name to avoid
     clashing with an ext4 VM.
     """
+    from msai_setup.lab import zfsroot as zfsroot_mod
+
     _configure_logging(verbose)
     extras: list[str] = []
     for v in extra_var or []:
@@ -164,6 +168,10 @@ def install_zfs_root(
 @lab_app.command()
 def status() -> None:
     """Show the current state of the lab (VM, phase markers, snapshots)."""
+    from msai_setup.lab import state as state_mod
+    from msai_setup.lab import vbox as vbox_mod
+    from msai_setup.lab.config import load_config
+
     cfg = load_config()
     typer.echo(f"VM name:     {cfg.vm_name}")
     typer.echo(f"Platform:    {cfg.platform}")
@@ -202,6 +210,10 @@ def destroy(
     ] = False,
 ) -> None:
     """Power off, unregister, and delete the VM + its disks + state."""
+    from msai_setup.lab import state as state_mod
+    from msai_setup.lab import vbox as vbox_mod
+    from msai_setup.lab.config import load_config
+
     cfg = load_config()
 
     if not yes:
@@ -270,6 +282,9 @@ def snapshot(
     ] = True,
 ) -> None:
     """Take a VirtualBox snapshot of the lab VM."""
+    from msai_setup.lab import vbox as vbox_mod
+    from msai_setup.lab.config import load_config
+
     cfg = load_config()
     vbox_mod.snapshot_take(cfg.vm_name, name, pause=pause)
     typer.echo(f"snapshot '{name}' taken")
@@ -283,6 +298,9 @@ def restore(
     ] = None,
 ) -> None:
     """Restore the VM to a snapshot."""
+    from msai_setup.lab import vbox as vbox_mod
+    from msai_setup.lab.config import load_config
+
     cfg = load_config()
     if vbox_mod.vm_running(cfg.vm_name):
         vbox_mod.power_off(cfg.vm_name)
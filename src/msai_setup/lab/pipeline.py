@@ -11,11 +11,10 @@ from typing import Literal
 
 from msai_setup.lab import apply, provision, state
 from msai_setup.lab.config import LabConfig, load_config
+from msai_setup.lab.playbooks import PIPELINE_PLAYBOOKS
 
 log = logging.getLogger(__name__)
 
-DEFAULT_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw", "zfs", "docker", "services")
-
 StopAfter = Literal["provision", "apply", None]
 
 
@@ -30,7 +29,7 @@ def run_pipeline(
     log.info("lab pipeline starting: vm=%s platform=%s", cfg.vm_name, cfg.platform)
     log.info("state file: %s", cfg.state_path)
 
-    playbooks = list(playbooks) if playbooks else list(DEFAULT_PLAYBOOKS)
+    playbooks = list(playbooks) if playbooks else list(PIPELINE_PLAYBOOKS)
 
     # 1. Provision
     if force:
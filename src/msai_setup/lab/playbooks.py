@@ -0,0 +1,11 @@
+"""Names of the lab's Ansible playbooks.
+
+A leaf module (no imports) so ``msai lab`` can show them in its help text
+without loading the provisioning and apply machinery.
+"""
+
+# Bare `msai lab apply`: the conservative subset.
+DEFAULT_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw")
+# `msai lab all`: the full pipeline.
+PIPELINE_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw", "zfs", "docker", "services")
+KNOWN_PLAYBOOKS = ("bootstrap", "ssh-hardening", "ufw", "zfs", "docker", "services", "incus", "rdp")
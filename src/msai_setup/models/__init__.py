@@ -0,0 +1,5 @@
+"""Local GGUF models: what they need and whether they fit.
+
+``msai models plan`` reads a model's GGUF header and sets its weights, KV
+cache and compute buffers against the memory the box can give it right now.
+"""
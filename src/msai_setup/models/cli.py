@@ -0,0 +1,144 @@
+"""Models CLI - `msai models <command>`.
+
+Commands import the GGUF reader and planner when they run, so building the
+``msai`` command tree loads neither.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+models_app = typer.Typer(
+    name="models",
+    help="Local GGUF models: an index of what is on disk, and whether a model fits in memory.",
+    no_args_is_help=True,
+)
+
+
+def _refresh() -> None:
+    from msai_setup.models.index import ModelIndex, model_dirs
+    from msai_setup.utils.formatting import console
+
+    dirs = model_dirs()
+    stats = ModelIndex().refresh(dirs)
+    console.print(
+        f"[dim]indexed {stats.files} models in {', '.join(str(d) for d in dirs)}: "
+        f"{stats.parsed} parsed ({stats.failed} failed), {stats.removed} removed, {stats.elapsed:.2f}s[/dim]"
+    )
+
+
+@models_app.command("scan")
+def models_scan() -> None:
+    """Update the model index: parse new and changed GGUF files, drop deleted ones.
+
+    The directories come from the ``models.dirs`` config list.
+    """
+    _refresh()
+
+
+@models_app.command("ls")
+def models_ls(
+    refresh: Annotated[bool, typer.Option("--refresh", "-r", help="Scan the model directories first")] = False,
+    architecture: Annotated[
+        str | None, typer.Option("--arch", "-a", help="Only models of this architecture, e.g. qwen3moe")
+    ] = None,
+) -> None:
+    """List indexed models from the index alone, without touching the files."""
+    from rich.table import Table
+
+    from msai_setup.models.index import ModelIndex
+    from msai_setup.utils.formatting import console, format_gib
+
+    if refresh:
+        _refresh()
+    models = ModelIndex().models(architecture=architecture)
+    if not models:
+        typer.echo("no models indexed; run msai models scan (directories: models.dirs in the config)")
+        return
+    table = Table(title_justify="left")
+    for column in ("Model", "Arch", "Quant", "Params", "Context", "Weights", "KV/1k tok"):
+        table.add_column(column, justify="left" if column in ("Model", "Arch", "Quant") else "right")
+    for model in models:
+        name = Path(model.path).name + (f" [dim](+{model.shards - 1} shards)[/dim]" if model.shards > 1 else "")
+        if model.error is not None:
+            table.add_row(name, f"[red]unreadable: {model.error}[/red]", "", "", "", "", "")
+            continue
+        table.add_row(
+            name,
+            model.architecture or "?",
+            model.quantization or "?",
+            f"{model.parameters / 1e9:.1f}B",
+            str(model.context_length or "?"),
+            format_gib(model.tensor_bytes),
+            f"{model.kv_bytes_per_token() * 1024 / 1024**2:.0f} MiB",
+        )
+    console.print(table)
+
+
+@models_app.command("plan")
+def models_plan(
+    model: Annotated[Path, typer.Argument(help="GGUF file (any shard of a split model)", exists=True, dir_okay=False)],
+    context: Annotated[
+        int | None, typer.Option("--context", "-c", min=1, help="Context per sequence (default: the model's trained)")
+    ] = None,
+    parallel: Annotated[int, typer.Option("--parallel", "-np", min=1, help="Sequences served at once")] = 1,
+    cache_type: Annotated[str, typer.Option("--cache-type", "-ctk", help="KV cache type: f16, q8_0, q4_0...")] = "f16",
+    ubatch: Annotated[int, typer.Option("--ubatch", "-ub", min=1, help="Micro-batch size")] = 512,
+) -> None:
+    """Check whether a model fits in memory at a context, and the largest context that does.
+
+    Exits 1 when it does not fit.
+    """
+    from rich.table import Table
+
+    from msai_setup.models.index import load_model
+    from msai_setup.models.plan import SAFETY_MARGIN, plan_model, read_budget
+    from msai_setup.utils.formatting import console, format_gib
+    from msai_setup.utils.gguf import CACHE_TYPES, GGUFError
+
+    if cache_type not in CACHE_TYPES:
+        raise typer.BadParameter(f"expected one of {', '.join(CACHE_TYPES)}", param_hint="'--cache-type'")
+    try:
+        header = load_model(model)
+    except GGUFError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1) from e
+    budget = read_budget()
+    plan = plan_model(header, budget, context=context, parallel=parallel, cache_type=cache_type, ubatch=ubatch)
+
+    quant = f", {header.quantization}" if header.quantization else ""
+    console.print(
+        f"[bold]{header.name}[/bold] ({header.architecture}{quant}, {header.parameters / 1e9:.1f}B parameters, "
+        f"trained context {header.context_length or '?'})"
+    )
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    table.add_column()
+    table.add_column(justify="right")
+    table.add_row("Weights", format_gib(plan.weights))
+    table.add_row(f"KV cache ({plan.context} x {plan.parallel}, {cache_type})", format_gib(plan.kv_cache))
+    table.add_row(f"Compute buffers (ubatch {ubatch})", format_gib(plan.compute))
+    table.add_row("[bold]Needed[/bold]", f"[bold]{format_gib(plan.need)}[/bold]")
+    table.add_row("", "")
+    table.add_row("RAM available", format_gib(budget.mem_available))
+    table.add_row("ARC reclaimable", format_gib(budget.arc_reclaimable))
+    if budget.gpu:
+        table.add_row("GTT free", f"{format_gib(budget.gtt_free)} of {format_gib(budget.gtt_total)}")
+        table.add_row("VRAM free", f"{format_gib(budget.vram_free)} of {format_gib(budget.vram_total)}")
+    table.add_row("Safety margin", f"-{format_gib(SAFETY_MARGIN)}")
+    table.add_row("[bold]Usable[/bold]", f"[bold]{format_gib(plan.usable)}[/bold]")
+    console.print(table)
+
+    if plan.fits:
+        console.print(f"[green]fits[/green]: largest safe context {plan.max_context} x {plan.parallel}")
+        return
+    if plan.max_context:
+        console.print(
+            f"[red]does not fit[/red] at context {plan.context}; "
+            f"largest safe context {plan.max_context} x {plan.parallel}"
+        )
+    else:
+        console.print(f"[red]does not fit[/red] at any context: {plan.failure_cause()}")
+    raise typer.Exit(code=1)
@@ -0,0 +1,272 @@
+"""A persistent index of local GGUF models.
+
+Model directories hold hundreds of GB of GGUF files; even header-only reads
+add up to seconds when every query walks them. The index keeps one row per
+model in ``~/.cache/msai/models.db``, keyed by the file's path, size, mtime
+and inode. ``refresh`` walks the model directories, stats every ``.gguf``
+file and parses only those whose key changed or that are new; rows of files
+that disappeared are dropped. A file that fails to parse is stored with its
+error, so it is not retried until it changes.
+
+``msai models ls`` answers from the index alone. Checks and commands that
+need one model call ``load_model``, which costs one ``stat`` when the entry
+is current.
+
+Split models are indexed under their first shard, keyed by that shard's
+stat; the sizes and counts cover every shard.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+from msai_setup.utils.db import CACHE_DIR, connect
+from msai_setup.utils.gguf import CACHE_TYPES, GGUFError, read_gguf
+
+INDEX_PATH = CACHE_DIR / "models.db"
+
+# Where models live when the models.dirs config does not say (docs/ai layout on the tank pool).
+DEFAULT_DIRS = ("/tank/ai/models/gguf",)
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    indexed_at REAL NOT NULL,
+    name TEXT,
+    architecture TEXT,
+    quantization TEXT,
+    parameters INTEGER NOT NULL DEFAULT 0,
+    context_length INTEGER,
+    vocab_size INTEGER NOT NULL DEFAULT 0,
+    tensor_count INTEGER NOT NULL DEFAULT 0,
+    tensor_bytes INTEGER NOT NULL DEFAULT 0,
+    kv_bytes_per_token_f16 REAL NOT NULL DEFAULT 0,
+    shards INTEGER NOT NULL DEFAULT 1,
+    error TEXT
+) WITHOUT ROWID;
+"""
+
+# Later shards of a split model; the first shard stands for the whole model.
+_LATER_SHARD = re.compile(r"-(?!00001-)\d{5}-of-\d{5}\.gguf$")
+
+
+@dataclass
+class IndexedModel:
+    """A model as the index stores it; a row with ``error`` set could not be parsed."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    indexed_at: float
+    name: str | None = None
+    architecture: str | None = None
+    quantization: str | None = None
+    parameters: int = 0
+    context_length: int | None = None
+    vocab_size: int = 0
+    tensor_count: int = 0
+    tensor_bytes: int = 0
+    kv_bytes_per_token_f16: float = 0.0
+    shards: int = 1
+    error: str | None = None
+
+    def kv_bytes_per_token(self, cache_type: str = "f16") -> float:
+        """KV cache bytes per token of context for a cache type, scaled from the stored f16 figure.
+
+        Raises:
+            KeyError: If ``cache_type`` is not one of ``CACHE_TYPES``.
+        """
+        return self.kv_bytes_per_token_f16 * CACHE_TYPES[cache_type] / CACHE_TYPES["f16"]
+
+
+@dataclass
+class RefreshStats:
+    """What a refresh did."""
+
+    files: int = 0
+    parsed: int = 0
+    failed: int = 0
+    removed: int = 0
+    elapsed: float = 0.0
+
+
+_COLUMNS = [f.name for f in fields(IndexedModel)]
+
+
+def _stat_key(stat: os.stat_result) -> tuple[int, int, int]:
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _entry(path: Path, stat: os.stat_result) -> IndexedModel:
+    """Parse a model's header into an index row (the error stored if it fails)."""
+    size, mtime_ns, inode = _stat_key(stat)
+    entry = IndexedModel(str(path), size, mtime_ns, inode, time.time())
+    try:
+        model = read_gguf(path)
+    except GGUFError as e:
+        entry.error = str(e)
+        return entry
+    entry.name = model.name
+    entry.architecture = model.architecture
+    entry.quantization = model.quantization
+    entry.parameters = model.parameters
+    entry.context_length = model.context_length
+    entry.vocab_size = model.vocab_size
+    entry.tensor_count = model.tensor_count
+    entry.tensor_bytes = model.tensor_bytes
+    entry.kv_bytes_per_token_f16 = model.kv_bytes_per_token()
+    entry.shards = len(model.files)
+    return entry
+
+
+def _walk(directory: Path) -> Iterator[tuple[Path, os.stat_result]]:
+    """``.gguf`` files under ``directory`` (symlinks followed for files, not directories), with their stat."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(Path(entry.path))
+            elif entry.name.endswith(".gguf") and not _LATER_SHARD.search(entry.name):
+                yield Path(entry.path), entry.stat()
+        except OSError:
+            continue
+
+
+def model_dirs() -> list[Path]:
+    """Directories to index: the ``models.dirs`` config list, or ``DEFAULT_DIRS``."""
+    from msai_setup.utils.config import get_config_value
+
+    configured = get_config_value("models.dirs", None)
+    return [Path(str(path)).expanduser() for path in (configured or DEFAULT_DIRS)]
+
+
+class ModelIndex:
+    """The index database; every method opens and closes its own connection."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        """Use the database at ``path`` (default ``INDEX_PATH``), created by the first parse it stores."""
+        self.path = path or INDEX_PATH
+
+    def _connect(self, *, write: bool = False) -> AbstractContextManager[sqlite3.Connection]:
+        return connect(self.path, _SCHEMA, _SCHEMA_VERSION, create=write)
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> IndexedModel:
+        return IndexedModel(*(row[column] for column in _COLUMNS))
+
+    @staticmethod
+    def _store(conn: sqlite3.Connection, entries: Iterable[IndexedModel]) -> None:
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO models ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+            [tuple(getattr(entry, name) for name in _COLUMNS) for entry in entries],
+        )
+
+    def refresh(self, dirs: Iterable[Path]) -> RefreshStats:
+        """Bring the index up to date with the model directories.
+
+        Only new and changed files are parsed. Rows under ``dirs`` whose file
+        is gone are removed; rows under other directories are left alone.
+        """
+        started = time.monotonic()
+        stats = RefreshStats()
+        roots = [Path(os.path.abspath(directory)) for directory in dirs]
+        with self._connect(write=True) as conn:
+            known = {
+                row["path"]: (row["size"], row["mtime_ns"], row["inode"])
+                for row in conn.execute("SELECT path, size, mtime_ns, inode FROM models")
+            }
+            seen: set[str] = set()
+            changed: list[IndexedModel] = []
+            for root in roots:
+                for path, stat in _walk(root):
+                    stats.files += 1
+                    seen.add(str(path))
+                    if known.get(str(path)) == _stat_key(stat):
+                        continue
+                    entry = _entry(path, stat)
+                    stats.parsed += 1
+                    stats.failed += entry.error is not None
+                    changed.append(entry)
+            self._store(conn, changed)
+            gone = [
+                (path,)
+                for path in known
+                if path not in seen and any(Path(path).is_relative_to(root) for root in roots)
+            ]
+            conn.executemany("DELETE FROM models WHERE path = ?", gone)
+            stats.removed = len(gone)
+        stats.elapsed = time.monotonic() - started
+        return stats
+
+    def models(self, *, architecture: str | None = None) -> list[IndexedModel]:
+        """Indexed models by path, optionally of one architecture."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM models WHERE ? IS NULL OR architecture = ? ORDER BY path",
+                (architecture, architecture),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def get(self, path: Path) -> IndexedModel | None:
+        """The stored entry for a path, without checking the file."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM models WHERE path = ?", (str(path),)).fetchone()
+        return self._row(row) if row else None
+
+    def model(self, path: Path) -> IndexedModel:
+        """The entry for one file, parsed and stored first if it is new or changed.
+
+        Raises:
+            GGUFError: If the file is missing or cannot be parsed.
+        """
+        path = Path(os.path.abspath(path))
+        try:
+            stat = path.stat()
+        except OSError as e:
+            raise GGUFError(f"{path}: {e.strerror}") from e
+        entry = self.get(path)
+        if entry is None or (entry.size, entry.mtime_ns, entry.inode) != _stat_key(stat):
+            entry = _entry(path, stat)
+            with self._connect(write=True) as conn:
+                self._store(conn, [entry])
+        if entry.error is not None:
+            raise GGUFError(entry.error)
+        return entry
+
+
+def load_model(path: Path) -> IndexedModel:
+    """One model's header facts, through the index when it can be read and written.
+
+    Raises:
+        GGUFError: If the file is missing or cannot be parsed.
+    """
+    try:
+        return ModelIndex().model(path)
+    except (OSError, sqlite3.Error):
+        # A read-only or locked cache must not stop planning; parse directly.
+        path = Path(os.path.abspath(path))
+        try:
+            stat = path.stat()
+        except OSError as e:
+            raise GGUFError(f"{path}: {e.strerror}") from e
+        entry = _entry(path, stat)
+        if entry.error is not None:
+            raise GGUFError(entry.error)
+        return entry
@@ -0,0 +1,215 @@
+"""Unified-memory budget planning for GGUF models.
+
+On the MS-S1 MAX the GPU has no memory of its own beyond the small BIOS
+carve-out ("VRAM"); llama.cpp's Vulkan and ROCm backends put model weights
+and the KV cache in GTT, which is system RAM the amdgpu driver may map for
+the GPU. A model therefore fits when its weights, KV cache and compute
+buffers fit in the free carve-out plus whichever is smaller of free GTT and
+free RAM. Free RAM is ``MemAvailable`` plus what the ZFS ARC would give back
+under pressure (its size above ``c_min``; the kernel does not count the ARC
+as available).
+
+The weights are the GGUF's tensor bytes. The KV cache is the per-token size
+from the header times the context times the parallel sequences (llama-server
+``-np``). Compute buffers are estimated as a fixed base plus the logits of
+one micro-batch; the real figure depends on the backend and flash attention,
+so ``SAFETY_MARGIN`` is kept free on top.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Protocol
+
+from msai_setup.utils.formatting import GIB, format_gib
+from msai_setup.utils.probe import Probe, get_probe
+from msai_setup.utils.zfs import parse_arcstats
+
+# Left unallocated on top of everything planned: allocator slack, a desktop, short-lived processes.
+SAFETY_MARGIN = 2 * GIB
+
+# Compute buffers besides the logits: activations of one micro-batch, graph scratch space.
+COMPUTE_BASE = GIB // 2
+
+# llama.cpp rounds the context to a multiple of this.
+CONTEXT_STEP = 256
+
+
+class ModelShape(Protocol):
+    """What planning needs of a model: a ``GGUFModel`` header or an ``IndexedModel`` row."""
+
+    @property
+    def tensor_bytes(self) -> int:
+        """Bytes of weights."""
+        ...
+
+    @property
+    def context_length(self) -> int | None:
+        """The trained context."""
+        ...
+
+    @property
+    def vocab_size(self) -> int:
+        """Tokens in the vocabulary."""
+        ...
+
+    def kv_bytes_per_token(self, cache_type: str = "f16") -> float:
+        """KV cache bytes per token of context."""
+        ...
+
+
+@dataclass
+class MemoryBudget:
+    """Live memory figures, in bytes."""
+
+    mem_total: int
+    mem_available: int
+    arc_size: int = 0
+    arc_min: int = 0
+    gpu: bool = False
+    vram_total: int = 0
+    vram_used: int = 0
+    gtt_total: int = 0
+    gtt_used: int = 0
+
+    @property
+    def arc_reclaimable(self) -> int:
+        """ARC the kernel can shrink away under memory pressure."""
+        return max(0, self.arc_size - self.arc_min)
+
+    @property
+    def host_free(self) -> int:
+        """RAM a new process could get: available memory plus reclaimable ARC."""
+        return self.mem_available + self.arc_reclaimable
+
+    @property
+    def gtt_free(self) -> int:
+        """GTT not yet mapped for the GPU."""
+        return max(0, self.gtt_total - self.gtt_used)
+
+    @property
+    def vram_free(self) -> int:
+        """Unused BIOS carve-out."""
+        return max(0, self.vram_total - self.vram_used)
+
+    @property
+    def usable(self) -> int:
+        """What a model may take, ``SAFETY_MARGIN`` kept back.
+
+        With a GPU: free carve-out plus free GTT, GTT capped by free RAM since
+        it is RAM. Without one the model runs from RAM.
+        """
+        room = self.vram_free + min(self.gtt_free, self.host_free) if self.gpu else self.host_free
+        return max(0, room - SAFETY_MARGIN)
+
+
+def read_budget(probe: Probe | None = None) -> MemoryBudget:
+    """Current figures from ``/proc/meminfo``, arcstats and the amdgpu cards' sysfs."""
+    probe = probe or get_probe()
+    meminfo = probe.meminfo()
+    arcstats = parse_arcstats(probe.read("/proc/spl/kstat/zfs/arcstats") or "")
+    cards = probe.amdgpu_cards()
+
+    def total(attribute: str) -> int:
+        return sum(int((probe.read(f"{card}/{attribute}") or "0").strip() or 0) for card in cards)
+
+    return MemoryBudget(
+        mem_total=meminfo.get("MemTotal", 0) * 1024,
+        mem_available=meminfo.get("MemAvailable", 0) * 1024,
+        arc_size=arcstats.get("size", 0),
+        arc_min=arcstats.get("c_min", 0),
+        gpu=bool(cards),
+        vram_total=total("mem_info_vram_total"),
+        vram_used=total("mem_info_vram_used"),
+        gtt_total=total("mem_info_gtt_total"),
+        gtt_used=total("mem_info_gtt_used"),
+    )
+
+
+@dataclass
+class ModelPlan:
+    """What a model needs at a context size, against the budget."""
+
+    model: ModelShape
+    context: int
+    parallel: int
+    cache_type: str
+    weights: int
+    kv_cache: int
+    compute: int
+    usable: int
+    max_context: int
+
+    @property
+    def need(self) -> int:
+        """Weights, KV cache and compute buffers together."""
+        return self.weights + self.kv_cache + self.compute
+
+    @property
+    def fits(self) -> bool:
+        """Whether the plan fits in the usable memory."""
+        return self.need <= self.usable
+
+    def failure_cause(self) -> str:
+        """Why no context fits (``max_context`` is 0): what fills the usable memory first."""
+        usable = format_gib(self.usable)
+        if self.weights > self.usable:
+            return f"weights alone ({format_gib(self.weights)}) exceed {usable} usable"
+        if self.weights + self.compute > self.usable:
+            compute = format_gib(self.compute)
+            return f"weights ({format_gib(self.weights)}) and compute buffers ({compute}) exceed {usable} usable"
+        return f"weights and compute buffers leave room for under {CONTEXT_STEP} tokens of KV cache in {usable} usable"
+
+
+def compute_bytes(model: ModelShape, ubatch: int = 512) -> int:
+    """Estimated compute buffers: ``COMPUTE_BASE`` plus f32 logits for one micro-batch."""
+    return COMPUTE_BASE + model.vocab_size * ubatch * 4
+
+
+def plan_model(
+    model: ModelShape,
+    budget: MemoryBudget,
+    *,
+    context: int | None = None,
+    parallel: int = 1,
+    cache_type: str = "f16",
+    ubatch: int = 512,
+) -> ModelPlan:
+    """Size a model at a context against the budget, and find the largest context that fits.
+
+    Args:
+        model: The model's header or index entry.
+        budget: Memory to plan against.
+        context: Tokens of context per sequence; defaults to the model's
+            trained context.
+        parallel: Sequences served at once, each with its own context.
+        cache_type: KV cache type, one of ``CACHE_TYPES`` in utils.gguf.
+        ubatch: Micro-batch size, which sizes the logits buffer.
+
+    Raises:
+        KeyError: If ``cache_type`` is unknown.
+    """
+    per_token = model.kv_bytes_per_token(cache_type)
+    trained = model.context_length
+    context = context or trained or 4096
+    compute = compute_bytes(model, ubatch)
+    room = budget.usable - model.tensor_bytes - compute
+    if room <= 0:
+        max_context = 0
+    elif per_token <= 0:
+        max_context = trained or context
+    else:
+        max_context = int(room // (per_token * parallel)) // CONTEXT_STEP * CONTEXT_STEP
+        if trained:
+            max_context = min(max_context, trained)
+    return ModelPlan(
+        model=model,
+        context=context,
+        parallel=parallel,
+        cache_type=cache_type,
+        weights=model.tensor_bytes,
+        kv_cache=int(per_token * context * parallel),
+        compute=compute,
+        usable=budget.usable,
+        max_context=max_context,
+    )
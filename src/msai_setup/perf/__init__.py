@@ -0,0 +1,13 @@
+"""Host performance profiles: CPU governor, amd_pstate EPP and GPU power state as one setting.
+
+``msai perf profile set inference|balanced|quiet`` applies a coherent set of
+the four knobs token throughput depends on, all or nothing, and persists it
+through a systemd unit. ``msai doctor performance`` reports what the host is
+set to and whether it still matches the persisted profile.
+"""
+
+from __future__ import annotations
+
+
+class PerfError(RuntimeError):
+    """Raised when a profile cannot be applied on this host."""
@@ -0,0 +1,113 @@
+"""Perf CLI - `msai perf <command>`.
+
+Commands read sysfs and render the profile script when they run, so building
+the ``msai`` command tree loads neither the probe nor Rich.
+"""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import typer
+
+perf_app = typer.Typer(
+    name="perf",
+    help="Host performance profiles: CPU governor, amd_pstate EPP and GPU power state.",
+    no_args_is_help=True,
+)
+perf_profile_app = typer.Typer(
+    name="profile",
+    help="Show the current power settings, or apply and persist a profile.",
+    invoke_without_command=True,
+)
+perf_app.add_typer(perf_profile_app, name="profile")
+
+
+@perf_profile_app.callback(invoke_without_command=True)
+def perf_profile_main(ctx: typer.Context) -> None:
+    """Show the current settings and which profile they match."""
+    if ctx.invoked_subcommand is not None:
+        return
+    from rich.table import Table
+
+    from msai_setup.perf.profiles import PROFILES, matching_profile, persisted_profile, read_settings, summary
+    from msai_setup.utils.formatting import console
+
+    settings = read_settings()
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    table.add_column()
+    table.add_column()
+    mode = f" ({settings.amd_pstate})" if settings.amd_pstate else ""
+    table.add_row("cpufreq driver", f"{settings.driver or '-'}{mode}")
+    table.add_row("Governor", summary(settings.governors) or "-")
+    table.add_row("EPP", summary(settings.epp) or "-")
+    for gpu in settings.gpus:
+        card = gpu.card.split("/")[4]
+        table.add_row(f"{card} DPM level", gpu.dpm_level or "-")
+        table.add_row(f"{card} power profile", gpu.power_profiles.active or "-")
+    console.print(table)
+
+    live = matching_profile(settings)
+    persisted = persisted_profile()
+    console.print(f"matches: [bold]{live.name if live else 'no profile'}[/bold]; persisted: {persisted or 'none'}")
+    for profile in PROFILES.values():
+        console.print(f"  [dim]{profile.name:<10} {profile.description}[/dim]")
+
+
+@perf_profile_app.command("set")
+def perf_profile_set(
+    name: Annotated[str, typer.Argument(help="Profile to apply and persist: inference, balanced or quiet.")],
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Print the script and commands without running them")
+    ] = False,
+) -> None:
+    """Apply a profile, all settings or none, and persist it with a systemd unit.
+
+    Runs the profile's script once through sudo; if any write fails, the
+    settings already changed are restored and the previous profile stays
+    installed. Exits 1 when the profile cannot be applied.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from msai_setup.perf import PerfError
+    from msai_setup.perf.profiles import (
+        PROFILES,
+        differences,
+        install_commands,
+        read_settings,
+        render_script,
+        render_unit,
+    )
+    from msai_setup.utils.shell import run_interactive
+
+    profile = PROFILES.get(name.strip().lower())
+    if profile is None:
+        raise typer.BadParameter(f"expected one of {', '.join(PROFILES)}", param_hint="'NAME'")
+    try:
+        script = render_script(profile, read_settings())
+    except PerfError as e:
+        typer.echo(f"cannot apply {profile.name}: {e}", err=True)
+        raise typer.Exit(code=1) from e
+
+    with tempfile.TemporaryDirectory(prefix="msai-perf-") as tmp:
+        script_file, unit_file = Path(tmp) / "perf-profile.sh", Path(tmp) / "msai-perf-profile.service"
+        script_file.write_text(script)
+        unit_file.write_text(render_unit())
+        commands = install_commands(script_file, unit_file)
+        if dry_run:
+            typer.echo(script)
+            typer.echo("\n".join(commands))
+            return
+        for command in commands:
+            if run_interactive(command) != 0:
+                typer.echo(f"failed: {command}", err=True)
+                raise typer.Exit(code=1)
+
+    remaining = differences(profile, read_settings())
+    if remaining:
+        typer.echo(f"{profile.name} applied and persisted, but the host reports:", err=True)
+        for line in remaining:
+            typer.echo(f"  {line}", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"{profile.name} applied and persisted")
@@ -0,0 +1,349 @@
+"""Performance profiles and the host settings they cover.
+
+Four sysfs knobs decide how fast the APU answers a prompt:
+
+- the cpufreq governor of every CPU (``scaling_governor``);
+- with amd_pstate in active mode, every CPU's energy-performance preference
+  (``energy_performance_preference``), the hint the firmware picks clocks by;
+- amdgpu's ``power_dpm_force_performance_level``, where ``manual``, ``low``
+  or a ``profile_*`` level left behind by a tuning tool pins the clocks;
+- amdgpu's ``pp_power_profile_mode``, the workload the SMU tunes its clock
+  ramp for, written as an index into the table the file lists.
+
+A profile sets all four. ``render_script`` turns one into a POSIX shell script
+that applies every setting or, if a write fails, restores those it already
+made and exits non-zero; ``msai perf profile set`` runs it once to apply the
+profile and installs it with a oneshot unit that runs it again at boot. The
+script globs the sysfs paths rather than listing them, since card numbers
+can change between boots.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from msai_setup.perf import PerfError
+from msai_setup.utils.probe import Probe, get_probe
+
+CPU = "/sys/devices/system/cpu"
+
+SCRIPT_PATH = "/etc/msai/perf-profile.sh"
+UNIT_NAME = "msai-perf-profile.service"
+UNIT_PATH = f"/etc/systemd/system/{UNIT_NAME}"
+UNIT_WANTED = f"/etc/systemd/system/multi-user.target.wants/{UNIT_NAME}"
+
+# DPM levels that pin the GPU clocks; pp_power_profile_mode is ignored under manual.
+PINNED_LEVELS = frozenset({"manual", "low", "profile_standard", "profile_min_sclk", "profile_min_mclk"})
+
+_POWER_PROFILE = re.compile(r"^\s*(\d+)\s+([A-Z0-9_]+)\s*(\*)?", re.MULTILINE)
+_HEADER = re.compile(r"^# msai performance profile: (\S+)$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class PerfProfile:
+    """A coherent set of CPU and GPU power settings."""
+
+    name: str
+    description: str
+    governors: tuple[str, ...]
+    epp: str
+    dpm_level: str
+    power_profile: str
+
+    def governor(self, available: list[str]) -> str | None:
+        """The first of the profile's governors the cpufreq driver offers (all of them if it lists none)."""
+        return next((name for name in self.governors if not available or name in available), None)
+
+
+PROFILES: dict[str, PerfProfile] = {
+    profile.name: profile
+    for profile in (
+        PerfProfile(
+            "inference",
+            "Clocks up at once and stay up: for serving and benchmarking",
+            governors=("performance",),
+            epp="performance",
+            dpm_level="auto",
+            power_profile="COMPUTE",
+        ),
+        PerfProfile(
+            "balanced",
+            "The kernel defaults: fast under load, low power when idle",
+            # In active mode amd_pstate offers only performance and powersave, and powersave follows the EPP.
+            governors=("schedutil", "powersave"),
+            epp="balance_performance",
+            dpm_level="auto",
+            power_profile="BOOTUP_DEFAULT",
+        ),
+        PerfProfile(
+            "quiet",
+            "Lowest clocks and fan noise, for nights and idle days",
+            governors=("powersave",),
+            epp="power",
+            dpm_level="auto",
+            power_profile="POWER_SAVING",
+        ),
+    )
+}
+
+
+@dataclass(frozen=True)
+class PowerProfiles:
+    """A card's ``pp_power_profile_mode`` table: mode indices by name and the active mode."""
+
+    modes: dict[str, int]
+    active: str | None
+
+
+def parse_power_profiles(text: str) -> PowerProfiles:
+    """Parse ``pp_power_profile_mode``, in the short APU form or the long table with per-clock rows."""
+    modes: dict[str, int] = {}
+    active = None
+    for match in _POWER_PROFILE.finditer(text):
+        modes[match.group(2)] = int(match.group(1))
+        if match.group(3):
+            active = match.group(2)
+    return PowerProfiles(modes, active)
+
+
+@dataclass
+class GpuPower:
+    """One amdgpu card's power state."""
+
+    card: str
+    dpm_level: str | None
+    power_profiles: PowerProfiles
+    sclk_mhz: int | None = None
+
+
+@dataclass
+class PerfSettings:
+    """What the host is set to now; knobs it does not expose are None or empty."""
+
+    driver: str | None = None
+    amd_pstate: str | None = None
+    governors: list[str] = field(default_factory=list)
+    available_governors: list[str] = field(default_factory=list)
+    epp: list[str] = field(default_factory=list)
+    available_epp: list[str] = field(default_factory=list)
+    cpu_freq_mhz: list[float] = field(default_factory=list)
+    gpus: list[GpuPower] = field(default_factory=list)
+
+
+def summary(values: list[str]) -> str | None:
+    """One value for a per-CPU setting, or ``mixed (a, b)`` when the CPUs disagree."""
+    distinct = sorted(set(values))
+    if not distinct:
+        return None
+    return distinct[0] if len(distinct) == 1 else f"mixed ({', '.join(distinct)})"
+
+
+def read_settings(probe: Probe | None = None) -> PerfSettings:
+    """Read the current CPU and GPU power settings from sysfs."""
+    from msai_setup.utils.amdgpu import dpm_levels
+
+    probe = probe or get_probe()
+    settings = PerfSettings()
+    root = probe.resolve(CPU)
+    cpus = sorted(
+        (path for path in root.glob("cpu[0-9]*/cpufreq") if path.parent.name[3:].isdigit()),
+        key=lambda path: int(path.parent.name[3:]),
+    )
+
+    def read(path: Path, name: str) -> str | None:
+        try:
+            return (path / name).read_text().strip()
+        except OSError:
+            return None
+
+    for cpufreq in cpus:
+        if (governor := read(cpufreq, "scaling_governor")) is not None:
+            settings.governors.append(governor)
+        if (epp := read(cpufreq, "energy_performance_preference")) is not None:
+            settings.epp.append(epp)
+        freq = read(cpufreq, "scaling_cur_freq")
+        if freq and freq.isdigit():
+            settings.cpu_freq_mhz.append(int(freq) / 1000)
+    if cpus:
+        settings.driver = read(cpus[0], "scaling_driver")
+        settings.available_governors = (read(cpus[0], "scaling_available_governors") or "").split()
+        settings.available_epp = (read(cpus[0], "energy_performance_available_preferences") or "").split()
+    settings.amd_pstate = (probe.read(f"{CPU}/amd_pstate/status") or "").strip() or None
+
+    for card in probe.amdgpu_cards():
+        level = probe.read(f"{card}/power_dpm_force_performance_level")
+        if level is None:
+            continue
+        _levels, sclk = dpm_levels(probe.read(f"{card}/pp_dpm_sclk") or "")
+        settings.gpus.append(
+            GpuPower(
+                card=card,
+                dpm_level=level.strip(),
+                power_profiles=parse_power_profiles(probe.read(f"{card}/pp_power_profile_mode") or ""),
+                sclk_mhz=sclk,
+            )
+        )
+    return settings
+
+
+def differences(profile: PerfProfile, settings: PerfSettings) -> list[str]:
+    """How the host's settings differ from a profile, one ``knob: now, profile wants`` line each."""
+    found: list[str] = []
+    governor = profile.governor(settings.available_governors)
+    if settings.governors and governor is not None and set(settings.governors) != {governor}:
+        found.append(f"governor {summary(settings.governors)}, {profile.name} wants {governor}")
+    if settings.epp and set(settings.epp) != {profile.epp}:
+        found.append(f"EPP {summary(settings.epp)}, {profile.name} wants {profile.epp}")
+    for gpu in settings.gpus:
+        if gpu.dpm_level != profile.dpm_level:
+            found.append(f"{gpu.card} DPM level {gpu.dpm_level}, {profile.name} wants {profile.dpm_level}")
+        modes = gpu.power_profiles
+        if profile.power_profile in modes.modes and modes.active != profile.power_profile:
+            found.append(f"{gpu.card} power profile {modes.active}, {profile.name} wants {profile.power_profile}")
+    return found
+
+
+def matching_profile(settings: PerfSettings) -> PerfProfile | None:
+    """The profile the host's settings are exactly, if any (none when it exposes no settings)."""
+    if not settings.governors and not settings.gpus:
+        return None
+    return next((profile for profile in PROFILES.values() if not differences(profile, settings)), None)
+
+
+def persisted_profile(probe: Probe | None = None) -> str | None:
+    """The profile the installed boot script applies, from its header."""
+    match = _HEADER.search((probe or get_probe()).read(SCRIPT_PATH) or "")
+    return match.group(1) if match else None
+
+
+_SCRIPT = """\
+#!/bin/sh
+# msai performance profile: {name}
+# Written by `msai perf profile set`; run at boot by {unit}.
+# Applies every setting or none: when a write fails, those already made are restored.
+set -u
+saved=""
+undo=""
+
+# save FILE [PREVIOUS]: remember FILE's value (or PREVIOUS) before anything is written.
+save() {{
+    saved="$saved$1 ${{2-$(cat "$1" 2>/dev/null)}}
+"
+}}
+
+# put FILE VALUE: write VALUE; when that fails, restore what was written, latest first.
+put() {{
+    if ! printf '%s\\n' "$2" | tee "$1" >/dev/null 2>&1; then
+        echo "msai-perf-profile: cannot set $1 to $2; restoring the previous settings" >&2
+        eval "$undo"
+        exit 1
+    fi
+    old=$(printf '%s' "$saved" | awk -v file="$1" '$1 == file {{ sub(/^[^ ]+ /, ""); print; exit }}')
+    undo="printf '%s\\n' '$old' | tee '$1' >/dev/null 2>&1; $undo"
+}}
+
+# mode FILE [NAME]: the index of power profile NAME in FILE, or of the active one.
+mode() {{
+    awk -v want="${{2-}}" '$1 ~ /^[0-9]+$/ && $2 ~ /^[A-Z0-9_]+/ {{
+        name = $2; active = ($0 ~ /^ *[0-9]+ +[A-Z0-9_]+ *\\*/); sub(/[*:]+$/, "", name)
+        if (want == "" ? active : name == want) {{ print $1; exit }}
+    }}' "$1"
+}}
+
+# cards: amdgpu device directories with a DPM level (skipping connectors, e.g. card1-DP-1).
+cards() {{
+    for d in /sys/class/drm/card[0-9]*/device; do
+        case ${{d#/sys/class/drm/}} in *-*) continue ;; esac
+        [ -e "$d/power_dpm_force_performance_level" ] && echo "$d"
+    done
+}}
+
+# Save everything before the first write: under amd_pstate a governor write
+# also changes the EPP, which would otherwise be saved as the profile's value.
+for f in {cpu}/cpu[0-9]*/cpufreq/scaling_governor {cpu}/cpu[0-9]*/cpufreq/energy_performance_preference; do
+    [ -e "$f" ] && save "$f"
+done
+for d in $(cards); do
+    save "$d/power_dpm_force_performance_level"
+    [ -e "$d/pp_power_profile_mode" ] && save "$d/pp_power_profile_mode" "$(mode "$d/pp_power_profile_mode")"
+done
+
+for f in {cpu}/cpu[0-9]*/cpufreq/scaling_governor; do
+    [ -e "$f" ] && put "$f" {governor}
+done
+for f in {cpu}/cpu[0-9]*/cpufreq/energy_performance_preference; do
+    [ -e "$f" ] && put "$f" {epp}
+done
+for d in $(cards); do
+    put "$d/power_dpm_force_performance_level" {dpm_level}
+    [ -e "$d/pp_power_profile_mode" ] || continue
+    index=$(mode "$d/pp_power_profile_mode" {power_profile})
+    [ -n "$index" ] && put "$d/pp_power_profile_mode" "$index"
+done
+exit 0
+"""
+
+_UNIT = """\
+[Unit]
+Description=msai performance profile (CPU governor, EPP, GPU power state)
+# Run after the daemons that also set these, so the profile has the last word.
+After=systemd-modules-load.service power-profiles-daemon.service tuned.service
+
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+ExecStart=/bin/sh {script}
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def render_script(profile: PerfProfile, settings: PerfSettings) -> str:
+    """The boot script applying ``profile``, checked against what this host offers.
+
+    Raises:
+        PerfError: If the cpufreq driver offers none of the profile's
+            governors, or does not accept its EPP value.
+    """
+    governor = profile.governor(settings.available_governors)
+    if governor is None:
+        raise PerfError(
+            f"the {settings.driver or 'cpufreq'} driver offers none of {', '.join(profile.governors)} "
+            f"(available: {', '.join(settings.available_governors)})"
+        )
+    if settings.epp and settings.available_epp and profile.epp not in settings.available_epp:
+        raise PerfError(f"EPP {profile.epp} not offered (available: {', '.join(settings.available_epp)})")
+    return _SCRIPT.format(
+        name=profile.name,
+        unit=UNIT_NAME,
+        cpu=CPU,
+        governor=governor,
+        epp=profile.epp,
+        dpm_level=profile.dpm_level,
+        power_profile=profile.power_profile,
+    )
+
+
+def render_unit() -> str:
+    """The oneshot unit running the installed script at boot."""
+    return _UNIT.format(script=SCRIPT_PATH)
+
+
+def install_commands(script: Path, unit: Path) -> list[str]:
+    """Commands that apply a rendered script and, only if it succeeds, persist it.
+
+    The script is staged next to the installed one and run from there; if it
+    fails it has restored the previous settings, the staged copy is removed
+    and the previous profile stays installed. Otherwise it replaces the
+    installed script in one rename and the unit is installed and enabled.
+    """
+    staged = f"{SCRIPT_PATH}.new"
+    return [
+        f"sudo install -D -m 0755 {script} {staged}",
+        f"sudo sh {staged} || {{ sudo rm -f {staged}; exit 1; }}",
+        f"sudo mv -f {staged} {SCRIPT_PATH}",
+        f"sudo install -m 0644 {unit} {UNIT_PATH} && sudo systemctl daemon-reload && sudo systemctl enable {UNIT_NAME}",
+    ]
@@ -1,7 +1,25 @@
-"""Utility modules for msai-setup."""
+"""Utility modules for msai-setup.
 
-from msai_setup.utils.formatting import console, print_header, print_status
-from msai_setup.utils.shell import CommandResult, run_command
+The names below are imported on first access, so ``utils.duration`` and
+``utils.probe`` stay cheap to import on their own.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from msai_setup.utils.formatting import console, print_header, print_status
+    from msai_setup.utils.shell import CommandResult, run_command
+
+_EXPORTS = {
+    "console": "msai_setup.utils.formatting",
+    "print_header": "msai_setup.utils.formatting",
+    "print_status": "msai_setup.utils.formatting",
+    "run_command": "msai_setup.utils.shell",
+    "CommandResult": "msai_setup.utils.shell",
+}
 
 __all__ = [
     "console",
@@ -10,3 +28,10 @@ __all__ = [
     "run_command",
     "CommandResult",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import an exported name on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name]), name)
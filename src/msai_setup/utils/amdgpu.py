@@ -0,0 +1,159 @@
+"""Sampling amdgpu's load, memory, clock and power counters from sysfs.
+
+The driver exposes everything a utilization monitor needs under
+``/sys/class/drm/cardN/device``: ``gpu_busy_percent``, ``mem_info_vram_used``
+and ``mem_info_gtt_used``, the DPM clock tables ``pp_dpm_sclk`` and
+``pp_dpm_mclk`` (the current level is marked with ``*``), and the board power
+in the card's hwmon directory (microwatts). ``GpuSampler`` opens each
+attribute once and re-reads it with ``pread`` at offset 0, which makes sysfs
+regenerate the value; a poll costs a few syscalls and no process spawns, so
+sampling at 10 Hz does not disturb the workload being measured.
+
+Paths go through the Probe, so a fixture tree under a sysroot stands in for
+a real GPU in tests.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from types import TracebackType
+
+from msai_setup.utils.probe import Probe, get_probe
+
+_LEVEL = re.compile(r"^\s*\d+:\s*(\d+)\s*Mhz(\s*\*)?", re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class GpuSample:
+    """One poll of a card's counters; None where the card does not report a value."""
+
+    at: float
+    busy_percent: int | None
+    vram_used: int | None
+    gtt_used: int | None
+    sclk_mhz: int | None
+    mclk_mhz: int | None
+    power_w: float | None
+
+
+def dpm_levels(text: str) -> tuple[list[int], int | None]:
+    """The clock levels (MHz) of a ``pp_dpm_*`` table and the current one."""
+    levels: list[int] = []
+    current: int | None = None
+    for match in _LEVEL.finditer(text):
+        levels.append(int(match.group(1)))
+        if match.group(2):
+            current = int(match.group(1))
+    return levels, current
+
+
+def _int(text: str | None) -> int | None:
+    try:
+        return int(text.strip()) if text is not None else None
+    except ValueError:
+        return None
+
+
+class GpuSampler:
+    """Polls one card, keeping its sysfs attributes open between reads."""
+
+    FIELDS = ("gpu_busy_percent", "mem_info_vram_used", "mem_info_gtt_used", "pp_dpm_sclk", "pp_dpm_mclk")
+
+    def __init__(self, card: str, probe: Probe | None = None) -> None:
+        """Open the counters of ``card`` (a ``/sys/class/drm/cardN/device`` path).
+
+        Totals and the top clock levels are read once here; they do not move
+        while the driver is loaded.
+        """
+        self.card = card
+        self.probe = probe or get_probe()
+        self.vram_total = _int(self.probe.read(f"{card}/mem_info_vram_total"))
+        self.gtt_total = _int(self.probe.read(f"{card}/mem_info_gtt_total"))
+        sclk_levels, _ = dpm_levels(self.probe.read(f"{card}/pp_dpm_sclk") or "")
+        mclk_levels, _ = dpm_levels(self.probe.read(f"{card}/pp_dpm_mclk") or "")
+        self.sclk_max = max(sclk_levels, default=None)
+        self.mclk_max = max(mclk_levels, default=None)
+        self._fds: dict[str, int] = {}
+        paths = {name: f"{card}/{name}" for name in self.FIELDS}
+        hwmon = self.probe.resolve(f"{card}/hwmon")
+        if hwmon.is_dir():
+            # power1_average on discrete boards; APUs only report power1_input.
+            for attribute in ("power1_average", "power1_input"):
+                found = sorted(hwmon.glob(f"hwmon*/{attribute}"))
+                if found:
+                    paths["power"] = f"{card}/hwmon/{found[0].parent.name}/{attribute}"
+                    break
+        for name, path in paths.items():
+            try:
+                self._fds[name] = os.open(self.probe.resolve(path), os.O_RDONLY)
+            except OSError:
+                continue
+
+    def _read(self, name: str) -> str | None:
+        fd = self._fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, 4096, 0).decode(errors="replace")
+        except OSError:
+            return None
+
+    def sample(self, now: float | None = None) -> GpuSample:
+        """Read every counter once."""
+        power = _int(self._read("power"))
+        return GpuSample(
+            at=time.monotonic() if now is None else now,
+            busy_percent=_int(self._read("gpu_busy_percent")),
+            vram_used=_int(self._read("mem_info_vram_used")),
+            gtt_used=_int(self._read("mem_info_gtt_used")),
+            sclk_mhz=dpm_levels(self._read("pp_dpm_sclk") or "")[1],
+            mclk_mhz=dpm_levels(self._read("pp_dpm_mclk") or "")[1],
+            power_w=power / 1_000_000 if power is not None else None,
+        )
+
+    def collect(
+        self,
+        duration: float,
+        interval: float = 0.1,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> list[GpuSample]:
+        """Sample every ``interval`` seconds for ``duration`` seconds (at least once).
+
+        Polls are scheduled on a fixed grid, so a slow read does not stretch
+        the window.
+        """
+        start = clock()
+        samples = [self.sample(start)]
+        tick = 1
+        while (due := start + tick * interval) < start + duration:
+            delay = due - clock()
+            if delay > 0:
+                sleep(delay)
+            samples.append(self.sample(clock()))
+            tick += 1
+        return samples
+
+    def close(self) -> None:
+        """Close the attribute file descriptors."""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def __enter__(self) -> GpuSampler:
+        """Use as a context manager that closes the descriptors."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the descriptors."""
+        self.close()
@@ -0,0 +1,57 @@
+"""The small SQLite databases msai keeps for itself.
+
+Doctor history and benchmark results live under the XDG state directory
+(``~/.local/state/msai``), the model index under the cache directory
+(``~/.cache/msai``). All of them open connections the same way: WAL mode
+with ``synchronous=NORMAL`` (a commit is an append to the log, fsynced at
+checkpoints), foreign keys on, rows by column name, and the schema created
+or upgraded when ``PRAGMA user_version`` does not match. Only writes create
+a database: reading one that does not exist yet finds it empty and leaves
+nothing behind on disk.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+STATE_DIR = Path(os.environ.get("XDG_STATE_HOME", str(Path.home() / ".local" / "state"))) / "msai"
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))) / "msai"
+
+
+@contextmanager
+def connect(path: Path, schema: str, version: int, *, create: bool = True) -> Iterator[sqlite3.Connection]:
+    """Open ``path`` (creating its directory), apply ``schema`` if needed, and yield one transaction.
+
+    Args:
+        path: Database file.
+        schema: Idempotent DDL (``CREATE ... IF NOT EXISTS``) for the current version.
+        version: Schema version; ``schema`` runs whenever the file's differs.
+        create: Whether a missing ``path`` is created. When False and it is
+            missing, the block gets an empty in-memory database with the
+            same schema instead, so a read finds nothing and writes nothing.
+
+    Yields:
+        A connection inside a transaction that commits when the block exits
+        normally and rolls back otherwise; the connection is then closed.
+    """
+    memory = not create and not path.exists()
+    if not memory:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(":memory:" if memory else path, timeout=5.0)
+    try:
+        conn.row_factory = sqlite3.Row
+        if not memory:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != version:
+            conn.executescript(schema)
+            conn.execute(f"PRAGMA user_version={version}")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
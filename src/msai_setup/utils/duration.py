@@ -0,0 +1,20 @@
+"""Human-friendly duration parsing for CLI options (``10s``, ``2m``, ``500ms``)."""
+
+import re
+
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?\s*$")
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration into seconds; a bare number means seconds.
+
+    Raises:
+        ValueError: If the value is not a non-negative number with an
+            optional ms/s/m/h/d suffix.
+    """
+    match = _DURATION.match(value.lower())
+    if not match:
+        raise ValueError(f"invalid duration {value!r} (expected e.g. 10s, 2m, 500ms)")
+    number, unit = match.groups()
+    return float(number) * _UNITS[unit or "s"]
@@ -1,10 +1,10 @@
 """Rich console output formatting utilities."""
 
-from enum import Enum
-
 from rich.console import Console
 from rich.theme import Theme
 
+from msai_setup.utils.status import CheckStatus
+
 # Custom theme for consistent styling
 custom_theme = Theme(
     {
@@ -19,14 +19,9 @@ custom_theme = Theme(
 
 console = Console(theme=custom_theme)
 
+GIB = 1024**3
 
-class CheckStatus(Enum):
-    """Status of a health check."""
-
-    OK = "ok"
-    WARN = "warn"
-    FAIL = "fail"
-    SKIP = "skip"
+__all__ = ["CheckStatus", "console", "print_header", "print_status", "print_summary"]
 
 
 STATUS_SYMBOLS = {
@@ -34,9 +29,15 @@ STATUS_SYMBOLS = {
     CheckStatus.WARN: ("[WARN]", "warn"),
     CheckStatus.FAIL: ("[FAIL]", "fail"),
     CheckStatus.SKIP: ("[SKIP]", "dim"),
+    CheckStatus.TIMEOUT: ("[TIMEOUT]", "fail"),
 }
 
 
+def format_gib(size: float) -> str:
+    """A byte count in GiB, to one decimal place."""
+    return f"{size / GIB:.1f} GiB"
+
+
 def print_header(title: str) -> None:
     """Print a section header."""
     console.print(f"\n[header]{title}[/header]")
@@ -52,7 +53,7 @@ def print_status(
     """Print a status line with optional details and fix suggestion.
 
     Args:
-        status: The check status (OK, WARN, FAIL, SKIP).
+        status: The check status (OK, WARN, FAIL, SKIP, TIMEOUT).
         message: The main status message.
         detail: Optional detail/explanation line.
         fix: Optional fix command suggestion.
@@ -67,7 +68,7 @@ def print_status(
         console.print(f"         Run: [info]{fix}[/info]")
 
 
-def print_summary(passed: int, warnings: int, failed: int) -> None:
+def print_summary(passed: int, warnings: int, failed: int, timed_out: int = 0) -> None:
     """Print a summary of check results."""
     parts: list[str] = []
     if passed:
@@ -76,5 +77,7 @@ def print_summary(passed: int, warnings: int, failed: int) -> None:
         parts.append(f"[warn]{warnings} warning{'s' if warnings != 1 else ''}[/warn]")
     if failed:
         parts.append(f"[fail]{failed} failed[/fail]")
+    if timed_out:
+        parts.append(f"[fail]{timed_out} timed out[/fail]")
 
     console.print(f"\nSummary: {', '.join(parts)}")
@@ -0,0 +1,298 @@
+"""Reading GGUF model headers without loading the model.
+
+A GGUF file starts with a header: magic, version, tensor and metadata
+counts, then the metadata key/value pairs (architecture, layer and head
+counts, context length, the tokenizer's vocabulary...) and one info record
+per tensor (name, shape, type, offset into the data section). The tensor
+data, which is nearly all of the file, follows.
+
+``read_gguf`` maps the file with ``mmap`` and walks the header in place, so
+only the pages holding the header are ever read from disk; a 60 GB model
+costs a few MB of I/O. Large arrays (the vocabulary) are skipped, only their
+length is kept. Tensor sizes come from the gaps between tensor offsets, which
+counts alignment padding and needs no table of quantization block sizes.
+Models split into ``-00001-of-0000N.gguf`` shards are read as one.
+"""
+
+from __future__ import annotations
+
+import math
+import mmap
+import re
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+GGUF_MAGIC = b"GGUF"
+
+_DEFAULT_ALIGNMENT = 32
+
+# Arrays longer than this are skipped rather than decoded (tokenizer tokens, merges, scores).
+_ARRAY_KEEP = 1024
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+# GGUF metadata value types with a fixed size.
+_SCALARS: dict[int, struct.Struct] = {
+    0: struct.Struct("<B"),
+    1: struct.Struct("<b"),
+    2: struct.Struct("<H"),
+    3: struct.Struct("<h"),
+    4: struct.Struct("<I"),
+    5: struct.Struct("<i"),
+    6: struct.Struct("<f"),
+    7: struct.Struct("<?"),
+    10: struct.Struct("<Q"),
+    11: struct.Struct("<q"),
+    12: struct.Struct("<d"),
+}
+_STRING = 8
+_ARRAY = 9
+
+# general.file_type (llama.cpp's llama_ftype): the quantization most tensors use.
+FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 19: "IQ2_XXS", 20: "IQ2_XS", 21: "Q2_K_S",
+    22: "IQ3_XS", 23: "IQ3_XXS", 24: "IQ1_S", 25: "IQ4_NL", 26: "IQ3_S", 27: "IQ3_M",
+    28: "IQ2_S", 29: "IQ2_M", 30: "IQ4_XS", 31: "IQ1_M", 32: "BF16", 36: "TQ1_0",
+    37: "TQ2_0", 38: "MXFP4_MOE",
+}  # fmt: skip
+
+# Bytes per element of llama.cpp's KV cache types (--cache-type-k/-v); quantized types pack 32 per block.
+CACHE_TYPES = {
+    "f32": 4.0,
+    "f16": 2.0,
+    "bf16": 2.0,
+    "q8_0": 34 / 32,
+    "q5_1": 24 / 32,
+    "q5_0": 22 / 32,
+    "q4_1": 20 / 32,
+    "q4_0": 18 / 32,
+    "iq4_nl": 18 / 32,
+}
+
+_SHARD = re.compile(r"^(.*)-(\d{5})-of-(\d{5})\.gguf$")
+
+
+class GGUFError(ValueError):
+    """Raised when a file is not GGUF or its header is truncated or corrupt."""
+
+
+@dataclass(frozen=True)
+class SkippedArray:
+    """A metadata array too long to be worth decoding; only its size is kept."""
+
+    item_type: int
+    count: int
+
+
+class _Header:
+    """A cursor over a mapped GGUF header."""
+
+    def __init__(self, buffer: mmap.mmap) -> None:
+        self.buffer = buffer
+        self.pos = 0
+
+    def unpack(self, layout: struct.Struct) -> Any:
+        value = layout.unpack_from(self.buffer, self.pos)[0]
+        self.pos += layout.size
+        return value
+
+    def skip(self, size: int) -> None:
+        if size < 0 or self.pos + size > len(self.buffer):
+            raise GGUFError(f"header runs past the end of the file at byte {self.pos}")
+        self.pos += size
+
+    def string(self) -> str:
+        size = self.unpack(_U64)
+        start = self.pos
+        self.skip(size)
+        return self.buffer[start : self.pos].decode("utf-8", "replace")
+
+    def value(self, kind: int) -> Any:
+        if kind in _SCALARS:
+            return self.unpack(_SCALARS[kind])
+        if kind == _STRING:
+            return self.string()
+        if kind != _ARRAY:
+            raise GGUFError(f"unknown metadata type {kind} at byte {self.pos}")
+        item, count = self.unpack(_U32), self.unpack(_U64)
+        if item in _SCALARS:
+            layout = _SCALARS[item]
+            if count > _ARRAY_KEEP:
+                self.skip(count * layout.size)
+                return SkippedArray(item, count)
+            values = struct.unpack_from(f"<{count}{layout.format[-1]}", self.buffer, self.pos)
+            self.skip(count * layout.size)
+            return list(values)
+        if item == _STRING:
+            if count > _ARRAY_KEEP:
+                for _ in range(count):
+                    self.skip(self.unpack(_U64))
+                return SkippedArray(item, count)
+            return [self.string() for _ in range(count)]
+        raise GGUFError(f"unsupported array item type {item} at byte {self.pos}")
+
+
+@dataclass
+class _Part:
+    version: int
+    metadata: dict[str, Any]
+    tensor_count: int
+    tensor_bytes: int
+    parameters: int
+
+
+def _read_part(path: Path) -> _Part:
+    try:
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:4] != GGUF_MAGIC:
+                raise GGUFError(f"{path}: not a GGUF file")
+            header = _Header(buffer)
+            header.pos = 4
+            version = header.unpack(_U32)
+            if version not in (2, 3):
+                raise GGUFError(f"{path}: unsupported GGUF version {version}")
+            tensor_count, kv_count = header.unpack(_U64), header.unpack(_U64)
+            metadata: dict[str, Any] = {}
+            for _ in range(kv_count):
+                key = header.string()
+                metadata[key] = header.value(header.unpack(_U32))
+            offsets: list[int] = []
+            parameters = 0
+            for _ in range(tensor_count):
+                header.skip(header.unpack(_U64))
+                dims = [header.unpack(_U64) for _ in range(header.unpack(_U32))]
+                header.skip(_U32.size)
+                offsets.append(header.unpack(_U64))
+                parameters += math.prod(dims)
+            alignment = int(metadata.get("general.alignment", _DEFAULT_ALIGNMENT)) or _DEFAULT_ALIGNMENT
+            data_start = -(-header.pos // alignment) * alignment
+            size = len(buffer)
+    except struct.error as e:
+        raise GGUFError(f"{path}: truncated header ({e})") from e
+    except (OSError, ValueError) as e:
+        if isinstance(e, GGUFError):
+            raise
+        raise GGUFError(f"{path}: cannot map file ({e})") from e
+    tensor_bytes = size - data_start - min(offsets) if offsets else 0
+    return _Part(version, metadata, tensor_count, max(0, tensor_bytes), parameters)
+
+
+@dataclass
+class GGUFModel:
+    """A model's header: metadata, tensor totals, and the shape facts memory planning needs."""
+
+    path: Path
+    version: int
+    metadata: dict[str, Any]
+    tensor_count: int
+    tensor_bytes: int
+    parameters: int
+    files: list[Path] = field(default_factory=list)
+
+    def _arch(self, key: str) -> Any:
+        return self.metadata.get(f"{self.architecture}.{key}")
+
+    @property
+    def architecture(self) -> str:
+        """``general.architecture``, e.g. ``llama``, ``qwen3moe``, ``gpt-oss``."""
+        return str(self.metadata.get("general.architecture", "unknown"))
+
+    @property
+    def name(self) -> str:
+        """``general.name``, or the file name."""
+        return str(self.metadata.get("general.name") or self.path.name)
+
+    @property
+    def quantization(self) -> str | None:
+        """The file type, e.g. ``Q4_K_M``, if the file declares a known one."""
+        file_type = self.metadata.get("general.file_type")
+        return FILE_TYPES.get(file_type) if isinstance(file_type, int) else None
+
+    @property
+    def context_length(self) -> int | None:
+        """The context the model was trained for."""
+        value = self._arch("context_length")
+        return int(value) if isinstance(value, int) else None
+
+    @property
+    def block_count(self) -> int:
+        """Transformer layers."""
+        return int(self._arch("block_count") or 0)
+
+    @property
+    def embedding_length(self) -> int:
+        """Hidden size."""
+        return int(self._arch("embedding_length") or 0)
+
+    @property
+    def vocab_size(self) -> int:
+        """Tokens in the vocabulary."""
+        tokens = self.metadata.get("tokenizer.ggml.tokens")
+        if isinstance(tokens, SkippedArray):
+            return tokens.count
+        if isinstance(tokens, list):
+            return len(tokens)
+        return int(self._arch("vocab_size") or 0)
+
+    def _per_layer(self, key: str, default: int = 0) -> list[int]:
+        value = self._arch(key)
+        if isinstance(value, list):
+            return [int(item) for item in value]
+        return [int(value if value is not None else default)] * self.block_count
+
+    def kv_bytes_per_token(self, cache_type: str = "f16") -> float:
+        """KV cache bytes one token of context takes across all layers.
+
+        Layers without KV heads (recurrent layers of hybrid models) take
+        none. Models with multi-head latent attention (DeepSeek) cache the
+        compressed latent instead of per-head keys and values. Sliding-window
+        layers are counted at full context, so for those models this is an
+        upper bound.
+
+        Raises:
+            KeyError: If ``cache_type`` is not one of ``CACHE_TYPES``.
+        """
+        element = CACHE_TYPES[cache_type]
+        if (rank := self._arch("attention.kv_lora_rank")) is not None:
+            return self.block_count * (int(rank) + int(self._arch("rope.dimension_count") or 0)) * element
+        heads = self._per_layer("attention.head_count")
+        heads_kv = self._per_layer("attention.head_count_kv", default=max(heads, default=0))
+        head_dim = self.embedding_length // max(heads, default=1) if any(heads) else 0
+        key = int(self._arch("attention.key_length") or head_dim)
+        value = int(self._arch("attention.value_length") or head_dim)
+        return sum(heads_kv) * (key + value) * element
+
+
+def shard_paths(path: Path, count: int) -> list[Path]:
+    """All shards of a split model, given any one of them."""
+    match = _SHARD.match(path.name)
+    if match is None:
+        return [path]
+    return [path.with_name(f"{match.group(1)}-{index:05d}-of-{count:05d}.gguf") for index in range(1, count + 1)]
+
+
+def read_gguf(path: Path) -> GGUFModel:
+    """Read a model's header (and its other shards' if it is split).
+
+    Raises:
+        GGUFError: If a file is missing, not GGUF, or its header is corrupt.
+    """
+    first = _read_part(path)
+    count = int(first.metadata.get("split.count", 1) or 1)
+    files = shard_paths(path, count) if count > 1 else [path]
+    parts = [first if shard == path else _read_part(shard) for shard in files]
+    head = next((part for part in parts if "general.architecture" in part.metadata), first)
+    return GGUFModel(
+        path=files[0],
+        version=head.version,
+        metadata=head.metadata,
+        tensor_count=sum(part.tensor_count for part in parts),
+        tensor_bytes=sum(part.tensor_bytes for part in parts),
+        parameters=sum(part.parameters for part in parts),
+        files=files,
+    )
@@ -0,0 +1,291 @@
+"""In-process probes of kernel state under /proc, /sys and /etc.
+
+Most of what the doctor needs to know about the host is a file read away:
+``/proc/meminfo``, ``/proc/cpuinfo``, ``/proc/modules``, the KFD topology
+under ``/sys/class/kfd``. Reading those directly is far cheaper than forking
+``grep``, ``lsmod``, ``uname`` or ``which`` for each check.
+
+Every path is resolved under a configurable sysroot (``MSAI_SYSROOT``, default
+``/``) so the probes can be pointed at a fixture tree in tests. The PATH index
+used for executable lookups is reused until one of the PATH directories
+changes, so binaries installed mid-process (a fix, ``msai doctor watch``) are
+found without re-scanning PATH on every lookup.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class PciDevice:
+    """A PCI function as seen in /sys/bus/pci/devices."""
+
+    address: str
+    vendor: str
+    device: str
+    pci_class: str
+    driver: str | None
+
+    @property
+    def is_display(self) -> bool:
+        """True for VGA/display controllers (PCI base class 0x03)."""
+        return self.pci_class.startswith("0x03")
+
+
+@dataclass(frozen=True)
+class KfdNode:
+    """One node of the KFD (ROCm kernel driver) topology."""
+
+    node_id: int
+    name: str
+    gfx_target_version: int
+    simd_count: int
+
+    @property
+    def is_gpu(self) -> bool:
+        """CPU nodes report zero SIMDs and no gfx target."""
+        return self.simd_count > 0 and self.gfx_target_version > 0
+
+    @property
+    def gfx_target(self) -> str:
+        """The gfx name, e.g. 110501 -> 'gfx1151' (minor and step are hex digits)."""
+        version = self.gfx_target_version
+        major, minor, step = version // 10000, (version // 100) % 100, version % 100
+        return f"gfx{major}{minor:x}{step:x}"
+
+
+class Probe:
+    """Reads host state from files under a sysroot, without spawning."""
+
+    def __init__(self, sysroot: str | os.PathLike[str] = "/", *, path: str | None = None) -> None:
+        """Create a probe rooted at ``sysroot``.
+
+        Args:
+            sysroot: Directory standing in for ``/``.
+            path: PATH string for executable lookups; defaults to $PATH.
+                Its directories are resolved under the sysroot as well.
+        """
+        self.sysroot = Path(sysroot)
+        self._path = path
+        self._path_index: dict[str, str] | None = None
+        self._path_key: tuple[tuple[str, int | None], ...] = ()
+        self._lock = threading.Lock()
+
+    def resolve(self, path: str) -> Path:
+        """Map an absolute host path onto the sysroot."""
+        return self.sysroot / path.lstrip("/")
+
+    def exists(self, path: str) -> bool:
+        """Whether a host path exists."""
+        return self.resolve(path).exists()
+
+    def read(self, path: str) -> str | None:
+        """Read a host file as text, or None if it is missing or unreadable."""
+        try:
+            return self.resolve(path).read_text(errors="replace")
+        except OSError:
+            return None
+
+    # -- /proc --------------------------------------------------------------
+
+    def meminfo(self) -> dict[str, int]:
+        """``/proc/meminfo`` as {field: kB} (unitless counters kept as-is)."""
+        fields: dict[str, int] = {}
+        for line in (self.read("/proc/meminfo") or "").splitlines():
+            key, _, rest = line.partition(":")
+            value = rest.split()
+            if value and value[0].isdigit():
+                fields[key.strip()] = int(value[0])
+        return fields
+
+    def cpu_model(self) -> str | None:
+        """The first ``model name`` in ``/proc/cpuinfo``."""
+        for line in (self.read("/proc/cpuinfo") or "").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "model name":
+                return value.strip()
+        return None
+
+    def loaded_modules(self) -> set[str]:
+        """Names of the loadable modules listed in ``/proc/modules``."""
+        text = self.read("/proc/modules") or ""
+        return {line.split()[0] for line in text.splitlines() if line.strip()}
+
+    def module_loaded(self, name: str) -> bool:
+        """Whether a module is loaded, or built in (present in /sys/module)."""
+        return name in self.loaded_modules() or self.exists(f"/sys/module/{name}")
+
+    def kernel_release(self) -> str | None:
+        """The running kernel release (what ``uname -r`` prints)."""
+        text = self.read("/proc/sys/kernel/osrelease")
+        return text.strip() if text else None
+
+    def kernel_cmdline(self) -> list[str]:
+        """The kernel command line, split into parameters."""
+        return (self.read("/proc/cmdline") or "").split()
+
+    def buddyinfo(self) -> list[int]:
+        """Free blocks per allocation order (index 0 = one page), summed over every node and zone."""
+        orders: list[int] = []
+        for line in (self.read("/proc/buddyinfo") or "").splitlines():
+            # "Node 0, zone   Normal   1203    817 ..." - the counts follow the zone name.
+            counts = [int(value) for value in line.split()[4:] if value.isdigit()]
+            orders += [0] * (len(counts) - len(orders))
+            for order, count in enumerate(counts):
+                orders[order] += count
+        return orders
+
+    # -- /etc ---------------------------------------------------------------
+
+    def os_release(self) -> dict[str, str]:
+        """``/etc/os-release`` (falling back to ``/usr/lib/os-release``)."""
+        text = self.read("/etc/os-release") or self.read("/usr/lib/os-release") or ""
+        fields: dict[str, str] = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition("=")
+            if sep and not key.startswith("#"):
+                fields[key.strip()] = value.strip().strip("\"'")
+        return fields
+
+    # -- /sys ---------------------------------------------------------------
+
+    def pci_devices(self) -> list[PciDevice]:
+        """Every PCI function, with its bound driver if any."""
+        root = self.resolve("/sys/bus/pci/devices")
+        if not root.is_dir():
+            return []
+        devices: list[PciDevice] = []
+        for entry in sorted(root.iterdir()):
+            driver_link = entry / "driver"
+            driver = Path(os.readlink(driver_link)).name if driver_link.is_symlink() else None
+            devices.append(
+                PciDevice(
+                    address=entry.name,
+                    vendor=_read_stripped(entry / "vendor"),
+                    device=_read_stripped(entry / "device"),
+                    pci_class=_read_stripped(entry / "class"),
+                    driver=driver,
+                )
+            )
+        return devices
+
+    def iommu_group_count(self) -> int:
+        """Number of IOMMU groups (0 when the IOMMU is off)."""
+        root = self.resolve("/sys/kernel/iommu_groups")
+        return sum(1 for _ in root.iterdir()) if root.is_dir() else 0
+
+    def kfd_nodes(self) -> list[KfdNode]:
+        """The KFD topology nodes (empty when amdgpu/KFD is not up)."""
+        root = self.resolve("/sys/class/kfd/kfd/topology/nodes")
+        if not root.is_dir():
+            return []
+        nodes: list[KfdNode] = []
+        for entry in root.iterdir():
+            if not entry.name.isdigit():
+                continue
+            props: dict[str, int] = {}
+            for line in _read_stripped(entry / "properties").splitlines():
+                key, _, value = line.partition(" ")
+                if value.strip().isdigit():
+                    props[key] = int(value)
+            nodes.append(
+                KfdNode(
+                    node_id=int(entry.name),
+                    name=_read_stripped(entry / "name"),
+                    gfx_target_version=props.get("gfx_target_version", 0),
+                    simd_count=props.get("simd_count", 0),
+                )
+            )
+        return sorted(nodes, key=lambda node: node.node_id)
+
+    def amdgpu_cards(self) -> list[str]:
+        """Device directories (``/sys/class/drm/cardN/device``) of amdgpu GPUs.
+
+        A card counts as amdgpu when it exposes the driver's memory
+        accounting (``mem_info_gtt_total``); connectors like ``card1-DP-1``
+        are skipped.
+        """
+        root = self.resolve("/sys/class/drm")
+        if not root.is_dir():
+            return []
+        cards = [entry.name for entry in root.iterdir() if entry.name[4:].isdigit() and entry.name.startswith("card")]
+        return [
+            f"/sys/class/drm/{name}/device"
+            for name in sorted(cards, key=lambda name: int(name[4:]))
+            if self.exists(f"/sys/class/drm/{name}/device/mem_info_gtt_total")
+        ]
+
+    # -- executables --------------------------------------------------------
+
+    def which(self, cmd: str) -> str | None:
+        """Resolve an executable name via an index of PATH, rebuilt when a PATH directory changes."""
+        if "/" in cmd:
+            target = self.resolve(cmd)
+            return cmd if target.is_file() and os.access(target, os.X_OK) else None
+        return self._index().get(cmd)
+
+    def _index(self) -> dict[str, str]:
+        # Installing or removing a binary bumps its directory's mtime; a few
+        # stat calls per lookup are far cheaper than re-scanning every entry.
+        directories = self._path_directories()
+        key = tuple((directory, self._mtime(directory)) for directory in directories)
+        with self._lock:
+            if self._path_index is None or key != self._path_key:
+                self._path_index = self._build_index(directories)
+                self._path_key = key
+            return self._path_index
+
+    def _path_directories(self) -> list[str]:
+        path = self._path if self._path is not None else os.environ.get("PATH", os.defpath)
+        return [directory for directory in path.split(os.pathsep) if directory]
+
+    def _mtime(self, directory: str) -> int | None:
+        try:
+            return self.resolve(directory).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _build_index(self, directories: list[str]) -> dict[str, str]:
+        index: dict[str, str] = {}
+        for directory in directories:
+            try:
+                entries = list(os.scandir(self.resolve(directory)))
+            except OSError:
+                continue
+            for entry in entries:
+                # Earlier PATH entries win, as in the shell.
+                if entry.name in index:
+                    continue
+                try:
+                    if entry.is_file() and os.access(entry.path, os.X_OK):
+                        index[entry.name] = os.path.join(directory, entry.name)
+                except OSError:
+                    continue
+        return index
+
+
+def _read_stripped(path: Path) -> str:
+    try:
+        return path.read_text(errors="replace").strip()
+    except OSError:
+        return ""
+
+
+_probe = Probe(os.environ.get("MSAI_SYSROOT", "/"))
+
+
+def get_probe() -> Probe:
+    """The process-wide probe used by the doctor checks."""
+    return _probe
+
+
+def set_probe(probe: Probe) -> Probe:
+    """Swap the process-wide probe (e.g. for a fixture sysroot); returns the old one."""
+    global _probe
+    previous = _probe
+    _probe = probe
+    return previous
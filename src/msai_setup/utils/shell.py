@@ -1,8 +1,17 @@
 """Subprocess helpers for running shell commands."""
 
+import os
+import selectors
 import shlex
+import signal
 import subprocess
-from dataclasses import dataclass
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from msai_setup.utils.probe import get_probe
 
 
 @dataclass
@@ -24,12 +33,182 @@ class CommandResult:
         return self.stdout.strip()
 
 
+_CANCELLED = "Cancelled: deadline reached"
+
+
+@dataclass(frozen=True)
+class ChildUsage:
+    """Resource usage of one reaped child process (from ``os.wait4``).
+
+    CPU time and max RSS cover the direct child only; grandchildren it did
+    not wait for itself are not included.
+    """
+
+    argv: tuple[str, ...]
+    wall_s: float
+    user_s: float
+    system_s: float
+    maxrss_kb: int
+
+    @property
+    def cpu_s(self) -> float:
+        """User plus system CPU seconds."""
+        return self.user_s + self.system_s
+
+
+class ProcessScope:
+    """The child processes spawned on behalf of one unit of work.
+
+    ``run_command`` starts every child in its own session, so its process
+    group holds anything the child forks too. ``cancel()`` kills those whole
+    groups (not just the direct children) and makes any later ``run_command``
+    in the scope return immediately, which is how the doctor enforces check
+    budgets and the run deadline on threads it cannot interrupt. The scope
+    also collects the resource usage of every child it reaped.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty, live scope."""
+        self._lock = threading.Lock()
+        self._procs: set[subprocess.Popen[bytes]] = set()
+        self._usage: list[ChildUsage] = []
+        self.cancelled = False
+
+    def add(self, proc: subprocess.Popen[bytes]) -> None:
+        """Track a freshly spawned child (killed at once if already cancelled)."""
+        with self._lock:
+            if not self.cancelled:
+                self._procs.add(proc)
+                return
+        _kill_group(proc)
+
+    def discard(self, proc: subprocess.Popen[bytes], usage: ChildUsage | None = None) -> None:
+        """Stop tracking a child that has exited, recording its usage."""
+        with self._lock:
+            self._procs.discard(proc)
+            if usage is not None:
+                self._usage.append(usage)
+
+    def usage(self) -> list[ChildUsage]:
+        """Usage of the children reaped so far, in spawn-completion order."""
+        with self._lock:
+            return list(self._usage)
+
+    def cancel(self) -> None:
+        """Kill every live child's process group and refuse further spawns."""
+        with self._lock:
+            self.cancelled = True
+            procs = list(self._procs)
+            self._procs.clear()
+        for proc in procs:
+            _kill_group(proc)
+
+
+_local = threading.local()
+
+
+def current_scope() -> ProcessScope | None:
+    """The ProcessScope active on this thread, if any."""
+    return getattr(_local, "scope", None)
+
+
+@contextmanager
+def process_scope(scope: ProcessScope) -> Iterator[ProcessScope]:
+    """Attribute every command run on this thread within the block to ``scope``."""
+    previous = current_scope()
+    _local.scope = scope
+    try:
+        yield scope
+    finally:
+        _local.scope = previous
+
+
+def _scope_cancelled() -> bool:
+    scope = current_scope()
+    return scope is not None and scope.cancelled
+
+
+def _kill_group(proc: subprocess.Popen[bytes]) -> None:
+    """SIGKILL a child's whole process group, ignoring already-gone groups."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _key_locks() -> dict[tuple[str, ...], threading.Lock]:
+    return {}
+
+
+def _entries() -> dict[tuple[str, ...], CommandResult]:
+    return {}
+
+
+@dataclass
+class CommandCache:
+    """Run-scoped memo of captured command output, keyed by argv.
+
+    Several doctor checks probe the same thing (``zpool status tank``,
+    ``tailscale status --json``, ``systemctl is-active``). Inside a
+    ``command_cache()`` block, ``run_command(..., cached=True)`` forks each
+    distinct argv once and replays the result afterwards. Concurrent callers
+    asking for the same argv wait for the first one instead of racing it.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _key_locks: dict[tuple[str, ...], threading.Lock] = field(default_factory=_key_locks, repr=False)
+    _entries: dict[tuple[str, ...], CommandResult] = field(default_factory=_entries, repr=False)
+
+    def get(self, args: tuple[str, ...], run: Callable[[], CommandResult]) -> CommandResult:
+        """Return the cached result for ``args``, calling ``run`` on a miss."""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(args, threading.Lock())
+        with key_lock:
+            cached = self._entries.get(args)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+            result = run()
+            with self._lock:
+                self.misses += 1
+            # A spawn cut short by cancellation says nothing about the probe;
+            # leave it uncached so another check can still run it.
+            if not _scope_cancelled():
+                self._entries[args] = result
+            return result
+
+
+_active_cache: CommandCache | None = None
+
+
+@contextmanager
+def command_cache() -> Iterator[CommandCache]:
+    """Activate a fresh CommandCache for the duration of the block.
+
+    The cache is process-wide (not thread-local) so checks running on worker
+    threads share it.
+    """
+    global _active_cache
+    previous = _active_cache
+    cache = CommandCache()
+    _active_cache = cache
+    try:
+        yield cache
+    finally:
+        _active_cache = previous
+
+
 def run_command(
     cmd: str | list[str],
     *,
     check: bool = False,
     timeout: float | None = 30.0,
     capture: bool = True,
+    cached: bool = False,
+    on_line: Callable[[str], None] | None = None,
 ) -> CommandResult:
     """Run a shell command and return the result.
 
@@ -38,6 +217,13 @@ def run_command(
         check: If True, raise CalledProcessError on non-zero exit.
         timeout: Timeout in seconds, or None for no timeout.
         capture: If True, capture stdout/stderr. If False, let them pass through.
+        cached: If True and a ``command_cache()`` is active, reuse the output
+            of an identical earlier call instead of spawning again. Only
+            applies to captured, non-raising calls.
+        on_line: If given, each stdout line (without its newline) is handed
+            to it as soon as it arrives and stdout is not kept, so listings
+            of any length are processed in constant memory. The result's
+            ``stdout`` is then empty. Never cached.
 
     Returns:
         CommandResult with returncode, stdout, and stderr.
@@ -51,39 +237,125 @@ def run_command(
     else:
         args = list(cmd)
 
+    cache = _active_cache
+    if cached and cache is not None and capture and not check and on_line is None:
+        return cache.get(tuple(args), lambda: _spawn(args, check=False, timeout=timeout, capture=True))
+    return _spawn(args, check=check, timeout=timeout, capture=capture, on_line=on_line)
+
+
+def _spawn(
+    args: list[str],
+    *,
+    check: bool,
+    timeout: float | None,
+    capture: bool,
+    on_line: Callable[[str], None] | None = None,
+) -> CommandResult:
+    """Fork one command in its own process group and wrap its outcome.
+
+    On timeout (or when the current ProcessScope is cancelled) the whole
+    group is killed, so grandchildren such as a hung ``vulkaninfo`` helper do
+    not outlive the probe. The child is reaped with ``os.wait4`` so its CPU
+    time and max RSS can be credited to the scope.
+    """
+    scope = current_scope()
+    if scope is not None and scope.cancelled:
+        return CommandResult(returncode=-1, stdout="", stderr=_CANCELLED)
+
+    pipe = subprocess.PIPE if capture else None
+    started = time.monotonic()
     try:
-        result = subprocess.run(
-            args,
-            capture_output=capture,
-            text=True,
-            timeout=timeout,
-            check=check,
-        )
-        return CommandResult(
-            returncode=result.returncode,
-            stdout=result.stdout if capture else "",
-            stderr=result.stderr if capture else "",
-        )
-    except subprocess.CalledProcessError as e:
-        if check:
-            raise
-        return CommandResult(
-            returncode=e.returncode,
-            stdout=e.stdout or "",
-            stderr=e.stderr or "",
-        )
+        proc = subprocess.Popen(args, stdout=pipe, stderr=pipe, start_new_session=True)
     except FileNotFoundError:
         return CommandResult(
             returncode=127,
             stdout="",
             stderr=f"Command not found: {args[0]}",
         )
-    except subprocess.TimeoutExpired:
+
+    if scope is not None:
+        scope.add(proc)
+    expired = threading.Event()
+
+    def _expire() -> None:
+        expired.set()
+        _kill_group(proc)
+
+    watchdog = threading.Timer(timeout, _expire) if timeout is not None else None
+    usage: ChildUsage | None = None
+    try:
+        if watchdog is not None:
+            watchdog.daemon = True
+            watchdog.start()
+        stdout, stderr = _drain(proc, on_line)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        usage = ChildUsage(
+            argv=tuple(args),
+            wall_s=time.monotonic() - started,
+            user_s=rusage.ru_utime,
+            system_s=rusage.ru_stime,
+            maxrss_kb=rusage.ru_maxrss,
+        )
+    except BaseException:
+        # KeyboardInterrupt never reaches a child in its own session.
+        _kill_group(proc)
+        proc.wait()
+        raise
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+        if scope is not None:
+            scope.discard(proc, usage)
+
+    if expired.is_set():
         return CommandResult(
             returncode=-1,
             stdout="",
             stderr=f"Command timed out after {timeout} seconds",
         )
+    if scope is not None and scope.cancelled:
+        return CommandResult(returncode=-1, stdout="", stderr=_CANCELLED)
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args, stdout, stderr)
+    return CommandResult(returncode=proc.returncode, stdout=stdout, stderr=stderr)
+
+
+def _drain(proc: subprocess.Popen[bytes], on_line: Callable[[str], None] | None = None) -> tuple[str, str]:
+    """Read a child's stdout and stderr to EOF without reaping it.
+
+    ``Popen.communicate`` would reap the child with ``waitpid`` and lose its
+    rusage, so the pipes are multiplexed here instead. With ``on_line``,
+    stdout is split into lines and handed over as it arrives; only the
+    unfinished last line is buffered.
+    """
+    streams = {stream: bytearray() for stream in (proc.stdout, proc.stderr) if stream is not None}
+    if not streams:
+        return "", ""
+    with selectors.DefaultSelector() as selector:
+        for stream in streams:
+            selector.register(stream, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                chunk = os.read(key.fd, 65536)
+                buffer = streams[key.fileobj]  # type: ignore[index]
+                if chunk:
+                    buffer.extend(chunk)
+                else:
+                    selector.unregister(key.fileobj)
+                if on_line is not None and key.fileobj is proc.stdout:
+                    *lines, rest = buffer.split(b"\n")
+                    if not chunk and rest:
+                        lines.append(rest)
+                        rest = bytearray()
+                    for line in lines:
+                        on_line(line.decode(errors="replace"))
+                    buffer[:] = rest
+    for stream in streams:
+        stream.close()
+    out = streams[proc.stdout] if proc.stdout is not None else b""
+    err = streams[proc.stderr] if proc.stderr is not None else b""
+    return out.decode(errors="replace"), err.decode(errors="replace")
 
 
 def run_interactive(cmd: str, *, timeout: float | None = None) -> int:
@@ -126,9 +398,8 @@ def shell_succeeds(cmd: str, *, timeout: float | None = 10.0) -> bool:
 
 
 def command_exists(cmd: str) -> bool:
-    """Check if a command exists in PATH."""
-    result = run_command(f"which {cmd}")
-    return result.success
+    """Check if a command exists in PATH (via the probe's cached PATH index)."""
+    return get_probe().which(cmd) is not None
 
 
 def get_systemd_status(unit: str) -> str:
@@ -137,7 +408,7 @@ def get_systemd_status(unit: str) -> str:
     Returns:
         Status string: 'active', 'inactive', 'failed', or 'not-found'.
     """
-    result = run_command(f"systemctl is-active {unit}")
+    result = run_command(f"systemctl is-active {unit}", cached=True)
     if result.success:
         return result.output
     if "could not be found" in result.stderr.lower():
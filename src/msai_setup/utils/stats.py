@@ -0,0 +1,23 @@
+"""Small summary statistics for sampled measurements."""
+
+from collections.abc import Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """The ``q``-th percentile (0-100) of ``values``, interpolating between ranks.
+
+    Matches ``numpy.percentile``'s default (linear) method without needing
+    numpy.
+
+    Raises:
+        ValueError: If ``values`` is empty or ``q`` is outside 0-100.
+    """
+    if not values:
+        raise ValueError("percentile of an empty sequence")
+    if not 0 <= q <= 100:
+        raise ValueError(f"percentile must be within 0-100, got {q}")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -0,0 +1,13 @@
+"""Check status values, free of any console dependency."""
+
+from enum import Enum
+
+
+class CheckStatus(Enum):
+    """Status of a health check."""
+
+    OK = "ok"
+    WARN = "warn"
+    FAIL = "fail"
+    SKIP = "skip"
+    TIMEOUT = "timeout"
@@ -0,0 +1,347 @@
+"""Structured views of ZFS command output.
+
+``zpool status -p -P`` describes every imported pool in one call: its state,
+the last or current scan (scrub or resilver), the vdev tree with each device's
+read/write/checksum error counters, and the data error summary. ``-p`` prints
+exact numbers instead of ``1.2K`` and ``-P`` full device paths, so the output
+parses without guessing. ``parse_zpool_status`` turns it into ``PoolStatus``
+objects; the doctor runs the command once per run and every ZFS check reads
+from that, whatever the number of pools (``rpool`` and ``tank`` on a ZFS-root
+install).
+
+``/proc/spl/kstat/zfs/arcstats`` holds the ARC's counters since the module
+loaded; ``parse_arcstats`` reads them and ``arc_activity`` turns two samples
+into hits and misses over the interval.
+
+``SnapshotScanner`` folds ``zfs list -H -p -t snapshot -o name,creation,used``
+into per-dataset totals one line at a time, so tens of thousands of
+auto-snapshots cost a few numbers per dataset rather than a list of names.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+
+# Allocation classes that appear as top-level entries next to the pool's root vdev.
+_CLASS_GROUPS = frozenset({"logs", "cache", "spares", "special", "dedup"})
+
+_KEY = re.compile(r"^\s*([a-z]+): ?(.*)$")
+# Section headers of a pool's report; a line under none of them continues the previous one.
+_SECTIONS = ("state", "status", "action", "see", "scan", "remove", "checkpoint", "config", "errors")
+_COUNTER = re.compile(r"^\d+(?:\.\d+)?[KMGTPE]?$")
+_SUFFIX = {"K": 10**3, "M": 10**6, "G": 10**9, "T": 10**12, "P": 10**15, "E": 10**18}
+_DATE = r"(\w{3} \w{3} +\d+ \d+:\d+:\d+ \d{4})"
+_SCAN_DONE = re.compile(r"^(scrub repaired|resilvered) (\S+) in (\S+) with (\d+) errors on " + _DATE)
+_SCAN_RUNNING = re.compile(r"^(scrub|resilver) in progress since " + _DATE)
+_SCAN_STOPPED = re.compile(r"^(scrub|resilver) (canceled|paused) (?:on|since) " + _DATE)
+_PERCENT = re.compile(r"([\d.]+)% done")
+_DATA_ERRORS = re.compile(r"^(\d+) data errors?")
+
+
+def _count(text: str) -> int:
+    """An error counter, exact with ``-p`` but tolerant of ``1.2K`` without it."""
+    if text[-1] in _SUFFIX:
+        return int(float(text[:-1]) * _SUFFIX[text[-1]])
+    return int(float(text))
+
+
+def _timestamp(text: str) -> datetime | None:
+    try:
+        return datetime.strptime(" ".join(text.split()), "%a %b %d %H:%M:%S %Y")
+    except ValueError:
+        return None
+
+
+@dataclass
+class Vdev:
+    """A node of a pool's config tree: the pool itself, a mirror/raidz, or a device."""
+
+    name: str
+    state: str | None = None
+    read: int = 0
+    write: int = 0
+    cksum: int = 0
+    note: str = ""
+    children: list[Vdev] = field(default_factory=list)
+
+    @property
+    def errors(self) -> int:
+        """Read, write and checksum errors of this node."""
+        return self.read + self.write + self.cksum
+
+    def walk(self) -> Iterator[Vdev]:
+        """This node and everything below it, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+@dataclass
+class Scan:
+    """The pool's last or current scrub/resilver, from the ``scan:`` line."""
+
+    function: str | None = None
+    state: str = "none"
+    started: datetime | None = None
+    ended: datetime | None = None
+    errors: int | None = None
+    percent_done: float | None = None
+
+    @property
+    def completed(self) -> datetime | None:
+        """When the last scrub finished, if it did."""
+        return self.ended if self.function == "scrub" and self.state == "finished" else None
+
+
+@dataclass
+class PoolStatus:
+    """One pool as reported by ``zpool status -p -P``."""
+
+    name: str
+    state: str
+    status: str = ""
+    action: str = ""
+    scan: Scan = field(default_factory=Scan)
+    removal: str = ""
+    checkpoint: str = ""
+    root: Vdev | None = None
+    groups: dict[str, list[Vdev]] = field(default_factory=dict)
+    errors: str = ""
+
+    @property
+    def data_errors(self) -> int:
+        """Permanent data errors (files with unrecoverable blocks)."""
+        match = _DATA_ERRORS.match(self.errors)
+        return int(match.group(1)) if match else 0
+
+    def vdevs(self) -> Iterator[Vdev]:
+        """Every node of the config tree, the root vdev first, then logs, cache..."""
+        if self.root is not None:
+            yield from self.root.walk()
+        for members in self.groups.values():
+            for vdev in members:
+                yield from vdev.walk()
+
+    def devices(self) -> list[Vdev]:
+        """The leaf vdevs: disks, partitions and files."""
+        return [vdev for vdev in self.vdevs() if not vdev.children and vdev is not self.root]
+
+
+def _parse_scan(text: str) -> Scan:
+    first = text.split("\n", 1)[0].strip()
+    if match := _SCAN_DONE.match(first):
+        return Scan(
+            function="scrub" if match.group(1).startswith("scrub") else "resilver",
+            state="finished",
+            ended=_timestamp(match.group(5)),
+            errors=int(match.group(4)),
+        )
+    if match := _SCAN_RUNNING.match(first):
+        percent = _PERCENT.search(text)
+        return Scan(
+            function=match.group(1),
+            state="scanning",
+            started=_timestamp(match.group(2)),
+            percent_done=float(percent.group(1)) if percent else None,
+        )
+    if match := _SCAN_STOPPED.match(first):
+        return Scan(function=match.group(1), state=match.group(2), ended=_timestamp(match.group(3)))
+    return Scan()
+
+
+def _parse_config(lines: list[str], pool: PoolStatus) -> None:
+    """Build the vdev tree from the lines under ``config:``, by indentation."""
+    stack: list[tuple[int, Vdev]] = []
+    headers: list[Vdev] = []
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[:2] == ["NAME", "STATE"]:
+            continue
+        expanded = line.expandtabs(8)
+        indent = len(expanded) - len(expanded.lstrip())
+        vdev = Vdev(name=fields[0])
+        rest = fields[1:]
+        if rest:
+            vdev.state, rest = rest[0], rest[1:]
+        if len(rest) >= 3 and all(_COUNTER.match(value) for value in rest[:3]):
+            vdev.read, vdev.write, vdev.cksum = (_count(value) for value in rest[:3])
+            rest = rest[3:]
+        vdev.note = " ".join(rest)
+
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if stack:
+            stack[-1][1].children.append(vdev)
+        elif vdev.name in _CLASS_GROUPS and vdev.state is None:
+            headers.append(vdev)
+        elif pool.root is None:
+            pool.root = vdev
+        stack.append((indent, vdev))
+    # logs, cache, spares... are headings, not vdevs: keep their members apart.
+    for header in headers:
+        pool.groups[header.name] = header.children
+
+
+def parse_zpool_status(output: str) -> dict[str, PoolStatus]:
+    """Parse ``zpool status -p -P`` output for any number of pools.
+
+    Returns:
+        Pools by name, in the order reported. Empty if no pools are imported.
+    """
+    pools: dict[str, PoolStatus] = {}
+    pool: PoolStatus | None = None
+    key: str | None = None
+    values: dict[str, list[str]] = {}
+    config: list[str] = []
+
+    def finish() -> None:
+        if pool is None:
+            return
+        pool.state = " ".join(values.get("state", [pool.state]))
+        pool.status = "\n".join(values.get("status", []))
+        pool.action = "\n".join(values.get("action", []))
+        pool.scan = _parse_scan("\n".join(values.get("scan", [])))
+        pool.removal = "\n".join(values.get("remove", []))
+        pool.checkpoint = " ".join(values.get("checkpoint", []))
+        pool.errors = " ".join(values.get("errors", []))
+        _parse_config(config, pool)
+        pools[pool.name] = pool
+
+    for line in output.splitlines():
+        match = _KEY.match(line)
+        if match and match.group(1) == "pool":
+            finish()
+            pool = PoolStatus(name=match.group(2).strip(), state="UNKNOWN")
+            key, values, config = None, {}, []
+            continue
+        if pool is None:
+            continue
+        if match and match.group(1) in _SECTIONS:
+            key = match.group(1)
+            if key != "config":
+                values.setdefault(key, []).append(match.group(2).strip())
+            continue
+        if key == "config":
+            config.append(line)
+        elif key is not None and line.strip():
+            values[key].append(line.strip())
+    finish()
+    return pools
+
+
+def parse_arcstats(text: str) -> dict[str, int]:
+    """Counters from ``/proc/spl/kstat/zfs/arcstats`` by name (the kstat header is skipped)."""
+    stats: dict[str, int] = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and fields[1].isdigit() and fields[2].lstrip("-").isdigit():
+            stats[fields[0]] = int(fields[2])
+    return stats
+
+
+@dataclass
+class ArcActivity:
+    """ARC hits and misses over an interval, split into demand and prefetch reads."""
+
+    demand_hits: int
+    demand_misses: int
+    prefetch_hits: int
+    prefetch_misses: int
+
+    @property
+    def accesses(self) -> int:
+        """All lookups in the interval."""
+        return self.demand_hits + self.demand_misses + self.prefetch_hits + self.prefetch_misses
+
+    @property
+    def hit_ratio(self) -> float | None:
+        """Hits over all lookups, or None if there were none."""
+        return (self.demand_hits + self.prefetch_hits) / self.accesses if self.accesses else None
+
+    @property
+    def demand_hit_ratio(self) -> float | None:
+        """Hits over lookups something actually waited for (what applications feel)."""
+        demand = self.demand_hits + self.demand_misses
+        return self.demand_hits / demand if demand else None
+
+
+def arc_activity(after: dict[str, int], before: dict[str, int] | None = None) -> ArcActivity:
+    """Hits and misses between two arcstats samples, or since module load without ``before``."""
+
+    def delta(*names: str) -> int:
+        return sum(after.get(name, 0) - (before.get(name, 0) if before else 0) for name in names)
+
+    return ArcActivity(
+        demand_hits=delta("demand_data_hits", "demand_metadata_hits"),
+        demand_misses=delta("demand_data_misses", "demand_metadata_misses"),
+        prefetch_hits=delta("prefetch_data_hits", "prefetch_metadata_hits"),
+        prefetch_misses=delta("prefetch_data_misses", "prefetch_metadata_misses"),
+    )
+
+
+# Name prefixes of snapshots taken by zfs-auto-snapshot and sanoid.
+AUTO_SNAPSHOT_PREFIXES = ("zfs-auto-snap", "autosnap_")
+
+
+@dataclass
+class SnapshotSet:
+    """The snapshots of one dataset, summarized."""
+
+    dataset: str
+    count: int = 0
+    used: int = 0
+    oldest: int | None = None
+    newest: int | None = None
+    auto_count: int = 0
+    newest_auto: int | None = None
+
+    @property
+    def pool(self) -> str:
+        """The pool holding the dataset."""
+        return self.dataset.split("/", 1)[0]
+
+
+class SnapshotScanner:
+    """Per-dataset snapshot counts, ages and space from a streamed ``zfs list``.
+
+    Feed it the lines of ``zfs list -H -p -t snapshot -o name,creation,used``
+    (``-p``: creation as epoch seconds, used in bytes). ``used`` is what each
+    snapshot holds on its own, so the per-dataset sum is a lower bound on the
+    space the snapshots pin; blocks shared by several snapshots are not in it.
+    """
+
+    def __init__(self) -> None:
+        """Start with no datasets."""
+        self.datasets: dict[str, SnapshotSet] = {}
+        self.malformed = 0
+
+    def add(self, line: str) -> None:
+        """Account for one listing line; lines that do not parse are counted and skipped."""
+        fields = line.split("\t")
+        dataset, _, snapshot = fields[0].partition("@")
+        try:
+            creation, used = int(fields[1]), int(fields[2])
+        except (IndexError, ValueError):
+            self.malformed += 1
+            return
+        if not snapshot:
+            self.malformed += 1
+            return
+        entry = self.datasets.get(dataset)
+        if entry is None:
+            entry = self.datasets[dataset] = SnapshotSet(dataset)
+        entry.count += 1
+        entry.used += used
+        entry.oldest = creation if entry.oldest is None else min(entry.oldest, creation)
+        entry.newest = creation if entry.newest is None else max(entry.newest, creation)
+        if snapshot.startswith(AUTO_SNAPSHOT_PREFIXES):
+            entry.auto_count += 1
+            entry.newest_auto = creation if entry.newest_auto is None else max(entry.newest_auto, creation)
+
+    @property
+    def total(self) -> int:
+        """Snapshots seen across all datasets."""
+        return sum(entry.count for entry in self.datasets.values())
@@ -0,0 +1,93 @@
+"""A minimal OpenAI-compatible server for load generator tests.
+
+Streams ``max_tokens`` one-word chunks per chat completion, after a fixed
+delay for the first token and a fixed delay between tokens, and counts how
+many requests it served at once.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *, ttft: float = 0.02, itl: float = 0.002, usage: bool = True) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.ttft = ttft
+        self.itl = itl
+        self.usage = usage
+        self.requests: list[dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def __enter__(self) -> StubServer:
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _json(self, status: int, payload: object) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/v1/models":
+            self._json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path != "/v1/chat/completions" or request.get("model") == "missing":
+            self._json(404, {"error": {"message": f"model {request.get('model')!r} not found"}})
+            return
+        server = self.server
+        with server._lock:
+            server.requests.append(request)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            time.sleep(server.ttft)
+            tokens = int(request["max_tokens"])
+            for index in range(tokens):
+                if index:
+                    time.sleep(server.itl)
+                self._event({"choices": [{"index": 0, "delta": {"content": " word"}, "finish_reason": None}]})
+            self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "length"}]})
+            if server.usage:
+                self._event({"choices": [], "usage": {"prompt_tokens": 1, "completion_tokens": tokens}})
+            self.wfile.write(b"data: [DONE]\n\n")
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+    def _event(self, payload: object) -> None:
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
@@ -0,0 +1,297 @@
+"""Tests for msai bench: llama-bench parsing, the serve load generator, the results store and comparison."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from openai_stub import StubServer
+from typer.testing import CliRunner
+
+from msai_setup.bench import BenchError
+from msai_setup.bench import env as env_mod
+from msai_setup.bench import store as store_mod
+from msai_setup.bench.llama import LlamaMatrix, parse_llama_bench
+from msai_setup.bench.serve import Lengths, ServeLoad, arrivals, run_load
+from msai_setup.bench.store import BenchStore, Measurement, env_changes
+from msai_setup.cli import app
+from msai_setup.utils.probe import Probe
+
+
+def _row(model: str, n_prompt: int, n_gen: int, avg_ts: float, stddev_ts: float = 0.5) -> dict[str, object]:
+    return {
+        "build_commit": "8c3c8b5",
+        "build_number": 4567,
+        "backends": "Vulkan",
+        "model_filename": f"/models/{model}",
+        "n_batch": 2048,
+        "n_ubatch": 512,
+        "n_gpu_layers": 99,
+        "n_prompt": n_prompt,
+        "n_gen": n_gen,
+        "avg_ts": avg_ts,
+        "stddev_ts": stddev_ts,
+    }
+
+
+@pytest.fixture(autouse=True)
+def _isolated_store(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(store_mod, "STORE_PATH", tmp_path / "state" / "bench.db")
+
+
+def test_parses_llama_bench_rows_into_cases() -> None:
+    output = json.dumps([_row("qwen3-30b.gguf", 512, 0, 1234.5, 12.0), _row("qwen3-30b.gguf", 0, 128, 61.2)])
+
+    measurements, build = parse_llama_bench(output)
+
+    assert build == "b4567 (8c3c8b5)"
+    assert [m.case for m in measurements] == [
+        "qwen3-30b.gguf pp512 b2048 ub512 ngl99 Vulkan",
+        "qwen3-30b.gguf tg128 b2048 ub512 ngl99 Vulkan",
+    ]
+    assert (measurements[0].metric, measurements[0].value, measurements[0].stddev) == ("t/s", 1234.5, 12.0)
+    assert all(m.higher_is_better for m in measurements)
+
+
+@pytest.mark.parametrize("output", ["", "not json", '{"avg_ts": 1}', '[{"n_prompt": 512}]'])
+def test_unreadable_llama_bench_output_raises(output: str) -> None:
+    with pytest.raises(BenchError):
+        parse_llama_bench(output)
+
+
+def test_matrix_from_config_and_args() -> None:
+    matrix = LlamaMatrix.from_config({"models": ["/m/a.gguf"], "prompt": "512,2048", "batch": [1024, 2048], "ngl": 0})
+
+    assert matrix.args("/m/a.gguf") == [
+        "-m", "/m/a.gguf", "-p", "512,2048", "-n", "128", "-b", "1024,2048",
+        "-ub", "512", "-ngl", "0", "-r", "3", "-o", "json",
+    ]  # fmt: skip
+
+
+def test_store_round_trip_keeps_measurement_order(tmp_path: Path) -> None:
+    store = BenchStore(tmp_path / "bench.db")
+    assert store.runs() == []
+    assert not (tmp_path / "bench.db").exists()  # reading does not create it
+    measured = [Measurement("b", "t/s", 2.0, 0.1), Measurement("a", "ttft_ms", 80.0, 0.0, higher_is_better=False)]
+
+    run_id = store.record("llama", {"kernel": "6.14.0"}, measured, now=1000.0)
+    run = store.run(run_id)
+
+    assert run is not None
+    assert (run.suite, run.at, run.env) == ("llama", 1000.0, {"kernel": "6.14.0"})
+    assert run.measurements == measured
+    assert [r.id for r in store.runs("llama")] == [run_id]
+    assert store.runs("serve") == []
+
+
+def test_previous_run_is_of_the_same_suite(tmp_path: Path) -> None:
+    store = BenchStore(tmp_path / "bench.db")
+    first = store.record("llama", {}, [], now=1.0)
+    store.record("serve", {}, [], now=2.0)
+    latest = store.record("llama", {}, [], now=3.0)
+
+    previous = store.previous(store.run(latest))  # type: ignore[arg-type]
+
+    assert previous is not None and previous.id == first
+    assert store.previous(store.run(first)) is None  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    ("before", "after", "higher_is_better", "regressed", "improved"),
+    [
+        ((100.0, 1.0), (90.0, 1.0), True, True, False),  # 10% slower
+        ((100.0, 1.0), (97.0, 1.0), True, False, False),  # under the threshold
+        ((100.0, 6.0), (90.0, 6.0), True, False, False),  # within the combined noise
+        ((100.0, 1.0), (120.0, 1.0), True, False, True),
+        ((80.0, 0.0), (100.0, 0.0), False, True, False),  # latency went up
+    ],
+)
+def test_comparison_needs_threshold_and_noise(
+    before: tuple[float, float],
+    after: tuple[float, float],
+    higher_is_better: bool,
+    regressed: bool,
+    improved: bool,
+    tmp_path: Path,
+) -> None:
+    store = BenchStore(tmp_path / "bench.db")
+    base = store.run(store.record("s", {}, [Measurement("c", "m", *before, higher_is_better)], now=1.0))
+    latest = store.run(store.record("s", {}, [Measurement("c", "m", *after, higher_is_better)], now=2.0))
+    assert base is not None and latest is not None
+
+    [comparison] = store.compare(base, latest)
+
+    assert (comparison.regressed, comparison.improved) == (regressed, improved)
+
+
+def test_env_changes_lists_only_differences() -> None:
+    before = {"kernel": "6.14.0", "mesa": "25.0.7", "rocm": "6.4.1"}
+    after = {"kernel": "6.17.0", "mesa": "25.0.7", "llama.cpp": "b4567 (8c3c8b5)"}
+
+    assert env_changes(before, after) == {
+        "kernel": ("6.14.0", "6.17.0"),
+        "llama.cpp": (None, "b4567 (8c3c8b5)"),
+        "rocm": ("6.4.1", None),
+    }
+
+
+def test_build_ids_reads_kernel_rocm_and_packages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "proc/sys/kernel").mkdir(parents=True)
+    (tmp_path / "proc/sys/kernel/osrelease").write_text("6.14.0-29-generic\n")
+    (tmp_path / "opt/rocm/.info").mkdir(parents=True)
+    (tmp_path / "opt/rocm/.info/version").write_text("6.4.1-83\n")
+    stub = tmp_path / "bin" / "dpkg-query"
+    stub.parent.mkdir()
+    # linux-firmware is not installed: dpkg-query fails but still lists the rest.
+    stub.write_text("#!/bin/sh\nprintf 'mesa-vulkan-drivers\\t25.0.7-0ubuntu0.24.04.1\\n'\nexit 1\n")
+    stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{stub.parent}:/usr/bin:/bin")
+
+    assert env_mod.build_ids(Probe(tmp_path)) == {
+        "kernel": "6.14.0-29-generic",
+        "rocm": "6.4.1-83",
+        "mesa": "25.0.7-0ubuntu0.24.04.1",
+    }
+
+
+@pytest.fixture
+def llama_bench(tmp_path: Path) -> Path:
+    """A stub llama-bench whose tg speed is read from ``tg_ts`` next to it."""
+    rows = [_row("MODEL", 512, 0, 1000.0, 5.0), _row("MODEL", 0, 128, 0.0, 0.5)]
+    template = json.dumps(rows).replace("/models/MODEL", "$model").replace('"avg_ts": 0.0', '"avg_ts": $tg')
+    stub = tmp_path / "llama-bench"
+    stub.write_text(
+        "#!/bin/sh\n"
+        'while [ $# -gt 0 ]; do [ "$1" = -m ] && model=$2; shift; done\n'
+        f"tg=$(cat {tmp_path / 'tg_ts'})\n"
+        f"cat <<JSON\n{template}\nJSON\n"
+    )
+    stub.chmod(0o755)
+    (tmp_path / "tg_ts").write_text("60.0")
+    return stub
+
+
+def test_cli_bench_then_compare_flags_a_regression(
+    llama_bench: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    builds = iter([{"kernel": "6.14.0"}, {"kernel": "6.17.0"}])
+    monkeypatch.setattr(env_mod, "build_ids", lambda: next(builds))
+    runner = CliRunner()
+    argv = ["bench", "llama", "-m", "/models/a.gguf", "--binary", str(llama_bench)]
+
+    first = runner.invoke(app, argv)
+    assert first.exit_code == 0, first.output
+    assert "a.gguf tg128" in first.output
+    (tmp_path / "tg_ts").write_text("50.0")
+    assert runner.invoke(app, argv).exit_code == 0
+
+    result = runner.invoke(app, ["bench", "compare"])
+
+    assert result.exit_code == 1, result.output
+    assert "kernel: 6.14.0 → 6.17.0" in result.output
+    assert "-16.7% regressed" in result.output
+    [run] = BenchStore().runs("llama", limit=1)
+    assert run.env == {"kernel": "6.17.0", "llama.cpp": "b4567 (8c3c8b5)"}
+
+
+def test_cli_bench_llama_reports_a_failing_binary(tmp_path: Path) -> None:
+    failing = tmp_path / "llama-bench"
+    failing.write_text("#!/bin/sh\necho 'error: failed to load model' >&2\nexit 1\n")
+    failing.chmod(0o755)
+
+    result = CliRunner().invoke(app, ["bench", "llama", "-m", "/models/a.gguf", "--binary", str(failing)])
+
+    assert result.exit_code == 1
+    assert "failed to load model" in result.output
+    assert BenchStore().runs() == []
+
+
+def test_lengths_parse_fixed_and_ranges() -> None:
+    assert Lengths.parse("256") == Lengths(256, 256)
+    assert Lengths.parse("128-512") == Lengths(128, 512)
+    assert str(Lengths(128, 512)) == "128-512"
+    for bad in ("0", "512-128", "abc", "-5"):
+        with pytest.raises(ValueError):
+            Lengths.parse(bad)
+
+
+def test_arrivals_are_poisson_at_the_rate() -> None:
+    import random
+
+    assert arrivals(3, None, random.Random(0)) == [0.0, 0.0, 0.0]
+    times = arrivals(2000, 50.0, random.Random(0))
+    assert times[0] == 0.0 and times == sorted(times)
+    assert 2000 / times[-1] == pytest.approx(50.0, rel=0.1)
+
+
+def test_load_respects_concurrency_and_measures_latencies() -> None:
+    with StubServer(ttft=0.03, itl=0.005) as server:
+        load = ServeLoad(server.url, "stub-model", requests=6, concurrency=2, max_tokens=Lengths(5, 5))
+        report = run_load(load)
+
+    assert server.max_in_flight == 2
+    assert len(server.requests) == 6
+    assert all(request["stream"] and request["max_tokens"] == 5 for request in server.requests)
+    assert [result.error for result in report.results] == [None] * 6
+    assert report.output_tokens == 30
+    samples = report.samples()
+    assert min(samples["ttft"]) >= 0.03
+    assert len(samples["itl"]) == 6 * 4
+    assert min(samples["latency"]) >= 0.03 + 4 * 0.005
+    metrics = {m.metric: m for m in report.measurements()}
+    assert metrics["ttft p50 ms"].value >= 30 and not metrics["ttft p50 ms"].higher_is_better
+    assert metrics["output tok/s"].higher_is_better and metrics["output tok/s"].value > 0
+    assert set(metrics) >= {f"{metric} p{q} ms" for metric in ("ttft", "itl", "latency") for q in (50, 95, 99)}
+    assert "queue" not in samples
+
+
+def test_rate_latencies_count_from_the_scheduled_arrival() -> None:
+    # Four arrivals within a few ms, one slot, 50 ms each: the last waits ~150 ms for its turn.
+    with StubServer(ttft=0.05, itl=0.0) as server:
+        load = ServeLoad(server.url, "stub-model", requests=4, concurrency=1, rate=1000.0, max_tokens=Lengths(1, 1))
+        report = run_load(load)
+
+    samples = report.samples()
+    assert max(samples["queue"]) >= 0.14
+    assert max(samples["ttft"]) >= 0.19
+    assert all(result.latency >= result.queue + 0.05 for result in report.results)
+    assert "queue p99 ms" in {m.metric for m in report.measurements()}
+
+
+def test_output_tokens_fall_back_to_chunks_without_usage() -> None:
+    with StubServer(ttft=0.0, itl=0.0, usage=False) as server:
+        report = run_load(ServeLoad(server.url, "stub-model", requests=2, max_tokens=Lengths(3, 3)))
+
+    assert [result.output_tokens for result in report.results] == [3, 3]
+
+
+def test_failed_requests_are_reported_not_raised() -> None:
+    with StubServer() as server:
+        report = run_load(ServeLoad(server.url, "missing", requests=2))
+
+    assert report.completed == []
+    assert all("HTTP 404" in (result.error or "") for result in report.failed)
+
+
+def test_cli_bench_serve_records_a_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(env_mod, "build_ids", lambda: {"kernel": "6.14.0"})
+    with StubServer(ttft=0.01, itl=0.001) as server:
+        result = CliRunner().invoke(
+            app, ["bench", "serve", "--url", server.url, "-N", "4", "-c", "2", "-p", "16-32", "-n", "4"]
+        )
+
+    assert result.exit_code == 0, result.output
+    assert "Time to first token" in result.output
+    [run] = BenchStore().runs("serve")
+    assert run.env == {"kernel": "6.14.0", "endpoint": server.url}
+    stored = BenchStore().run(run.id)
+    assert stored is not None
+    assert {m.case for m in stored.measurements} == {"stub-model c2 rate max p16-32 n4"}
+
+
+def test_cli_bench_serve_fails_when_the_server_is_down() -> None:
+    result = CliRunner().invoke(app, ["bench", "serve", "--url", "http://127.0.0.1:9/v1"])
+
+    assert result.exit_code == 1
+    assert "cannot list the models" in result.output
@@ -0,0 +1,93 @@
+"""Startup cost of trivial `msai` commands.
+
+`msai` runs from shell prompts and scripts, so commands that do no real work
+must not import the doctor engine, the lab machinery, Rich or YAML. Each test
+runs in a fresh interpreter, since this one has imported everything already.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# Modules a trivial command must not pull in.
+HEAVY = (
+    "msai_setup.doctor.engine",
+    "msai_setup.doctor.render",
+    "msai_setup.doctor.checks.system",
+    "msai_setup.lab.config",
+    "msai_setup.lab.provision",
+    "msai_setup.lab.vbox",
+    "msai_setup.install.runner",
+    "rich",
+    "yaml",
+    "httpx",
+)
+
+# Import time msai itself may add on top of typer, best of a few runs. With
+# every command module imported eagerly this was about four times the budget.
+BUDGET_MS = 100.0
+
+
+def _run(code: str, *args: str) -> subprocess.CompletedProcess[str]:
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    return subprocess.run([sys.executable, *args, "-c", code], capture_output=True, text=True, env=env, check=False)
+
+
+def _invoke(argv: list[str]) -> str:
+    return f"""
+import json, sys
+from msai_setup.cli import app
+try:
+    app({argv!r})
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def _import_times(stderr: str) -> dict[str, int]:
+    """Cumulative microseconds per module from ``-X importtime`` output."""
+    times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def _modules_after(argv: list[str]) -> set[str]:
+    done = _run(_invoke(argv))
+    modules = set(json.loads(done.stderr.splitlines()[-1]))
+    assert "msai_setup.cli" in modules
+    return modules
+
+
+@pytest.mark.parametrize("argv", [["version"], ["profile"]])
+def test_trivial_commands_skip_heavy_imports(argv: list[str]) -> None:
+    modules = _modules_after(argv)
+    assert [name for name in HEAVY if name in modules] == []
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["doctor", "--help"], ["lab", "--help"]])
+def test_help_loads_no_command_modules(argv: list[str]) -> None:
+    modules = _modules_after(argv)
+    # typer renders help with Rich; nothing else heavy is needed for it.
+    assert [name for name in HEAVY if name in modules and name != "rich"] == []
+
+
+def test_version_import_time_budget() -> None:
+    own = []
+    for _ in range(3):
+        done = _run(_invoke(["version"]), "-X", "importtime")
+        assert "msai-setup" in done.stdout
+        times = _import_times(done.stderr)
+        own.append((times["msai_setup.cli"] - times.get("typer", 0)) / 1000)
+    assert min(own) < BUDGET_MS, f"msai import overhead {min(own):.1f} ms exceeds {BUDGET_MS} ms"
@@ -1,13 +1,56 @@
 """Tests for the doctor fix-application layer."""
 
-from msai_setup.doctor.checks import CheckResult, registry
+import io
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from typer.testing import CliRunner
+
+from msai_setup.cli import app
+from msai_setup.doctor import cache as cache_mod
+from msai_setup.doctor import history as history_mod
+from msai_setup.doctor.checks import Category, Check, CheckResult, CheckTiming, Fact, registry
+from msai_setup.doctor.engine import DoctorRun, last_known, verify, with_dependents
+from msai_setup.doctor.export import render_textfile, write_textfile
 from msai_setup.doctor.fixes import (
     SAFE_FIXES,
     apply_fix,
+    fix_target,
     get_safe_fix,
+    is_batchable,
     is_safe_fix,
+    run_fixes,
 )
-from msai_setup.utils.shell import run_interactive
+from msai_setup.doctor.history import History, record_run
+from msai_setup.doctor.profile import Profile
+from msai_setup.doctor.render import JsonRenderer, NdjsonRenderer, _fixed_checks
+from msai_setup.doctor.scheduler import iter_results
+from msai_setup.install.manifest import load_manifest
+from msai_setup.install.runner import ComponentOutcome, verify_categories
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.shell import command_cache, run_command, run_interactive
+
+
+@pytest.fixture(autouse=True)
+def _isolated_result_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Keep doctor runs from touching the real ~/.cache/msai and ~/.local/state/msai."""
+    monkeypatch.setattr(cache_mod, "CACHE_PATH", tmp_path / "cache" / "doctor.json")
+    monkeypatch.setattr(history_mod, "HISTORY_PATH", tmp_path / "state" / "history.db")
+
+
+def _sleepy(name: str, delay: float) -> Check:
+    def run() -> CheckResult:
+        time.sleep(delay)
+        return CheckResult(name=name, status=CheckStatus.OK, message=name, category=Category.SYSTEM)
+
+    return Check(name=name, run=run)
 
 
 def test_every_registered_check_returns_a_checkresult() -> None:
@@ -66,3 +109,852 @@ def test_get_safe_fix_lookup() -> None:
     """Known keys resolve; unknown keys return None."""
     assert get_safe_fix("docker_start") == "sudo systemctl start docker"
     assert get_safe_fix("nonexistent") is None
+
+
+def test_scheduler_overlaps_checks() -> None:
+    """Four 0.2s checks on four workers finish in about one check's time."""
+    checks = [(Category.SYSTEM, _sleepy(f"c{i}", 0.2)) for i in range(4)]
+    start = time.monotonic()
+    results = dict(iter_results(checks, jobs=4))
+    assert time.monotonic() - start < 0.6
+    assert [results[i].name for i in range(4)] == ["c0", "c1", "c2", "c3"]
+
+
+def test_scheduler_turns_exceptions_into_failures() -> None:
+    """A check that raises is reported as FAIL, not propagated."""
+
+    def boom() -> CheckResult:
+        raise RuntimeError("kaboom")
+
+    [(index, result)] = list(iter_results([(Category.GPU, Check(name="Boom", run=boom))], jobs=2))
+    assert index == 0
+    assert result.status is CheckStatus.FAIL
+    assert "kaboom" in result.message
+    assert result.category is Category.GPU
+
+
+def test_command_cache_forks_each_argv_once(tmp_path: Path) -> None:
+    """Identical cached calls inside a command_cache() block spawn once."""
+    counter = tmp_path / "count"
+    script = f"echo x >> {counter}; echo hello"
+    with command_cache() as cache:
+        first = run_command(["bash", "-c", script], cached=True)
+        second = run_command(["bash", "-c", script], cached=True)
+    assert first.output == second.output == "hello"
+    assert counter.read_text().count("x") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_command_cache_is_opt_in_and_run_scoped(tmp_path: Path) -> None:
+    """Uncached calls, and cached calls outside a block, always spawn."""
+    counter = tmp_path / "count"
+    argv = ["bash", "-c", f"echo x >> {counter}"]
+    with command_cache() as cache:
+        run_command(argv)
+        run_command(argv)
+    run_command(argv, cached=True)
+    run_command(argv, cached=True)
+    assert counter.read_text().count("x") == 4
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_dependents_of_a_failed_check_are_skipped_without_running() -> None:
+    """A failed prerequisite short-circuits its dependents (transitively)."""
+    ran: list[str] = []
+
+    def root() -> CheckResult:
+        ran.append("root")
+        return CheckResult(name="Root", status=CheckStatus.FAIL, message="down", category=Category.ZFS)
+
+    def child() -> CheckResult:
+        ran.append("child")
+        return CheckResult(name="Child", status=CheckStatus.OK, message="ok", category=Category.ZFS)
+
+    def grandchild() -> CheckResult:
+        ran.append("grandchild")
+        return CheckResult(name="Grandchild", status=CheckStatus.OK, message="ok", category=Category.ZFS)
+
+    checks = [
+        (Category.ZFS, Check(name="Root", run=root)),
+        (Category.ZFS, Check(name="Child", run=child, requires=(root,))),
+        (Category.ZFS, Check(name="Grandchild", run=grandchild, requires=(child,))),
+    ]
+    for jobs in (1, 4):
+        ran.clear()
+        results = dict(iter_results(checks, jobs=jobs))
+        assert ran == ["root"]
+        assert results[1].status is CheckStatus.SKIP
+        assert "requires 'Root'" in results[1].message
+        assert results[2].status is CheckStatus.SKIP
+
+
+def test_independent_branches_run_concurrently() -> None:
+    """Two chains of two 0.15s checks take about two steps, not four."""
+    a = _sleepy("a", 0.15)
+    b = _sleepy("b", 0.15)
+    checks = [
+        (Category.SYSTEM, a),
+        (Category.SYSTEM, b),
+        (Category.SYSTEM, Check(name="a2", run=_sleepy("a2", 0.15).run, requires=(a.run,))),
+        (Category.SYSTEM, Check(name="b2", run=_sleepy("b2", 0.15).run, requires=(b.run,))),
+    ]
+    start = time.monotonic()
+    results = dict(iter_results(checks, jobs=4))
+    assert time.monotonic() - start < 0.5
+    assert all(r.status is CheckStatus.OK for r in results.values())
+
+
+def test_register_rejects_unregistered_prerequisite() -> None:
+    """A prerequisite must be a registered check, not an arbitrary function."""
+    import pytest
+
+    from msai_setup.doctor.checks import CheckRegistry
+
+    def helper() -> CheckResult:
+        raise AssertionError
+
+    with pytest.raises(ValueError, match="not a registered check"):
+        CheckRegistry().register(Category.SYSTEM, Check(name="X", run=helper, requires=(helper,)))
+
+
+def _hung(name: str, pidfile: Path, timeout: float | None = None) -> Check:
+    """A check whose child forks a grandchild and then both hang."""
+
+    def run() -> CheckResult:
+        run_command(["bash", "-c", f"sleep 30 & echo $! > {pidfile}; sleep 30"], timeout=None)
+        return CheckResult(name=name, status=CheckStatus.OK, message="finished", category=Category.GPU)
+
+    return Check(name=name, run=run, timeout=timeout)
+
+
+def _alive(pid: int) -> bool:
+    import os
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed-but-unreaped grandchild is a zombie until init collects it.
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().split()[2] != "Z"
+
+
+def test_check_budget_kills_whole_process_group(tmp_path: Path) -> None:
+    """An overrunning check is TIMEOUT and its grandchild dies with it."""
+    pidfile = tmp_path / "pid"
+    checks = [(Category.GPU, _hung("Hung", pidfile, timeout=0.5)), (Category.GPU, _sleepy("Quick", 0.0))]
+    start = time.monotonic()
+    results = dict(iter_results(checks, jobs=2))
+    assert time.monotonic() - start < 5
+    assert results[0].status is CheckStatus.TIMEOUT
+    assert "0.5s" in results[0].message
+    assert results[1].status is CheckStatus.OK
+    grandchild = int(pidfile.read_text())
+    deadline = time.monotonic() + 2
+    while _alive(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+
+
+def test_a_hung_check_does_not_eat_the_next_checks_budget() -> None:
+    """A check stuck in Python past its budget frees its slot for the next one."""
+    import threading
+
+    release = threading.Event()
+
+    def stuck() -> CheckResult:
+        release.wait(10)
+        return CheckResult(name="Stuck", status=CheckStatus.OK, message="finished", category=Category.GPU)
+
+    slow = _sleepy("Slow", 0.4)
+    checks = [
+        (Category.GPU, Check(name="Stuck", run=stuck, timeout=0.2)),
+        (Category.GPU, Check(name="Slow", run=slow.run, timeout=0.6)),
+    ]
+    try:
+        results = dict(iter_results(checks, jobs=1))
+    finally:
+        release.set()
+    assert results[0].status is CheckStatus.TIMEOUT
+    assert results[1].status is CheckStatus.OK, results[1].message
+
+
+def test_run_deadline_reports_finished_checks_and_times_out_the_rest(tmp_path: Path) -> None:
+    """With one worker, the deadline cuts the hung check and the queued one."""
+    checks = [
+        (Category.GPU, _sleepy("Quick", 0.0)),
+        (Category.GPU, _hung("Hung", tmp_path / "pid")),
+        (Category.GPU, _sleepy("Queued", 0.0)),
+    ]
+    start = time.monotonic()
+    results = dict(iter_results(checks, jobs=1, deadline=0.5))
+    assert time.monotonic() - start < 5
+    assert results[0].status is CheckStatus.OK
+    assert results[1].status is CheckStatus.TIMEOUT
+    assert "run deadline" in results[1].message
+    assert results[2].status is CheckStatus.TIMEOUT
+    assert "not started" in results[2].message
+
+
+def test_parse_duration() -> None:
+    import pytest
+
+    from msai_setup.utils.duration import parse_duration
+
+    assert parse_duration("10s") == 10
+    assert parse_duration("2m") == 120
+    assert parse_duration("500ms") == 0.5
+    assert parse_duration("3") == 3
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_scope_records_child_resource_usage() -> None:
+    """Children reaped inside a ProcessScope report wall, CPU and max RSS."""
+    from msai_setup.utils.shell import ProcessScope, process_scope
+
+    burn = "i=0; while [ $i -lt 200000 ]; do i=$((i+1)); done; echo done"
+    with process_scope(ProcessScope()) as scope:
+        result = run_command(["bash", "-c", burn])
+        run_command(["true"])
+    assert result.output == "done"
+    first, second = scope.usage()
+    assert first.argv == ("bash", "-c", burn)
+    assert first.cpu_s > 0
+    assert first.maxrss_kb > 0
+    assert first.wall_s >= first.cpu_s * 0.5
+    assert second.argv == ("true",)
+
+
+def test_results_carry_check_timing() -> None:
+    """Every check run by the scheduler reports its wall time and spawns."""
+
+    def spawns_twice() -> CheckResult:
+        run_command(["true"])
+        run_command(["true"])
+        return CheckResult(name="Two", status=CheckStatus.OK, message="ok", category=Category.SYSTEM)
+
+    [(_, result)] = list(iter_results([(Category.SYSTEM, Check(name="Two", run=spawns_twice))]))
+    assert result.timing is not None
+    assert result.timing.spawns == 2
+    assert result.timing.wall_s >= sum(c.wall_s for c in result.timing.children) * 0.5
+
+
+def _staged_run(*checks: Check) -> DoctorRun:
+    return DoctorRun(profile=Profile.SERVER, jobs=len(checks), checks=[(Category.SYSTEM, check) for check in checks])
+
+
+def test_ndjson_writes_each_result_as_it_completes() -> None:
+    """A fast result is on the stream before a slow one has finished."""
+    stream = io.StringIO()
+    renderer = NdjsonRenderer(stream)
+    run = _staged_run(_sleepy("slow", 0.3), _sleepy("fast", 0.0))
+
+    renderer.start(run)
+    lines_when_yielded = []
+    for result in run:
+        renderer.result(result)
+        lines_when_yielded.append((result.name, len(stream.getvalue().splitlines())))
+    renderer.finish(run)
+
+    assert lines_when_yielded == [("fast", 1), ("slow", 2)]
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["type"] for r in records] == ["result", "result", "summary"]
+    assert records[0]["status"] == "ok" and records[0]["category"] == "system"
+    assert records[0]["timing"]["spawns"] == 0
+    assert records[2]["summary"]["passed"] == 2
+    assert records[2]["profile"] == "server"
+
+
+def test_json_is_one_document_in_report_order() -> None:
+    stream = io.StringIO()
+    renderer = JsonRenderer(stream)
+    run = _staged_run(_sleepy("first", 0.1), _sleepy("second", 0.0))
+
+    renderer.start(run)
+    for result in run:
+        renderer.result(result)
+    renderer.finish(run)
+
+    document = json.loads(stream.getvalue())
+    assert [r["name"] for r in document["results"]] == ["first", "second"]
+    assert document["summary"] == {
+        "passed": 2,
+        "warnings": 0,
+        "failed": 0,
+        "timed_out": 0,
+        "skipped": 0,
+        "cached": 0,
+    }
+    assert document["command_cache"] == {"hits": 0, "misses": 0}
+
+
+def test_apply_is_rejected_with_machine_formats() -> None:
+    result = CliRunner().invoke(app, ["doctor", "--format", "json", "--apply"])
+    assert result.exit_code == 2
+    assert "--apply" in result.output
+
+
+def _counted(name: str, calls: list[str], **kwargs: Any) -> Check:
+    def run() -> CheckResult:
+        calls.append(name)
+        return CheckResult(name=name, status=CheckStatus.OK, message=f"{name} ok", category=Category.SYSTEM)
+
+    return Check(name=name, run=run, **kwargs)
+
+
+def test_result_cache_reuses_results_within_ttl() -> None:
+    calls: list[str] = []
+    cpu = _counted("cpu", calls, ttl=3600.0)
+    rocm = _counted("rocm", calls)
+
+    assert [r.cached for r in _staged_run(cpu, rocm)] == [False, False]
+    assert sorted(calls) == ["cpu", "rocm"]
+
+    calls.clear()
+    results = {r.name: r for r in _staged_run(cpu, rocm)}
+    assert calls == ["rocm"]  # no TTL: always runs
+    assert results["cpu"].cached and results["cpu"].message == "cpu ok"
+
+    calls.clear()
+    fresh = _staged_run(cpu, rocm)
+    fresh.fresh = True
+    list(fresh)
+    assert sorted(calls) == ["cpu", "rocm"]
+
+
+def test_result_cache_invalidation_key(tmp_path: Path) -> None:
+    calls: list[str] = []
+    marker = tmp_path / "sshd_config"
+    marker.write_text("PasswordAuthentication no\n")
+    ssh = _counted("ssh", calls, ttl=3600.0, keys=(str(marker),))
+
+    list(_staged_run(ssh))
+    list(_staged_run(ssh))
+    assert calls == ["ssh"]
+
+    st = marker.stat()
+    os.utime(marker, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    list(_staged_run(ssh))
+    assert calls == ["ssh", "ssh"]
+
+
+def test_cached_only_runs_nothing() -> None:
+    calls: list[str] = []
+    cpu = _counted("cpu", calls)
+    never_ran = _counted("new", calls)
+    list(_staged_run(cpu))
+    calls.clear()
+
+    run = _staged_run(cpu, never_ran)
+    run.cached_only = True
+    results = list(run)
+    assert calls == []
+    assert [(r.name, r.status, r.cached) for r in results] == [
+        ("cpu", CheckStatus.OK, True),
+        ("new", CheckStatus.SKIP, False),
+    ]
+
+
+def test_cache_keys_of_registered_checks_are_valid() -> None:
+    for _category, check in registry.get_checks():
+        for key in check.keys:
+            cache_mod.key_value(key)
+
+
+def test_textfile_export_renders_status_duration_and_facts() -> None:
+    results = [
+        CheckResult(
+            name="Memory",
+            status=CheckStatus.WARN,
+            message="Memory: 64GB",
+            category=Category.SYSTEM,
+            timing=CheckTiming(wall_s=0.0123456),
+            facts=[Fact("memory_total_gb", 62.5)],
+        ),
+        CheckResult(
+            name='Scrub "recent"',
+            status=CheckStatus.OK,
+            message="ok",
+            category=Category.ZFS,
+            cached=True,
+            facts=[Fact("zfs_scrub_age_days", 3, {"pool": "tank"})],
+        ),
+    ]
+    text = render_textfile(results)
+    lines = text.splitlines()
+
+    assert 'msai_doctor_check_status{category="system",check="Memory",status="warn"} 1' in lines
+    assert 'msai_doctor_check_status{category="system",check="Memory",status="ok"} 0' in lines
+    assert 'msai_doctor_check_duration_seconds{category="system",check="Memory"} 0.012' in lines
+    assert 'msai_doctor_check_cached{category="zfs",check="Scrub \\"recent\\""} 1' in lines
+    assert 'msai_doctor_checks{status="warn"} 1' in lines
+    assert 'msai_doctor_memory_total_gb{category="system",check="Memory"} 62.5' in lines
+    assert 'msai_doctor_zfs_scrub_age_days{category="zfs",check="Scrub \\"recent\\"",pool="tank"} 3' in lines
+    assert "# TYPE msai_doctor_zfs_scrub_age_days gauge" in lines
+    assert render_textfile(results) == text
+
+
+def test_textfile_is_replaced_atomically_and_only_on_change(tmp_path: Path) -> None:
+    assert write_textfile(tmp_path, "a 1\n") is True
+    target = tmp_path / "msai_doctor.prom"
+    inode = target.stat().st_ino
+    assert write_textfile(tmp_path, "a 1\n") is False
+    assert target.stat().st_ino == inode
+    assert write_textfile(tmp_path, "a 2\n") is True
+    assert target.read_text() == "a 2\n"
+    assert target.stat().st_mode & 0o777 == 0o644
+    assert [p.name for p in tmp_path.iterdir()] == ["msai_doctor.prom"]
+
+
+def test_textfile_ignores_changed_durations(tmp_path: Path) -> None:
+    def run(wall_s: float, status: CheckStatus) -> str:
+        result = CheckResult(
+            name="Memory", status=status, message="m", category=Category.SYSTEM, timing=CheckTiming(wall_s=wall_s)
+        )
+        return render_textfile([result])
+
+    assert write_textfile(tmp_path, run(0.012, CheckStatus.OK)) is True
+    target = tmp_path / "msai_doctor.prom"
+    written = target.read_text()
+    assert write_textfile(tmp_path, run(0.345, CheckStatus.OK)) is False
+    assert target.read_text() == written
+    assert write_textfile(tmp_path, run(0.345, CheckStatus.WARN)) is True
+    assert 'msai_doctor_check_duration_seconds{category="system",check="Memory"} 0.345' in target.read_text()
+
+
+def test_cached_results_keep_facts_and_duration() -> None:
+    def memory() -> CheckResult:
+        return CheckResult(
+            name="mem",
+            status=CheckStatus.OK,
+            message="ok",
+            category=Category.SYSTEM,
+            facts=[Fact("memory_total_gb", 128)],
+        )
+
+    check = Check(name="mem", run=memory, ttl=3600.0)
+    [first] = list(_staged_run(check))
+    [second] = list(_staged_run(check))
+    assert second.cached
+    assert second.facts == first.facts
+    assert second.timing is not None and first.timing is not None
+    assert second.timing.wall_s == first.timing.wall_s
+
+
+def _scripted(name: str, outcomes: list[tuple[CheckStatus, float]]) -> Check:
+    """A check reporting the next (status, fact value) pair on each run."""
+
+    def run() -> CheckResult:
+        status, value = outcomes.pop(0)
+        return CheckResult(
+            name=name,
+            status=status,
+            message=f"{name} {value:g}",
+            category=Category.SYSTEM,
+            facts=[Fact("scrub_age_days", value, {"pool": "tank"}), Fact("scrub_age_days", 1, {"pool": "rpool"})],
+        )
+
+    return Check(name=name, run=run)
+
+
+def _recorded(history: History, check: Check, at: float) -> int:
+    run = _staged_run(check)
+    list(run)
+    return history.record(run, now=at)
+
+
+def test_history_reads_leave_a_missing_database_uncreated(tmp_path: Path) -> None:
+    path = tmp_path / "state" / "history.db"
+    history = History(path)
+    assert history.runs() == []
+    assert history.transitions(Category.SYSTEM, "scrub") == []
+    assert history.fact_days("scrub_age_days", since=0) == []
+    assert not path.parent.exists()
+
+    _recorded(history, _scripted("scrub", [(CheckStatus.OK, 1)]), 1000.0)
+    assert [run.id for run in history.runs()] == [1]
+
+
+def test_history_lists_only_state_changes(tmp_path: Path) -> None:
+    history = History(tmp_path / "history.db")
+    ok, warn = CheckStatus.OK, CheckStatus.WARN
+    scrub = _scripted("scrub", [(ok, 1), (ok, 2), (warn, 9), (warn, 10), (ok, 0)])
+    for day in range(5):
+        _recorded(history, scrub, 1_000_000.0 + day * 86400)
+
+    transitions = history.transitions(Category.SYSTEM, "scrub")
+    assert [(t.previous, t.status, t.message) for t in transitions] == [
+        (warn, ok, "scrub 0"),
+        (ok, warn, "scrub 9"),
+        (None, ok, "scrub 1"),
+    ]
+    assert [run.summary.warnings for run in history.runs()] == [0, 1, 1, 0, 0]
+    assert history.transitions(Category.SYSTEM, "scrub", limit=1)[0].status is ok
+
+
+def test_history_aggregates_facts_per_day_and_label(tmp_path: Path) -> None:
+    history = History(tmp_path / "history.db")
+    scrub = _scripted("scrub", [(CheckStatus.OK, value) for value in (5, 3, 4, 7)])
+    noon = time.mktime((2026, 3, 1, 12, 0, 0, 0, 0, -1))
+    for at in (noon, noon + 3600, noon + 7200, noon + 86400):
+        _recorded(history, scrub, at)
+
+    days = history.fact_days("scrub_age_days", since=noon - 1, labels={"pool": "tank"})
+    assert [(d.day, d.minimum, d.maximum, d.last, d.samples) for d in days] == [
+        ("2026-03-01", 3, 5, 4, 3),
+        ("2026-03-02", 7, 7, 7, 1),
+    ]
+    assert {tuple(d.labels.items()) for d in history.fact_days("scrub_age_days", since=0)} == {
+        (("pool", "rpool"),),
+        (("pool", "tank"),),
+    }
+    assert history.fact_days("scrub_age_days", since=noon + 3 * 86400) == []
+
+
+def test_history_last_fact_is_the_latest_measurement_not_the_latest_insert(tmp_path: Path) -> None:
+    history = History(tmp_path / "history.db")
+    # Neither the smallest nor the largest value is the latest, and rows arrive out of order.
+    scrub = _scripted("scrub", [(CheckStatus.OK, value) for value in (4, 9, 1, 6)])
+    noon = time.mktime((2026, 3, 1, 12, 0, 0, 0, 0, -1))
+    for at in (noon + 7200, noon, noon + 3600, noon + 1800):
+        _recorded(history, scrub, at)
+
+    [day] = history.fact_days("scrub_age_days", since=0, labels={"pool": "tank"})
+    assert (day.minimum, day.maximum, day.last, day.samples) == (1, 9, 4, 4)
+
+
+def test_history_does_not_store_cached_facts_again(tmp_path: Path) -> None:
+    history = History(tmp_path / "history.db")
+    calls: list[str] = []
+    pkg = _counted("pkg", calls, ttl=3600.0)
+    pkg_run = pkg.run
+
+    def with_fact() -> CheckResult:
+        result = pkg_run()
+        result.facts = [Fact("packages", 10)]
+        return result
+
+    pkg.run = with_fact
+    _recorded(history, pkg, 1000.0)
+    _recorded(history, pkg, 2000.0)
+    assert calls == ["pkg"]
+    assert [day.samples for day in history.fact_days("packages", since=0)] == [1]
+    assert [run.summary.cached for run in history.runs()] == [1, 0]
+
+
+def test_history_compares_runs_and_prunes_old_ones(tmp_path: Path) -> None:
+    history = History(tmp_path / "history.db", retention_days=30)
+    scrub = _scripted("scrub", [(CheckStatus.OK, 1), (CheckStatus.OK, 2), (CheckStatus.FAIL, 40)])
+    first = _recorded(history, scrub, 1_000_000.0)
+    second = _recorded(history, scrub, 1_000_000.0 + 86400)
+    [change] = history.compare(first, second)
+    assert change.changed and not change.regressed
+
+    third = _recorded(history, scrub, 1_000_000.0 + 31 * 86400)
+    [change] = history.compare(second, third)
+    assert change.regressed
+    assert [run.id for run in history.runs()] == [third, second]
+    assert history.results(first) == []
+    assert [day.last for day in history.fact_days("scrub_age_days", since=0, labels={"pool": "tank"})] == [2, 40]
+
+
+def test_history_uses_wal_and_never_fails_the_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import sqlite3
+
+    path = tmp_path / "history.db"
+    _recorded(History(path), _counted("pkg", []), 1000.0)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setattr(history_mod, "HISTORY_PATH", blocker / "history.db")
+    run = _staged_run(_counted("pkg", []))
+    list(run)
+    record_run(run)  # must not raise
+
+
+def test_doctor_history_commands(tmp_path: Path) -> None:
+    history = History()
+    scrub = _scripted("scrub", [(CheckStatus.OK, 1), (CheckStatus.WARN, 9)])
+    now = time.time()
+    _recorded(history, scrub, now - 3600)
+    _recorded(history, scrub, now)
+    runner = CliRunner()
+
+    listing = runner.invoke(app, ["doctor", "history"])
+    assert listing.exit_code == 0, listing.output
+    assert "Doctor runs" in listing.output
+
+    changes = runner.invoke(app, ["doctor", "history", "changes", "system", "scrub"])
+    assert changes.exit_code == 0, changes.output
+    assert "scrub 9" in changes.output and "was ok" in changes.output
+
+    fact = runner.invoke(app, ["doctor", "history", "fact", "scrub_age_days", "--label", "pool=tank"])
+    assert fact.exit_code == 0, fact.output
+    assert "pool=tank" in fact.output and "rpool" not in fact.output
+
+    regressions = runner.invoke(app, ["doctor", "history", "regressions"])
+    assert regressions.exit_code == 1
+    assert "Compared 1 check" in regressions.output and "scrub 9" in regressions.output
+
+    missing = runner.invoke(app, ["doctor", "history", "regressions", "--baseline", "999"])
+    assert missing.exit_code == 1
+
+
+def test_fix_target_groups_by_what_a_fix_touches() -> None:
+    assert fix_target("sudo systemctl start docker") == "unit:docker.service"
+    assert fix_target("sudo systemctl start tailscaled") == "unit:tailscaled.service"
+    assert fix_target(SAFE_FIXES["audio_powersave"]) == "file:/etc/modprobe.d/audio-disable-powersave.conf"
+    assert fix_target("sudo apt install docker-compose-plugin") == "packages"
+    assert fix_target("sudo usermod -aG render,video $USER") == "accounts"
+    assert fix_target("sudo zpool scrub tank") == "shell"
+
+
+def test_is_batchable_only_admits_fixes_that_cannot_prompt() -> None:
+    for command in SAFE_FIXES.values():
+        assert is_batchable(command)
+    assert is_batchable("sudo systemctl enable --now incus.socket")
+    assert is_batchable("echo 1 | sudo tee /proc/sys/vm/compact_memory")
+    assert is_batchable("echo 'options zfs zfs_arc_max=1' | sudo tee /etc/modprobe.d/zfs.conf && echo 1 | sudo tee /x")
+    for command in (
+        "sudo apt install rocm",
+        "sudo tailscale up",
+        "sudo incus admin init",
+        "sudo usermod -aG docker $USER && newgrp docker",
+        "msai bootstrap llamacpp",
+        "echo 1 | sudo tee /etc/x && sudo update-grub",
+        "echo 1 | sudo tee /etc/x;sudo apt install y",
+    ):
+        assert not is_batchable(command), command
+
+
+@pytest.fixture
+def fake_systemctl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A ``systemctl`` on PATH that logs its arguments; ``slow*`` units take 0.3s, ``broken*`` exit 3."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    log = tmp_path / "systemctl.log"
+    script = bin_dir / "systemctl"
+    script.write_text(
+        f'#!/bin/sh\ncase "$2" in slow*) sleep 0.3;; esac\necho "$*" >> {log}\ncase "$2" in broken*) exit 3;; esac\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return log
+
+
+def test_run_fixes_runs_different_targets_concurrently(fake_systemctl: Path) -> None:
+    commands = ["systemctl start slow-a", "systemctl start slow-b", "systemctl start slow-c"]
+    started = time.monotonic()
+    outcomes = dict(run_fixes(commands))
+    assert time.monotonic() - started < 0.8
+    assert all(outcome.success for outcome in outcomes.values())
+    assert all(outcome.duration_s is not None and outcome.duration_s >= 0.3 for outcome in outcomes.values())
+
+
+def test_run_fixes_serializes_fixes_on_the_same_target(fake_systemctl: Path) -> None:
+    commands = ["systemctl restart slow", "systemctl start slow", "systemctl start broken"]
+    outcomes = dict(run_fixes(commands))
+    assert [line for line in fake_systemctl.read_text().splitlines() if "slow" in line] == [
+        "restart slow",
+        "start slow",
+    ]
+    assert outcomes[2].success is False
+    assert outcomes[2].message == "Failed (exit 3): systemctl start broken"
+
+
+def test_run_fixes_keeps_the_terminal_for_fixes_that_may_prompt(
+    fake_systemctl: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from msai_setup.doctor import fixes as fixes_mod
+
+    interactive: list[str] = []
+
+    def fake_interactive(command: str, **_kwargs: object) -> int:
+        interactive.append(command)
+        return 0
+
+    monkeypatch.setattr(fixes_mod, "run_interactive", fake_interactive)
+    monkeypatch.setattr(os, "geteuid", lambda: 1000)
+    announced: list[str] = []
+    commands = ["sudo apt install rocm", "systemctl start docker", "sudo tailscale up"]
+    outcomes = dict(run_fixes(commands, announce=announced.append))
+
+    assert all(outcome.success for outcome in outcomes.values())
+    assert interactive == ["sudo -v", "sudo apt install rocm", "sudo tailscale up"]
+    assert announced == ["sudo apt install rocm", "sudo tailscale up"]
+    assert fake_systemctl.read_text().splitlines() == ["start docker"]
+
+
+def test_run_fixes_authenticates_sudo_once_and_never_prompts(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    fake_sudo = bin_dir / "sudo"
+    fake_sudo.write_text(f'#!/bin/sh\necho "$*" >> {calls}\n')
+    fake_sudo.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(os, "geteuid", lambda: 1000)
+
+    commands = ["sudo systemctl start docker", "sudo systemctl start tailscaled", "true"]
+    outcomes = dict(run_fixes(commands))
+
+    assert all(outcome.success for outcome in outcomes.values())
+    lines = calls.read_text().splitlines()
+    assert lines[0] == "-v"
+    assert sorted(lines[1:]) == ["-n systemctl start docker", "-n systemctl start tailscaled"]
+
+
+def _flagged(name: str, flag: Path, calls: list[str], **kwargs: Any) -> Check:
+    def run() -> CheckResult:
+        calls.append(name)
+        if flag.exists():
+            return CheckResult(name=name, status=CheckStatus.OK, message=f"{name} ok", category=Category.SYSTEM)
+        return CheckResult(
+            name=name, status=CheckStatus.WARN, message=f"{name} off", category=Category.SYSTEM, fix=f"touch {flag}"
+        )
+
+    return Check(name=name, run=run, **kwargs)
+
+
+def test_fixes_reverify_only_the_fixed_check_and_its_dependents(tmp_path: Path) -> None:
+    calls: list[str] = []
+    daemon = _flagged("daemon", tmp_path / "started", calls)
+    group = _counted("group", calls, requires=(daemon.run,))
+    other = _counted("other", calls)
+    run = _staged_run(daemon, group, other)
+    list(run)
+    assert [r.status for r in run.results()] == [CheckStatus.WARN, CheckStatus.SKIP, CheckStatus.OK]
+
+    (tmp_path / "started").touch()
+    targets = _fixed_checks(run, [f"touch {tmp_path / 'started'}"])
+    assert [check.name for _cat, check in targets] == ["daemon", "group"]
+
+    calls.clear()
+    before = {(cat, check.name): r for (cat, check), r in zip(run.checks, run.results(), strict=True)}
+    changes = verify(targets, before, profile=Profile.SERVER)
+    assert sorted(calls) == ["daemon", "group"]
+    assert [(c.before.status, c.after.status) for c in changes if c.before] == [
+        (CheckStatus.WARN, CheckStatus.OK),
+        (CheckStatus.SKIP, CheckStatus.OK),
+    ]
+    assert all(c.changed and c.improved for c in changes)
+
+
+def test_with_dependents_is_transitive_and_keeps_order() -> None:
+    calls: list[str] = []
+    a = _counted("a", calls)
+    b = _counted("b", calls, requires=(a.run,))
+    c = _counted("c", calls, requires=(b.run,))
+    d = _counted("d", calls)
+    universe = [(Category.SYSTEM, check) for check in (a, b, c, d)]
+    assert [check.name for _cat, check in with_dependents([universe[0]], universe)] == ["a", "b", "c"]
+    assert [check.name for _cat, check in with_dependents([universe[3]], universe)] == ["d"]
+
+
+def test_last_known_ignores_ttl_and_keys(tmp_path: Path) -> None:
+    calls: list[str] = []
+    marker = tmp_path / "status"
+    marker.write_text("1")
+    pkg = _counted("pkg", calls, keys=(str(marker),))
+    list(_staged_run(pkg))
+    marker.write_text("22")
+    os.utime(marker, ns=(0, 0))
+
+    before = last_known([(Category.SYSTEM, pkg)], profile=Profile.SERVER)
+    assert before[(Category.SYSTEM, "pkg")].message == "pkg ok"
+    [change] = verify([(Category.SYSTEM, pkg)], before, profile=Profile.SERVER)
+    assert not change.changed and not change.after.cached
+
+
+def test_bootstrap_verifies_categories_of_installed_components() -> None:
+    outcomes = [
+        ComponentOutcome("docker", "installed", "docker"),
+        ComponentOutcome("compose", "installed", "docker"),
+        ComponentOutcome("zfs", "skipped", "zfs"),
+        ComponentOutcome("rocm", "failed", "gpu"),
+        ComponentOutcome("tools", "installed"),
+    ]
+    assert verify_categories(outcomes) == ["docker"]
+
+
+def test_manifest_categories_are_doctor_categories() -> None:
+    for component in load_manifest().values():
+        if component.category is not None:
+            Category(component.category)
+
+
+def _in_fresh_interpreter(code: str, *paths: Path) -> str:
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(str(p) for p in (src, *paths))}
+    done = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)], capture_output=True, text=True, env=env, check=True
+    )
+    return done.stdout
+
+
+def test_only_requested_categories_are_imported() -> None:
+    out = _in_fresh_interpreter(
+        """
+        import sys
+        from msai_setup.doctor.checks import Category, registry
+        names = [check.name for _cat, check in registry.get_checks([Category.GPU])]
+        print(sorted(m.rsplit(".", 1)[1] for m in sys.modules if m.startswith("msai_setup.doctor.checks.")))
+        print(names)
+        """
+    )
+    modules, names = out.splitlines()
+    assert modules == "['_common', 'gpu']"
+    assert names == (
+        "['AMD driver', 'Render/video groups', 'ROCm installed', 'Vulkan', "
+        "'GPU memory limits', 'Transparent hugepages', 'Memory fragmentation']"
+    )
+
+
+def test_checks_come_in_category_order_whatever_the_load_order() -> None:
+    out = _in_fresh_interpreter(
+        """
+        from msai_setup.doctor.checks import Category, registry
+        registry.get_checks([Category.TAILSCALE])
+        print(list(dict.fromkeys(cat.value for cat, _check in registry.get_checks())))
+        """
+    )
+    assert out.strip() == str([category.value for category in Category])
+
+
+def test_entry_point_plugins_add_checks_to_their_category(tmp_path: Path) -> None:
+    (tmp_path / "msai_extra_checks.py").write_text(
+        textwrap.dedent(
+            """
+            from msai_setup.doctor.checks import Category, CheckResult, register_check
+            from msai_setup.utils.formatting import CheckStatus
+
+            @register_check(Category.GPU, "NPU present")
+            def check_npu() -> CheckResult:
+                return CheckResult(name="NPU present", status=CheckStatus.OK, message="npu", category=Category.GPU)
+            """
+        )
+    )
+    dist = tmp_path / "msai_extra_checks-1.0.dist-info"
+    dist.mkdir()
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: msai-extra-checks\nVersion: 1.0\n")
+    (dist / "entry_points.txt").write_text(
+        "[msai_setup.doctor.checks]\ngpu = msai_extra_checks\nkvm = msai_missing_module\nnot-a-category = os\n"
+    )
+
+    out = _in_fresh_interpreter(
+        """
+        from msai_setup.doctor.checks import Category, registry
+        from msai_setup.doctor.scheduler import run_check
+        for category, check in registry.get_checks([Category.GPU, Category.KVM]):
+            if check.name in ("NPU present", "Plugin msai_missing_module"):
+                result = run_check(category, check)
+                print(category.value, result.status.value, result.message)
+        """,
+        tmp_path,
+    )
+    lines = out.splitlines()
+    assert lines[0] == "kvm fail Plugin msai_missing_module: failed to load (No module named 'msai_missing_module')"
+    assert lines[1] == "gpu ok npu"
@@ -0,0 +1,407 @@
+"""Tests for GGUF header reading, the model index, memory budget planning and msai models."""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from msai_setup.cli import app
+from msai_setup.doctor.checks import inference
+from msai_setup.models import index as index_mod
+from msai_setup.models import plan as plan_mod
+from msai_setup.models.index import ModelIndex, load_model
+from msai_setup.models.plan import GIB, SAFETY_MARGIN, MemoryBudget, compute_bytes, plan_model, read_budget
+from msai_setup.utils import config as config_mod
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.gguf import GGUFError, GGUFModel, SkippedArray, read_gguf
+from msai_setup.utils.probe import Probe, set_probe
+
+
+def _string(text: str) -> bytes:
+    data = text.encode()
+    return struct.pack("<Q", len(data)) + data
+
+
+def _value(value: Any) -> bytes:
+    """A metadata value with its type tag; ints are u32, lists are arrays of u32 or strings."""
+    if isinstance(value, bool):
+        return struct.pack("<I?", 7, value)
+    if isinstance(value, int):
+        return struct.pack("<II", 4, value)
+    if isinstance(value, float):
+        return struct.pack("<If", 6, value)
+    if isinstance(value, str):
+        return struct.pack("<I", 8) + _string(value)
+    if value and isinstance(value[0], str):
+        return struct.pack("<IIQ", 9, 8, len(value)) + b"".join(_string(item) for item in value)
+    return struct.pack("<IIQ", 9, 4, len(value)) + struct.pack(f"<{len(value)}I", *value)
+
+
+def write_gguf(path: Path, metadata: dict[str, Any], tensors: list[tuple[str, list[int], int]]) -> Path:
+    """A GGUF v3 file with the given metadata and tensors (name, shape, data bytes), 32-byte aligned."""
+    header = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata))
+    header += b"".join(_string(key) + _value(value) for key, value in metadata.items())
+    offset = 0
+    for name, shape, size in tensors:
+        header += _string(name) + struct.pack("<I", len(shape)) + struct.pack(f"<{len(shape)}Q", *shape)
+        header += struct.pack("<IQ", 1, offset)
+        offset += -(-size // 32) * 32
+    header += b"\0" * (-len(header) % 32)
+    path.write_bytes(header + b"\1" * offset)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _isolated_index(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(index_mod, "INDEX_PATH", tmp_path / "cache" / "models.db")
+
+
+LLAMA = {
+    "general.architecture": "llama",
+    "general.name": "Tiny Llama",
+    "general.file_type": 15,
+    "llama.context_length": 8192,
+    "llama.block_count": 4,
+    "llama.embedding_length": 256,
+    "llama.attention.head_count": 8,
+    "llama.attention.head_count_kv": 2,
+    "tokenizer.ggml.tokens": [f"t{index}" for index in range(2000)],
+}
+
+
+def test_reads_metadata_and_tensor_totals(tmp_path: Path) -> None:
+    path = write_gguf(tmp_path / "tiny.gguf", LLAMA, [("a.weight", [256, 4], 2048), ("b.weight", [100], 200)])
+
+    model = read_gguf(path)
+
+    assert (model.version, model.architecture, model.name) == (3, "llama", "Tiny Llama")
+    assert model.quantization == "Q4_K_M"
+    assert (model.context_length, model.block_count, model.embedding_length) == (8192, 4, 256)
+    assert model.metadata["tokenizer.ggml.tokens"] == SkippedArray(8, 2000)
+    assert model.vocab_size == 2000
+    assert (model.tensor_count, model.parameters) == (2, 1124)
+    assert model.tensor_bytes == 2048 + 224  # the last tensor padded to the alignment
+
+
+def test_kv_bytes_per_token_from_heads() -> None:
+    model = GGUFModel(Path("m.gguf"), 3, LLAMA, 0, 0, 0)
+    # 4 layers x 2 KV heads x (32 + 32) head dims x 2 bytes
+    assert model.kv_bytes_per_token() == 4 * 2 * 64 * 2
+    assert model.kv_bytes_per_token("q8_0") == pytest.approx(4 * 2 * 64 * 34 / 32)
+    with pytest.raises(KeyError):
+        model.kv_bytes_per_token("q3")
+
+
+def test_kv_bytes_per_token_per_layer_heads_and_latent_attention() -> None:
+    hybrid = GGUFModel(Path("m.gguf"), 3, {**LLAMA, "llama.attention.head_count_kv": [2, 0, 0, 2]}, 0, 0, 0)
+    assert hybrid.kv_bytes_per_token() == 2 * 2 * 64 * 2
+    mla = {
+        "general.architecture": "deepseek2",
+        "deepseek2.block_count": 2,
+        "deepseek2.attention.kv_lora_rank": 512,
+        "deepseek2.rope.dimension_count": 64,
+    }
+    assert GGUFModel(Path("m.gguf"), 3, mla, 0, 0, 0).kv_bytes_per_token() == 2 * 576 * 2
+
+
+def test_split_models_are_read_as_one(tmp_path: Path) -> None:
+    first = write_gguf(tmp_path / "big-00001-of-00002.gguf", {**LLAMA, "split.count": 2}, [("a", [64], 64)])
+    write_gguf(tmp_path / "big-00002-of-00002.gguf", {"split.count": 2}, [("b", [128], 128)])
+
+    model = read_gguf(tmp_path / "big-00002-of-00002.gguf")
+
+    assert model.architecture == "llama"
+    assert model.files == [first, tmp_path / "big-00002-of-00002.gguf"]
+    assert (model.tensor_count, model.parameters, model.tensor_bytes) == (2, 192, 64 + 128)
+
+
+@pytest.mark.parametrize("content", [b"", b"GGML0000", b"GGUF\x03\0\0\0" + b"\xff" * 20])
+def test_not_gguf_or_truncated_raises(tmp_path: Path, content: bytes) -> None:
+    path = tmp_path / "bad.gguf"
+    path.write_bytes(content)
+    with pytest.raises(GGUFError):
+        read_gguf(path)
+
+
+def _model(weights_gib: float, **metadata: Any) -> GGUFModel:
+    return GGUFModel(Path("m.gguf"), 3, {**LLAMA, **metadata}, 1, int(weights_gib * GIB), 0)
+
+
+def test_budget_caps_gtt_by_free_ram_and_counts_reclaimable_arc() -> None:
+    budget = MemoryBudget(
+        mem_total=128 * GIB,
+        mem_available=40 * GIB,
+        arc_size=30 * GIB,
+        arc_min=4 * GIB,
+        gpu=True,
+        vram_total=GIB,
+        vram_used=GIB // 2,
+        gtt_total=96 * GIB,
+        gtt_used=2 * GIB,
+    )
+    assert budget.host_free == 66 * GIB
+    assert budget.usable == GIB // 2 + 66 * GIB - SAFETY_MARGIN
+    assert MemoryBudget(128 * GIB, 40 * GIB).usable == 40 * GIB - SAFETY_MARGIN
+
+
+def test_plan_finds_the_largest_safe_context() -> None:
+    # 4 layers x 2 heads x 64 x 2 bytes = 1 KiB per token; 4 GiB of room after weights and compute.
+    model = _model(10, **{"llama.context_length": 10_000_000})
+    budget = MemoryBudget(128 * GIB, 10 * GIB + 4 * GIB + SAFETY_MARGIN)
+    budget.mem_available += GIB // 2 + 2000 * 512 * 4  # the compute estimate
+
+    plan = plan_model(model, budget, context=8_000_000)
+
+    assert plan.kv_cache == 8_000_000 * 1024
+    assert not plan.fits
+    assert plan.max_context == 4 * 1024 * 1024
+    assert plan_model(model, budget, context=plan.max_context).fits
+    assert plan_model(model, budget, parallel=2).max_context == 2 * 1024 * 1024
+    assert plan_model(_model(20), budget).max_context == 0
+
+
+def test_plan_defaults_to_the_trained_context_and_caps_at_it() -> None:
+    plan = plan_model(_model(1), MemoryBudget(128 * GIB, 100 * GIB))
+    assert (plan.context, plan.max_context, plan.fits) == (8192, 8192, True)
+
+
+@pytest.fixture
+def host(tmp_path: Path) -> Iterator[Path]:
+    """A 128 GiB box: 60 GiB available, 20 GiB of reclaimable ARC, 96 GiB of GTT with 1 GiB used."""
+
+    def write(path: str, text: str) -> None:
+        target = tmp_path / "root" / path.lstrip("/")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+
+    write("/proc/meminfo", f"MemTotal: {128 * GIB // 1024} kB\nMemAvailable: {60 * GIB // 1024} kB\n")
+    arcstats = f"13 1 0x01 3 144 0 0\nname type data\nsize 4 {24 * GIB}\nc_min 4 {4 * GIB}\n"
+    write("/proc/spl/kstat/zfs/arcstats", arcstats)
+    write("/sys/class/drm/card1/device/mem_info_gtt_total", f"{96 * GIB}\n")
+    write("/sys/class/drm/card1/device/mem_info_gtt_used", f"{GIB}\n")
+    write("/sys/class/drm/card1/device/mem_info_vram_total", f"{GIB // 2}\n")
+    write("/sys/class/drm/card1/device/mem_info_vram_used", f"{GIB // 2}\n")
+    write("/proc/1/comm", "systemd\n")
+    previous = set_probe(Probe(tmp_path / "root"))
+    yield tmp_path / "root"
+    set_probe(previous)
+
+
+def test_read_budget_from_proc_and_sysfs(host: Path) -> None:
+    budget = read_budget()
+    assert (budget.mem_available, budget.arc_reclaimable, budget.gtt_free, budget.vram_free) == (
+        60 * GIB,
+        20 * GIB,
+        95 * GIB,
+        0,
+    )
+    assert budget.usable == 80 * GIB - SAFETY_MARGIN
+
+
+@pytest.fixture
+def default_model(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Callable[..., Path]:
+    def configure(**section: Any) -> Path:
+        path = write_gguf(tmp_path / "tiny.gguf", LLAMA, [("a.weight", [256], 512)])
+        config = tmp_path / "config.yaml"
+        config.write_text(yaml.safe_dump({"models": {"default": {"path": str(path), **section}}}))
+        monkeypatch.setattr(config_mod, "DEFAULT_CONFIG_PATH", config)
+        return path
+
+    monkeypatch.setattr(config_mod, "DEFAULT_CONFIG_PATH", tmp_path / "missing.yaml")
+    return configure
+
+
+def test_model_check_skips_without_a_configured_model(host: Path, default_model: Callable[..., Path]) -> None:
+    result = inference.check_model_fits()
+    assert result.status is CheckStatus.SKIP
+    assert "models.default.path" in result.message
+
+
+def test_model_check_reports_fit_and_facts(host: Path, default_model: Callable[..., Path]) -> None:
+    default_model(context=4096)
+
+    result = inference.check_model_fits()
+
+    assert result.status is CheckStatus.OK, result.message
+    assert "tiny.gguf needs" in result.message and "at context 4096" in result.message
+    facts = {fact.name: fact.value for fact in result.facts}
+    assert facts["model_max_context"] == 8192
+    assert facts["model_kv_cache_bytes"] == 4096 * 1024
+
+
+def test_model_check_warns_with_the_largest_context(
+    host: Path, default_model: Callable[..., Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = default_model(context=8192, parallel=4)
+    # Room for 1300 tokens x 4 sequences after the weights and compute buffers.
+    available = SAFETY_MARGIN + 512 + compute_bytes(read_gguf(path)) + 1300 * 4 * 1024
+    monkeypatch.setattr(inference, "read_budget", lambda probe=None: MemoryBudget(128 * GIB, available))
+
+    result = inference.check_model_fits()
+
+    assert result.status is CheckStatus.WARN
+    assert "largest safe context 1280" in result.message
+
+
+def test_model_check_failure_names_what_does_not_fit(
+    host: Path, default_model: Callable[..., Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = default_model(context=8192)
+    compute = compute_bytes(read_gguf(path))
+
+    def check(available: int) -> str:
+        monkeypatch.setattr(inference, "read_budget", lambda probe=None: MemoryBudget(128 * GIB, available))
+        result = inference.check_model_fits()
+        assert result.status is CheckStatus.FAIL
+        return result.message
+
+    assert "weights and compute buffers leave room for under 256 tokens" in check(SAFETY_MARGIN + 512 + compute + 1024)
+    assert "and compute buffers (" in check(SAFETY_MARGIN + 512 + compute // 2)
+    assert "weights alone" in check(SAFETY_MARGIN + 256)
+
+
+def test_model_check_skips_while_llama_server_runs(host: Path, default_model: Callable[..., Path]) -> None:
+    default_model()
+    (host / "proc/4242").mkdir()
+    (host / "proc/4242/comm").write_text("llama-server\n")
+
+    assert inference.check_model_fits().status is CheckStatus.SKIP
+
+
+def test_cli_models_plan(host: Path, tmp_path: Path) -> None:
+    path = write_gguf(tmp_path / "tiny.gguf", LLAMA, [("a.weight", [256], 512)])
+    runner = CliRunner()
+
+    fits = runner.invoke(app, ["models", "plan", str(path), "-c", "4096"])
+    assert fits.exit_code == 0, fits.output
+    assert "Tiny Llama" in fits.output and "Q4_K_M" in fits.output
+    assert "fits: largest safe context 8192 x 1" in fits.output
+
+    bad = runner.invoke(app, ["models", "plan", str(path), "--cache-type", "q3"])
+    assert bad.exit_code == 2
+
+
+def test_cli_models_plan_names_what_does_not_fit(host: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = write_gguf(tmp_path / "tiny.gguf", LLAMA, [("a.weight", [256], 512)])
+    available = SAFETY_MARGIN + 512 + compute_bytes(read_gguf(path)) // 2
+    monkeypatch.setattr(plan_mod, "read_budget", lambda probe=None: MemoryBudget(128 * GIB, available))
+
+    done = CliRunner().invoke(app, ["models", "plan", str(path)])
+
+    assert done.exit_code == 1
+    assert "does not fit at any context: weights (0.0 GiB) and compute buffers (" in done.output
+
+
+@pytest.fixture
+def parses(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    """Paths the index parsed, in order."""
+    calls: list[Path] = []
+    real = index_mod.read_gguf
+
+    def counting(path: Path) -> GGUFModel:
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(index_mod, "read_gguf", counting)
+    return calls
+
+
+def test_refresh_parses_only_new_and_changed_files(tmp_path: Path, parses: list[Path]) -> None:
+    models = tmp_path / "models"
+    (models / "sub").mkdir(parents=True)
+    a = write_gguf(models / "a.gguf", LLAMA, [("w", [64], 64)])
+    b = write_gguf(models / "sub" / "b.gguf", {**LLAMA, "general.name": "B"}, [("w", [64], 64)])
+    (models / "notes.txt").write_text("not a model")
+    index = ModelIndex()
+
+    first = index.refresh([models])
+    assert (first.files, first.parsed, first.removed) == (2, 2, 0)
+    assert index.refresh([models]).parsed == 0
+    assert len(parses) == 2
+
+    write_gguf(a, {**LLAMA, "general.name": "A2"}, [("w", [64], 64), ("v", [64], 64)])
+    b.unlink()
+    again = index.refresh([models])
+
+    assert (again.parsed, again.removed) == (1, 1)
+    assert parses[-1] == a
+    [entry] = index.models()
+    assert (entry.name, entry.tensor_count, entry.architecture, entry.quantization) == ("A2", 2, "llama", "Q4_K_M")
+    assert entry.kv_bytes_per_token("q8_0") == pytest.approx(4 * 2 * 64 * 34 / 32)
+
+
+def test_refresh_keeps_rows_outside_the_scanned_dirs_and_records_errors(tmp_path: Path, parses: list[Path]) -> None:
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    write_gguf(tmp_path / "one" / "a.gguf", LLAMA, [("w", [64], 64)])
+    (tmp_path / "two" / "broken.gguf").write_bytes(b"GGUF\x03\0\0\0")
+    index = ModelIndex()
+    index.refresh([tmp_path / "one", tmp_path / "two"])
+
+    stats = index.refresh([tmp_path / "two"])
+
+    assert (stats.files, stats.parsed, stats.removed) == (1, 0, 0)  # the broken file is not retried
+    assert [Path(model.path).name for model in index.models()] == ["a.gguf", "broken.gguf"]
+    assert index.models()[1].error is not None
+    assert index.models(architecture="llama")[0].path.endswith("a.gguf")
+
+
+def test_split_models_are_indexed_once(tmp_path: Path) -> None:
+    write_gguf(tmp_path / "big-00001-of-00002.gguf", {**LLAMA, "split.count": 2}, [("a", [64], 64)])
+    write_gguf(tmp_path / "big-00002-of-00002.gguf", {"split.count": 2}, [("b", [128], 128)])
+
+    ModelIndex().refresh([tmp_path])
+
+    [entry] = ModelIndex().models()
+    assert (Path(entry.path).name, entry.shards, entry.tensor_bytes) == ("big-00001-of-00002.gguf", 2, 192)
+
+
+def test_load_model_answers_from_the_index_until_the_file_changes(tmp_path: Path, parses: list[Path]) -> None:
+    path = write_gguf(tmp_path / "a.gguf", LLAMA, [("w", [64], 64)])
+
+    assert load_model(path).name == "Tiny Llama"
+    assert load_model(path).name == "Tiny Llama"
+    assert len(parses) == 1
+    write_gguf(path, {**LLAMA, "general.name": "Renamed"}, [("w", [64], 64)])
+    assert load_model(path).name == "Renamed"
+    with pytest.raises(GGUFError):
+        load_model(tmp_path / "missing.gguf")
+
+
+def test_load_model_parses_directly_when_the_index_is_unwritable(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    monkeypatch.setattr(index_mod, "INDEX_PATH", blocker / "models.db")
+    path = write_gguf(tmp_path / "a.gguf", LLAMA, [("w", [64], 64)])
+
+    assert load_model(path).context_length == 8192
+
+
+def test_cli_models_ls_answers_from_the_index(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, parses: list[Path]
+) -> None:
+    models = tmp_path / "models"
+    models.mkdir()
+    write_gguf(models / "tiny.gguf", LLAMA, [("w", [64], 64)])
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump({"models": {"dirs": [str(models)]}}))
+    monkeypatch.setattr(config_mod, "DEFAULT_CONFIG_PATH", config)
+    runner = CliRunner()
+
+    assert "no models indexed" in runner.invoke(app, ["models", "ls"]).output
+    scanned = runner.invoke(app, ["models", "ls", "--refresh"])
+    assert scanned.exit_code == 0, scanned.output
+    assert "1 parsed" in scanned.output and "tiny.gguf" in scanned.output and "Q4_K_M" in scanned.output
+
+    listed = runner.invoke(app, ["models", "ls"])
+
+    assert "tiny.gguf" in listed.output
+    assert len(parses) == 1
@@ -0,0 +1,231 @@
+"""Tests for performance profiles, their boot script, the PERFORMANCE checks and msai perf."""
+
+from __future__ import annotations
+
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from msai_setup.cli import app
+from msai_setup.doctor.checks import performance
+from msai_setup.perf import PerfError
+from msai_setup.perf.profiles import (
+    PROFILES,
+    SCRIPT_PATH,
+    UNIT_WANTED,
+    differences,
+    matching_profile,
+    parse_power_profiles,
+    read_settings,
+    render_script,
+)
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import Probe, set_probe
+
+CARD = "/sys/class/drm/card1/device"
+
+# The short table APUs print; discrete cards add per-clock rows under each mode.
+POWER_PROFILES = (
+    "  0 BOOTUP_DEFAULT*\n  1 3D_FULL_SCREEN\n  2 POWER_SAVING\n  3 VIDEO\n  4 VR\n  5 COMPUTE\n  6 CUSTOM\n"
+)
+
+
+def _write(root: Path, path: str, text: str) -> Path:
+    target = root / path.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+    return target
+
+
+@pytest.fixture
+def sysroot(tmp_path: Path) -> Path:
+    """Two amd-pstate-epp CPUs and one amdgpu card at the kernel defaults (balanced)."""
+    for cpu in (0, 1):
+        cpufreq = f"/sys/devices/system/cpu/cpu{cpu}/cpufreq"
+        _write(tmp_path, f"{cpufreq}/scaling_driver", "amd-pstate-epp\n")
+        _write(tmp_path, f"{cpufreq}/scaling_governor", "powersave\n")
+        _write(tmp_path, f"{cpufreq}/scaling_available_governors", "performance powersave\n")
+        _write(tmp_path, f"{cpufreq}/energy_performance_preference", "balance_performance\n")
+        _write(
+            tmp_path,
+            f"{cpufreq}/energy_performance_available_preferences",
+            "default performance balance_performance balance_power power\n",
+        )
+        _write(tmp_path, f"{cpufreq}/scaling_cur_freq", f"{600000 + cpu * 400000}\n")
+    _write(tmp_path, "/sys/devices/system/cpu/amd_pstate/status", "active\n")
+    _write(tmp_path, f"{CARD}/mem_info_gtt_total", f"{96 * 1024**3}\n")
+    _write(tmp_path, f"{CARD}/power_dpm_force_performance_level", "auto\n")
+    _write(tmp_path, f"{CARD}/pp_power_profile_mode", POWER_PROFILES)
+    _write(tmp_path, f"{CARD}/pp_dpm_sclk", "0: 600Mhz *\n1: 2900Mhz\n")
+    return tmp_path
+
+
+@pytest.fixture
+def probe(sysroot: Path) -> Iterator[Probe]:
+    probe = Probe(sysroot)
+    previous = set_probe(probe)
+    yield probe
+    set_probe(previous)
+
+
+def test_parse_power_profiles_reads_both_table_forms() -> None:
+    short = parse_power_profiles(POWER_PROFILES)
+    assert (short.modes["COMPUTE"], short.active) == (5, "BOOTUP_DEFAULT")
+    table = parse_power_profiles(
+        "PROFILE_INDEX(NAME) CLOCK_TYPE(NAME) FPS MinActiveFreqType MinActiveFreq\n"
+        " 0 BOOTUP_DEFAULT :\n  0(       GFXCLK)       0       5       1\n"
+        " 1 3D_FULL_SCREEN*:\n  0(       GFXCLK)       1       5       1\n"
+        " 5 COMPUTE :\n"
+    )
+    assert table.modes == {"BOOTUP_DEFAULT": 0, "3D_FULL_SCREEN": 1, "COMPUTE": 5}
+    assert table.active == "3D_FULL_SCREEN"
+
+
+def test_settings_match_a_profile(probe: Probe) -> None:
+    settings = read_settings()
+    assert settings.governors == ["powersave", "powersave"]
+    assert settings.cpu_freq_mhz == [600.0, 1000.0]
+    assert [gpu.sclk_mhz for gpu in settings.gpus] == [600]
+    assert matching_profile(settings) is PROFILES["balanced"]
+    assert differences(PROFILES["inference"], settings) == [
+        "governor powersave, inference wants performance",
+        "EPP balance_performance, inference wants performance",
+        f"{CARD} power profile BOOTUP_DEFAULT, inference wants COMPUTE",
+    ]
+
+
+def test_no_profile_matches_a_host_without_settings(tmp_path: Path) -> None:
+    previous = set_probe(Probe(tmp_path))
+    try:
+        assert matching_profile(read_settings()) is None
+        assert performance.check_perf_profile().status is CheckStatus.SKIP
+    finally:
+        set_probe(previous)
+
+
+def test_render_script_rejects_what_the_driver_does_not_offer(probe: Probe, sysroot: Path) -> None:
+    _write(sysroot, "/sys/devices/system/cpu/cpu0/cpufreq/scaling_available_governors", "schedutil\n")
+    with pytest.raises(PerfError, match="offers none of performance"):
+        render_script(PROFILES["inference"], read_settings())
+    assert "put \"$f\" schedutil" in render_script(PROFILES["balanced"], read_settings())
+
+
+def _run_script(profile: str, sysroot: Path) -> subprocess.CompletedProcess[str]:
+    """Run the boot script against the fixture tree instead of /sys."""
+    script = render_script(PROFILES[profile], read_settings()).replace("/sys/", f"{sysroot}/sys/")
+    return subprocess.run(["sh", "-c", script], capture_output=True, text=True, check=False)
+
+
+def test_script_applies_every_setting(probe: Probe, sysroot: Path) -> None:
+    done = _run_script("inference", sysroot)
+    assert done.returncode == 0, done.stderr
+    settings = read_settings()
+    assert settings.governors == ["performance", "performance"]
+    assert settings.epp == ["performance", "performance"]
+    assert (sysroot / CARD.lstrip("/") / "pp_power_profile_mode").read_text() == "5\n"
+
+
+def test_script_restores_earlier_writes_when_one_fails(probe: Probe, sysroot: Path) -> None:
+    # cpu1's EPP cannot be written: cpu0/cpu1 governors and cpu0 EPP must roll back.
+    epp = sysroot / "sys/devices/system/cpu/cpu1/cpufreq/energy_performance_preference"
+    epp.unlink()
+    epp.mkdir()
+    done = _run_script("quiet", sysroot)
+    assert done.returncode == 1
+    assert "restoring the previous settings" in done.stderr
+    settings = read_settings()
+    assert settings.governors == ["powersave", "powersave"]
+    assert settings.epp == ["balance_performance"]
+    assert (sysroot / CARD.lstrip("/") / "pp_power_profile_mode").read_text() == POWER_PROFILES
+
+
+def test_script_restores_values_read_before_any_write(
+    probe: Probe, sysroot: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Like amd_pstate, the performance governor forces the EPP to performance.
+    shim = tmp_path / "bin" / "tee"
+    shim.parent.mkdir()
+    shim.write_text(
+        "#!/bin/sh\n"
+        'value=$(cat) && printf \'%s\\n\' "$value" > "$1" || exit 1\n'
+        'case $1:$value in */scaling_governor:performance)\n'
+        '    echo performance > "${1%/*}/energy_performance_preference" ;;\n'
+        "esac\n"
+        "exit 0\n"
+    )
+    shim.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{shim.parent}:/usr/bin:/bin")
+    epp = sysroot / "sys/devices/system/cpu/cpu1/cpufreq/energy_performance_preference"
+    epp.unlink()
+    epp.mkdir()
+
+    assert _run_script("inference", sysroot).returncode == 1
+    settings = read_settings()
+    assert settings.governors == ["powersave", "powersave"]
+    assert settings.epp == ["balance_performance"]
+
+
+def test_cpu_scaling_check_reports_settings_and_clocks(probe: Probe, sysroot: Path) -> None:
+    result = performance.check_cpu_scaling()
+    assert result.status is CheckStatus.OK
+    expected = "amd-pstate-epp, governor powersave, EPP balance_performance, 800 MHz mean / 1000 MHz max now"
+    assert result.message == expected
+    assert {(fact.labels["stat"], fact.value) for fact in result.facts} == {("mean", 800.0), ("max", 1000.0)}
+
+    _write(sysroot, "/sys/devices/system/cpu/cpu1/cpufreq/scaling_governor", "performance\n")
+    mixed = performance.check_cpu_scaling()
+    assert mixed.status is CheckStatus.WARN
+    assert "governor mixed (performance, powersave)" in mixed.message
+
+
+def test_gpu_power_state_flags_pinned_clocks(probe: Probe, sysroot: Path) -> None:
+    result = performance.check_gpu_power_state()
+    assert (result.status, result.message) == (
+        CheckStatus.OK,
+        "card1: DPM auto, profile BOOTUP_DEFAULT, sclk 600 MHz now",
+    )
+    _write(sysroot, f"{CARD}/power_dpm_force_performance_level", "manual\n")
+    pinned = performance.check_gpu_power_state()
+    assert pinned.status is CheckStatus.WARN
+    assert pinned.message == "card1 clocks pinned by DPM level manual"
+
+
+def test_profile_check_catches_drift_and_a_disabled_unit(probe: Probe, sysroot: Path) -> None:
+    none = performance.check_perf_profile()
+    assert (none.status, none.message) == (CheckStatus.OK, "Settings match balanced (none persisted)")
+
+    _write(sysroot, SCRIPT_PATH, render_script(PROFILES["inference"], read_settings()))
+    disabled = performance.check_perf_profile()
+    assert disabled.status is CheckStatus.WARN
+    assert disabled.fix == "sudo systemctl enable msai-perf-profile.service"
+
+    _write(sysroot, UNIT_WANTED, "")
+    drift = performance.check_perf_profile()
+    assert drift.status is CheckStatus.WARN
+    assert drift.message == "Settings drifted from persisted profile inference"
+    assert drift.fix == "sudo systemctl restart msai-perf-profile.service"
+    assert [fact.labels for fact in drift.facts] == [{"profile": "balanced"}]
+
+    assert _run_script("inference", sysroot).returncode == 0
+    assert performance.check_perf_profile().message == "Profile inference (persisted, applied)"
+
+
+def test_perf_profile_set_dry_run(probe: Probe) -> None:
+    runner = CliRunner()
+    done = runner.invoke(app, ["perf", "profile", "set", "quiet", "--dry-run"])
+    assert done.exit_code == 0, done.output
+    assert "# msai performance profile: quiet" in done.output
+    staged = "/etc/msai/perf-profile.sh.new"
+    assert f"sudo sh {staged} || {{ sudo rm -f {staged}; exit 1; }}" in done.output
+    assert "sudo systemctl enable msai-perf-profile.service" in done.output
+
+    bad = runner.invoke(app, ["perf", "profile", "set", "turbo"])
+    assert bad.exit_code == 2
+    assert "expected one of inference, balanced, quiet" in bad.output
+
+    shown = runner.invoke(app, ["perf", "profile"])
+    assert shown.exit_code == 0
+    assert "matches: balanced; persisted: none" in shown.output
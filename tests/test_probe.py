@@ -0,0 +1,266 @@
+"""Tests for the in-process /proc and /sys probe layer, against a fixture sysroot."""
+
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from msai_setup.doctor.checks import gpu, kvm, system
+from msai_setup.doctor.fixes import SAFE_FIXES, fix_target, is_safe_fix
+from msai_setup.utils.amdgpu import GpuSampler
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import Probe, set_probe
+from msai_setup.utils.stats import percentile
+
+
+def _write(root: Path, path: str, text: str) -> Path:
+    target = root / path.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+    return target
+
+
+@pytest.fixture
+def sysroot(tmp_path: Path) -> Path:
+    """A minimal MS-S1 MAX-shaped tree."""
+    _write(tmp_path, "/proc/meminfo", "MemTotal: 131890068 kB\nMemFree: 1000 kB\nHugePages_Total: 0\n")
+    _write(
+        tmp_path,
+        "/proc/cpuinfo",
+        "processor\t: 0\nmodel name\t: AMD RYZEN AI MAX+ 395 w/ Radeon 8060S\n\n"
+        "processor\t: 1\nmodel name\t: AMD RYZEN AI MAX+ 395 w/ Radeon 8060S\n",
+    )
+    _write(tmp_path, "/proc/modules", "amdgpu 15990784 12 - Live 0x0\nvfio_pci 16384 0 - Live 0x0\n")
+    _write(tmp_path, "/proc/sys/kernel/osrelease", "7.0.0-14-generic\n")
+    _write(tmp_path, "/etc/os-release", 'NAME="Ubuntu"\nVERSION_ID="26.04"\nPRETTY_NAME="Ubuntu 26.04 LTS"\n')
+    _write(tmp_path, "/sys/class/kfd/kfd/topology/nodes/0/properties", "simd_count 0\ngfx_target_version 0\n")
+    _write(tmp_path, "/sys/class/kfd/kfd/topology/nodes/1/properties", "simd_count 80\ngfx_target_version 110501\n")
+    _write(tmp_path, "/sys/class/kfd/kfd/topology/nodes/1/name", "gfx1151\n")
+    for group in ("0", "1", "2"):
+        (tmp_path / "sys/kernel/iommu_groups" / group).mkdir(parents=True)
+    gpu = tmp_path / "sys/bus/pci/devices/0000:c5:00.0"
+    _write(tmp_path, "/sys/bus/pci/devices/0000:c5:00.0/vendor", "0x1002\n")
+    _write(tmp_path, "/sys/bus/pci/devices/0000:c5:00.0/device", "0x1586\n")
+    _write(tmp_path, "/sys/bus/pci/devices/0000:c5:00.0/class", "0x030000\n")
+    (tmp_path / "sys/bus/pci/drivers/amdgpu").mkdir(parents=True)
+    os.symlink("../../../bus/pci/drivers/amdgpu", gpu / "driver")
+    tool = _write(tmp_path, "/usr/bin/rocminfo", "#!/bin/sh\n")
+    tool.chmod(0o755)
+    _write(tmp_path, "/usr/bin/not-executable", "")
+    return tmp_path
+
+
+@pytest.fixture
+def probe(sysroot: Path) -> Iterator[Probe]:
+    probe = Probe(sysroot, path="/usr/local/bin:/usr/bin")
+    previous = set_probe(probe)
+    yield probe
+    set_probe(previous)
+
+
+def test_proc_readers(probe: Probe) -> None:
+    assert probe.meminfo()["MemTotal"] == 131890068
+    assert probe.meminfo()["HugePages_Total"] == 0
+    assert probe.cpu_model() == "AMD RYZEN AI MAX+ 395 w/ Radeon 8060S"
+    assert probe.loaded_modules() == {"amdgpu", "vfio_pci"}
+    assert probe.kernel_release() == "7.0.0-14-generic"
+    assert probe.os_release()["VERSION_ID"] == "26.04"
+
+
+def test_sys_readers(probe: Probe) -> None:
+    [gpu_node] = [node for node in probe.kfd_nodes() if node.is_gpu]
+    assert gpu_node.gfx_target == "gfx1151"
+    assert probe.iommu_group_count() == 3
+    [device] = probe.pci_devices()
+    assert device.is_display and device.vendor == "0x1002" and device.driver == "amdgpu"
+
+
+def test_which_uses_the_path_index(probe: Probe, sysroot: Path) -> None:
+    assert probe.which("rocminfo") == "/usr/bin/rocminfo"
+    assert probe.which("not-executable") is None
+    assert probe.which("vulkaninfo") is None
+    # Installing into a PATH directory changes its mtime and refreshes the index.
+    _write(sysroot, "/usr/local/bin/vulkaninfo", "").chmod(0o755)
+    assert probe.which("vulkaninfo") == "/usr/local/bin/vulkaninfo"
+    (sysroot / "usr/local/bin/vulkaninfo").unlink()
+    assert probe.which("vulkaninfo") is None
+
+
+def test_missing_files_degrade_to_empty(tmp_path: Path) -> None:
+    probe = Probe(tmp_path)
+    assert probe.meminfo() == {}
+    assert probe.cpu_model() is None
+    assert probe.kernel_release() is None
+    assert probe.kfd_nodes() == []
+    assert probe.pci_devices() == []
+
+
+def test_system_and_kvm_checks_read_the_sysroot(probe: Probe) -> None:
+    """The SYSTEM/KVM/GPU checks that moved onto the probe report from the fixture."""
+    assert system.check_ubuntu_version().message == "Ubuntu 26.04 LTS"
+    assert system.check_kernel_version().status is CheckStatus.OK
+    memory = system.check_memory()
+    assert (memory.status, memory.message) == (CheckStatus.OK, "Memory: 126GB")
+    assert system.check_cpu().status is CheckStatus.OK
+    assert kvm.check_iommu().message == "IOMMU enabled (3 groups)"
+    assert kvm.check_vfio().status is CheckStatus.OK
+    assert gpu.check_amd_driver().status is CheckStatus.OK
+
+
+def test_ssh_check_reads_drop_ins(probe: Probe, sysroot: Path) -> None:
+    _write(sysroot, "/etc/ssh/sshd_config", "Include /etc/ssh/sshd_config.d/*.conf\n#PasswordAuthentication no\n")
+    assert system.check_ssh_hardened().status is CheckStatus.WARN
+    _write(sysroot, "/etc/ssh/sshd_config.d/50-hardening.conf", "PasswordAuthentication no\n")
+    assert system.check_ssh_hardened().status is CheckStatus.OK
+
+
+def test_audio_check_finds_persistent_drop_in(probe: Probe, sysroot: Path) -> None:
+    _write(sysroot, "/sys/module/snd_hda_intel/parameters/power_save", "1\n")
+    assert system.check_audio_powersave().status is CheckStatus.WARN
+    _write(sysroot, "/etc/modprobe.d/audio-disable-powersave.conf", "options snd_hda_intel power_save=0\n")
+    result = system.check_audio_powersave()
+    assert result.status is CheckStatus.OK
+    assert "/etc/modprobe.d/audio-disable-powersave.conf" in result.message
+
+
+def _gpu_card(sysroot: Path, *, busy: int, sclk_level: int, gtt_used: int) -> str:
+    card = "/sys/class/drm/card1/device"
+    levels = ["600Mhz", "1500Mhz", "2900Mhz"]
+    sclk = "".join(f"{i}: {mhz}{' *' if i == sclk_level else ''}\n" for i, mhz in enumerate(levels))
+    _write(sysroot, f"{card}/gpu_busy_percent", f"{busy}\n")
+    _write(sysroot, f"{card}/pp_dpm_sclk", sclk)
+    _write(sysroot, f"{card}/pp_dpm_mclk", "0: 400Mhz\n1: 1000Mhz *\n")
+    _write(sysroot, f"{card}/mem_info_vram_total", f"{512 * 1024**2}\n")
+    _write(sysroot, f"{card}/mem_info_vram_used", f"{100 * 1024**2}\n")
+    _write(sysroot, f"{card}/mem_info_gtt_total", f"{96 * 1024**3}\n")
+    _write(sysroot, f"{card}/mem_info_gtt_used", f"{gtt_used}\n")
+    _write(sysroot, f"{card}/hwmon/hwmon3/power1_input", "85000000\n")
+    _write(sysroot, "/sys/class/drm/card1-DP-1/status", "connected\n")
+    return card
+
+
+def test_gpu_sampler_rereads_open_attributes(probe: Probe, sysroot: Path) -> None:
+    card = _gpu_card(sysroot, busy=97, sclk_level=2, gtt_used=10 * 1024**3)
+    assert probe.amdgpu_cards() == [card]
+    with GpuSampler(card) as sampler:
+        assert (sampler.sclk_max, sampler.gtt_total) == (2900, 96 * 1024**3)
+        first = sampler.sample()
+        _write(sysroot, f"{card}/gpu_busy_percent", "3\n")
+        second = sampler.sample()
+    assert (first.busy_percent, first.sclk_mhz, first.mclk_mhz, first.power_w) == (97, 2900, 1000, 85.0)
+    assert second.busy_percent == 3
+
+
+def test_gpu_sampler_polls_on_a_fixed_grid(probe: Probe, sysroot: Path) -> None:
+    card = _gpu_card(sysroot, busy=50, sclk_level=1, gtt_used=0)
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds + 0.01  # every poll oversleeps a little
+
+    with GpuSampler(card) as sampler:
+        samples = sampler.collect(1.0, 0.1, clock=lambda: now[0], sleep=sleep)
+    assert len(samples) == 10
+    assert samples[-1].at == pytest.approx(0.91)
+
+
+def test_gpu_load_flags_low_clocks_and_gtt_pressure(probe: Probe, sysroot: Path) -> None:
+    card = _gpu_card(sysroot, busy=99, sclk_level=1, gtt_used=90 * 1024**3)
+    with GpuSampler(card) as sampler:
+        result = gpu.summarize_gpu_load([sampler.sample() for _ in range(5)], sampler, 1.0)
+    assert result.status is CheckStatus.WARN
+    assert "sclk p50 1500 of 2900 MHz" in result.message
+    assert "GTT peaked at 94% of 96.0 GiB" in result.message
+    assert result.detail is not None and "busy: p50 99% / p95 99% / max 99%" in result.detail
+
+    _write(sysroot, f"{card}/pp_dpm_sclk", "0: 600Mhz\n1: 1500Mhz\n2: 2900Mhz *\n")
+    _write(sysroot, f"{card}/mem_info_gtt_used", f"{20 * 1024**3}\n")
+    ok = gpu.gpu_load_check(0.0).run()
+    assert ok.status is CheckStatus.OK
+    assert ok.message == "busy p50 99% / p95 99%, sclk p50 2900 MHz, GTT 20.0 of 96.0 GiB, 85 W p95"
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([10], 95) == 10
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def _gpu_memory(sysroot: Path, *, gtt_gib: int, pages_limit: int, pool: int, cmdline: str = "") -> None:
+    card = "/sys/class/drm/card1/device"
+    _write(sysroot, "/proc/meminfo", f"MemTotal: {128 * 1024**2} kB\n")
+    _write(sysroot, "/proc/cmdline", f"BOOT_IMAGE=/vmlinuz root=ZFS=rpool/ROOT {cmdline}\n")
+    _write(sysroot, f"{card}/mem_info_vram_total", f"{512 * 1024**2}\n")
+    _write(sysroot, f"{card}/mem_info_gtt_total", f"{gtt_gib * 1024**3}\n")
+    _write(sysroot, "/sys/module/ttm/parameters/pages_limit", f"{pages_limit}\n")
+    _write(sysroot, "/sys/module/ttm/parameters/page_pool_size", f"{pool}\n")
+
+
+def test_gpu_memory_limits_flag_the_default_half_of_ram(probe: Probe, sysroot: Path) -> None:
+    half = 64 * 1024**3 // 4096
+    _gpu_memory(sysroot, gtt_gib=64, pages_limit=half, pool=half)
+    result = gpu.check_gpu_memory_limits()
+    assert result.status is CheckStatus.WARN
+    assert result.message == "GPU can address 64.5 GiB of 128.0 GiB RAM, recommend GTT 120.0 GiB"
+    pages = 120 * 1024**3 // 4096
+    assert result.fix == (
+        f"echo 'GRUB_CMDLINE_LINUX_DEFAULT=\"$GRUB_CMDLINE_LINUX_DEFAULT ttm.pages_limit={pages} "
+        f"ttm.page_pool_size={pages}\"' | sudo tee /etc/default/grub.d/90-msai-gpu-memory.cfg && sudo update-grub"
+    )
+    assert not is_safe_fix(result.fix)  # boot configuration always asks
+    facts = {fact.name: fact.value for fact in result.facts}
+    assert facts["gpu_addressable_bytes"] == 64 * 1024**3 + 512 * 1024**2
+
+    # With ZFS loaded the recommendation leaves the ARC its floor.
+    _write(sysroot, "/proc/modules", "amdgpu 1 0 - Live 0x0\nzfs 1 0 - Live 0x0\n")
+    assert "recommend GTT 116.0 GiB" in gpu.check_gpu_memory_limits().message
+
+
+def test_gpu_memory_limits_catch_disagreeing_limits(probe: Probe, sysroot: Path) -> None:
+    limit = 112 * 1024**3 // 4096
+    _gpu_memory(sysroot, gtt_gib=112, pages_limit=limit, pool=limit)
+    assert gpu.check_gpu_memory_limits().status is CheckStatus.OK
+
+    # A gttsize the TTM limit cannot back, and a pool left at its default.
+    _gpu_memory(sysroot, gtt_gib=112, pages_limit=limit, pool=limit // 2, cmdline="amdgpu.gttsize=122880")
+    result = gpu.check_gpu_memory_limits()
+    assert result.status is CheckStatus.WARN
+    assert "amdgpu.gttsize 122880 MiB exceeds the TTM limit of 112.0 GiB" in result.message
+    assert "TTM pool 56.0 GiB below its limit" in result.message
+    assert result.fix is not None and f"amdgpu.gttsize=114688 ttm.pages_limit={limit}" in result.fix
+
+
+def test_transparent_hugepages_fix_is_safe(probe: Probe, sysroot: Path) -> None:
+    _write(sysroot, "/sys/kernel/mm/transparent_hugepage/enabled", "always madvise [never]\n")
+    _write(sysroot, "/sys/kernel/mm/transparent_hugepage/defrag", "[always] defer defer+madvise madvise never\n")
+    result = gpu.check_transparent_hugepages()
+    assert result.status is CheckStatus.WARN
+    assert result.message.startswith("enabled=never, defrag=always: hugepages disabled; synchronous compaction")
+    assert result.fix == SAFE_FIXES["thp_madvise"]
+    assert fix_target(result.fix) == "file:/etc/tmpfiles.d/msai-thp.conf"
+
+    _write(sysroot, "/sys/kernel/mm/transparent_hugepage/enabled", "always [madvise] never\n")
+    _write(sysroot, "/sys/kernel/mm/transparent_hugepage/defrag", "always defer [defer+madvise] madvise never\n")
+    assert gpu.check_transparent_hugepages().status is CheckStatus.OK
+
+
+def test_memory_fragmentation_from_buddyinfo(probe: Probe, sysroot: Path) -> None:
+    # Orders 0-10; 2 GiB free in 4 KiB pages against 512 MiB in 4 MiB blocks.
+    small = 2 * 1024**3 // 4096
+    _write(
+        sysroot,
+        "/proc/buddyinfo",
+        "Node 0, zone      DMA      0      0      0      0      0      0      0      0      0      1      0\n"
+        f"Node 0, zone   Normal {small} 0 0 0 0 0 0 0 0 0 128\n",
+    )
+    assert probe.buddyinfo() == [small, 0, 0, 0, 0, 0, 0, 0, 0, 1, 128]
+    result = gpu.check_memory_fragmentation()
+    assert result.status is CheckStatus.WARN
+    assert result.message.startswith("2.5 GiB free, 20% in 2 MiB or larger blocks")
+    assert result.fix is not None and not is_safe_fix(result.fix)
+
+    _write(sysroot, "/proc/buddyinfo", "Node 0, zone   Normal 10 0 0 0 0 0 0 0 0 0 4096\n")
+    assert gpu.check_memory_fragmentation().status is CheckStatus.OK
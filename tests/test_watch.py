@@ -0,0 +1,263 @@
+"""Tests for `msai doctor watch`: input fingerprints and selective re-runs."""
+
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+from typer.testing import CliRunner
+
+from msai_setup.cli import app
+from msai_setup.doctor import watch as watch_mod
+from msai_setup.doctor.checks import Category, Check, CheckResult, registry
+from msai_setup.doctor.profile import Profile
+from msai_setup.doctor.scheduler import iter_results
+from msai_setup.doctor.watch import Inotify, Watcher, fingerprint, watch_dirs
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import Probe, set_probe
+
+
+def _write(root: Path, path: str, text: str) -> Path:
+    target = root / path.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+    return target
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _reading(name: str, probe: Probe, path: str, calls: list[str], **kwargs: Any) -> Check:
+    def run() -> CheckResult:
+        calls.append(name)
+        text = probe.read(path)
+        status = CheckStatus.OK if text and text.strip() == "0" else CheckStatus.WARN
+        return CheckResult(name=name, status=status, message=f"{name}: {text!r}", category=Category.SYSTEM)
+
+    return Check(name=name, run=run, inputs=(path,), **kwargs)
+
+
+def _counting(name: str, calls: list[str], **kwargs: Any) -> Check:
+    def run() -> CheckResult:
+        calls.append(name)
+        return CheckResult(name=name, status=CheckStatus.OK, message=name, category=Category.SYSTEM)
+
+    return Check(name=name, run=run, **kwargs)
+
+
+@pytest.fixture
+def probe(tmp_path: Path) -> Probe:
+    _write(tmp_path, "/etc/ssh/sshd_config", "PasswordAuthentication yes\n")
+    _write(tmp_path, "/etc/ssh/sshd_config.d/50-cloud.conf", "")
+    _write(tmp_path, "/sys/module/snd_hda_intel/parameters/power_save", "1\n")
+    return Probe(tmp_path)
+
+
+def test_fingerprint_tracks_globs_drop_ins_and_pseudo_file_content(probe: Probe) -> None:
+    ssh = fingerprint(("/etc/ssh/sshd_config*",), probe)
+    assert [stamp[0] for stamp in ssh] == [
+        "/etc/ssh/sshd_config",
+        "/etc/ssh/sshd_config.d",
+        "/etc/ssh/sshd_config.d/50-cloud.conf",
+    ]
+    _write(probe.sysroot, "/etc/ssh/sshd_config.d/60-hardening.conf", "PasswordAuthentication no\n")
+    assert fingerprint(("/etc/ssh/sshd_config*",), probe) != ssh
+
+    # sysfs attributes keep their size and mtime; the content is what moves.
+    param = probe.resolve("/sys/module/snd_hda_intel/parameters/power_save")
+    before = fingerprint(("/sys/module/snd_hda_intel/parameters/power_save",), probe)
+    st = param.stat()
+    param.write_text("0\n")
+    os.utime(param, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert fingerprint(("/sys/module/snd_hda_intel/parameters/power_save",), probe) != before
+
+
+def test_fingerprint_notices_a_missing_input_appearing(probe: Probe) -> None:
+    before = fingerprint(("/dev/kvm",), probe)
+    assert before == (("/dev/kvm", -1, -1, -1, None),)
+    _write(probe.sysroot, "/dev/kvm", "")
+    assert fingerprint(("/dev/kvm",), probe) != before
+
+
+def test_watch_dirs_cover_parents_and_drop_in_directories(probe: Probe) -> None:
+    dirs = watch_dirs(("/etc/ssh/sshd_config*", "/dev/kvm"), probe)
+    assert probe.resolve("/etc/ssh") in dirs
+    assert probe.resolve("/etc/ssh/sshd_config.d") in dirs
+    assert probe.resolve("/dev") not in dirs  # does not exist in the fixture
+
+
+def test_sysfs_symlink_cycles_are_stamped_but_never_followed(probe: Probe) -> None:
+    root = probe.sysroot
+    cpu0 = "/sys/devices/system/cpu/cpu0"
+    _write(root, f"{cpu0}/cpufreq/scaling_governor", "powersave\n")
+    (root / "sys/devices/system/node/node0").mkdir(parents=True)
+    (root / "sys/devices/system/node/node0/cpu0").symlink_to("../../cpu/cpu0")
+    (root / cpu0.lstrip("/") / "node0").symlink_to("../../node/node0")
+    (root / "sys/bus/cpu/devices").mkdir(parents=True)
+    (root / "sys/bus/cpu/devices/cpu0").symlink_to("../../../devices/system/cpu/cpu0")
+    (root / cpu0.lstrip("/") / "subsystem").symlink_to("../../../../bus/cpu")
+
+    walked = [stamp[0] for stamp in fingerprint(("/sys/devices/system",), probe)]
+    assert f"{cpu0}/node0" in walked and f"{cpu0}/subsystem" in walked
+    assert f"{cpu0}/cpufreq/scaling_governor" in walked
+    assert not any("/node0/cpu0/" in host or "/subsystem/" in host for host in walked)
+
+    governors = ("/sys/devices/system/cpu/cpu*/cpufreq/scaling_governor",)
+    assert watch_dirs(governors, probe) == {
+        probe.resolve("/sys/devices/system/cpu"),
+        probe.resolve(f"{cpu0}/cpufreq"),
+    }
+    assert watch_dirs(("/sys/devices/system",), probe) == {
+        probe.resolve(path)
+        for path in (
+            "/sys/devices",
+            "/sys/devices/system",
+            "/sys/devices/system/cpu",
+            cpu0,
+            f"{cpu0}/cpufreq",
+            "/sys/devices/system/node",
+            "/sys/devices/system/node/node0",
+        )
+    }
+
+
+def test_watcher_reruns_only_checks_whose_inputs_changed(probe: Probe) -> None:
+    calls: list[str] = []
+    clock = _Clock()
+    checks = [
+        (Category.SYSTEM, _reading("audio", probe, "/sys/module/snd_hda_intel/parameters/power_save", calls)),
+        (Category.SYSTEM, _reading("ssh", probe, "/etc/ssh/sshd_config", calls)),
+        (Category.SYSTEM, _counting("static", calls)),
+    ]
+    watcher = Watcher(checks, profile=Profile.SERVER, interval=60.0, probe=probe, clock=clock)
+
+    assert watcher.tick() == [0, 1, 2]
+    assert sorted(calls) == ["audio", "ssh", "static"]
+
+    calls.clear()
+    clock.now += 10
+    assert watcher.tick() == []
+    assert calls == []
+
+    _write(probe.sysroot, "/sys/module/snd_hda_intel/parameters/power_save", "0\n")
+    assert watcher.tick() == [0]
+    assert calls == ["audio"]
+    assert watcher.slots[0].shown is not None
+    assert watcher.slots[0].shown.status is CheckStatus.OK
+
+
+def test_watcher_reruns_on_interval_but_redraws_only_changes(probe: Probe) -> None:
+    calls: list[str] = []
+    clock = _Clock()
+    checks = [
+        (Category.SYSTEM, _counting("fast", calls, interval=5.0)),
+        (Category.SYSTEM, _counting("slow", calls)),
+    ]
+    watcher = Watcher(checks, profile=Profile.SERVER, interval=60.0, probe=probe, clock=clock)
+    watcher.tick()
+    calls.clear()
+
+    clock.now += 6
+    assert watcher.stale() == [0]
+    assert watcher.tick() == []  # re-ran, but the row is unchanged
+    assert calls == ["fast"]
+    assert watcher.next_due() == pytest.approx(clock.now + 5.0)
+
+
+def test_watcher_reruns_dependents_of_a_changed_check(probe: Probe) -> None:
+    calls: list[str] = []
+    clock = _Clock()
+    audio = _reading("audio", probe, "/sys/module/snd_hda_intel/parameters/power_save", calls)
+    dependent = _counting("dependent", calls, requires=(audio.run,))
+    watcher = Watcher(
+        [(Category.SYSTEM, audio), (Category.SYSTEM, dependent)],
+        profile=Profile.SERVER,
+        probe=probe,
+        clock=clock,
+    )
+
+    watcher.tick()
+    assert calls == ["audio"]  # audio warns, so the dependent is skipped
+    assert watcher.slots[1].shown is not None
+    assert watcher.slots[1].shown.status is CheckStatus.SKIP
+
+    calls.clear()
+    _write(probe.sysroot, "/sys/module/snd_hda_intel/parameters/power_save", "0\n")
+    assert watcher.tick() == [0, 1]
+    assert calls == ["audio", "dependent"]
+
+
+def test_watcher_follows_performance_checks_through_sysfs(probe: Probe) -> None:
+    root = probe.sysroot
+    for cpu in (0, 1):
+        cpufreq = f"/sys/devices/system/cpu/cpu{cpu}/cpufreq"
+        _write(root, f"{cpufreq}/scaling_driver", "amd-pstate-epp\n")
+        _write(root, f"{cpufreq}/scaling_governor", "powersave\n")
+        _write(root, f"{cpufreq}/energy_performance_preference", "balance_performance\n")
+        (root / f"sys/devices/system/cpu/cpu{cpu}/subsystem").symlink_to("../../../../bus/cpu")
+    (root / "sys/bus/cpu/devices").mkdir(parents=True)
+    (root / "sys/bus/cpu/devices/cpu0").symlink_to("../../../devices/system/cpu/cpu0")
+    checks = registry.get_checks([Category.PERFORMANCE])
+    names = [check.name for _cat, check in checks]
+    previous = set_probe(probe)
+    try:
+        watcher = Watcher(checks, profile=Profile.SERVER, probe=probe, clock=_Clock())
+        watcher.tick()
+        assert probe.resolve("/sys/devices/system/cpu") in watcher.watch_dirs()
+        assert watcher.stale() == []
+
+        _write(root, "/sys/devices/system/cpu/cpu1/cpufreq/scaling_governor", "performance\n")
+        assert [names[index] for index in watcher.stale()] == ["CPU frequency scaling", "Performance profile"]
+        changed = watcher.tick()
+    finally:
+        set_probe(previous)
+    assert [names[index] for index in changed] == ["CPU frequency scaling"]
+    shown = watcher.slots[names.index("CPU frequency scaling")].shown
+    assert shown is not None and "governor mixed" in shown.message
+
+
+def test_known_results_gate_prerequisites_outside_the_run() -> None:
+    calls: list[str] = []
+    prereq = _counting("prereq", calls)
+    dependent = _counting("dependent", calls, requires=(prereq.run,))
+    failed = CheckResult(name="prereq", status=CheckStatus.FAIL, message="no", category=Category.SYSTEM)
+
+    [(_, result)] = list(iter_results([(Category.SYSTEM, dependent)], known={prereq.run: failed}))
+    assert result.status is CheckStatus.SKIP
+    assert calls == []
+
+
+def test_inotify_wakes_on_a_new_file(tmp_path: Path) -> None:
+    notifier = Inotify()
+    if not notifier.active:
+        pytest.skip("inotify unavailable")
+    try:
+        notifier.add(tmp_path)
+        assert notifier.wait(0.0) is False
+        (tmp_path / "sshd_config").write_text("PasswordAuthentication no\n")
+        assert notifier.wait(2.0) is True
+        assert notifier.wait(0.0) is False  # drained
+    finally:
+        notifier.close()
+
+
+def test_cli_parses_watch_durations(monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: dict[str, float] = {}
+
+    def fake_watch(checks: object, *, interval: float, poll: float, **_kwargs: object) -> None:
+        seen.update(interval=interval, poll=poll)
+
+    monkeypatch.setattr(watch_mod, "watch", fake_watch)
+    runner = CliRunner()
+
+    assert runner.invoke(app, ["doctor", "watch", "system", "--poll", "500ms"]).exit_code == 0
+    assert seen == {"interval": 300.0, "poll": 0.5}
+
+    bad = runner.invoke(app, ["doctor", "watch", "--interval", "soon"])
+    assert bad.exit_code == 2
+    assert "Invalid value for '--interval'" in bad.output
@@ -0,0 +1,364 @@
+"""Tests for the zpool status model and the ZFS checks built on it."""
+
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from msai_setup.doctor.checks import Category, registry, zfs
+from msai_setup.doctor.scheduler import iter_results
+from msai_setup.utils.formatting import CheckStatus
+from msai_setup.utils.probe import Probe, set_probe
+from msai_setup.utils.shell import CommandResult
+from msai_setup.utils.zfs import SnapshotScanner, arc_activity, parse_arcstats, parse_zpool_status
+
+GIB = 1024**3
+
+NVME = "/dev/disk/by-id/nvme-Samsung_SSD_990_PRO_4TB_S7KGNU0X"
+
+ZPOOL_STATUS = f"""\
+  pool: rpool
+ state: ONLINE
+status: Some supported and requested features are not enabled on the pool.
+\tThe pool can still be used, but some features are unavailable.
+action: Enable all features using 'zpool upgrade'.
+  scan: scrub repaired 0 in 00:00:12 with 0 errors on Sun Jan  5 03:24:01 2025
+config:
+
+\tNAME                                STATE     READ WRITE CKSUM
+\trpool                               ONLINE       0     0     0
+\t  mirror-0                          ONLINE       0     0     0
+\t    {NVME}1-part4                   ONLINE       0     0     0
+\t    {NVME}2-part4                   ONLINE       0     0     0
+
+errors: No known data errors
+
+  pool: tank
+ state: DEGRADED
+status: One or more devices has experienced an unrecoverable error.
+action: Replace the faulted device, or use 'zpool clear' to mark the device repaired.
+  scan: scrub in progress since Mon Feb 10 01:00:00 2025
+\t3298534883328 scanned at 1073741824/s, 1099511627776 issued at 536870912/s, 8796093022208 total
+\t0 repaired, 12.50% done, 01:23:45 to go
+config:
+
+\tNAME                    STATE     READ WRITE CKSUM
+\ttank                    DEGRADED     0     0     0
+\t  raidz1-0              DEGRADED     0     0     0
+\t    /dev/sda1           ONLINE       0     0     0
+\t    /dev/sdb1           FAULTED      3     0    12  too many errors
+\t    /dev/sdc1           ONLINE       0     0     0
+\tlogs
+\t  {NVME}1-part5         ONLINE       0     0     0
+\tcache
+\t  {NVME}2-part5         ONLINE       0     0     0
+\tspares
+\t  /dev/sdd1             AVAIL
+
+errors: 2 data errors, use '-v' for a list
+"""
+
+
+def test_parses_every_pool_in_one_pass() -> None:
+    pools = parse_zpool_status(ZPOOL_STATUS)
+    assert list(pools) == ["rpool", "tank"]
+
+    rpool = pools["rpool"]
+    assert rpool.state == "ONLINE"
+    assert rpool.status.splitlines()[1] == "The pool can still be used, but some features are unavailable."
+    assert rpool.scan.completed == datetime(2025, 1, 5, 3, 24, 1)
+    assert rpool.scan.errors == 0
+    assert [vdev.name for vdev in rpool.devices()] == [f"{NVME}1-part4", f"{NVME}2-part4"]
+    assert rpool.data_errors == 0
+
+
+def test_parses_the_vdev_tree_counters_and_scan_progress() -> None:
+    tank = parse_zpool_status(ZPOOL_STATUS)["tank"]
+    assert tank.root is not None
+    [raidz] = tank.root.children
+    assert raidz.name == "raidz1-0" and raidz.state == "DEGRADED"
+    faulted = raidz.children[1]
+    assert (faulted.name, faulted.state) == ("/dev/sdb1", "FAULTED")
+    assert (faulted.read, faulted.write, faulted.cksum) == (3, 0, 12)
+    assert faulted.note == "too many errors"
+    assert [vdev.name for vdev in tank.groups["logs"]] == [f"{NVME}1-part5"]
+    assert tank.groups["spares"][0].state == "AVAIL"
+    assert len(tank.devices()) == 6
+
+    assert tank.scan.function == "scrub" and tank.scan.state == "scanning"
+    assert tank.scan.started == datetime(2025, 2, 10, 1, 0, 0)
+    assert tank.scan.percent_done == 12.5
+    assert tank.scan.completed is None
+    assert tank.data_errors == 2
+
+
+def test_removal_and_checkpoint_sections_stay_out_of_the_others() -> None:
+    text = (
+        "  pool: tank\n state: ONLINE\n"
+        "status: Some supported and requested features are not enabled on the pool.\n"
+        "action: Enable all features using 'zpool upgrade'.\n"
+        "  scan: scrub repaired 0B in 00:10:00 with 0 errors on Sun Jan  5 03:24:01 2025\n"
+        "remove: Removal of vdev 1 copied 1288490188 in 0h2m, completed on Mon Jan  6 10:00:00 2025\n"
+        "\t12.3K memory used for removed device mappings\n"
+        "checkpoint: created Tue Jan  7 09:00:00 2025, consumes 1048576\n"
+        "config:\n\n\ttank ONLINE 0 0 0\n\t  /dev/sda1 ONLINE 0 0 0\n\n"
+        "errors: No known data errors\n"
+    )
+    tank = parse_zpool_status(text)["tank"]
+    assert tank.status == "Some supported and requested features are not enabled on the pool."
+    assert tank.action == "Enable all features using 'zpool upgrade'."
+    assert tank.scan.completed == datetime(2025, 1, 5, 3, 24, 1)
+    assert tank.scan.errors == 0
+    assert tank.removal.splitlines() == [
+        "Removal of vdev 1 copied 1288490188 in 0h2m, completed on Mon Jan  6 10:00:00 2025",
+        "12.3K memory used for removed device mappings",
+    ]
+    assert tank.checkpoint == "created Tue Jan  7 09:00:00 2025, consumes 1048576"
+    assert [vdev.name for vdev in tank.devices()] == ["/dev/sda1"]
+
+
+def test_parses_scans_that_never_ran_or_were_resilvers() -> None:
+    text = (
+        "  pool: a\n state: ONLINE\n  scan: none requested\nconfig:\n\n\ta ONLINE 0 0 0\n\n"
+        "errors: No known data errors\n"
+        "  pool: b\n state: ONLINE\n"
+        "  scan: resilvered 1.20K in 00:00:01 with 0 errors on Tue Mar  4 10:00:00 2025\n"
+        "config:\n\n\tb ONLINE 0 0 1.2K\n"
+    )
+    pools = parse_zpool_status(text)
+    assert pools["a"].scan.state == "none" and pools["a"].scan.function is None
+    assert pools["b"].scan.function == "resilver" and pools["b"].scan.completed is None
+    assert pools["b"].root is not None and pools["b"].root.cksum == 1200
+    assert parse_zpool_status("no pools available\n") == {}
+
+
+@pytest.fixture
+def zpool(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, ...]]:
+    calls: list[tuple[str, ...]] = []
+
+    def fake(cmd: str, **_kwargs: object) -> CommandResult:
+        calls.append(tuple(cmd.split()) if isinstance(cmd, str) else tuple(cmd))
+        return CommandResult(0, ZPOOL_STATUS, "")
+
+    monkeypatch.setattr(zfs, "run_command", fake)
+    return calls
+
+
+def test_checks_cover_all_pools_from_one_command(zpool: list[tuple[str, ...]]) -> None:
+    exists = zfs.check_zfs_pool_exists()
+    assert exists.status is CheckStatus.OK
+    assert exists.message == "Imported: 'rpool', 'tank'"
+
+    health = zfs.check_zfs_pool_health()
+    assert health.status is CheckStatus.FAIL
+    assert health.message == "Pool health: 'tank' is DEGRADED"
+    assert {fact.labels["pool"]: fact.value for fact in health.facts} == {"rpool": 1, "tank": 0}
+
+    errors = zfs.check_zfs_device_errors()
+    assert errors.status is CheckStatus.WARN
+    assert errors.detail is not None and errors.detail.startswith("/dev/sdb1 (read 3, write 0, cksum 12)")
+    tank_errors = {f.labels["kind"]: f.value for f in errors.facts if f.labels["pool"] == "tank"}
+    assert tank_errors == {"read": 3, "write": 0, "cksum": 12}
+
+    assert {call for call in zpool} == {("zpool", "status", "-p", "-P")}
+
+
+def test_scrub_check_reports_each_pool(zpool: list[tuple[str, ...]]) -> None:
+    scrub = zfs.check_zfs_scrub()
+    assert scrub.status is CheckStatus.WARN  # rpool's last scrub is long past
+    assert scrub.message.startswith("Last scrub: rpool ")
+    assert "tank scrub in progress, 12.5% done" in scrub.message
+    assert scrub.fix == "sudo zpool scrub rpool"
+    assert [fact.labels for fact in scrub.facts] == [{"pool": "rpool"}]
+
+
+def test_missing_data_pool_is_its_own_finding(monkeypatch: pytest.MonkeyPatch) -> None:
+    only_rpool = ZPOOL_STATUS[: ZPOOL_STATUS.index("  pool: tank")]
+    monkeypatch.setattr(zfs, "run_command", lambda *_a, **_k: CommandResult(0, only_rpool, ""))
+    checks = [
+        (Category.ZFS, check)
+        for _category, check in registry.get_checks([Category.ZFS])
+        if check.name in ("Pool exists", "Data pool", "Pool health", "Scrub recent", "Device errors")
+    ]
+    results = {result.name: result for _index, result in iter_results(checks, jobs=2)}
+
+    assert results["Pool exists"].status is CheckStatus.OK
+    assert results["Data pool"].status is CheckStatus.FAIL
+    assert results["Data pool"].fix == "sudo zpool import tank"
+    # rpool is still checked: the per-pool checks only need some pool imported.
+    assert results["Pool health"].status is CheckStatus.OK
+    assert results["Scrub recent"].status is CheckStatus.WARN
+    assert results["Device errors"].status is CheckStatus.OK
+
+
+def test_no_pools_offers_an_import_and_skips_the_pool_checks(monkeypatch: pytest.MonkeyPatch) -> None:
+    commands: list[str] = []
+
+    def run_command(command: str, **_kwargs: object) -> CommandResult:
+        commands.append(command)
+        return CommandResult(0, "no pools available\n", "")
+
+    monkeypatch.setattr(zfs, "run_command", run_command)
+    exists = zfs.check_zfs_pool_exists()
+    assert (exists.status, exists.message, exists.fix) == (
+        CheckStatus.FAIL,
+        "No pools imported",
+        "sudo zpool import tank",
+    )
+
+    commands.clear()
+    checks = [
+        (category, check)
+        for category, check in registry.get_checks([Category.ZFS])
+        if check.name in ("Pool exists", "Auto-snapshots")
+    ]
+    results = {result.name: result for _index, result in iter_results(checks, jobs=2)}
+    assert results["Auto-snapshots"].status is CheckStatus.SKIP
+    assert commands == ["zpool status -p -P"]
+
+
+def _arcstats(*, hits: int, misses: int, size: int, c_max: int) -> str:
+    return (
+        "13 1 0x01 147 39984 4815162342 1234567890\n"
+        "name                            type data\n"
+        f"hits                            4    {hits}\n"
+        f"demand_data_hits                4    {hits}\n"
+        f"demand_data_misses              4    {misses}\n"
+        "demand_metadata_hits            4    0\n"
+        "prefetch_data_hits              4    0\n"
+        "prefetch_data_misses            4    100\n"
+        f"size                            4    {size}\n"
+        f"c_max                           4    {c_max}\n"
+    )
+
+
+def _write(root: Path, path: str, text: str) -> None:
+    target = root / path.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+
+
+@pytest.fixture
+def arc_host(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """A 128 GiB unified-memory box with 96 GiB of GTT and a 64 GiB default ARC ceiling."""
+    monkeypatch.setattr(zfs, "ARC_SAMPLE_S", 0.0)
+    _write(tmp_path, "/proc/meminfo", f"MemTotal: {128 * GIB // 1024} kB\n")
+    _write(tmp_path, "/proc/spl/kstat/zfs/arcstats", _arcstats(hits=9000, misses=1000, size=60 * GIB, c_max=64 * GIB))
+    _write(tmp_path, "/sys/class/drm/card1/device/mem_info_gtt_total", f"{96 * GIB}\n")
+    _write(tmp_path, "/sys/class/drm/card1-DP-1/status", "disconnected\n")
+    _write(tmp_path, "/sys/module/zfs/parameters/zfs_arc_max", "0\n")
+    _write(tmp_path, "/proc/mounts", "rpool/ROOT/ubuntu / zfs rw 0 0\n")
+    previous = set_probe(Probe(tmp_path))
+    yield tmp_path
+    set_probe(previous)
+
+
+def test_arc_activity_splits_demand_and_prefetch() -> None:
+    before = parse_arcstats(_arcstats(hits=100, misses=10, size=0, c_max=1))
+    after = parse_arcstats(_arcstats(hits=190, misses=20, size=0, c_max=1))
+    assert before["c_max"] == 1 and "name" not in before
+    window = arc_activity(after, before)
+    assert (window.demand_hits, window.demand_misses, window.prefetch_misses) == (90, 10, 0)
+    assert window.demand_hit_ratio == 0.9
+    assert arc_activity(after).hit_ratio == pytest.approx(190 / 310)
+
+
+def test_recommended_arc_max_leaves_room_for_gtt() -> None:
+    assert zfs.recommend_arc_max(128 * GIB, 96 * GIB) == 24 * GIB
+    assert zfs.recommend_arc_max(128 * GIB, 124 * GIB) == zfs.ARC_FLOOR
+    assert zfs.recommend_arc_max(128 * GIB, 16 * GIB) == 64 * GIB  # never above the ZFS default
+
+
+def test_arc_check_recommends_a_ceiling_below_the_gtt(arc_host: Path) -> None:
+    result = zfs.check_zfs_arc()
+    assert result.status is CheckStatus.WARN
+    assert "hit ratio 89.1% since load" in result.message  # no traffic between the two samples
+    assert "recommend arc_max 24.0 GiB" in result.message
+    assert result.fix is not None
+    assert f"options zfs zfs_arc_max={24 * GIB}' | sudo tee /etc/modprobe.d/zfs-arc-max.conf" in result.fix
+    assert result.fix.endswith("update-initramfs -u")
+    facts = {fact.name: fact.value for fact in result.facts}
+    assert facts["zfs_arc_recommended_max_bytes"] == 24 * GIB
+
+
+def test_arc_check_wants_runtime_limits_persisted(arc_host: Path) -> None:
+    _write(arc_host, "/proc/spl/kstat/zfs/arcstats", _arcstats(hits=99, misses=1, size=GIB, c_max=24 * GIB))
+    _write(arc_host, "/sys/module/zfs/parameters/zfs_arc_max", f"{24 * GIB}\n")
+    result = zfs.check_zfs_arc()
+    assert result.status is CheckStatus.WARN
+    assert "runtime only" in result.message
+
+    _write(arc_host, "/etc/modprobe.d/zfs.conf", f"options zfs zfs_arc_max={24 * GIB}\n")
+    assert zfs.check_zfs_arc().status is CheckStatus.OK
+
+
+def test_snapshot_scanner_folds_lines_per_dataset() -> None:
+    scanner = SnapshotScanner()
+    for line in (
+        "tank/vm@zfs-auto-snap_hourly-2025-03-01-1000\t1740823200\t4096",
+        "tank/vm@before-upgrade\t1700000000\t1048576",
+        "tank/vm@zfs-auto-snap_hourly-2025-03-01-1100\t1740826800\t0",
+        "rpool/ROOT/ubuntu@autosnap_2025-03-01_00:00:00_daily\t1740787200\t8192",
+        "garbage",
+    ):
+        scanner.add(line)
+    vm = scanner.datasets["tank/vm"]
+    assert (vm.count, vm.used, vm.oldest, vm.newest) == (3, 1052672, 1700000000, 1740826800)
+    assert (vm.auto_count, vm.newest_auto) == (2, 1740826800)
+    assert scanner.datasets["rpool/ROOT/ubuntu"].pool == "rpool"
+    assert (scanner.total, scanner.malformed) == (4, 1)
+
+
+@pytest.fixture
+def zfs_list(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A stub ``zfs`` on PATH whose listing is generated by a shell snippet in ``listing.sh``."""
+    stub = tmp_path / "bin" / "zfs"
+    stub.parent.mkdir()
+    stub.write_text(f"#!/bin/sh\nexec sh {tmp_path / 'listing.sh'}\n")
+    stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{stub.parent}:/usr/bin:/bin")
+    monkeypatch.setattr(zfs, "command_exists", lambda name: name == "zfs-auto-snapshot")
+    return tmp_path / "listing.sh"
+
+
+def test_snapshot_check_streams_a_large_listing(zfs_list: Path) -> None:
+    now = int(time.time())
+    # 20k fresh hourly snapshots on one dataset, one healthy dataset.
+    zfs_list.write_text(
+        f"awk 'BEGIN {{ for (i = 0; i < 20000; i++) "
+        f'printf "tank/docker@zfs-auto-snap_hourly-%d\\t%d\\t4096\\n", i, {now} - i }}\'\n'
+        f'printf "tank/home@zfs-auto-snap_daily-1\\t%d\\t0\\n" {now - 3600}\n'
+    )
+    result = zfs.check_zfs_snapshots()
+    assert result.status is CheckStatus.WARN
+    assert result.message == "Snapshots: not pruned on tank/docker (20000 snapshots)"
+    facts = {(fact.name, tuple(fact.labels.values())): fact.value for fact in result.facts}
+    assert facts[("zfs_snapshots", ())] == 20001
+    assert facts[("zfs_snapshot_used_bytes", ("tank",))] == 20000 * 4096
+
+
+def test_snapshot_check_flags_sets_that_stopped(zfs_list: Path) -> None:
+    now = int(time.time())
+    zfs_list.write_text(
+        f'printf "tank/vm@zfs-auto-snap_hourly-1\\t%d\\t0\\n" {now - 9 * 86400}\n'
+        f'printf "tank/vm@manual\\t%d\\t0\\n" {now - 60}\n'
+        f'printf "tank/home@zfs-auto-snap_hourly-1\\t%d\\t0\\n" {now - 600}\n'
+    )
+    result = zfs.check_zfs_snapshots()
+    assert result.status is CheckStatus.WARN
+    assert result.message == "Snapshots: auto-snapshots stopped on tank/vm (last 9 days ago)"
+
+    zfs_list.write_text(f'printf "tank/home@zfs-auto-snap_hourly-1\\t%d\\t0\\n" {now - 600}\n')
+    ok = zfs.check_zfs_snapshots()
+    assert ok.status is CheckStatus.OK
+    assert ok.message == "zfs-auto-snapshot: 1 snapshots in 1 datasets, newest 0 hours old"
+
+
+def test_snapshot_check_warns_when_the_tool_takes_none(zfs_list: Path) -> None:
+    zfs_list.write_text("exit 0\n")
+    result = zfs.check_zfs_snapshots()
+    assert result.status is CheckStatus.WARN
+    assert result.message == "zfs-auto-snapshot installed but no snapshots taken"
+    assert [(fact.name, fact.value) for fact in result.facts] == [("zfs_snapshots", 0)]